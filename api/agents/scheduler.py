@@ -13,6 +13,7 @@ Uses APScheduler with AsyncIOScheduler for async/await compatibility.
 
 import asyncio
 import logging
+import os
 
 # Import ML services
 import sys
@@ -22,12 +23,16 @@ from typing import Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from openai import AsyncOpenAI
+from supabase import Client, create_client
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+from api.analytics.aggregates import get_interaction_aggregates
 from ml.churn_predictor import ChurnPredictor
 from ml.clustering_service import ContactClusteringService
+from ml.embedding_store import EmbeddingStore
 from ml.embeddings_service import ContactEmbeddingsService
 from ml.recommendation_engine import RecommendationEngine
 from ml.sentiment_analyzer import SentimentAnalyzer
@@ -43,6 +48,20 @@ logger = logging.getLogger(__name__)
 # Global scheduler instance
 _scheduler: Optional[AsyncIOScheduler] = None
 
+# Shared memory-mapped embedding store (one copy on disk, page cache shared by workers)
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", "data/embedding_store")
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+EMBEDDING_STORE_COMPACT_RATIO = 0.2  # Compact when >20% of rows are tombstones
+
+_embedding_store: Optional[EmbeddingStore] = None
+
+# Shared clients (initialized on first use)
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+
+_supabase: Optional[Client] = None
+_openai_client: Optional[AsyncOpenAI] = None
+
 # ML service instances (initialized on first use)
 _embeddings_service: Optional[ContactEmbeddingsService] = None
 _recommendation_engine: Optional[RecommendationEngine] = None
@@ -51,11 +70,40 @@ _sentiment_analyzer: Optional[SentimentAnalyzer] = None
 _clustering_service: Optional[ContactClusteringService] = None
 
 
+def _get_supabase() -> Client:
+    """Lazy initialization of the shared Supabase client."""
+    global _supabase
+    if _supabase is None:
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        logger.info("Initialized Supabase client")
+    return _supabase
+
+
+def _get_openai_client() -> AsyncOpenAI:
+    """Lazy initialization of the shared OpenAI client (OPENAI_API_KEY)."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        logger.info("Initialized OpenAI client")
+    return _openai_client
+
+
+def _get_embedding_store() -> EmbeddingStore:
+    """Lazy initialization of the shared EmbeddingStore."""
+    global _embedding_store
+    if _embedding_store is None:
+        _embedding_store = EmbeddingStore(EMBEDDING_STORE_PATH, dtype=EMBEDDING_STORE_DTYPE)
+        logger.info(f"Opened embedding store {EMBEDDING_STORE_PATH} ({len(_embedding_store)} rows)")
+    return _embedding_store
+
+
 def _get_embeddings_service() -> ContactEmbeddingsService:
     """Lazy initialization of ContactEmbeddingsService."""
     global _embeddings_service
     if _embeddings_service is None:
-        _embeddings_service = ContactEmbeddingsService()
+        _embeddings_service = ContactEmbeddingsService(
+            _get_supabase(), _get_openai_client(), embedding_store=_get_embedding_store()
+        )
         logger.info("Initialized ContactEmbeddingsService")
     return _embeddings_service
 
@@ -64,7 +112,7 @@ def _get_recommendation_engine() -> RecommendationEngine:
     """Lazy initialization of RecommendationEngine."""
     global _recommendation_engine
     if _recommendation_engine is None:
-        _recommendation_engine = RecommendationEngine()
+        _recommendation_engine = RecommendationEngine(_get_supabase(), _get_embeddings_service())
         logger.info("Initialized RecommendationEngine")
     return _recommendation_engine
 
@@ -73,7 +121,7 @@ def _get_churn_predictor() -> ChurnPredictor:
     """Lazy initialization of ChurnPredictor."""
     global _churn_predictor
     if _churn_predictor is None:
-        _churn_predictor = ChurnPredictor()
+        _churn_predictor = ChurnPredictor(_get_supabase(), aggregates=get_interaction_aggregates())
         logger.info("Initialized ChurnPredictor")
     return _churn_predictor
 
@@ -82,7 +130,9 @@ def _get_sentiment_analyzer() -> SentimentAnalyzer:
     """Lazy initialization of SentimentAnalyzer."""
     global _sentiment_analyzer
     if _sentiment_analyzer is None:
-        _sentiment_analyzer = SentimentAnalyzer()
+        _sentiment_analyzer = SentimentAnalyzer(
+            _get_supabase(), aggregates=get_interaction_aggregates()
+        )
         logger.info("Initialized SentimentAnalyzer")
     return _sentiment_analyzer
 
@@ -91,7 +141,9 @@ def _get_clustering_service() -> ContactClusteringService:
     """Lazy initialization of ContactClusteringService."""
     global _clustering_service
     if _clustering_service is None:
-        _clustering_service = ContactClusteringService()
+        _clustering_service = ContactClusteringService(
+            _get_supabase(), _get_embeddings_service(), embedding_store=_get_embedding_store()
+        )
         logger.info("Initialized ContactClusteringService")
     return _clustering_service
 
@@ -148,7 +200,13 @@ async def job_generate_embeddings():
         logger.info(f"Found {len(contacts)} contacts needing embeddings")
 
         # Batch generate embeddings
-        processed = await service.batch_generate_embeddings(contacts, batch_size=10)
+        processed = await service.batch_generate_embeddings(contacts)
+
+        # Reclaim rows replaced by re-embedded contacts
+        store = _get_embedding_store()
+        if store.dead_ratio > EMBEDDING_STORE_COMPACT_RATIO:
+            reclaimed = store.compact()
+            logger.info(f"Compacted embedding store: {reclaimed} rows reclaimed")
 
         duration = (datetime.utcnow() - start_time).total_seconds()
         logger.info(
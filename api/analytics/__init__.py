@@ -1,5 +1,19 @@
 """Analytics module exports"""
 
+from .aggregates import (
+    ContactAggregate,
+    InteractionAggregates,
+    WorkspaceAggregates,
+    get_interaction_aggregates,
+)
+from .engine import InteractionDataset
 from .metrics import AnalyticsMetrics
 
-__all__ = ["AnalyticsMetrics"]
+__all__ = [
+    "AnalyticsMetrics",
+    "ContactAggregate",
+    "InteractionAggregates",
+    "InteractionDataset",
+    "WorkspaceAggregates",
+    "get_interaction_aggregates",
+]
@@ -0,0 +1,407 @@
+"""
+Rolling Per-Contact Interaction Aggregates
+
+Analytics, churn and sentiment all need the same per-contact numbers:
+interaction count, last interaction, distinct interaction types and recent
+(30/90-day) counts. Instead of re-deriving them from raw rows on every call,
+WorkspaceAggregates keeps them as columns (one slot per contact):
+
+    total        int64   all interactions
+    last_at      float64 POSIX seconds of the latest interaction (-inf if none)
+    type_mask    uint64  bit per interaction type (types past 63 share bit 63)
+    window_counts int64  interactions in the last 30 / 90 days
+
+record() updates the counters on each interaction insert. Window counts
+expire lazily: events inside a window sit in an expiry queue (a sorted array
+from the bulk build plus a heap for inserts) and advance(now) decrements
+the counters of events that fell out of the window, so reads are O(1)
+amortized.
+
+InteractionAggregates is the per-process registry: a workspace is built in
+bulk from the interactions table on first use (or when older than max_age,
+to pick up inserts from other processes) and patched by record_interaction()
+afterwards. get_interaction_aggregates() returns the one registry every
+consumer in a process shares (analytics routes, GraphQL resolvers, scheduler).
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .engine import INTERACTION_COLUMNS, SECONDS_PER_DAY, fetch_workspace_rows, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = (30, 90)
+MAX_TYPE_BITS = 64
+
+Timestamp = Union[str, datetime, float, None]
+
+
+def to_timestamp(value: Timestamp, default: float) -> float:
+    """ISO string / datetime / POSIX seconds -> POSIX seconds (None -> default)"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return parse_timestamp(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """Set bits per uint64 mask (np.bitwise_count needs NumPy 2)"""
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    return np.unpackbits(masks.view(np.uint8)).reshape(-1, 64).sum(axis=1, dtype=np.int64)
+
+
+class ContactAggregate(NamedTuple):
+    """Counters of one contact at a point in time."""
+
+    total: int
+    last_30d: int
+    last_90d: int
+    last_at: Optional[float]
+    type_mask: int
+
+    @property
+    def distinct_types(self) -> int:
+        return self.type_mask.bit_count()
+
+    def days_since_last(self, now: float) -> Optional[int]:
+        """Whole days since the latest interaction (None without interactions)"""
+        if self.last_at is None:
+            return None
+        return int((now - self.last_at) // SECONDS_PER_DAY)
+
+
+class WorkspaceAggregates:
+    """Per-contact interaction counters of one workspace."""
+
+    def __init__(
+        self,
+        workspace_id: str,
+        windows: Sequence[int] = WINDOW_DAYS,
+        now: Optional[float] = None,
+    ):
+        """
+        Initialize WorkspaceAggregates.
+
+        Args:
+            workspace_id: Workspace ID
+            windows: Rolling window lengths in days
+            now: Build time (POSIX seconds, default: current time)
+        """
+        self.workspace_id = workspace_id
+        self.windows = tuple(windows)
+        self.built_at = time.time() if now is None else now
+        self.as_of = self.built_at
+
+        self._slots: Dict[str, int] = {}
+        self._type_bits: Dict[str, int] = {}
+        self.total = np.zeros(0, dtype=np.int64)
+        self.last_at = np.zeros(0, dtype=np.float64)
+        self.type_mask = np.zeros(0, dtype=np.uint64)
+        self.window_counts = np.zeros((len(self.windows), 0), dtype=np.int64)
+
+        # Expiry queues: bulk-built events sorted by time with a cursor per window,
+        # plus one heap of (occurred_at, slot) per window for recorded events
+        self._queue_times = np.zeros(0, dtype=np.float64)
+        self._queue_slots = np.zeros(0, dtype=np.int64)
+        self._queue_cursors = [0] * len(self.windows)
+        self._heaps: List[List[Tuple[float, int]]] = [[] for _ in self.windows]
+
+    @classmethod
+    def from_rows(
+        cls,
+        workspace_id: str,
+        interactions: Iterable[Dict],
+        windows: Sequence[int] = WINDOW_DAYS,
+        now: Optional[float] = None,
+    ) -> "WorkspaceAggregates":
+        """
+        Build from interaction rows (contact_id, occurred_at, type) in one pass.
+
+        Rows without a contact or timestamp are skipped.
+        """
+        aggregates = cls(workspace_id, windows, now)
+
+        slots, times, bits = [], [], []
+        for row in interactions:
+            contact_id = row.get("contact_id")
+            if contact_id is None or not row.get("occurred_at"):
+                continue
+            slots.append(aggregates._slot(contact_id))
+            times.append(parse_timestamp(row["occurred_at"]))
+            bits.append(aggregates._type_bit(row.get("type")))
+
+        aggregates._bulk_load(
+            np.asarray(slots, dtype=np.int64),
+            np.asarray(times, dtype=np.float64),
+            np.asarray(bits, dtype=np.uint64),
+        )
+        return aggregates
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, contact_id) -> bool:
+        return contact_id in self._slots
+
+    # ========== Updates ==========
+
+    def record(self, contact_id: str, occurred_at: Timestamp = None, type: Optional[str] = None):
+        """
+        Count one new interaction.
+
+        Args:
+            contact_id: Contact the interaction belongs to
+            occurred_at: Interaction time (default: now)
+            type: Interaction type
+        """
+        timestamp = to_timestamp(occurred_at, default=max(time.time(), self.as_of))
+        slot = self._slot(contact_id)
+
+        self.total[slot] += 1
+        if timestamp > self.last_at[slot]:
+            self.last_at[slot] = timestamp
+        self.type_mask[slot] |= np.uint64(1) << np.uint64(self._type_bit(type))
+
+        for w, days in enumerate(self.windows):
+            if timestamp >= self.as_of - days * SECONDS_PER_DAY:
+                self.window_counts[w, slot] += 1
+                heapq.heappush(self._heaps[w], (timestamp, slot))
+
+    def advance(self, now: Optional[float] = None) -> None:
+        """Expire window counts up to `now` (time only moves forward)."""
+        now = time.time() if now is None else now
+        if now <= self.as_of:
+            return
+        self.as_of = now
+
+        for w, days in enumerate(self.windows):
+            cutoff = now - days * SECONDS_PER_DAY
+            counts = self.window_counts[w]
+
+            start = self._queue_cursors[w]
+            end = int(np.searchsorted(self._queue_times, cutoff, side="left"))
+            if end > start:
+                np.subtract.at(counts, self._queue_slots[start:end], 1)
+                self._queue_cursors[w] = end
+
+            heap = self._heaps[w]
+            while heap and heap[0][0] < cutoff:
+                counts[heapq.heappop(heap)[1]] -= 1
+
+    # ========== Reads ==========
+
+    def get(self, contact_id: str, now: Optional[float] = None) -> ContactAggregate:
+        """Counters of a contact (zeros for contacts without interactions)"""
+        self.advance(now)
+        slot = self._slots.get(contact_id)
+        if slot is None:
+            return ContactAggregate(0, 0, 0, None, 0)
+
+        windows = dict(zip(self.windows, self.window_counts[:, slot].tolist()))
+        return ContactAggregate(
+            total=int(self.total[slot]),
+            last_30d=windows.get(30, 0),
+            last_90d=windows.get(90, 0),
+            last_at=float(self.last_at[slot]) if self.total[slot] else None,
+            type_mask=int(self.type_mask[slot]),
+        )
+
+    def columns(self, contact_ids: Sequence[str], now: Optional[float] = None) -> Dict:
+        """
+        Counters aligned with `contact_ids` (zeros / -inf for unknown contacts).
+
+        Returns:
+            {'total', 'last_at', 'type_mask', 'distinct_types', 'window_counts'}
+        """
+        self.advance(now)
+        slots = np.fromiter(
+            (self._slots.get(contact_id, -1) for contact_id in contact_ids),
+            dtype=np.int64,
+            count=len(contact_ids),
+        )
+        known = slots >= 0
+        index = np.where(known, slots, 0)
+
+        def gather(values, missing):
+            if not len(values):
+                return np.full(len(slots), missing, dtype=values.dtype)
+            return np.where(known, values[index], missing)
+
+        type_mask = gather(self.type_mask, np.uint64(0))
+        return {
+            "total": gather(self.total, 0),
+            "last_at": gather(self.last_at, -np.inf),
+            "type_mask": type_mask,
+            "distinct_types": popcount(type_mask),
+            "window_counts": {
+                days: gather(self.window_counts[w], 0) for w, days in enumerate(self.windows)
+            },
+        }
+
+    # ========== Internals ==========
+
+    def _slot(self, contact_id: str) -> int:
+        slot = self._slots.get(contact_id)
+        if slot is None:
+            slot = self._slots[contact_id] = len(self._slots)
+            if slot >= len(self.total):
+                self._grow(max(16, 2 * len(self.total)))
+        return slot
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - len(self.total)
+        self.total = np.concatenate([self.total, np.zeros(extra, dtype=np.int64)])
+        self.last_at = np.concatenate([self.last_at, np.full(extra, -np.inf)])
+        self.type_mask = np.concatenate([self.type_mask, np.zeros(extra, dtype=np.uint64)])
+        self.window_counts = np.concatenate(
+            [self.window_counts, np.zeros((len(self.windows), extra), dtype=np.int64)], axis=1
+        )
+
+    def _type_bit(self, type: Optional[str]) -> int:
+        bit = self._type_bits.get(type)
+        if bit is None:
+            bit = self._type_bits[type] = min(len(self._type_bits), MAX_TYPE_BITS - 1)
+        return bit
+
+    def _bulk_load(self, slots: np.ndarray, times: np.ndarray, bits: np.ndarray) -> None:
+        """Counters from event columns with bincount / maximum.at / bitwise_or.at"""
+        num_slots = len(self._slots)
+        if num_slots > len(self.total):
+            self._grow(num_slots)
+
+        capacity = len(self.total)
+        self.total[:] = np.bincount(slots, minlength=capacity)
+        np.maximum.at(self.last_at, slots, times)
+        np.bitwise_or.at(self.type_mask, slots, np.left_shift(np.uint64(1), bits))
+
+        # Only events inside the longest window can ever expire out of a count
+        inside = times >= self.as_of - max(self.windows, default=0) * SECONDS_PER_DAY
+        order = np.argsort(times[inside], kind="stable")
+        self._queue_times = times[inside][order]
+        self._queue_slots = slots[inside][order]
+
+        for w, days in enumerate(self.windows):
+            cursor = int(
+                np.searchsorted(self._queue_times, self.as_of - days * SECONDS_PER_DAY, "left")
+            )
+            self._queue_cursors[w] = cursor
+            self.window_counts[w] = np.bincount(self._queue_slots[cursor:], minlength=capacity)
+
+
+class InteractionAggregates:
+    """Per-process registry of WorkspaceAggregates, built in bulk and patched on insert."""
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, max_age: float = 600.0, windows: Sequence[int] = WINDOW_DAYS):
+        """
+        Initialize InteractionAggregates.
+
+        Args:
+            max_age: Seconds before a workspace is rebuilt from the interactions table
+                (picks up inserts recorded by other processes)
+            windows: Rolling window lengths in days
+        """
+        self.max_age = max_age
+        self.windows = tuple(windows)
+        self._workspaces: Dict[str, WorkspaceAggregates] = {}
+        self._workspace_locks: Dict[str, asyncio.Lock] = {}
+
+    def __contains__(self, workspace_id) -> bool:
+        return self.get(workspace_id) is not None
+
+    def get(self, workspace_id: str) -> Optional[WorkspaceAggregates]:
+        """Aggregates of a workspace, or None if not built or older than max_age"""
+        aggregates = self._workspaces.get(workspace_id)
+        if aggregates is None or time.time() - aggregates.built_at > self.max_age:
+            return None
+        return aggregates
+
+    def put(self, aggregates: WorkspaceAggregates) -> None:
+        self._workspaces[aggregates.workspace_id] = aggregates
+
+    def drop(self, workspace_id: str) -> None:
+        self._workspaces.pop(workspace_id, None)
+
+    def rebuild(self, supabase, workspace_id: str) -> WorkspaceAggregates:
+        """
+        Rebuild a workspace from scratch: one paged interactions scan.
+
+        Args:
+            supabase: Supabase client
+            workspace_id: Workspace ID
+        """
+        interactions = fetch_workspace_rows(
+            supabase, "interactions", INTERACTION_COLUMNS, workspace_id, self.PAGE_SIZE
+        )
+        aggregates = WorkspaceAggregates.from_rows(workspace_id, interactions, self.windows)
+        self.put(aggregates)
+
+        logger.info(
+            f"Rebuilt interaction aggregates for {workspace_id}: "
+            f"{len(aggregates)} contacts, {len(interactions)} interactions"
+        )
+        return aggregates
+
+    async def ensure(self, supabase, workspace_id: str) -> WorkspaceAggregates:
+        """Aggregates of a workspace, rebuilt (off the event loop) if missing or stale"""
+        aggregates = self.get(workspace_id)
+        if aggregates is not None:
+            return aggregates
+
+        async with self._workspace_locks.setdefault(workspace_id, asyncio.Lock()):
+            aggregates = self.get(workspace_id)
+            if aggregates is None:
+                aggregates = await asyncio.get_running_loop().run_in_executor(
+                    None, self.rebuild, supabase, workspace_id
+                )
+            return aggregates
+
+    async def get_contact(self, supabase, workspace_id: str, contact_id: str) -> ContactAggregate:
+        """O(1) counters of one contact (builds the workspace on first use)"""
+        return (await self.ensure(supabase, workspace_id)).get(contact_id)
+
+    def record_interaction(
+        self,
+        workspace_id: str,
+        contact_id: str,
+        occurred_at: Timestamp = None,
+        type: Optional[str] = None,
+    ) -> bool:
+        """
+        Interaction inserted: update the counters of a built workspace.
+
+        Workspaces that are not built yet pick the interaction up from their
+        bulk build.
+
+        Returns:
+            True if counters were updated
+        """
+        aggregates = self._workspaces.get(workspace_id)
+        if aggregates is None:
+            return False
+        aggregates.record(contact_id, occurred_at, type)
+        return True
+
+
+_interaction_aggregates: Optional[InteractionAggregates] = None
+
+
+def get_interaction_aggregates() -> InteractionAggregates:
+    """The process-wide InteractionAggregates (created on first use)"""
+    global _interaction_aggregates
+    if _interaction_aggregates is None:
+        _interaction_aggregates = InteractionAggregates()
+    return _interaction_aggregates
@@ -0,0 +1,259 @@
+"""
+Columnar Analytics Engine
+
+One pass over a workspace's interactions as NumPy columns instead of one
+`interactions` query per contact:
+
+    contact_index  int32    row of the contact in InteractionDataset.contact_ids
+    occurred_at    float64  POSIX seconds (UTC)
+    type_code      int16    index into InteractionDataset.type_names
+
+Per-contact features (interaction count, last interaction, recency, distinct
+interaction types) are computed with group-by operations (bincount /
+maximum.at / unique) and cached on the dataset, so CLV, health score,
+engagement trends and top contacts in one dashboard load share one paged
+contacts query and one paged interactions query.
+"""
+
+import logging
+from datetime import datetime, timezone
+from functools import cached_property
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400.0
+INTERACTION_COLUMNS = "contact_id, occurred_at, type"
+
+
+def parse_timestamp(value: str) -> float:
+    """ISO 8601 string from PostgREST -> POSIX seconds (naive values are UTC)."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def fetch_workspace_rows(
+    supabase, table: str, columns: str, workspace_id: str, page_size: int
+) -> List[Dict]:
+    """All rows of a workspace-scoped table, one `.range()` page per request"""
+    rows = []
+    start = 0
+    while True:
+        page = (
+            supabase.table(table)
+            .select(columns)
+            .eq("workspace_id", workspace_id)
+            .range(start, start + page_size - 1)
+            .execute()
+        ).data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+class InteractionDataset:
+    """A workspace's contacts and interactions as columnar arrays."""
+
+    def __init__(
+        self,
+        workspace_id: str,
+        contacts: List[Dict],
+        contact_index: np.ndarray,
+        occurred_at: np.ndarray,
+        type_code: np.ndarray,
+        type_names: List[str],
+        now: Optional[float] = None,
+    ):
+        """
+        Initialize InteractionDataset.
+
+        Args:
+            workspace_id: Workspace ID
+            contacts: Contact rows (row i is contact index i)
+            contact_index: Contact index of each interaction
+            occurred_at: POSIX seconds of each interaction
+            type_code: Interaction type code of each interaction
+            type_names: Type name of each code
+            now: Reference time for recency (POSIX seconds, default: current time)
+        """
+        self.workspace_id = workspace_id
+        self.contacts = contacts
+        self.contact_ids = [contact["id"] for contact in contacts]
+        self.contact_index = np.asarray(contact_index, dtype=np.int32)
+        self.occurred_at = np.asarray(occurred_at, dtype=np.float64)
+        self.type_code = np.asarray(type_code, dtype=np.int16)
+        self.type_names = type_names
+        self.now = datetime.now(timezone.utc).timestamp() if now is None else now
+        self.events_loaded = True
+
+    @classmethod
+    def from_rows(
+        cls,
+        workspace_id: str,
+        contacts: List[Dict],
+        interactions: List[Dict],
+        now: Optional[float] = None,
+    ) -> "InteractionDataset":
+        """
+        Build from contact rows and interaction rows (contact_id, occurred_at, type).
+
+        Interactions of contacts outside `contacts` and rows without a timestamp
+        are skipped.
+        """
+        index_of = {contact["id"]: i for i, contact in enumerate(contacts)}
+        type_codes: Dict[str, int] = {}
+
+        contact_index = np.empty(len(interactions), dtype=np.int32)
+        occurred_at = np.empty(len(interactions), dtype=np.float64)
+        type_code = np.empty(len(interactions), dtype=np.int16)
+        size = 0
+        for row in interactions:
+            index = index_of.get(row.get("contact_id"))
+            if index is None or not row.get("occurred_at"):
+                continue
+            contact_index[size] = index
+            occurred_at[size] = parse_timestamp(row["occurred_at"])
+            type_code[size] = type_codes.setdefault(row.get("type"), len(type_codes))
+            size += 1
+
+        return cls(
+            workspace_id,
+            contacts,
+            contact_index[:size],
+            occurred_at[:size],
+            type_code[:size],
+            list(type_codes),
+            now=now,
+        )
+
+    @classmethod
+    def from_aggregates(
+        cls, workspace_id: str, contacts: List[Dict], aggregates, now: Optional[float] = None
+    ) -> "InteractionDataset":
+        """
+        Build from rolling per-contact counters (see aggregates.WorkspaceAggregates).
+
+        No interaction rows are loaded: per-contact features come from the
+        counters, and daily_counts() is unavailable (events_loaded is False).
+        """
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        empty = np.zeros(0)
+        dataset = cls(workspace_id, contacts, empty, empty, empty, [], now=now)
+        dataset.events_loaded = False
+
+        columns = aggregates.columns(dataset.contact_ids, now=now)
+        # Seed the cached group-by properties
+        dataset.__dict__["interaction_counts"] = columns["total"]
+        dataset.__dict__["last_interaction_at"] = columns["last_at"]
+        dataset.__dict__["distinct_types"] = columns["distinct_types"]
+        return dataset
+
+    @classmethod
+    def load(cls, supabase, workspace_id: str, page_size: int = 1000) -> "InteractionDataset":
+        """
+        Fetch a workspace's contacts and interactions, `page_size` rows per request.
+
+        Args:
+            supabase: Supabase client
+            workspace_id: Workspace ID
+            page_size: Rows per request
+        """
+        contacts = fetch_workspace_rows(supabase, "contacts", "*", workspace_id, page_size)
+        interactions = (
+            fetch_workspace_rows(
+                supabase, "interactions", INTERACTION_COLUMNS, workspace_id, page_size
+            )
+            if contacts
+            else []
+        )
+
+        dataset = cls.from_rows(workspace_id, contacts, interactions)
+        logger.info(
+            f"Loaded analytics dataset for {workspace_id}: {dataset.num_contacts} contacts, "
+            f"{dataset.num_interactions} interactions"
+        )
+        return dataset
+
+    @property
+    def num_contacts(self) -> int:
+        return len(self.contacts)
+
+    @property
+    def num_interactions(self) -> int:
+        return len(self.contact_index)
+
+    # ========== Per-contact features ==========
+
+    @cached_property
+    def interaction_counts(self) -> np.ndarray:
+        """Interactions per contact (int64)"""
+        return np.bincount(self.contact_index, minlength=self.num_contacts)
+
+    @cached_property
+    def last_interaction_at(self) -> np.ndarray:
+        """POSIX seconds of each contact's latest interaction (-inf if none)"""
+        last = np.full(self.num_contacts, -np.inf)
+        np.maximum.at(last, self.contact_index, self.occurred_at)
+        return last
+
+    @cached_property
+    def recency_days(self) -> np.ndarray:
+        """Whole days since the latest interaction (timedelta.days semantics; inf if none)"""
+        with np.errstate(invalid="ignore"):
+            return np.floor((self.now - self.last_interaction_at) / SECONDS_PER_DAY)
+
+    @cached_property
+    def distinct_types(self) -> np.ndarray:
+        """Number of distinct interaction types per contact"""
+        num_types = max(len(self.type_names), 1)
+        pairs = np.unique(self.contact_index.astype(np.int64) * num_types + self.type_code)
+        return np.bincount(pairs // num_types, minlength=self.num_contacts)
+
+    @cached_property
+    def recency_weight(self) -> np.ndarray:
+        """max(0.1, 1 - days / 365); 0.1 for contacts without interactions"""
+        weight = np.maximum(0.1, 1 - self.recency_days / 365)
+        return np.where(self.interaction_counts > 0, weight, 0.1)
+
+    @cached_property
+    def clv(self) -> np.ndarray:
+        """count x recency weight x relationship strength (count / 20, capped) x $1000"""
+        counts = self.interaction_counts
+        strength = np.minimum(1.0, counts / 20)
+        return counts * self.recency_weight * strength * 1000
+
+    @cached_property
+    def frequency_score(self) -> np.ndarray:
+        """0-40 points: 2 per interaction"""
+        return np.minimum(40, self.interaction_counts * 2).astype(np.float64)
+
+    @cached_property
+    def recency_score(self) -> np.ndarray:
+        """0-30 points: -10 per 90 days since the latest interaction"""
+        return np.where(self.interaction_counts > 0, np.maximum(0, 30 - self.recency_days / 3), 0.0)
+
+    @cached_property
+    def diversity_score(self) -> np.ndarray:
+        """0-20 points: 5 per distinct interaction type"""
+        return np.minimum(20, self.distinct_types * 5).astype(np.float64)
+
+    @cached_property
+    def health_score(self) -> np.ndarray:
+        """frequency + recency + diversity + response (10, placeholder); 0 without interactions"""
+        score = self.frequency_score + self.recency_score + self.diversity_score + 10
+        return np.where(self.interaction_counts > 0, score, 0.0)
+
+    def daily_counts(self, days: int) -> Dict[str, int]:
+        """Interactions per UTC day (YYYY-MM-DD) over the last `days` days"""
+        cutoff = self.now - days * SECONDS_PER_DAY
+        recent = self.occurred_at[self.occurred_at >= cutoff]
+        day_numbers, counts = np.unique(
+            np.floor(recent / SECONDS_PER_DAY).astype(np.int64), return_counts=True
+        )
+        dates = (day_numbers.astype("datetime64[D]")).astype(str)
+        return {date: int(count) for date, count in zip(dates, counts)}
@@ -7,16 +7,24 @@ Enterprise dashboard metrics:
 - Engagement Trends (30-day)
 - Top Performing Contacts
 
+Per-contact metrics are computed set-based from one InteractionDataset
+(see engine.py) instead of one interactions query per contact.
+
 Author: Super Brain Team
 Created: 2025-12-13
 """
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
 
+import numpy as np
 from supabase import Client
 
+from .aggregates import InteractionAggregates
+from .engine import InteractionDataset, fetch_workspace_rows
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,12 +37,41 @@ class AnalyticsMetrics:
     2. Health Score (0-100) - Relationship strength
     3. Engagement Trends - Activity over time
     4. Top Contacts - Most valuable relationships
+
+    Every metric accepts an optional InteractionDataset; get_metrics() loads
+    one and shares it across all four. With InteractionAggregates the
+    per-contact features come from the rolling counters instead of an
+    interactions scan.
     """
 
-    def __init__(self, supabase: Client):
+    PAGE_SIZE = 1000
+
+    def __init__(self, supabase: Client, aggregates: Optional[InteractionAggregates] = None):
+        """
+        Initialize AnalyticsMetrics.
+
+        Args:
+            supabase: Supabase client
+            aggregates: Rolling per-contact interaction counters (optional)
+        """
         self.supabase = supabase
+        self.aggregates = aggregates
         logger.info("✅ Analytics Metrics initialized")
 
+    async def load_dataset(self, workspace_id: str) -> InteractionDataset:
+        """Fetch the workspace's contacts and per-contact interaction features"""
+        loop = asyncio.get_running_loop()
+        if self.aggregates is None:
+            return await loop.run_in_executor(
+                None, InteractionDataset.load, self.supabase, workspace_id, self.PAGE_SIZE
+            )
+
+        aggregates = await self.aggregates.ensure(self.supabase, workspace_id)
+        contacts = await loop.run_in_executor(
+            None, fetch_workspace_rows, self.supabase, "contacts", "*", workspace_id, self.PAGE_SIZE
+        )
+        return InteractionDataset.from_aggregates(workspace_id, contacts, aggregates)
+
     async def get_metrics(self, workspace_id: str) -> Dict:
         """
         Get all analytics metrics for workspace
@@ -48,10 +85,12 @@ class AnalyticsMetrics:
             }
         """
         try:
-            clv = await self.calculate_clv(workspace_id)
-            health = await self.calculate_health_score(workspace_id)
-            engagement = await self.get_engagement_trends(workspace_id)
-            top = await self.get_top_contacts(workspace_id)
+            dataset = await self.load_dataset(workspace_id)
+
+            clv = await self.calculate_clv(workspace_id, dataset)
+            health = await self.calculate_health_score(workspace_id, dataset)
+            engagement = await self.get_engagement_trends(workspace_id, dataset=dataset)
+            top = await self.get_top_contacts(workspace_id, dataset=dataset)
 
             return {
                 "clv": clv,
@@ -65,7 +104,9 @@ class AnalyticsMetrics:
             logger.error(f"Failed to get metrics: {e}")
             return {"error": str(e)}
 
-    async def calculate_clv(self, workspace_id: str) -> Dict:
+    async def calculate_clv(
+        self, workspace_id: str, dataset: Optional[InteractionDataset] = None
+    ) -> Dict:
         """
         Calculate Contact Lifetime Value
 
@@ -80,74 +121,29 @@ class AnalyticsMetrics:
             }
         """
         try:
-            # Get all contacts with interactions
-            contacts = (
-                self.supabase.table("contacts")
-                .select("id")
-                .eq("workspace_id", workspace_id)
-                .execute()
-            )
+            if dataset is None:
+                dataset = await self.load_dataset(workspace_id)
 
-            if not contacts.data:
+            if not dataset.num_contacts:
                 return {"total_clv": 0, "avg_clv_per_contact": 0, "high_value_contacts": 0}
 
-            total_clv = 0
-            high_value_count = 0
-
-            for contact in contacts.data:
-                # Get interactions
-                interactions = (
-                    self.supabase.table("interactions")
-                    .select("*")
-                    .eq("contact_id", contact["id"])
-                    .execute()
-                )
-
-                interaction_count = len(interactions.data)
-
-                # Calculate recency (days since last interaction)
-                if interactions.data:
-                    last_interaction = max(
-                        [
-                            datetime.fromisoformat(i["occurred_at"].replace("Z", "+00:00"))
-                            for i in interactions.data
-                        ]
-                    )
-                    recency_days = (
-                        datetime.utcnow().replace(tzinfo=last_interaction.tzinfo) - last_interaction
-                    ).days
-                    recency_weight = max(0.1, 1 - (recency_days / 365))  # Decay over 1 year
-                else:
-                    recency_weight = 0.1
-
-                # Relationship strength (0-1) based on interaction variety
-                relationship_strength = min(1.0, interaction_count / 20)  # Cap at 20 interactions
-
-                # Business value multiplier (configurable)
-                business_value = 1000  # $1k per strong relationship
-
-                # CLV formula
-                clv = interaction_count * recency_weight * relationship_strength * business_value
-
-                total_clv += clv
-
-                if clv > 10000:  # High value threshold: $10k
-                    high_value_count += 1
-
-            avg_clv = total_clv / len(contacts.data) if contacts.data else 0
+            clv = dataset.clv
+            total_clv = float(clv.sum())
 
             return {
                 "total_clv": round(total_clv, 2),
-                "avg_clv_per_contact": round(avg_clv, 2),
-                "high_value_contacts": high_value_count,
-                "total_contacts": len(contacts.data),
+                "avg_clv_per_contact": round(total_clv / dataset.num_contacts, 2),
+                "high_value_contacts": int((clv > 10000).sum()),  # High value threshold: $10k
+                "total_contacts": dataset.num_contacts,
             }
 
         except Exception as e:
             logger.error(f"CLV calculation failed: {e}")
             return {"error": str(e)}
 
-    async def calculate_health_score(self, workspace_id: str) -> Dict:
+    async def calculate_health_score(
+        self, workspace_id: str, dataset: Optional[InteractionDataset] = None
+    ) -> Dict:
         """
         Calculate Relationship Health Score (0-100)
 
@@ -164,77 +160,32 @@ class AnalyticsMetrics:
             }
         """
         try:
-            contacts = (
-                self.supabase.table("contacts")
-                .select("id")
-                .eq("workspace_id", workspace_id)
-                .execute()
-            )
+            if dataset is None:
+                dataset = await self.load_dataset(workspace_id)
 
-            if not contacts.data:
+            if not dataset.num_contacts:
                 return {"overall_score": 0, "breakdown": {}}
 
-            total_score = 0
-            scores = []
-
-            for contact in contacts.data:
-                interactions = (
-                    self.supabase.table("interactions")
-                    .select("*")
-                    .eq("contact_id", contact["id"])
-                    .execute()
-                )
-
-                if not interactions.data:
-                    scores.append(0)
-                    continue
-
-                # Frequency score (40 points) - interactions per month
-                interaction_count = len(interactions.data)
-                frequency_score = min(40, interaction_count * 2)  # Cap at 40
-
-                # Recency score (30 points) - days since last interaction
-                last_interaction = max(
-                    [
-                        datetime.fromisoformat(i["occurred_at"].replace("Z", "+00:00"))
-                        for i in interactions.data
-                    ]
-                )
-                days_ago = (
-                    datetime.utcnow().replace(tzinfo=last_interaction.tzinfo) - last_interaction
-                ).days
-                recency_score = max(0, 30 - (days_ago / 3))  # Decay: -10 points per 90 days
-
-                # Diversity score (20 points) - unique interaction types
-                interaction_types = set([i["type"] for i in interactions.data])
-                diversity_score = min(20, len(interaction_types) * 5)  # 5 points per type
-
-                # Response rate score (10 points) - placeholder
-                response_score = 10  # TODO: Implement actual response tracking
-
-                health_score = frequency_score + recency_score + diversity_score + response_score
-
-                total_score += health_score
-                scores.append(health_score)
-
-            overall_score = total_score / len(contacts.data) if contacts.data else 0
+            scores = dataset.health_score
 
             return {
-                "overall_score": round(overall_score, 1),
+                "overall_score": round(float(scores.mean()), 1),
                 "breakdown": {
-                    "excellent": len([s for s in scores if s >= 80]),
-                    "good": len([s for s in scores if 60 <= s < 80]),
-                    "fair": len([s for s in scores if 40 <= s < 60]),
-                    "poor": len([s for s in scores if s < 40]),
+                    "excellent": int((scores >= 80).sum()),
+                    "good": int(((scores >= 60) & (scores < 80)).sum()),
+                    "fair": int(((scores >= 40) & (scores < 60)).sum()),
+                    "poor": int((scores < 40).sum()),
                 },
-                "total_contacts": len(contacts.data),
+                "total_contacts": dataset.num_contacts,
             }
 
         except Exception as e:
             logger.error(f"Health score calculation failed: {e}")
             return {"error": str(e)}
 
-    async def get_engagement_trends(self, workspace_id: str, days: int = 30) -> Dict:
+    async def get_engagement_trends(
+        self, workspace_id: str, days: int = 30, dataset: Optional[InteractionDataset] = None
+    ) -> Dict:
         """
         Get engagement trends over time
 
@@ -248,22 +199,25 @@ class AnalyticsMetrics:
             }
         """
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-
-            # Get interactions in date range
-            interactions = (
-                self.supabase.table("interactions")
-                .select("occurred_at")
-                .eq("workspace_id", workspace_id)
-                .gte("occurred_at", cutoff_date.isoformat())
-                .execute()
-            )
+            if dataset is not None and dataset.events_loaded:
+                daily_counts = dataset.daily_counts(days)
+            else:
+                cutoff_date = datetime.utcnow() - timedelta(days=days)
+
+                # Get interactions in date range
+                interactions = (
+                    self.supabase.table("interactions")
+                    .select("occurred_at")
+                    .eq("workspace_id", workspace_id)
+                    .gte("occurred_at", cutoff_date.isoformat())
+                    .execute()
+                )
 
-            # Group by day
-            daily_counts = {}
-            for interaction in interactions.data:
-                date = interaction["occurred_at"][:10]  # YYYY-MM-DD
-                daily_counts[date] = daily_counts.get(date, 0) + 1
+                # Group by day
+                daily_counts = {}
+                for interaction in interactions.data:
+                    date = interaction["occurred_at"][:10]  # YYYY-MM-DD
+                    daily_counts[date] = daily_counts.get(date, 0) + 1
 
             # Fill missing days with 0
             all_days = []
@@ -300,7 +254,9 @@ class AnalyticsMetrics:
             logger.error(f"Engagement trends failed: {e}")
             return {"error": str(e)}
 
-    async def get_top_contacts(self, workspace_id: str, limit: int = 10) -> List[Dict]:
+    async def get_top_contacts(
+        self, workspace_id: str, limit: int = 10, dataset: Optional[InteractionDataset] = None
+    ) -> List[Dict]:
         """
         Get top performing contacts by combined score
 
@@ -320,70 +276,40 @@ class AnalyticsMetrics:
             ]
         """
         try:
-            contacts = (
-                self.supabase.table("contacts")
-                .select("*")
-                .eq("workspace_id", workspace_id)
-                .execute()
-            )
-
-            if not contacts.data:
-                return []
-
-            scored_contacts = []
-
-            for contact in contacts.data:
-                interactions = (
-                    self.supabase.table("interactions")
-                    .select("*")
-                    .eq("contact_id", contact["id"])
-                    .execute()
+            if dataset is None:
+                dataset = await self.load_dataset(workspace_id)
+
+            # Mini-CLV and mini health score (frequency + recency)
+            clv = dataset.interaction_counts * dataset.recency_weight * 1000
+            health = dataset.frequency_score + dataset.recency_score
+            combined = np.round(clv / 100 + health, 2)
+
+            # Contacts with interactions, by score descending (stable: ties keep contact order)
+            active = np.flatnonzero(dataset.interaction_counts > 0)
+            ranked = active[np.argsort(-combined[active], kind="stable")][:limit]
+
+            top_contacts = []
+            for index in ranked:
+                contact = dataset.contacts[index]
+                last_interaction = datetime.fromtimestamp(
+                    dataset.last_interaction_at[index], tz=timezone.utc
                 )
-
-                if not interactions.data:
-                    continue
-
-                # Calculate mini-CLV
-                interaction_count = len(interactions.data)
-                last_interaction = max(
-                    [
-                        datetime.fromisoformat(i["occurred_at"].replace("Z", "+00:00"))
-                        for i in interactions.data
-                    ]
-                )
-                recency_days = (
-                    datetime.utcnow().replace(tzinfo=last_interaction.tzinfo) - last_interaction
-                ).days
-                recency_weight = max(0.1, 1 - (recency_days / 365))
-                clv = interaction_count * recency_weight * 1000
-
-                # Calculate mini health score
-                frequency_score = min(40, interaction_count * 2)
-                recency_score = max(0, 30 - (recency_days / 3))
-                health_score = frequency_score + recency_score
-
-                # Combined score
-                combined_score = (clv / 100) + health_score
-
-                scored_contacts.append(
+                top_contacts.append(
                     {
                         "contact_id": contact["id"],
                         "name": f"{contact.get('first_name', '')} {contact.get('last_name', '')}".strip()
                         or contact.get("email", "Unknown"),
                         "email": contact.get("email"),
                         "organization": contact.get("organization"),
-                        "score": round(combined_score, 2),
-                        "clv": round(clv, 2),
-                        "health_score": round(health_score, 1),
-                        "interaction_count": interaction_count,
+                        "score": float(combined[index]),
+                        "clv": round(float(clv[index]), 2),
+                        "health_score": round(float(health[index]), 1),
+                        "interaction_count": int(dataset.interaction_counts[index]),
                         "last_interaction": last_interaction.isoformat(),
                     }
                 )
 
-            # Sort by score descending
-            scored_contacts.sort(key=lambda x: x["score"], reverse=True)
-
-            return scored_contacts[:limit]
+            return top_contacts
 
         except Exception as e:
             logger.error(f"Top contacts failed: {e}")
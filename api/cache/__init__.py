@@ -3,10 +3,21 @@ Cache module for Super Brain Digital Twin
 
 Exports:
     - CacheManager: Main Redis caching manager
+    - TieredCacheManager: In-process L1 + Redis L2 with single-flight loads
     - ContactRecommendation: Recommendation data model
     - CacheStats: Cache statistics data model
+    - CacheCodec / get_codec: Pluggable value serialization (packed binary by default)
 """
 
+from api.cache.codecs import CacheCodec, get_codec
 from api.cache.redis_manager import CacheManager, CacheStats, ContactRecommendation
+from api.cache.tiered_cache import TieredCacheManager
 
-__all__ = ["CacheManager", "ContactRecommendation", "CacheStats"]
+__all__ = [
+    "CacheManager",
+    "TieredCacheManager",
+    "ContactRecommendation",
+    "CacheStats",
+    "CacheCodec",
+    "get_codec",
+]
@@ -0,0 +1,343 @@
+"""
+Cache Value Codecs
+
+Serialization of cached recommendation lists. Every value starts with a 4-byte header:
+
+    magic (0xB5) | codec id | codec format version | compression (0 none, 1 zlib, 2 zstd)
+
+Any codec in the registry can read values written by another (rolling deploys that
+switch codecs keep their hits). Values without a known header - legacy JSON entries,
+an older format version, zstd data on a pod without zstandard - decode to None and
+are treated as cache misses.
+
+Codecs:
+    - JsonCodec: compact JSON arrays (readable in redis-cli after the header)
+    - MsgpackCodec: msgpack arrays (requires msgpack)
+    - PackedCodec (default): columnar binary - 4-byte fixed-point scores, one-byte
+      reason codes, UUID contact ids as 16 raw bytes
+
+Codecs encode objects with contact_id / score / reason attributes and decode to
+(contact_id, score, reason) rows; CacheManager builds the models.
+"""
+
+import json
+import logging
+import os
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import msgpack
+except ImportError:  # optional codec
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional compression
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# (contact_id, score, reason)
+Row = Tuple[str, float, Optional[str]]
+
+MAGIC = 0xB5
+HEADER = struct.Struct("!BBBB")
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+COMPRESSIONS = {None: COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+# Explanations produced by GNNRecommender._generate_explanation, stored as one byte
+REASON_CODES = (
+    None,
+    "Very similar network patterns and professional interests",
+    "Similar connections and shared interests",
+    "Some overlapping connections",
+    "Potential connection based on network proximity",
+)
+REASON_LITERAL = 255
+
+
+class CacheCodec(ABC):
+    """Encodes recommendation lists to bytes (header included) and back."""
+
+    name = "base"
+    codec_id = 0
+    version = 1
+
+    def __init__(self, compression: Optional[str] = None, compress_min_bytes: int = 512):
+        """
+        Initialize codec.
+
+        Args:
+            compression: None, "zlib" or "zstd" (requires zstandard)
+            compress_min_bytes: Smaller payloads are stored uncompressed
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd cache compression requires the zstandard package")
+
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self._compressor = zstandard.ZstdCompressor() if compression == "zstd" else None
+
+    def encode(self, recommendations: Sequence) -> bytes:
+        body = self.encode_body(recommendations)
+        flag = COMPRESSION_NONE
+        if self.compression is not None and len(body) >= self.compress_min_bytes:
+            flag = COMPRESSIONS[self.compression]
+            if flag == COMPRESSION_ZSTD:
+                body = self._compressor.compress(body)
+            else:
+                body = zlib.compress(body)
+        return HEADER.pack(MAGIC, self.codec_id, self.version, flag) + body
+
+    @abstractmethod
+    def encode_body(self, recommendations: Sequence) -> bytes:
+        """Serialize recommendations (without header or compression)."""
+
+    @abstractmethod
+    def decode_body(self, body: bytes) -> List[Row]:
+        """Parse an uncompressed body back to (contact_id, score, reason) rows."""
+
+
+class JsonCodec(CacheCodec):
+    """[[contact_id, score, reason], ...] as compact UTF-8 JSON."""
+
+    name = "json"
+    codec_id = 1
+
+    def encode_body(self, recommendations):
+        return json.dumps(
+            [[rec.contact_id, rec.score, rec.reason] for rec in recommendations],
+            separators=(",", ":"),
+        ).encode()
+
+    def decode_body(self, body):
+        return [tuple(row) for row in json.loads(body)]
+
+
+class MsgpackCodec(CacheCodec):
+    """[[contact_id, score, reason], ...] as msgpack (float64 scores)."""
+
+    name = "msgpack"
+    codec_id = 2
+
+    def __init__(self, compression: Optional[str] = None, compress_min_bytes: int = 512):
+        if msgpack is None:
+            raise ImportError("msgpack cache codec requires the msgpack package")
+        super().__init__(compression, compress_min_bytes)
+
+    def encode_body(self, recommendations):
+        return msgpack.packb([[rec.contact_id, rec.score, rec.reason] for rec in recommendations])
+
+    def decode_body(self, body):
+        return [tuple(row) for row in msgpack.unpackb(body)]
+
+
+class PackedCodec(CacheCodec):
+    """
+    Columnar binary layout (network byte order):
+
+        count: u16
+        score mode: u8 (0 = count x int32 millionths, 1 = count x float64)
+        scores
+        reason codes: count x u8 (index into REASON_CODES, 255 = literal below)
+        id mode: u8 (0 = all canonical UUIDs, count x 16 bytes;
+                     1 = count x (u16 length + UTF-8))
+        literal reasons: per code 255, u16 length + UTF-8
+
+    Fixed-point scores take as much space as float32 but round-trip every score
+    with up to 6 decimals exactly; float64 is used if one is out of int32 range.
+    """
+
+    name = "packed"
+    codec_id = 3
+
+    ID_UUID = 0
+    ID_UTF8 = 1
+    SCORE_MICRO = 0
+    SCORE_FLOAT64 = 1
+    MICRO = 1_000_000
+    MAX_MICRO_SCORE = (2**31 - 1) / MICRO
+
+    # Contacts recur across cached lists: formatting a UUID costs more than a dict hit
+    UUID_MEMO_SIZE = 65_536
+
+    _reason_index: Dict[Optional[str], int] = {reason: i for i, reason in enumerate(REASON_CODES)}
+    _uuid_memo: Dict[bytes, str] = {}
+
+    def encode_body(self, recommendations):
+        count = len(recommendations)
+        if count > 0xFFFF:
+            raise ValueError(f"Too many recommendations to pack: {count}")
+
+        codes = bytearray()
+        literals = []
+        for rec in recommendations:
+            code = self._reason_index.get(rec.reason, REASON_LITERAL)
+            codes.append(code)
+            if code == REASON_LITERAL:
+                literals.append(rec.reason.encode())
+
+        scores = [rec.score for rec in recommendations]
+        if all(abs(score) <= self.MAX_MICRO_SCORE for score in scores):
+            micro = self.MICRO
+            packed_scores = struct.pack(
+                f"!HB{count}i", count, self.SCORE_MICRO, *(round(s * micro) for s in scores)
+            )
+        else:
+            packed_scores = struct.pack(f"!HB{count}d", count, self.SCORE_FLOAT64, *scores)
+        parts = [packed_scores, bytes(codes)]
+
+        uuids = self._pack_uuids([rec.contact_id for rec in recommendations])
+        if uuids is not None:
+            parts.append(bytes((self.ID_UUID,)))
+            parts.append(uuids)
+        else:
+            parts.append(bytes((self.ID_UTF8,)))
+            for rec in recommendations:
+                encoded = rec.contact_id.encode()
+                parts.append(struct.pack("!H", len(encoded)))
+                parts.append(encoded)
+
+        for literal in literals:
+            parts.append(struct.pack("!H", len(literal)))
+            parts.append(literal)
+
+        return b"".join(parts)
+
+    def decode_body(self, body):
+        count, score_mode = struct.unpack_from("!HB", body)
+        offset = 3
+        if score_mode == self.SCORE_MICRO:
+            micro = self.MICRO
+            scores = [score / micro for score in struct.unpack_from(f"!{count}i", body, offset)]
+            offset += 4 * count
+        else:
+            scores = struct.unpack_from(f"!{count}d", body, offset)
+            offset += 8 * count
+        codes = body[offset : offset + count]
+        offset += count
+
+        id_mode = body[offset]
+        offset += 1
+        if id_mode == self.ID_UUID:
+            contact_ids = [
+                self._uuid_string(body[i : i + 16]) for i in range(offset, offset + 16 * count, 16)
+            ]
+            offset += 16 * count
+        else:
+            contact_ids = []
+            for _ in range(count):
+                (length,) = struct.unpack_from("!H", body, offset)
+                offset += 2
+                contact_ids.append(body[offset : offset + length].decode())
+                offset += length
+
+        reasons = []
+        for code in codes:
+            if code == REASON_LITERAL:
+                (length,) = struct.unpack_from("!H", body, offset)
+                offset += 2
+                reasons.append(body[offset : offset + length].decode())
+                offset += length
+            else:
+                reasons.append(REASON_CODES[code])
+
+        if offset != len(body):
+            raise ValueError("Trailing bytes in packed recommendations")
+
+        return list(zip(contact_ids, scores, reasons))
+
+    @classmethod
+    def _uuid_string(cls, raw: bytes) -> str:
+        value = cls._uuid_memo.get(raw)
+        if value is None:
+            if len(cls._uuid_memo) >= cls.UUID_MEMO_SIZE:
+                cls._uuid_memo.clear()
+            h = raw.hex()
+            value = cls._uuid_memo[raw] = f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+        return value
+
+    @staticmethod
+    def _pack_uuids(contact_ids: List[str]) -> Optional[bytes]:
+        """16 bytes per id if every id is a canonical (lowercase, hyphenated) UUID"""
+        for contact_id in contact_ids:
+            if (
+                len(contact_id) != 36
+                or contact_id[8] != "-"
+                or contact_id[13] != "-"
+                or contact_id[18] != "-"
+                or contact_id[23] != "-"
+                or contact_id != contact_id.lower()
+            ):
+                return None
+        try:
+            packed = bytes.fromhex("".join(contact_ids).replace("-", ""))
+        except ValueError:
+            return None
+        return packed if len(packed) == 16 * len(contact_ids) else None
+
+
+CODEC_CLASSES = {cls.name: cls for cls in (JsonCodec, MsgpackCodec, PackedCodec)}
+
+# Decoders by codec id (one instance each; compression is read from the header)
+_decoders: Dict[int, CacheCodec] = {}
+for _cls in CODEC_CLASSES.values():
+    try:
+        _decoders[_cls.codec_id] = _cls()
+    except ImportError:
+        pass
+
+
+def get_codec(name: Optional[str] = None, compression: Optional[str] = None) -> CacheCodec:
+    """
+    Codec by name (CACHE_CODEC env, default "packed") with optional compression
+    (CACHE_COMPRESSION env: "zlib" or "zstd").
+    """
+    name = name or os.getenv("CACHE_CODEC", "packed")
+    compression = compression or os.getenv("CACHE_COMPRESSION") or None
+    if name not in CODEC_CLASSES:
+        raise ValueError(f"Unknown cache codec: {name}")
+    return CODEC_CLASSES[name](compression=compression)
+
+
+def decode_value(data) -> Optional[List[Row]]:
+    """
+    Decode a cached value written by any registered codec.
+
+    Returns:
+        (contact_id, score, reason) rows, or None for values without a readable header (legacy
+        entries, other format versions, unavailable codec/compression)
+    """
+    if isinstance(data, str):
+        # Client with decode_responses=True: only legacy JSON can arrive this way
+        return None
+    if len(data) < HEADER.size:
+        return None
+
+    magic, codec_id, version, compression = HEADER.unpack_from(data)
+    decoder = _decoders.get(codec_id)
+    if magic != MAGIC or decoder is None or version != decoder.version:
+        return None
+
+    try:
+        body = data[HEADER.size :]
+        if compression == COMPRESSION_ZLIB:
+            body = zlib.decompress(body)
+        elif compression == COMPRESSION_ZSTD:
+            if zstandard is None:
+                return None
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif compression != COMPRESSION_NONE:
+            return None
+        return decoder.decode_body(body)
+    except Exception as e:
+        logger.warning(f"Undecodable cache value ({decoder.name}): {e}")
+        return None
@@ -0,0 +1,515 @@
+"""
+Cache Instrumentation
+
+Per-process recorder for CacheManager, aggregated across pods through Redis:
+
+- latency histogram per operation (get, mget, set, set_many, invalidate, compute)
+- lookups per workspace, tier (l1 / redis) and result (hit / miss)
+- payload size histogram of written values
+- hot keys: a sampled count-min sketch plus a bounded candidate set
+
+Recording is in-memory only. flush() moves the deltas into three Redis keys shared
+by every pod, so the totals survive restarts and look the same from any pod:
+
+    {prefix}:stats       hash of counters (histogram buckets, sums, lookups)
+    {prefix}:stats:cms   hash of count-min sketch cells "{row}:{column}"
+    {prefix}:stats:hot   sorted set of hot-key candidates
+
+collect() reads them back into a snapshot, and render_prometheus() formats a
+snapshot in the Prometheus text exposition format.
+"""
+
+import hashlib
+import logging
+import random
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+# Bytes
+PAYLOAD_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+
+OTHER_WORKSPACES = "__other__"
+
+
+class Histogram:
+    """Fixed-bucket histogram (per-bucket counts; the last bucket is +Inf)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate like PromQL histogram_quantile (linear within the bucket)."""
+        return histogram_quantile(self.buckets, self.counts, q)
+
+
+def histogram_quantile(
+    buckets: Sequence[float], counts: Sequence[int], q: float
+) -> Optional[float]:
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count > 0:
+            if i == len(buckets):
+                return buckets[-1]
+            lower = buckets[i - 1] if i > 0 else 0.0
+            return lower + (buckets[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+class CountMinSketch:
+    """Count-min sketch with a hash that is stable across processes (mergeable)."""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [[0] * width for _ in range(depth)]
+
+    def columns(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return [
+            int.from_bytes(digest[4 * row : 4 * row + 4], "little") % self.width
+            for row in range(self.depth)
+        ]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Add and return the new estimate"""
+        estimate = None
+        for row, column in enumerate(self.columns(key)):
+            self.rows[row][column] += count
+            value = self.rows[row][column]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(self.rows[row][column] for row, column in enumerate(self.columns(key)))
+
+    def cells(self) -> Dict[Tuple[int, int], int]:
+        """Non-zero cells {(row, column): count}"""
+        return {
+            (row, column): count
+            for row, counts in enumerate(self.rows)
+            for column, count in enumerate(counts)
+            if count
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "operation", "start")
+
+    def __init__(self, metrics: "CacheMetrics", operation: str):
+        self.metrics = metrics
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe_latency(self.operation, time.perf_counter() - self.start)
+        return False
+
+
+class CacheMetrics:
+    """
+    In-memory cache instrumentation with Redis aggregation
+
+    Example:
+        >>> with metrics.timer("get"):
+        ...     value = await redis.get(key)
+        >>> metrics.record_lookup(workspace_id, hit=value is not None)
+        >>> await metrics.flush(redis, "superbrain")
+        >>> print(render_prometheus(await metrics.collect(redis, "superbrain")))
+    """
+
+    def __init__(
+        self,
+        hot_key_sample_rate: float = 0.1,
+        hot_keys: int = 20,
+        sketch_width: int = 2048,
+        sketch_depth: int = 4,
+        max_workspaces: int = 1000,
+        stats_ttl: int = 7 * 86400,
+        rng: Callable[[], float] = random.random,
+    ):
+        """
+        Initialize CacheMetrics.
+
+        Args:
+            hot_key_sample_rate: Fraction of lookups fed to the hot-key sketch
+            hot_keys: Number of hot keys reported
+            sketch_width: Count-min sketch columns (error ~ 2 / width of sampled lookups)
+            sketch_depth: Count-min sketch rows (hash functions)
+            max_workspaces: Distinct workspaces tracked per flush; the rest are
+                counted as "__other__" (bounds label cardinality)
+            stats_ttl: Seconds the aggregated Redis keys live after the last flush
+            rng: Uniform [0, 1) random source (injectable for tests)
+        """
+        if not 0 < hot_key_sample_rate <= 1:
+            raise ValueError(f"hot_key_sample_rate must be in (0, 1]: {hot_key_sample_rate}")
+
+        self.hot_key_sample_rate = hot_key_sample_rate
+        self.hot_keys = hot_keys
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.max_workspaces = max_workspaces
+        self.stats_ttl = stats_ttl
+        self._rng = rng
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop unflushed data"""
+        self.latency: Dict[str, Histogram] = {}
+        self.payload = Histogram(PAYLOAD_BUCKETS)
+        # (workspace_id, tier, result) -> count
+        self.lookups: Dict[Tuple[str, str, str], int] = {}
+        self._workspaces = set()
+        self.sketch = CountMinSketch(self.sketch_width, self.sketch_depth)
+        # Locally hottest sampled keys -> sketch estimate
+        self._candidates: Dict[str, int] = {}
+
+    # ========== Recording ==========
+
+    def timer(self, operation: str) -> _Timer:
+        return _Timer(self, operation)
+
+    def observe_latency(self, operation: str, seconds: float) -> None:
+        histogram = self.latency.get(operation)
+        if histogram is None:
+            histogram = self.latency[operation] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    def observe_payload(self, nbytes: int) -> None:
+        self.payload.observe(nbytes)
+
+    def record_lookup(
+        self, workspace_id: str, hit: bool, tier: str = "redis", count: int = 1
+    ) -> None:
+        if workspace_id not in self._workspaces:
+            if len(self._workspaces) >= self.max_workspaces:
+                workspace_id = OTHER_WORKSPACES
+            else:
+                self._workspaces.add(workspace_id)
+        key = (workspace_id, tier, "hit" if hit else "miss")
+        self.lookups[key] = self.lookups.get(key, 0) + count
+
+    def sample_key(self, key: str) -> None:
+        """Feed a looked-up key to the hot-key sketch (sampled)"""
+        if self._rng() >= self.hot_key_sample_rate:
+            return
+        estimate = self.sketch.add(key)
+
+        candidates = self._candidates
+        if key in candidates or len(candidates) < 4 * self.hot_keys:
+            candidates[key] = estimate
+            return
+        coldest = min(candidates, key=candidates.get)
+        if estimate > candidates[coldest]:
+            del candidates[coldest]
+            candidates[key] = estimate
+
+    # ========== Aggregation ==========
+
+    async def flush(self, redis_client, prefix: str) -> bool:
+        """
+        Add the unflushed deltas to the cluster-wide Redis keys and reset them
+
+        Deltas recorded while the pipeline runs are kept; if the write fails the
+        flushed deltas are merged back and retried on the next flush.
+
+        Returns:
+            True if anything was written
+        """
+        latency, payload, lookups = self.latency, self.payload, self.lookups
+        sketch, candidates = self.sketch, self._candidates
+        cells = sketch.cells()
+        self.reset()
+        if not (latency or payload.count or lookups or cells):
+            return False
+
+        stats_key, cms_key, hot_key = _keys(prefix)
+        fields: Dict[str, int] = {}
+        sums: Dict[str, float] = {}
+        for operation, histogram in latency.items():
+            _histogram_fields(f"lat|{operation}", histogram, fields, sums)
+        if payload.count:
+            _histogram_fields("payload", payload, fields, sums)
+        for (workspace_id, tier, result), count in lookups.items():
+            fields[f"ws|{workspace_id}|{tier}|{result}"] = count
+
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for field, value in fields.items():
+                pipe.hincrby(stats_key, field, value)
+            for field, value in sums.items():
+                pipe.hincrbyfloat(stats_key, field, value)
+            for (row, column), count in cells.items():
+                pipe.hincrby(cms_key, f"{row}:{column}", count)
+            for key, estimate in candidates.items():
+                pipe.zincrby(hot_key, estimate, key)
+            if candidates:
+                # Keep the strongest candidates only
+                pipe.zremrangebyrank(hot_key, 0, -(4 * self.hot_keys) - 1)
+            for key in (stats_key, cms_key, hot_key):
+                pipe.expire(key, self.stats_ttl)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache metrics flush error: {e}")
+            self._merge(latency, payload, lookups, sketch, candidates)
+            return False
+
+    def _merge(
+        self,
+        latency: Dict[str, Histogram],
+        payload: Histogram,
+        lookups: Dict[Tuple[str, str, str], int],
+        sketch: CountMinSketch,
+        candidates: Dict[str, int],
+    ) -> None:
+        """Add unflushed deltas back (after a failed flush)"""
+        for operation, histogram in latency.items():
+            current = self.latency.get(operation)
+            if current is None:
+                current = self.latency[operation] = Histogram(LATENCY_BUCKETS)
+            _merge_histogram(current, histogram)
+        _merge_histogram(self.payload, payload)
+
+        for key, count in lookups.items():
+            self.lookups[key] = self.lookups.get(key, 0) + count
+        self._workspaces.update(key[0] for key in lookups if key[0] != OTHER_WORKSPACES)
+
+        for row, counts in enumerate(sketch.rows):
+            current = self.sketch.rows[row]
+            for column, count in enumerate(counts):
+                if count:
+                    current[column] += count
+
+        merged = {key: self.sketch.estimate(key) for key in {**candidates, **self._candidates}}
+        strongest = sorted(merged, key=merged.get, reverse=True)[: 4 * self.hot_keys]
+        self._candidates = {key: merged[key] for key in strongest}
+
+    async def collect(self, redis_client, prefix: str) -> Dict:
+        """
+        Cluster-wide snapshot (flushed data of every pod)
+
+        Returns:
+            {
+                "latency": {operation: {"buckets", "counts", "sum", "count"}},
+                "payload": {"buckets", "counts", "sum", "count"},
+                "lookups": {workspace_id: {"l1_hit", "redis_hit", "redis_miss", ...}},
+                "hot_keys": [(key, estimated lookups), ...],
+                "hot_key_sample_rate": float
+            }
+        """
+        stats_key, cms_key, hot_key = _keys(prefix)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hgetall(stats_key)
+        pipe.hgetall(cms_key)
+        pipe.zrevrange(hot_key, 0, 4 * self.hot_keys - 1)
+        raw_stats, raw_cells, raw_candidates = await pipe.execute()
+
+        stats = {_text(field): value for field, value in (raw_stats or {}).items()}
+        latency = {}
+        operations = {field.split("|")[1] for field in stats if field.startswith("lat|")}
+        for operation in sorted(operations):
+            latency[operation] = _read_histogram(f"lat|{operation}", LATENCY_BUCKETS, stats)
+
+        lookups: Dict[str, Dict[str, int]] = {}
+        for field, value in stats.items():
+            if field.startswith("ws|"):
+                workspace_id, tier, result = field[3:].rsplit("|", 2)
+                lookups.setdefault(workspace_id, {})[f"{tier}_{result}"] = int(value)
+
+        cells = {_text(field): int(value) for field, value in (raw_cells or {}).items()}
+        sketch = CountMinSketch(self.sketch_width, self.sketch_depth)
+        hot_keys = []
+        for key in (_text(candidate) for candidate in raw_candidates or []):
+            estimate = min(
+                cells.get(f"{row}:{column}", 0) for row, column in enumerate(sketch.columns(key))
+            )
+            hot_keys.append((key, round(estimate / self.hot_key_sample_rate)))
+        hot_keys.sort(key=lambda item: item[1], reverse=True)
+
+        return {
+            "latency": latency,
+            "payload": _read_histogram("payload", PAYLOAD_BUCKETS, stats),
+            "lookups": lookups,
+            "hot_keys": hot_keys[: self.hot_keys],
+            "hot_key_sample_rate": self.hot_key_sample_rate,
+        }
+
+
+def summarize(snapshot: Dict) -> Dict:
+    """Compact JSON view of a snapshot (quantiles and ratios instead of buckets)"""
+
+    def histogram_summary(histogram: Dict, scale: float = 1.0) -> Dict:
+        quantiles = {
+            f"p{int(q * 100)}": histogram_quantile(histogram["buckets"], histogram["counts"], q)
+            for q in (0.5, 0.95, 0.99)
+        }
+        return {
+            "count": histogram["count"],
+            "mean": (
+                round(histogram["sum"] / histogram["count"] * scale, 3)
+                if histogram["count"]
+                else None
+            ),
+            **{
+                name: round(value * scale, 3) if value is not None else None
+                for name, value in quantiles.items()
+            },
+        }
+
+    workspaces = {}
+    for workspace_id, counts in snapshot["lookups"].items():
+        hits = counts.get("l1_hit", 0) + counts.get("redis_hit", 0)
+        total = hits + counts.get("l1_miss", 0) + counts.get("redis_miss", 0)
+        workspaces[workspace_id] = {
+            "lookups": total,
+            "hit_ratio": round(hits / total, 3) if total else 0.0,
+            "l1_hits": counts.get("l1_hit", 0),
+        }
+
+    return {
+        "latency_ms": {
+            operation: histogram_summary(histogram, scale=1000)
+            for operation, histogram in snapshot["latency"].items()
+        },
+        "payload_bytes": histogram_summary(snapshot["payload"]),
+        "workspaces": workspaces,
+        "hot_keys": [
+            {"key": key, "estimated_lookups": count} for key, count in snapshot["hot_keys"]
+        ],
+    }
+
+
+def render_prometheus(snapshot: Dict, namespace: str = "superbrain_cache") -> str:
+    """Snapshot in the Prometheus text exposition format (version 0.0.4)"""
+    lines: List[str] = []
+
+    def header(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {namespace}_{name} {help_text}")
+        lines.append(f"# TYPE {namespace}_{name} {kind}")
+
+    def histogram(name: str, histogram: Dict, labels: str = "") -> None:
+        cumulative = 0
+        separator = "," if labels else ""
+        bounds = [_format_number(bound) for bound in histogram["buckets"]] + ["+Inf"]
+        for bound, count in zip(bounds, histogram["counts"]):
+            cumulative += count
+            lines.append(
+                f'{namespace}_{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}'
+            )
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{namespace}_{name}_sum{suffix} {_format_number(histogram['sum'])}")
+        lines.append(f"{namespace}_{name}_count{suffix} {histogram['count']}")
+
+    header("operation_duration_seconds", "histogram", "Cache operation latency")
+    for operation, data in snapshot["latency"].items():
+        histogram("operation_duration_seconds", data, f'operation="{_escape(operation)}"')
+
+    header("payload_bytes", "histogram", "Size of cached recommendation values")
+    histogram("payload_bytes", snapshot["payload"])
+
+    header("lookups_total", "counter", "Cache lookups by workspace, tier and result")
+    for workspace_id, counts in sorted(snapshot["lookups"].items()):
+        for tier_result, count in sorted(counts.items()):
+            tier, result = tier_result.split("_", 1)
+            lines.append(
+                f'{namespace}_lookups_total{{workspace_id="{_escape(workspace_id)}",'
+                f'tier="{tier}",result="{result}"}} {count}'
+            )
+
+    header("hit_ratio", "gauge", "Hits (L1 + Redis) / lookups per workspace")
+    for workspace_id, summary in sorted(summarize(snapshot)["workspaces"].items()):
+        lines.append(
+            f'{namespace}_hit_ratio{{workspace_id="{_escape(workspace_id)}"}} '
+            f"{summary['hit_ratio']}"
+        )
+
+    header("hot_key_lookups", "gauge", "Estimated lookups of the hottest keys (sampled)")
+    for rank, (key, count) in enumerate(snapshot["hot_keys"], start=1):
+        lines.append(f'{namespace}_hot_key_lookups{{key="{_escape(key)}",rank="{rank}"}} {count}')
+
+    return "\n".join(lines) + "\n"
+
+
+# ========== Helpers ==========
+
+
+def _keys(prefix: str) -> Tuple[str, str, str]:
+    return f"{prefix}:stats", f"{prefix}:stats:cms", f"{prefix}:stats:hot"
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _merge_histogram(target: Histogram, source: Histogram) -> None:
+    for i, count in enumerate(source.counts):
+        target.counts[i] += count
+    target.sum += source.sum
+    target.count += source.count
+
+
+def _histogram_fields(
+    name: str, histogram: Histogram, fields: Dict[str, int], sums: Dict[str, float]
+) -> None:
+    bounds = [_format_number(bound) for bound in histogram.buckets] + ["+Inf"]
+    for bound, count in zip(bounds, histogram.counts):
+        if count:
+            fields[f"{name}|{bound}"] = count
+    fields[f"{name}|count"] = histogram.count
+    sums[f"{name}|sum"] = histogram.sum
+
+
+def _read_histogram(name: str, buckets: Sequence[float], stats: Dict[str, bytes]) -> Dict:
+    bounds = [_format_number(bound) for bound in buckets] + ["+Inf"]
+    return {
+        "buckets": list(buckets),
+        "counts": [int(stats.get(f"{name}|{bound}", 0)) for bound in bounds],
+        "sum": float(stats.get(f"{name}|sum", 0.0)),
+        "count": int(stats.get(f"{name}|count", 0)),
+    }
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
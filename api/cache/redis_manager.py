@@ -14,16 +14,40 @@ Cache Strategy:
     - Invalidate on contact changes
     - Pre-warm on startup
 
+Invalidation:
+    Recommendation keys embed a per-workspace generation counter
+    ({prefix}:rec:{workspace_id}:g{generation}:{contact_id}:{k}). Invalidating a
+    workspace is one INCR of {prefix}:gen:{workspace_id}; entries of older
+    generations are never read again and expire with their TTL.
+
+Serialization:
+    Values are encoded by a pluggable codec (api.cache.codecs, packed binary by
+    default) behind a version header; unreadable values count as misses. The
+    Redis client must return bytes (decode_responses=False).
+
+Instrumentation:
+    Every operation feeds CacheMetrics (api.cache.metrics): latency histograms,
+    per-workspace hit ratio, payload sizes and sampled hot keys. start() flushes
+    them to Redis periodically so /api/cache/stats and /api/cache/metrics show
+    cluster-wide numbers.
+
+Bulk operations:
+    mget_recommendations / set_many_recommendations read or write many contacts
+    in one MGET / one pipeline (warmup of 10K contacts = 1 round trip for writes).
+
 Author: Super Brain Team
 Created: 2025-12-13
 """
 
-import json
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 import redis.asyncio as redis
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+
+from api.cache.codecs import CacheCodec, decode_value, get_codec
+from api.cache.metrics import CacheMetrics, summarize
 
 logger = logging.getLogger(__name__)
 
@@ -36,8 +60,11 @@ class ContactRecommendation(BaseModel):
     reason: Optional[str] = None
 
 
+_RECOMMENDATION_LIST = TypeAdapter(List[ContactRecommendation])
+
+
 class CacheStats(BaseModel):
-    """Cache statistics"""
+    """Cache statistics (this instance since start; see CacheMetrics for cluster-wide)"""
 
     total_keys: int = 0
     hit_count: int = 0
@@ -63,26 +90,40 @@ class CacheManager:
         >>> if recommendations is None:
         ...     recommendations = await compute_recommendations()
         ...     await cache.set_recommendations(workspace_id, contact_id, recommendations)
+        >>> cached = await cache.mget_recommendations(workspace_id, contact_ids, k=20)
     """
 
+    # Commands buffered per pipeline execute in set_many_recommendations
+    PIPELINE_BATCH_SIZE = 10_000
+
     def __init__(
         self,
         redis_client: redis.Redis,
         default_ttl: int = 86400,  # 24 hours
         key_prefix: str = "superbrain",
+        codec: Optional[CacheCodec] = None,
+        metrics: Optional[CacheMetrics] = None,
+        metrics_flush_interval: float = 10.0,
     ):
         """
         Initialize Cache Manager
 
         Args:
-            redis_client: Async Redis client
+            redis_client: Async Redis client (decode_responses=False)
             default_ttl: Default TTL in seconds (24h)
             key_prefix: Prefix for all cache keys
+            codec: CacheCodec for values (CACHE_CODEC / CACHE_COMPRESSION env if None)
+            metrics: Instrumentation recorder (new CacheMetrics if None)
+            metrics_flush_interval: Seconds between metric flushes to Redis (after start())
         """
         self.redis = redis_client
         self.default_ttl = default_ttl
         self.key_prefix = key_prefix
+        self.codec = codec or get_codec()
         self.stats = CacheStats()
+        self.metrics = metrics or CacheMetrics()
+        self.metrics_flush_interval = metrics_flush_interval
+        self._metrics_task: Optional[asyncio.Task] = None
 
     # ========== Core Methods ==========
 
@@ -90,10 +131,55 @@ class CacheManager:
         """
         Create cache key
 
-        Format: superbrain:rec:{workspace_id}:{contact_id}:{k}
+        Format: superbrain:rec:{workspace_id}:g{generation}:{contact_id}:{k}
         """
         return f"{self.key_prefix}:{':'.join(parts)}"
 
+    def _rec_key(self, workspace_id: str, generation: int, contact_id: str, k: int) -> str:
+        return self._make_key("rec", workspace_id, f"g{generation}", str(contact_id), str(k))
+
+    def _generation_key(self, workspace_id: str) -> str:
+        return self._make_key("gen", workspace_id)
+
+    def _count_key(self, workspace_id: str, generation: int) -> str:
+        """Number of entries written in a generation (reported on invalidation)"""
+        return self._make_key("gen", workspace_id, f"g{generation}", "count")
+
+    async def _get_generation(self, workspace_id: str) -> int:
+        value = await self.redis.get(self._generation_key(workspace_id))
+        return int(value) if value is not None else 0
+
+    def _serialize(self, recommendations: List[ContactRecommendation]) -> bytes:
+        value = self.codec.encode(recommendations)
+        self.metrics.observe_payload(len(value))
+        return value
+
+    def _record_lookup(
+        self, workspace_id: str, contact_id: str, k: int, hit: bool, tier: str = "redis"
+    ) -> None:
+        """Count a hit/miss in the instance stats and the cluster metrics"""
+        if tier == "redis":
+            if hit:
+                self.stats.hit_count += 1
+            else:
+                self.stats.miss_count += 1
+        self.metrics.record_lookup(workspace_id, hit, tier)
+        self.metrics.sample_key(f"{workspace_id}:{contact_id}:{k}")
+
+    @staticmethod
+    def _deserialize(cached) -> Optional[List[ContactRecommendation]]:
+        """Decoded value (None if written by an unknown codec / format version)"""
+        rows = decode_value(cached)
+        if rows is None:
+            return None
+        # One pydantic-core call for the whole list
+        return _RECOMMENDATION_LIST.validate_python(
+            [
+                {"contact_id": contact_id, "score": score, "reason": reason}
+                for contact_id, score, reason in rows
+            ]
+        )
+
     async def get_recommendations(
         self, workspace_id: str, contact_id: str, k: int = 20
     ) -> Optional[List[ContactRecommendation]]:
@@ -112,20 +198,19 @@ class CacheManager:
             Increments cache hit/miss stats
         """
         try:
-            key = self._make_key("rec", workspace_id, contact_id, str(k))
-            cached = await self.redis.get(key)
+            with self.metrics.timer("get"):
+                generation = await self._get_generation(workspace_id)
+                cached = await self.redis.get(
+                    self._rec_key(workspace_id, generation, contact_id, k)
+                )
+                recommendations = self._deserialize(cached) if cached else None
 
-            if cached:
-                self.stats.hit_count += 1
-                data = json.loads(cached)
-                return [ContactRecommendation(**item) for item in data]
-            else:
-                self.stats.miss_count += 1
-                return None
+            self._record_lookup(workspace_id, contact_id, k, recommendations is not None)
+            return recommendations
 
         except Exception as e:
             logger.error(f"Cache get error: {e}")
-            self.stats.miss_count += 1
+            self._record_lookup(workspace_id, contact_id, k, False)
             return None
 
     async def set_recommendations(
@@ -150,12 +235,39 @@ class CacheManager:
             True if cached successfully, False otherwise
         """
         try:
-            key = self._make_key("rec", workspace_id, contact_id, str(k))
-            data = [rec.model_dump() for rec in recommendations]
-            value = json.dumps(data)
+            generation = await self._get_generation(workspace_id)
+        except Exception as e:
+            logger.error(f"Cache set error: {e}")
+            return False
+
+        return await self._set_in_generation(
+            workspace_id, generation, contact_id, recommendations, k, ttl
+        )
 
+    async def _set_in_generation(
+        self,
+        workspace_id: str,
+        generation: int,
+        contact_id: str,
+        recommendations: List[ContactRecommendation],
+        k: int,
+        ttl: Optional[int],
+    ) -> bool:
+        """Write into a known generation (a value computed before an invalidation stays unread)"""
+        try:
             ttl = ttl or self.default_ttl
-            await self.redis.setex(key, ttl, value)
+
+            with self.metrics.timer("set"):
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.setex(
+                    self._rec_key(workspace_id, generation, contact_id, k),
+                    ttl,
+                    self._serialize(recommendations),
+                )
+                count_key = self._count_key(workspace_id, generation)
+                pipe.incr(count_key)
+                pipe.expire(count_key, ttl)
+                await pipe.execute()
 
             logger.debug(
                 f"Cached {len(recommendations)} recommendations for {contact_id} (TTL: {ttl}s)"
@@ -166,10 +278,109 @@ class CacheManager:
             logger.error(f"Cache set error: {e}")
             return False
 
+    async def mget_recommendations(
+        self, workspace_id: str, contact_ids: Iterable[str], k: int = 20
+    ) -> Dict[str, Optional[List[ContactRecommendation]]]:
+        """
+        Get cached recommendations for many contacts with one MGET
+
+        Args:
+            workspace_id: Workspace ID
+            contact_ids: Contact IDs to get recommendations for
+            k: Number of recommendations
+
+        Returns:
+            {contact_id: recommendations or None (miss)}
+
+        Side effects:
+            Increments cache hit/miss stats per contact
+        """
+        contact_ids = [str(contact_id) for contact_id in contact_ids]
+        if not contact_ids:
+            return {}
+
+        try:
+            with self.metrics.timer("mget"):
+                generation = await self._get_generation(workspace_id)
+                values = await self.redis.mget(
+                    [self._rec_key(workspace_id, generation, cid, k) for cid in contact_ids]
+                )
+                result = {
+                    contact_id: self._deserialize(cached) if cached else None
+                    for contact_id, cached in zip(contact_ids, values)
+                }
+        except Exception as e:
+            logger.error(f"Cache mget error: {e}")
+            result = {contact_id: None for contact_id in contact_ids}
+
+        for contact_id, recs in result.items():
+            self._record_lookup(workspace_id, contact_id, k, recs is not None)
+        return result
+
+    async def set_many_recommendations(
+        self,
+        workspace_id: str,
+        recommendations: Dict[str, List[ContactRecommendation]],
+        k: int = 20,
+        ttl: Optional[int] = None,
+    ) -> int:
+        """
+        Cache recommendations for many contacts in one pipeline
+
+        Commands are sent in batches of PIPELINE_BATCH_SIZE (one round trip each).
+
+        Args:
+            workspace_id: Workspace ID
+            recommendations: {contact_id: recommendations}
+            k: Number of recommendations
+            ttl: TTL in seconds (uses default if None)
+
+        Returns:
+            Number of contacts cached (0 on error)
+        """
+        if not recommendations:
+            return 0
+
+        try:
+            ttl = ttl or self.default_ttl
+
+            with self.metrics.timer("set_many"):
+                generation = await self._get_generation(workspace_id)
+
+                pipe = self.redis.pipeline(transaction=False)
+                buffered = 0
+                for contact_id, recs in recommendations.items():
+                    if buffered >= self.PIPELINE_BATCH_SIZE:
+                        await pipe.execute()
+                        buffered = 0
+                    pipe.setex(
+                        self._rec_key(workspace_id, generation, contact_id, k),
+                        ttl,
+                        self._serialize(recs),
+                    )
+                    buffered += 1
+
+                count_key = self._count_key(workspace_id, generation)
+                pipe.incrby(count_key, len(recommendations))
+                pipe.expire(count_key, ttl)
+                await pipe.execute()
+
+            logger.debug(
+                f"Cached recommendations for {len(recommendations)} contacts (TTL: {ttl}s)"
+            )
+            return len(recommendations)
+
+        except Exception as e:
+            logger.error(f"Cache set_many error: {e}")
+            return 0
+
     async def invalidate_workspace(self, workspace_id: str) -> int:
         """
         Invalidate all cache for workspace
 
+        Bumps the workspace generation: one round trip regardless of the number of
+        cached keys. Old entries are no longer addressable and expire with their TTL.
+
         Use cases:
             - Contact added/updated/deleted
             - Model retrained
@@ -179,25 +390,20 @@ class CacheManager:
             workspace_id: Workspace ID
 
         Returns:
-            Number of keys deleted
+            Number of entries written in the invalidated generation
         """
         try:
-            pattern = self._make_key("rec", workspace_id, "*")
-            cursor = 0
-            deleted_count = 0
-
-            # Scan with pattern matching
-            while True:
-                cursor, keys = await self.redis.scan(cursor=cursor, match=pattern, count=100)
-
-                if keys:
-                    deleted_count += await self.redis.delete(*keys)
+            with self.metrics.timer("invalidate"):
+                generation = await self.redis.incr(self._generation_key(workspace_id)) - 1
 
-                if cursor == 0:
-                    break
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.get(self._count_key(workspace_id, generation))
+                pipe.delete(self._count_key(workspace_id, generation))
+                count, _ = await pipe.execute()
+            invalidated = int(count) if count is not None else 0
 
-            logger.info(f"Invalidated {deleted_count} cache keys for workspace {workspace_id}")
-            return deleted_count
+            logger.info(f"Invalidated {invalidated} cache keys for workspace {workspace_id}")
+            return invalidated
 
         except Exception as e:
             logger.error(f"Cache invalidation error: {e}")
@@ -211,9 +417,14 @@ class CacheManager:
             {
                 'memory_usage_mb': float,
                 'total_keys': int,
-                'hit_rate': float,
+                'hit_rate': float,   # this instance
                 'miss_rate': float,
-                'avg_latency_ms': float
+                'cluster': {         # all pods, see api.cache.metrics.summarize
+                    'latency_ms': {operation: {count, mean, p50, p95, p99}},
+                    'payload_bytes': {count, mean, p50, p95, p99},
+                    'workspaces': {workspace_id: {lookups, hit_ratio, l1_hits}},
+                    'hot_keys': [{key, estimated_lookups}]
+                }
             }
         """
         try:
@@ -239,6 +450,7 @@ class CacheManager:
                 "miss_count": self.stats.miss_count,
                 "hit_rate": round(self.stats.hit_rate, 3),
                 "miss_rate": round(self.stats.miss_rate, 3),
+                "cluster": summarize(await self.collect_metrics()),
             }
 
         except Exception as e:
@@ -300,14 +512,16 @@ class CacheManager:
         limit: int = 100,
         get_top_contacts_func=None,
         generate_recommendations_func=None,
+        generate_batch_recommendations_func=None,
     ):
         """
         Pre-compute recommendations for top contacts
 
         Strategy:
             1. Get top N contacts by interaction frequency
-            2. Pre-compute recommendations for each
-            3. Cache results
+            2. Pre-compute recommendations for all of them (one batch call if
+               generate_batch_recommendations_func is given, else one call each)
+            3. Cache results in one pipeline
 
         Use case:
             - On server startup
@@ -319,6 +533,8 @@ class CacheManager:
             limit: Number of top contacts to warm up
             get_top_contacts_func: Function to get top contacts
             generate_recommendations_func: Function to generate recommendations
+            generate_batch_recommendations_func: (workspace_id, contact_ids, k) ->
+                {contact_id: recommendations}; preferred over the per-contact function
 
         Returns:
             {
@@ -332,31 +548,38 @@ class CacheManager:
         start_time = time.time()
 
         try:
-            if not get_top_contacts_func or not generate_recommendations_func:
+            generate_func = generate_recommendations_func or generate_batch_recommendations_func
+            if not get_top_contacts_func or not generate_func:
                 logger.warning("Warmup functions not provided, skipping")
                 return {"contacts_cached": 0, "recommendations_generated": 0, "time_taken_sec": 0}
 
             # Get top contacts
             top_contacts = await get_top_contacts_func(workspace_id, limit)
 
-            contacts_cached = 0
-            recommendations_generated = 0
+            batch = None
+            if generate_batch_recommendations_func is not None:
+                batch = await generate_batch_recommendations_func(
+                    workspace_id, [contact["id"] for contact in top_contacts], k=20
+                )
 
+            # Generate recommendations
+            to_cache = {}
             for contact in top_contacts:
-                # Generate recommendations
-                recommendations = await generate_recommendations_func(
-                    workspace_id, contact["id"], k=20
-                )
+                if batch is not None:
+                    recommendations = batch.get(contact["id"])
+                else:
+                    recommendations = await generate_recommendations_func(
+                        workspace_id, contact["id"], k=20
+                    )
 
-                # Cache
                 if recommendations:
-                    success = await self.set_recommendations(
-                        workspace_id, contact["id"], recommendations, k=20
-                    )
+                    to_cache[contact["id"]] = recommendations
 
-                    if success:
-                        contacts_cached += 1
-                        recommendations_generated += len(recommendations)
+            # Cache (one pipeline)
+            contacts_cached = await self.set_many_recommendations(workspace_id, to_cache, k=20)
+            recommendations_generated = (
+                sum(len(recs) for recs in to_cache.values()) if contacts_cached else 0
+            )
 
             time_taken = time.time() - start_time
 
@@ -381,6 +604,36 @@ class CacheManager:
                 "time_taken_sec": 0,
             }
 
+    # ========== Metrics ==========
+
+    async def collect_metrics(self) -> Dict[str, Any]:
+        """
+        Flush this instance's metrics and read the cluster-wide snapshot
+
+        Returns:
+            Snapshot for api.cache.metrics.summarize / render_prometheus
+        """
+        await self.metrics.flush(self.redis, self.key_prefix)
+        return await self.metrics.collect(self.redis, self.key_prefix)
+
+    async def start(self) -> None:
+        """Start flushing metrics to Redis every metrics_flush_interval seconds"""
+        if self._metrics_task is None:
+            self._metrics_task = asyncio.create_task(self._flush_metrics_loop())
+
+    async def _flush_metrics_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.metrics_flush_interval)
+            await self.metrics.flush(self.redis, self.key_prefix)
+
     async def close(self):
-        """Close Redis connection"""
+        """Flush metrics and close Redis connection"""
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+            try:
+                await self._metrics_task
+            except asyncio.CancelledError:
+                pass
+            self._metrics_task = None
+            await self.metrics.flush(self.redis, self.key_prefix)
         await self.redis.close()
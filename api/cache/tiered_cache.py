@@ -0,0 +1,546 @@
+"""
+Two-Tier Recommendation Cache
+
+In-process L1 (bounded LRU with TTL) in front of the Redis L2 managed by CacheManager.
+
+Read path for (workspace_id, contact_id, k):
+    1. L1 fresh entry -> returned without touching Redis; close to the L2 expiry a
+       single background recompute is started (probabilistic early refresh, XFetch)
+    2. L1 stale entry (within l1_stale_ttl) -> returned, reloaded in the background
+       (stale-while-revalidate)
+    3. Otherwise one load per key at a time (single-flight): concurrent callers
+       await the same L2 read / recomputation instead of stampeding
+
+Coherence:
+    invalidate_workspace bumps the Redis generation (see CacheManager), drops the
+    local entries and publishes the workspace on a pub/sub channel; every other
+    pod drops its L1 entries for that workspace. A missed message is bounded by
+    the short L1 TTL.
+
+Example:
+    >>> cache = TieredCacheManager(redis_client)
+    >>> await cache.start()  # pub/sub listener
+    >>> recs = await cache.get_or_compute(workspace_id, contact_id, 20, compute)
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from api.cache.redis_manager import CacheManager, ContactRecommendation
+
+logger = logging.getLogger(__name__)
+
+# (workspace_id, contact_id, k)
+CacheKey = Tuple[str, str, int]
+Compute = Callable[[], Awaitable[Optional[List[ContactRecommendation]]]]
+
+
+@dataclass
+class L1Entry:
+    """Locally cached recommendations with their freshness deadlines (monotonic time)."""
+
+    value: List[ContactRecommendation]
+    fresh_until: float
+    stale_until: float
+    # When the Redis copy expires (None = unknown, no early refresh)
+    l2_expires_at: Optional[float] = None
+    # Seconds the last recomputation of this key took (XFetch delta)
+    compute_seconds: float = 0.0
+
+
+class L1Cache:
+    """Bounded LRU of L1Entry objects with a per-workspace index for invalidation."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, L1Entry]" = OrderedDict()
+        self._by_workspace: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[L1Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: CacheKey, entry: L1Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._by_workspace.setdefault(key[0], set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._unindex(evicted)
+
+    def pop(self, key: CacheKey) -> Optional[L1Entry]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._unindex(key)
+        return entry
+
+    def drop_workspace(self, workspace_id: str) -> int:
+        keys = self._by_workspace.pop(workspace_id, set())
+        for key in keys:
+            self._entries.pop(key, None)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_workspace.clear()
+
+    def _unindex(self, key: CacheKey) -> None:
+        keys = self._by_workspace.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_workspace[key[0]]
+
+
+class TieredCacheManager(CacheManager):
+    """
+    CacheManager with an in-process L1, single-flight loads, early refresh and
+    pub/sub invalidation. Drop-in replacement: same API plus get_or_compute().
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        default_ttl: int = 86400,  # 24 hours
+        key_prefix: str = "superbrain",
+        l1_max_entries: int = 10_000,
+        l1_ttl: float = 30.0,
+        l1_stale_ttl: float = 30.0,
+        early_refresh_beta: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ):
+        """
+        Initialize Tiered Cache Manager
+
+        Args:
+            redis_client: Async Redis client
+            default_ttl: Redis TTL in seconds (24h)
+            key_prefix: Prefix for all cache keys
+            l1_max_entries: L1 capacity (least recently used entries are evicted)
+            l1_ttl: Seconds an L1 entry is served without consulting Redis
+            l1_stale_ttl: Further seconds it is served while being reloaded
+            early_refresh_beta: XFetch aggressiveness (0 disables early refresh)
+            clock: Monotonic clock (injectable for tests)
+            rng: Uniform (0, 1] random source (injectable for tests)
+        """
+        super().__init__(redis_client, default_ttl=default_ttl, key_prefix=key_prefix)
+        self.l1 = L1Cache(l1_max_entries)
+        self.l1_ttl = l1_ttl
+        self.l1_stale_ttl = l1_stale_ttl
+        self.early_refresh_beta = early_refresh_beta
+        self._clock = clock
+        self._rng = rng
+
+        self.instance_id = uuid.uuid4().hex
+        self.channel = self._make_key("invalidate")
+        # key -> (load task, whether it computes on a Redis miss)
+        self._inflight: Dict[CacheKey, Tuple[asyncio.Task, bool]] = {}
+        # Bumped on invalidation so loads started before it do not refill L1
+        self._epochs: Dict[str, int] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._pubsub = None
+
+        # Counters
+        self.l1_hits = 0
+        self.l1_stale_hits = 0
+        self.l1_misses = 0
+        self.coalesced = 0
+        self.early_refreshes = 0
+        self.invalidations_received = 0
+
+    # ========== Read / write ==========
+
+    async def get_or_compute(
+        self,
+        workspace_id: str,
+        contact_id: str,
+        k: int,
+        compute: Compute,
+        ttl: Optional[int] = None,
+    ) -> Optional[List[ContactRecommendation]]:
+        """
+        Cached recommendations, computing and caching them on a miss
+
+        Only one computation per key runs at a time in this process; concurrent
+        callers share its result.
+
+        Args:
+            workspace_id: Workspace ID
+            contact_id: Contact ID
+            k: Number of recommendations
+            compute: Coroutine function producing the recommendations
+                (None = nothing cacheable, returned as is)
+            ttl: Redis TTL in seconds (uses default if None)
+
+        Returns:
+            Recommendations (None if compute returned None)
+        """
+        key = (workspace_id, str(contact_id), k)
+
+        entry = self._l1_lookup(key)
+        if entry is not None:
+            if self._should_refresh_early(entry):
+                self.early_refreshes += 1
+                self._refresh(key, compute=compute, ttl=ttl)
+            return entry.value
+
+        return await self._single_flight(key, compute, ttl)
+
+    async def get_recommendations(
+        self, workspace_id: str, contact_id: str, k: int = 20
+    ) -> Optional[List[ContactRecommendation]]:
+        """Get cached recommendations (L1, then Redis; concurrent misses share one read)"""
+        key = (workspace_id, str(contact_id), k)
+
+        entry = self._l1_lookup(key)
+        if entry is not None:
+            return entry.value
+
+        return await self._single_flight(key)
+
+    async def mget_recommendations(
+        self, workspace_id: str, contact_ids: Iterable[str], k: int = 20
+    ) -> Dict[str, Optional[List[ContactRecommendation]]]:
+        """Get cached recommendations for many contacts (L1 hits + one MGET for the rest)"""
+        result: Dict[str, Optional[List[ContactRecommendation]]] = {}
+        missing = []
+        for contact_id in dict.fromkeys(str(cid) for cid in contact_ids):
+            entry = self._l1_lookup((workspace_id, contact_id, k))
+            if entry is not None:
+                result[contact_id] = entry.value
+            else:
+                missing.append(contact_id)
+
+        if missing:
+            epoch = self._epochs.get(workspace_id, 0)
+            loaded = await super().mget_recommendations(workspace_id, missing, k)
+            for contact_id, recs in loaded.items():
+                if recs is not None:
+                    self._l1_store((workspace_id, contact_id, k), recs, epoch)
+            result.update(loaded)
+
+        return result
+
+    async def set_recommendations(
+        self,
+        workspace_id: str,
+        contact_id: str,
+        recommendations: List[ContactRecommendation],
+        k: int = 20,
+        ttl: Optional[int] = None,
+    ) -> bool:
+        """Cache recommendations in Redis and L1"""
+        epoch = self._epochs.get(workspace_id, 0)
+        success = await super().set_recommendations(
+            workspace_id, contact_id, recommendations, k, ttl
+        )
+        if success:
+            ttl = ttl or self.default_ttl
+            self._l1_store(
+                (workspace_id, str(contact_id), k),
+                recommendations,
+                epoch,
+                l2_expires_at=self._clock() + ttl,
+            )
+        return success
+
+    async def set_many_recommendations(
+        self,
+        workspace_id: str,
+        recommendations: Dict[str, List[ContactRecommendation]],
+        k: int = 20,
+        ttl: Optional[int] = None,
+    ) -> int:
+        """Cache recommendations for many contacts in Redis (bulk writes skip L1)"""
+        for contact_id in recommendations:
+            self.l1.pop((workspace_id, str(contact_id), k))
+        return await super().set_many_recommendations(workspace_id, recommendations, k, ttl)
+
+    async def invalidate_workspace(self, workspace_id: str) -> int:
+        """Invalidate workspace in Redis, local L1 and (via pub/sub) every other pod's L1"""
+        self._drop_local(workspace_id)
+        invalidated = await super().invalidate_workspace(workspace_id)
+
+        try:
+            message = json.dumps({"workspace_id": workspace_id, "origin": self.instance_id})
+            await self.redis.publish(self.channel, message)
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error: {e}")
+
+        return invalidated
+
+    async def get_cache_stats(self) -> Dict:
+        """Redis statistics plus L1 counters"""
+        stats = await super().get_cache_stats()
+        stats["l1"] = self.l1_stats()
+        return stats
+
+    def l1_stats(self) -> Dict:
+        lookups = self.l1_hits + self.l1_stale_hits + self.l1_misses
+        return {
+            "entries": len(self.l1),
+            "max_entries": self.l1.max_entries,
+            "hits": self.l1_hits,
+            "stale_hits": self.l1_stale_hits,
+            "misses": self.l1_misses,
+            "hit_rate": round((self.l1_hits + self.l1_stale_hits) / lookups, 3) if lookups else 0.0,
+            "coalesced_loads": self.coalesced,
+            "early_refreshes": self.early_refreshes,
+            "invalidations_received": self.invalidations_received,
+        }
+
+    # ========== Pub/sub ==========
+
+    async def start(self) -> None:
+        """Subscribe to invalidation broadcasts, start metric flushes (once the loop runs)."""
+        await super().start()
+        if self._listener is not None:
+            return
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"L1 cache listening for invalidations on {self.channel}")
+
+    async def close(self):
+        """Stop the pub/sub listener and close Redis connection"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self.channel)
+                await self._pubsub.aclose()
+            except Exception as e:
+                logger.debug(f"Pub/sub close error: {e}")
+            self._pubsub = None
+        await super().close()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if message is not None:
+                    self.handle_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Connection lost: entries may be stale up to the L1 TTL
+                logger.warning(f"Cache invalidation listener error: {e}")
+                self.l1.clear()
+                await asyncio.sleep(1.0)
+
+    def handle_invalidation(self, data) -> None:
+        """Apply an invalidation broadcast from another pod."""
+        if isinstance(data, bytes):
+            data = data.decode()
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning(f"Malformed cache invalidation message: {data!r}")
+            return
+
+        if message.get("origin") == self.instance_id:
+            return
+        self.invalidations_received += 1
+        self._drop_local(message["workspace_id"])
+
+    # ========== Internals ==========
+
+    def _l1_lookup(self, key: CacheKey) -> Optional[L1Entry]:
+        """Fresh or stale-but-servable L1 entry (stale ones get a background reload)."""
+        entry = self.l1.get(key)
+        now = self._clock()
+
+        if entry is None or now >= entry.stale_until:
+            if entry is not None:
+                self.l1.pop(key)
+            self.l1_misses += 1
+            return None
+
+        if now < entry.fresh_until:
+            self.l1_hits += 1
+        else:
+            self.l1_stale_hits += 1
+            self._refresh(key)
+        self._record_lookup(*key, True, tier="l1")
+        return entry
+
+    def _l1_store(
+        self,
+        key: CacheKey,
+        value: List[ContactRecommendation],
+        epoch: int,
+        l2_expires_at: Optional[float] = None,
+        compute_seconds: float = 0.0,
+    ) -> None:
+        if self._epochs.get(key[0], 0) != epoch:
+            # Invalidated while loading
+            return
+        now = self._clock()
+        self.l1.put(
+            key,
+            L1Entry(
+                value=value,
+                fresh_until=now + self.l1_ttl,
+                stale_until=now + self.l1_ttl + self.l1_stale_ttl,
+                l2_expires_at=l2_expires_at,
+                compute_seconds=compute_seconds,
+            ),
+        )
+
+    def _should_refresh_early(self, entry: L1Entry) -> bool:
+        """XFetch: recompute with rising probability as the Redis copy nears expiry."""
+        if entry.l2_expires_at is None or self.early_refresh_beta <= 0:
+            return False
+        delta = max(entry.compute_seconds, 1e-3)
+        jitter = -delta * self.early_refresh_beta * math.log(max(self._rng(), 1e-12))
+        return self._clock() + jitter >= entry.l2_expires_at
+
+    async def _single_flight(
+        self, key: CacheKey, compute: Optional[Compute] = None, ttl: Optional[int] = None
+    ) -> Optional[List[ContactRecommendation]]:
+        """Join the running load of a key or start one."""
+        while True:
+            flight = self._inflight.get(key)
+            if flight is None or flight[0].done():
+                task = self._start_load(key, compute, ttl)
+                # Shielded: a cancelled caller does not cancel the load others await
+                return await asyncio.shield(task)
+
+            task, computes = flight
+            self.coalesced += 1
+            value = await asyncio.shield(task)
+            if value is not None or computes or compute is None:
+                return value
+            # Joined a read-only load that missed Redis: compute now
+
+    def _start_load(
+        self,
+        key: CacheKey,
+        compute: Optional[Compute] = None,
+        ttl: Optional[int] = None,
+        recompute: bool = False,
+    ) -> asyncio.Task:
+        task = asyncio.ensure_future(self._load(key, compute, ttl, recompute=recompute))
+        self._inflight[key] = (task, compute is not None)
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    def _finish(self, key: CacheKey, task: asyncio.Task) -> None:
+        flight = self._inflight.get(key)
+        if flight is not None and flight[0] is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Cache load for {key} failed: {task.exception()}")
+
+    def _refresh(
+        self, key: CacheKey, compute: Optional[Compute] = None, ttl: Optional[int] = None
+    ) -> None:
+        """Background reload (from Redis, or recompute if given) unless one is running."""
+        flight = self._inflight.get(key)
+        if flight is not None and not flight[0].done():
+            return
+        self._start_load(key, compute, ttl, recompute=compute is not None)
+
+    async def _load(
+        self,
+        key: CacheKey,
+        compute: Optional[Compute] = None,
+        ttl: Optional[int] = None,
+        recompute: bool = False,
+    ) -> Optional[List[ContactRecommendation]]:
+        """Read Redis into L1; on a miss (or recompute=True) compute and write both."""
+        workspace_id, contact_id, k = key
+        epoch = self._epochs.get(workspace_id, 0)
+        started = time.perf_counter()
+        try:
+            generation = await self._get_generation(workspace_id)
+        except Exception as e:
+            logger.error(f"Cache get error: {e}")
+            generation = None
+
+        if not recompute and generation is not None:
+            cached, remaining = await self._get_with_ttl(workspace_id, generation, contact_id, k)
+            self.metrics.observe_latency("get", time.perf_counter() - started)
+            if cached is not None:
+                l2_expires_at = self._clock() + remaining if remaining is not None else None
+                self._l1_store(key, cached, epoch, l2_expires_at=l2_expires_at)
+                return cached
+        if compute is None:
+            if generation is None:
+                self._record_lookup(workspace_id, contact_id, k, False)
+            return None
+
+        start = self._clock()
+        value = await compute()
+        compute_seconds = self._clock() - start
+        self.metrics.observe_latency("compute", compute_seconds)
+        if value is None:
+            return None
+
+        ttl = ttl or self.default_ttl
+        if generation is None:
+            # Redis unavailable: serve the computed value without caching it
+            return value
+        # Written into the generation read above: if the workspace was invalidated
+        # meanwhile, the (possibly outdated) value is never served from Redis
+        await self._set_in_generation(workspace_id, generation, contact_id, value, k, ttl)
+        self._l1_store(
+            key,
+            value,
+            epoch,
+            l2_expires_at=self._clock() + ttl,
+            compute_seconds=compute_seconds,
+        )
+        return value
+
+    async def _get_with_ttl(
+        self, workspace_id: str, generation: int, contact_id: str, k: int
+    ) -> Tuple[Optional[List[ContactRecommendation]], Optional[float]]:
+        """Redis value and remaining TTL in seconds in one pipeline (counts hit/miss)."""
+        try:
+            key = self._rec_key(workspace_id, generation, contact_id, k)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            cached, remaining_ms = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Cache get error: {e}")
+            self._record_lookup(workspace_id, contact_id, k, False)
+            return None, None
+
+        recommendations = self._deserialize(cached) if cached else None
+        self._record_lookup(workspace_id, contact_id, k, recommendations is not None)
+        if recommendations is None:
+            return None, None
+
+        remaining = remaining_ms / 1000 if remaining_ms is not None and remaining_ms >= 0 else None
+        return recommendations, remaining
+
+    def _drop_local(self, workspace_id: str) -> None:
+        self._epochs[workspace_id] = self._epochs.get(workspace_id, 0) + 1
+        dropped = self.l1.drop_workspace(workspace_id)
+        logger.debug(f"Dropped {dropped} L1 entries for workspace {workspace_id}")
@@ -78,13 +78,19 @@ async def lifespan(app: FastAPI):
     try:
         redis_client = redis.from_url(
             os.getenv("REDIS_URL", "redis://localhost:6379"),
-            encoding="utf-8",
-            decode_responses=True,
+            # Raw bytes: cached recommendations are binary-encoded (api.cache.codecs)
+            decode_responses=False,
             socket_connect_timeout=2,
         )
         # Test connection
         await redis_client.ping()
         logger.info("Redis client initialized successfully")
+
+        # Recommendation cache: in-process L1 in front of Redis, coherent via pub/sub
+        from api.cache import TieredCacheManager
+
+        app.state.cache_manager = TieredCacheManager(redis_client)
+        await app.state.cache_manager.start()
     except Exception as e:
         logger.warning(f"Redis not available - {e}")
         redis_client = None
@@ -95,6 +101,8 @@ async def lifespan(app: FastAPI):
 
     # Cleanup on shutdown
     logger.info("Shutting down application...")
+    if getattr(app.state, "cache_manager", None) is not None:
+        await app.state.cache_manager.close()
     if redis_client:
         await redis_client.close()
         logger.info("Redis client closed")
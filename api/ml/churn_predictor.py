@@ -22,6 +22,8 @@ from sklearn.metrics import accuracy_score, precision_score, recall_score
 from sklearn.model_selection import train_test_split
 from supabase import Client
 
+from api.analytics.aggregates import InteractionAggregates
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,14 +41,17 @@ class ChurnPredictor:
     RISK_HIGH_THRESHOLD = 0.7
     RISK_MEDIUM_THRESHOLD = 0.4
 
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: Client, aggregates: Optional[InteractionAggregates] = None):
         """
         Initialize ChurnPredictor.
 
         Args:
             supabase_client: Supabase client instance
+            aggregates: Rolling per-contact interaction counters (optional); used
+                for the 90-day interaction count instead of a history query
         """
         self.supabase = supabase_client
+        self.aggregates = aggregates
         self.model: Optional[RandomForestClassifier] = None
         self._load_model()
 
@@ -277,17 +282,7 @@ class ChurnPredictor:
             days_since_normalized = min(days_since / 365.0, 1.0)
 
             # Feature 2: Interaction frequency (last 90 days)
-            ninety_days_ago = (datetime.utcnow() - timedelta(days=90)).isoformat()
-
-            interaction_response = (
-                self.supabase.table("sync_history")
-                .select("id")
-                .eq("contact_id", contact_id)
-                .gte("synced_at", ninety_days_ago)
-                .execute()
-            )
-
-            interaction_count = len(interaction_response.data) if interaction_response.data else 0
+            interaction_count = await self._recent_interaction_count(contact)
             interaction_freq = min(
                 interaction_count / 3.0, 1.0
             )  # Normalize: 3+ interactions in 90 days = 1.0
@@ -335,6 +330,27 @@ class ChurnPredictor:
             logger.error(f"Error extracting features for {contact_id}: {str(e)}")
             return None
 
+    async def _recent_interaction_count(self, contact: Dict) -> int:
+        """Interactions of a contact in the last 90 days"""
+        workspace_id = contact.get("workspace_id")
+        if self.aggregates is not None and workspace_id:
+            aggregate = await self.aggregates.get_contact(
+                self.supabase, workspace_id, contact["id"]
+            )
+            return aggregate.last_90d
+
+        ninety_days_ago = (datetime.utcnow() - timedelta(days=90)).isoformat()
+
+        interaction_response = (
+            self.supabase.table("sync_history")
+            .select("id")
+            .eq("contact_id", contact["id"])
+            .gte("synced_at", ninety_days_ago)
+            .execute()
+        )
+
+        return len(interaction_response.data) if interaction_response.data else 0
+
     def _risk_level(self, probability: float) -> str:
         """
         Convert churn probability to risk level.
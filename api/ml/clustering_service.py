@@ -3,33 +3,46 @@ Contact Clustering Service
 
 Groups contacts into clusters based on semantic similarity of embeddings.
 Uses K-means clustering to discover interest-based groups.
+Embeddings are read from the local EmbeddingStore when one is configured.
 """
 
 import logging
 from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 from sklearn.cluster import KMeans
 from supabase import Client
 
+from .embedding_store import EmbeddingStore, parse_embedding
+
 logger = logging.getLogger(__name__)
 
 
 class ContactClusteringService:
     """Service for clustering contacts by interests/topics."""
 
-    def __init__(self, supabase_client: Client, embeddings_service):
+    def __init__(
+        self,
+        supabase_client: Client,
+        embeddings_service,
+        embedding_store: Optional[EmbeddingStore] = None,
+    ):
         """
         Initialize ContactClusteringService.
 
         Args:
             supabase_client: Supabase client instance
             embeddings_service: ContactEmbeddingsService instance
+            embedding_store: Local memory-mapped embedding store (default: the one
+                configured on embeddings_service, if any)
         """
         self.supabase = supabase_client
         self.embeddings_service = embeddings_service
+        self.embedding_store = embedding_store or getattr(
+            embeddings_service, "embedding_store", None
+        )
 
     async def cluster_contacts(self, n_clusters: int = 5) -> Dict:
         """
@@ -54,13 +67,11 @@ class ContactClusteringService:
         try:
             logger.info(f"Starting contact clustering with n_clusters={n_clusters}")
 
-            # Step 1: Query all embeddings
-            embeddings_response = self.supabase.table("contact_embeddings").select("*").execute()
+            # Step 1: Load all embeddings
+            contact_ids, embeddings_array = self._load_embeddings()
 
-            if not embeddings_response.data or len(embeddings_response.data) < n_clusters:
-                logger.warning(
-                    f"Insufficient embeddings for clustering: {len(embeddings_response.data) if embeddings_response.data else 0}"
-                )
+            if len(contact_ids) < n_clusters:
+                logger.warning(f"Insufficient embeddings for clustering: {len(contact_ids)}")
                 return {
                     "total_clusters": 0,
                     "clusters": {},
@@ -68,17 +79,10 @@ class ContactClusteringService:
                     "error": "Insufficient data for clustering",
                 }
 
-            # Step 2: Prepare data
-            contact_ids = []
-            embeddings = []
-
-            for row in embeddings_response.data:
-                contact_ids.append(row["contact_id"])
-                embeddings.append(np.array(row["embedding"], dtype=np.float32))
-
-            embeddings_array = np.array(embeddings)
+            # Step 2: Prepare data (float16 stores are upcast once for K-means)
+            embeddings_array = np.asarray(embeddings_array, dtype=np.float32)
 
-            logger.info(f"Loaded {len(embeddings)} embeddings with shape {embeddings_array.shape}")
+            logger.info(f"Loaded {len(contact_ids)} embeddings with shape {embeddings_array.shape}")
 
             # Step 3: K-means clustering
             kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10, max_iter=300)
@@ -124,6 +128,30 @@ class ContactClusteringService:
             logger.error(f"Failed to cluster contacts: {str(e)}")
             return {"total_clusters": 0, "clusters": {}, "cluster_sizes": {}, "error": str(e)}
 
+    def _load_embeddings(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Load all embeddings as one matrix.
+
+        Uses the local memory-mapped store when available (no JSON parsing);
+        otherwise reads contact_embeddings from the database.
+
+        Returns:
+            Tuple (contact_ids, matrix of shape (n, dimension))
+        """
+        if self.embedding_store is not None:
+            self.embedding_store.refresh()
+            if len(self.embedding_store) > 0:
+                return self.embedding_store.load()
+
+        embeddings_response = self.supabase.table("contact_embeddings").select("*").execute()
+        rows = embeddings_response.data or []
+        if not rows:
+            return [], np.zeros((0, 0), dtype=np.float32)
+
+        contact_ids = [row["contact_id"] for row in rows]
+        embeddings = np.stack([parse_embedding(row["embedding"]) for row in rows])
+        return contact_ids, embeddings
+
     async def _save_clusters_to_db(self, clusters: Dict[int, List[str]]) -> None:
         """
         Save cluster assignments to contact_clusters table.
@@ -0,0 +1,123 @@
+"""
+Contact Details Cache
+
+Per-process LRU with TTL for the contact fields shown in recommendations,
+keyed by (workspace_id, contact_id). Misses for a whole recommendation list
+are fetched with one batched query; contact update/delete events invalidate
+entries so edits are visible immediately.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (workspace_id, contact_ids) -> {contact_id: contact}
+FetchMany = Callable[[str, List[str]], Awaitable[Dict[str, Dict]]]
+
+
+class ContactDetailsCache:
+    """LRU + TTL cache of contact rows with batched miss fetching."""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize ContactDetailsCache.
+
+        Args:
+            max_entries: Entries kept before least recently used ones are evicted
+            ttl_seconds: Lifetime of an entry
+            clock: Monotonic clock (injectable for tests)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+
+        # (workspace_id, contact_id) -> (expires_at, contact or None if not found)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Optional[Dict]]]" = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_many(
+        self, workspace_id: str, contact_ids: Iterable[str], fetch: FetchMany
+    ) -> Dict[str, Dict]:
+        """
+        Contact rows for many ids; all misses are loaded with one fetch call.
+
+        Args:
+            workspace_id: Workspace ID
+            contact_ids: Contact ids to hydrate
+            fetch: Batched loader for missing ids
+
+        Returns:
+            Dictionary contact_id -> contact (ids not found are left out)
+        """
+        now = self._clock()
+        found: Dict[str, Dict] = {}
+        missing: List[str] = []
+
+        for contact_id in dict.fromkeys(str(cid) for cid in contact_ids):
+            key = (workspace_id, contact_id)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if entry[1] is not None:
+                    found[contact_id] = entry[1]
+            else:
+                self.misses += 1
+                missing.append(contact_id)
+
+        if missing:
+            fetched = await fetch(workspace_id, missing)
+            expires_at = self._clock() + self.ttl_seconds
+            for contact_id in missing:
+                contact = fetched.get(contact_id)
+                # Not-found results are cached too, so deleted contacts are not re-queried
+                self._store((workspace_id, contact_id), (expires_at, contact))
+                if contact is not None:
+                    found[contact_id] = contact
+
+        return found
+
+    def invalidate(self, workspace_id: str, contact_ids: Optional[Iterable[str]] = None) -> int:
+        """
+        Drop cached contacts (on contact update/delete events).
+
+        Args:
+            workspace_id: Workspace ID
+            contact_ids: Contacts to drop; None = whole workspace
+
+        Returns:
+            Number of removed entries
+        """
+        if contact_ids is None:
+            keys = [key for key in self._entries if key[0] == workspace_id]
+        else:
+            keys = [(workspace_id, str(contact_id)) for contact_id in contact_ids]
+
+        removed = 0
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _store(self, key: Tuple[str, str], entry: Tuple[float, Optional[Dict]]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
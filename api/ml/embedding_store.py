@@ -0,0 +1,347 @@
+"""
+Memory-mapped Embedding Store
+
+Local on-disk copy of contact embeddings shared by the ML services
+(embeddings, clustering, scheduler jobs) without re-fetching JSON from Supabase.
+
+Layout (one directory):
+- meta.json                 dimension, dtype, current generation
+- vectors.<gen>.bin         row-major float32/float16 matrix, opened with np.memmap
+- ids.<gen>.txt             contact_id of each row, one per line (append-only)
+- tombstones.<gen>.bin      int64 numbers of deleted/replaced rows (append-only)
+
+Upserts append a new row and tombstone the old one; compact() rewrites live rows
+into a new generation and switches meta.json atomically. Readers in other processes
+keep their memmap of the old generation until refresh().
+"""
+
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single writer only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def parse_embedding(value) -> np.ndarray:
+    """pgvector value from PostgREST: JSON list or "[0.1,0.2,...]" string -> float32 array."""
+    if isinstance(value, str):
+        return np.fromstring(value.strip("[]"), sep=",", dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+class EmbeddingStore:
+    """Append-friendly embedding matrix with a contact-id sidecar and tombstones."""
+
+    META_FILE = "meta.json"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, path: str, dimension: int = 1536, dtype: str = "float32"):
+        """
+        Initialize EmbeddingStore.
+
+        Args:
+            path: Store directory (created if missing)
+            dimension: Embedding dimension (ignored if the store already exists)
+            dtype: "float32" or "float16" (ignored if the store already exists)
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, self.META_FILE)
+        if not os.path.exists(meta_path):
+            self._write_meta({"dimension": dimension, "dtype": dtype, "generation": 0})
+
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.generation = 0
+
+        self._id_lines: List[str] = []
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._dead = np.zeros(0, dtype=bool)
+        self._matrix: Optional[np.ndarray] = None
+        self._ids_offset: Optional[int] = None
+        self._tombstones_offset = 0
+        # Tombstones read before their row became visible (applied once it is)
+        self._pending_tombstones: List[int] = []
+
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, contact_id: str) -> bool:
+        return contact_id in self._rows
+
+    @property
+    def num_rows(self) -> int:
+        """Physical rows including tombstoned ones."""
+        return len(self._ids)
+
+    @property
+    def dead_ratio(self) -> float:
+        """Share of rows that compact() would reclaim."""
+        return 1.0 - len(self) / self.num_rows if self.num_rows else 0.0
+
+    @property
+    def contact_ids(self) -> List[str]:
+        """Live contact ids in row order."""
+        return [self._ids[row] for row in self._live_rows()]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Read-only memmap of all physical rows (shared page cache, no copy)."""
+        if self._matrix is None:
+            if self.num_rows == 0:
+                self._matrix = np.zeros((0, self.dimension), dtype=self.dtype)
+            else:
+                self._matrix = np.memmap(
+                    self._file("vectors", "bin"),
+                    dtype=self.dtype,
+                    mode="r",
+                    shape=(self.num_rows, self.dimension),
+                )
+        return self._matrix
+
+    def refresh(self) -> None:
+        """
+        Pick up appends, deletes and compactions from other processes.
+
+        Only the new tail of the sidecar files is read, so refreshing after a small
+        append does not re-read the whole id list.
+        """
+        with open(os.path.join(self.path, self.META_FILE)) as f:
+            meta = json.load(f)
+
+        if meta["generation"] != self.generation or self._ids_offset is None:
+            self.dimension = meta["dimension"]
+            self.dtype = np.dtype(meta["dtype"])
+            self.generation = meta["generation"]
+            self._id_lines = []
+            self._ids = []
+            self._rows = {}
+            self._dead = np.zeros(0, dtype=bool)
+            self._ids_offset = 0
+            self._tombstones_offset = 0
+            self._pending_tombstones = []
+            self._matrix = None
+
+        # New ids (only complete lines)
+        ids_path = self._file("ids", "txt")
+        if os.path.exists(ids_path):
+            with open(ids_path, "rb") as f:
+                f.seek(self._ids_offset)
+                tail = f.read()
+            end = tail.rfind(b"\n") + 1
+            self._id_lines.extend(tail[:end].decode().splitlines())
+            self._ids_offset += end
+
+        # Rows whose vector is not fully written yet (or crashed mid-append) are ignored
+        vectors_path = self._file("vectors", "bin")
+        row_bytes = self.dimension * self.dtype.itemsize
+        complete = os.path.getsize(vectors_path) // row_bytes if os.path.exists(vectors_path) else 0
+        num_rows = min(len(self._id_lines), complete)
+
+        if num_rows > len(self._ids):
+            start = len(self._ids)
+            self._ids.extend(self._id_lines[start:num_rows])
+            self._dead = np.concatenate([self._dead, np.zeros(num_rows - start, dtype=bool)])
+            for row in range(start, num_rows):
+                self._rows[self._ids[row]] = row
+            self._matrix = None
+
+        # New tombstones; rows appended after the ids were read above stay pending
+        tombstones = self._pending_tombstones
+        tombstones_path = self._file("tombstones", "bin")
+        if os.path.exists(tombstones_path):
+            with open(tombstones_path, "rb") as f:
+                f.seek(self._tombstones_offset)
+                tail = f.read()
+            usable = len(tail) - len(tail) % 8
+            self._tombstones_offset += usable
+            tombstones = tombstones + np.frombuffer(tail[:usable], dtype=np.int64).tolist()
+
+        self._pending_tombstones = []
+        for row in tombstones:
+            if row >= len(self._ids):
+                self._pending_tombstones.append(row)
+                continue
+            self._dead[row] = True
+            if self._rows.get(self._ids[row]) == row:
+                del self._rows[self._ids[row]]
+
+    def get(self, contact_id: str) -> Optional[np.ndarray]:
+        """Embedding of one contact as float32 (a copy) or None."""
+        row = self._rows.get(contact_id)
+        return None if row is None else np.asarray(self.matrix[row], dtype=np.float32)
+
+    def load(self, contact_ids: Optional[Sequence[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Load live embeddings.
+
+        Without filter and tombstones this returns the memmap itself (zero-copy);
+        otherwise the selected rows are gathered into a new array.
+
+        Args:
+            contact_ids: Only these contacts (missing ones are skipped); None = all
+
+        Returns:
+            Tuple (contact_ids, matrix of shape (n, dimension) in the store dtype)
+        """
+        if contact_ids is None:
+            if not self._dead.any():
+                return list(self._ids), self.matrix
+            rows = self._live_rows()
+        else:
+            rows = np.fromiter(
+                (self._rows[cid] for cid in contact_ids if cid in self._rows), dtype=np.int64
+            )
+
+        return [self._ids[row] for row in rows.tolist()], self.matrix[rows]
+
+    def upsert_many(self, contact_ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Append embeddings; previous rows of the same contacts are tombstoned.
+
+        Args:
+            contact_ids: Contact UUIDs
+            vectors: Array of shape (len(contact_ids), dimension)
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype).reshape(-1, self.dimension)
+        if len(contact_ids) != len(vectors):
+            raise ValueError("contact_ids and vectors must have the same length")
+        if len(contact_ids) == 0:
+            return
+
+        with self._lock():
+            self.refresh()
+            self._truncate_partial_writes()
+
+            stale = [self._rows[cid] for cid in contact_ids if cid in self._rows]
+            # Duplicates inside one call: all but the last occurrence are stale too
+            last = {cid: i for i, cid in enumerate(contact_ids)}
+            stale += [self.num_rows + i for i, cid in enumerate(contact_ids) if last[cid] != i]
+
+            with open(self._file("vectors", "bin"), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._file("ids", "txt"), "a") as f:
+                f.write("".join(f"{cid}\n" for cid in contact_ids))
+            self._append_tombstones(stale)
+
+            self.refresh()
+
+    def upsert(self, contact_id: str, vector: Sequence[float]) -> None:
+        """Append or replace one embedding."""
+        self.upsert_many([contact_id], np.asarray(vector)[None, :])
+
+    def delete(self, contact_ids: Sequence[str]) -> int:
+        """Tombstone embeddings. Returns number of deleted contacts."""
+        with self._lock():
+            self.refresh()
+            rows = [self._rows[cid] for cid in set(contact_ids) if cid in self._rows]
+            self._append_tombstones(rows)
+            self.refresh()
+        return len(rows)
+
+    def compact(self, chunk_rows: int = 65536) -> int:
+        """
+        Rewrite live rows into a new generation and drop tombstoned ones.
+
+        Returns:
+            Number of reclaimed rows
+        """
+        with self._lock():
+            self.refresh()
+            reclaimed = self.num_rows - len(self)
+            if reclaimed == 0:
+                return 0
+
+            rows = self._live_rows()
+            old_generation = self.generation
+            new_generation = old_generation + 1
+
+            with open(self._file("vectors", "bin", new_generation), "wb") as f:
+                for start in range(0, len(rows), chunk_rows):
+                    f.write(np.ascontiguousarray(self.matrix[rows[start : start + chunk_rows]]))
+            with open(self._file("ids", "txt", new_generation), "w") as f:
+                f.write("".join(f"{self._ids[row]}\n" for row in rows.tolist()))
+
+            self._write_meta(
+                {
+                    "dimension": self.dimension,
+                    "dtype": self.dtype.name,
+                    "generation": new_generation,
+                }
+            )
+            self._matrix = None
+
+            # Open memmaps in other processes stay valid after unlink (POSIX)
+            for name, ext in (("vectors", "bin"), ("ids", "txt"), ("tombstones", "bin")):
+                path = self._file(name, ext, old_generation)
+                if os.path.exists(path):
+                    os.remove(path)
+
+            self.refresh()
+
+        logger.info(f"Compacted embedding store {self.path}: reclaimed {reclaimed} rows")
+        return reclaimed
+
+    def _truncate_partial_writes(self) -> None:
+        """Drop rows left half-written by a crashed writer so files stay aligned."""
+        vectors_path = self._file("vectors", "bin")
+        if os.path.exists(vectors_path):
+            os.truncate(vectors_path, self.num_rows * self.dimension * self.dtype.itemsize)
+
+        ids_path = self._file("ids", "txt")
+        if os.path.exists(ids_path) and (
+            len(self._id_lines) > self.num_rows or os.path.getsize(ids_path) > self._ids_offset
+        ):
+            content = "".join(f"{cid}\n" for cid in self._ids).encode()
+            with open(ids_path, "wb") as f:
+                f.write(content)
+            self._id_lines = list(self._ids)
+            self._ids_offset = len(content)
+
+    def _live_rows(self) -> np.ndarray:
+        return np.flatnonzero(~self._dead)
+
+    def _append_tombstones(self, rows: Sequence[int]) -> None:
+        if rows:
+            with open(self._file("tombstones", "bin"), "ab") as f:
+                f.write(np.asarray(rows, dtype=np.int64).tobytes())
+
+    def _file(self, name: str, ext: str, generation: Optional[int] = None) -> str:
+        generation = self.generation if generation is None else generation
+        return os.path.join(self.path, f"{name}.{generation}.{ext}")
+
+    def _write_meta(self, meta: Dict) -> None:
+        tmp_path = os.path.join(self.path, self.META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, self.META_FILE))
+
+    @contextmanager
+    def _lock(self):
+        """Exclusive writer lock across processes."""
+        if fcntl is None:
+            yield
+            return
+
+        with open(os.path.join(self.path, self.LOCK_FILE), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
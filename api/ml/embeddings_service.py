@@ -3,35 +3,144 @@ Contact Embeddings Service
 
 Generates semantic embeddings for contacts using OpenAI text-embedding-3-small model.
 Enables semantic search and similarity-based recommendations.
+
+Similarity search runs against an in-process VectorIndex per workspace, loaded
+from contact_embeddings, kept up to date by _process_single_contact and
+remove_contacts, and reloaded after index_ttl_seconds (picks up writes from other
+processes such as the scheduler).
+With an EmbeddingStore the index is loaded from the local memory-mapped matrix
+instead of the database.
+
+batch_generate_embeddings packs many contact texts into each embeddings request
+(token budget), paces requests with an adaptive token bucket, writes one bulk
+upsert per request and skips contacts whose text hash did not change.
 """
 
 import asyncio
+import hashlib
 import logging
+import time
+import weakref
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, RateLimitError
 from supabase import Client
 
+from .embedding_store import EmbeddingStore, parse_embedding
+from .rate_limiter import AdaptiveRateLimiter, retry_after_from_headers
+from .vector_index import VectorIndex
+
 logger = logging.getLogger(__name__)
 
+# Live services in this process, so contact deletes can drop their vectors
+_services: "weakref.WeakSet[ContactEmbeddingsService]" = weakref.WeakSet()
+
+
+def remove_contact_embeddings(contact_ids: Sequence[str]) -> None:
+    """Drop deleted contacts from every embeddings service in this process."""
+    for service in list(_services):
+        service.remove_contacts(contact_ids)
+
 
 class ContactEmbeddingsService:
     """Service for generating and managing contact embeddings."""
 
-    def __init__(self, supabase_client: Client, openai_client: AsyncOpenAI):
+    # Rows per request when loading contact_embeddings into the index
+    INDEX_PAGE_SIZE = 1000
+
+    # Embeddings API request limits
+    MAX_BATCH_INPUTS = 2048
+    MAX_BATCH_TOKENS = 100_000
+    MAX_INPUT_TOKENS = 8191
+
+    def __init__(
+        self,
+        supabase_client: Client,
+        openai_client: AsyncOpenAI,
+        index_mode: str = "auto",
+        exact_search_threshold: int = 20000,
+        embedding_store: Optional[EmbeddingStore] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        index_ttl_seconds: float = 300.0,
+    ):
         """
         Initialize ContactEmbeddingsService.
 
         Args:
             supabase_client: Supabase client instance
             openai_client: OpenAI async client instance
+            index_mode: VectorIndex mode ("auto", "brute" or "ivf")
+            exact_search_threshold: Index size at which "auto" switches to IVF search
+            embedding_store: Local memory-mapped embedding store (optional)
+            rate_limiter: Shared rate limiter for embeddings requests
+            index_ttl_seconds: Reload a workspace index after this many seconds
+                (picks up writes from other processes)
         """
         self.supabase = supabase_client
         self.openai = openai_client
         self.model = "text-embedding-3-small"
         self.embedding_dimension = 1536
+        self.index_mode = index_mode
+        self.exact_search_threshold = exact_search_threshold
+        self.embedding_store = embedding_store
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+
+        self.index_ttl_seconds = index_ttl_seconds
+
+        # workspace_id -> VectorIndex (None = all contacts)
+        self._indexes: Dict[Optional[str], VectorIndex] = {}
+        self._index_loaded_at: Dict[Optional[str], float] = {}
+
+        _services.add(self)
+
+    @staticmethod
+    def build_embedding_text(contact: Dict) -> str:
+        """
+        Text representation of a contact used for its embedding.
+
+        Concatenates: first_name + last_name + organization + tags + notes
+
+        Args:
+            contact: Contact dictionary with fields
+
+        Returns:
+            Text to embed ("Unknown contact" if all fields are empty)
+        """
+        text_parts = []
+
+        if contact.get("first_name"):
+            text_parts.append(contact["first_name"])
+        if contact.get("last_name"):
+            text_parts.append(contact["last_name"])
+        if contact.get("organization"):
+            text_parts.append(f"Organization: {contact['organization']}")
+        if contact.get("tags"):
+            tags_str = (
+                ", ".join(contact["tags"]) if isinstance(contact["tags"], list) else contact["tags"]
+            )
+            text_parts.append(f"Tags: {tags_str}")
+        if contact.get("notes"):
+            text_parts.append(f"Notes: {contact['notes']}")
+
+        text = " ".join(text_parts)
+
+        if not text.strip():
+            logger.warning(f"Empty text for contact {contact.get('id')}, using default")
+            text = "Unknown contact"
+
+        return text
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """Stable hash of an embedding text (stored as contact_embeddings.text_hash)."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Cheap token estimate for batching (~4 characters per token)."""
+        return len(text) // 4 + 1
 
     async def generate_embedding(self, contact: Dict) -> np.ndarray:
         """
@@ -50,39 +159,11 @@ class ContactEmbeddingsService:
             Exception: If OpenAI API call fails
         """
         try:
-            # Build text representation
-            text_parts = []
-
-            if contact.get("first_name"):
-                text_parts.append(contact["first_name"])
-            if contact.get("last_name"):
-                text_parts.append(contact["last_name"])
-            if contact.get("organization"):
-                text_parts.append(f"Organization: {contact['organization']}")
-            if contact.get("tags"):
-                tags_str = (
-                    ", ".join(contact["tags"])
-                    if isinstance(contact["tags"], list)
-                    else contact["tags"]
-                )
-                text_parts.append(f"Tags: {tags_str}")
-            if contact.get("notes"):
-                text_parts.append(f"Notes: {contact['notes']}")
-
-            text = " ".join(text_parts)
-
-            if not text.strip():
-                logger.warning(f"Empty text for contact {contact.get('id')}, using default")
-                text = "Unknown contact"
+            text = self._truncate(self.build_embedding_text(contact))
 
             logger.info(f"Generating embedding for contact {contact.get('id')}: '{text[:100]}...'")
 
-            # Call OpenAI API
-            response = await self.openai.embeddings.create(
-                model=self.model, input=text, encoding_format="float"
-            )
-
-            embedding = np.array(response.data[0].embedding, dtype=np.float32)
+            embedding = (await self._request_embeddings([text]))[0]
 
             logger.info(
                 f"Generated embedding of shape {embedding.shape} for contact {contact.get('id')}"
@@ -94,16 +175,63 @@ class ContactEmbeddingsService:
             logger.error(f"Failed to generate embedding for contact {contact.get('id')}: {str(e)}")
             raise
 
-    async def find_similar_contacts(self, contact_id: str, top_n: int = 10) -> List[Dict]:
+    async def _request_embeddings(self, texts: List[str], max_retries: int = 5) -> np.ndarray:
+        """
+        One embeddings API request for many texts, paced by the rate limiter.
+
+        Args:
+            texts: Input texts (order is preserved in the result)
+            max_retries: Retries after 429 responses
+
+        Returns:
+            float32 array of shape (len(texts), embedding_dimension)
+
+        Raises:
+            RateLimitError: If still rate limited after max_retries
+        """
+        tokens = sum(self.estimate_tokens(text) for text in texts)
+
+        for attempt in range(max_retries + 1):
+            await self.rate_limiter.acquire(tokens)
+            try:
+                raw = await self.openai.embeddings.with_raw_response.create(
+                    model=self.model, input=texts, encoding_format="float"
+                )
+            except RateLimitError as e:
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                self.rate_limiter.on_rate_limited(retry_after_from_headers(headers))
+                if attempt == max_retries:
+                    raise
+                continue
+
+            self.rate_limiter.update_from_headers(raw.headers)
+            self.rate_limiter.on_success()
+            response = raw.parse()
+
+            embeddings = np.zeros((len(texts), self.embedding_dimension), dtype=np.float32)
+            returned = np.zeros(len(texts), dtype=bool)
+            for item in response.data:
+                embeddings[item.index] = item.embedding
+                returned[item.index] = True
+            if not returned.all():
+                missing = np.flatnonzero(~returned).tolist()
+                raise ValueError(f"Embeddings response is missing inputs {missing[:10]}")
+            return embeddings
+
+    async def find_similar_contacts(
+        self, contact_id: str, top_n: int = 10, workspace_id: Optional[str] = None
+    ) -> List[Dict]:
         """
-        Find similar contacts using pgvector cosine similarity.
+        Find similar contacts using the in-process vector index.
 
-        Queries contact_embeddings table and uses PostgreSQL pgvector extension
-        to compute cosine similarity: 1 - (embedding <=> target_embedding)
+        The workspace index is loaded from contact_embeddings on first use and then
+        updated incrementally, so a query is one matrix-vector product
+        (or an IVF probe for large workspaces) instead of a full table scan.
 
         Args:
             contact_id: Target contact UUID
             top_n: Number of similar contacts to return
+            workspace_id: Restrict search to one workspace (None = all contacts)
 
         Returns:
             List of dictionaries with contact_id and similarity score
@@ -111,78 +239,241 @@ class ContactEmbeddingsService:
         try:
             logger.info(f"Finding {top_n} similar contacts for {contact_id}")
 
-            # Get target embedding
-            target_response = (
-                self.supabase.table("contact_embeddings")
-                .select("*")
-                .eq("contact_id", contact_id)
-                .execute()
-            )
+            index = self.get_index(workspace_id)
 
-            if not target_response.data or len(target_response.data) == 0:
+            if contact_id not in index and not self._load_contact_embedding(index, contact_id):
                 logger.warning(f"No embedding found for contact {contact_id}")
                 return []
 
-            target_embedding = target_response.data[0]["embedding"]
+            top_similar = [
+                {"contact_id": other_id, "similarity": similarity}
+                for other_id, similarity in index.search_by_id(contact_id, k=top_n)
+            ]
 
-            # Query similar contacts using pgvector
-            # Note: In production, use RPC function with pgvector operator
-            # For now, fetch all and compute in Python
-            all_embeddings = (
-                self.supabase.table("contact_embeddings")
-                .select("*")
-                .neq("contact_id", contact_id)
-                .execute()
+            logger.info(f"Found {len(top_similar)} similar contacts for {contact_id}")
+
+            return top_similar
+
+        except Exception as e:
+            logger.error(f"Failed to find similar contacts for {contact_id}: {str(e)}")
+            return []
+
+    async def get_similarities(
+        self, contact_id: str, candidate_ids: Sequence[str], workspace_id: Optional[str] = None
+    ) -> Dict[str, float]:
+        """
+        Exact cosine similarity between a contact and specific candidates.
+
+        Args:
+            contact_id: Target contact UUID
+            candidate_ids: Candidate contact UUIDs
+            workspace_id: Workspace index to use (None = all contacts)
+
+        Returns:
+            Dictionary candidate_id -> similarity (candidates without embeddings are omitted)
+        """
+        try:
+            index = self.get_index(workspace_id)
+            if contact_id not in index:
+                self._load_contact_embedding(index, contact_id)
+            return index.similarities(contact_id, candidate_ids)
+
+        except Exception as e:
+            logger.error(f"Failed to compute similarities for {contact_id}: {str(e)}")
+            return {}
+
+    def get_index(self, workspace_id: Optional[str] = None) -> VectorIndex:
+        """
+        Get (loading on first use or after index_ttl_seconds) the vector index of a workspace.
+
+        Args:
+            workspace_id: Workspace UUID (None = all contacts)
+
+        Returns:
+            VectorIndex with all stored embeddings of the workspace
+        """
+        index = self._indexes.get(workspace_id)
+        loaded_at = self._index_loaded_at.get(workspace_id, 0.0)
+        if index is None or time.monotonic() - loaded_at > self.index_ttl_seconds:
+            index = VectorIndex(
+                dimension=self.embedding_dimension,
+                mode=self.index_mode,
+                exact_threshold=self.exact_search_threshold,
             )
+            contact_ids, vectors = self._fetch_embeddings(workspace_id)
+            if contact_ids:
+                index.upsert_many(contact_ids, vectors)
+            self._indexes[workspace_id] = index
+            self._index_loaded_at[workspace_id] = time.monotonic()
+            logger.info(f"Loaded vector index for workspace {workspace_id}: {len(index)} vectors")
+        return index
+
+    def invalidate_index(self, workspace_id: Optional[str] = None) -> None:
+        """Drop a loaded index; it is reloaded from the database on next use."""
+        self._indexes.pop(workspace_id, None)
+        self._index_loaded_at.pop(workspace_id, None)
+
+    def remove_contacts(self, contact_ids: Sequence[str]) -> int:
+        """
+        Drop deleted contacts from every loaded index and the local store.
 
-            similarities = []
-            target_vec = np.array(target_embedding, dtype=np.float32)
+        Returns:
+            Number of vectors removed from loaded indexes
+        """
+        contact_ids = list(contact_ids)
+        removed = sum(index.remove(contact_ids) for index in self._indexes.values())
+        if self.embedding_store is not None:
+            self.embedding_store.delete(contact_ids)
+        return removed
 
-            for row in all_embeddings.data:
-                other_vec = np.array(row["embedding"], dtype=np.float32)
+    def sync_embedding_store(self) -> int:
+        """
+        Copy all embeddings from contact_embeddings into the local store.
 
-                # Cosine similarity: 1 - cosine_distance
-                dot_product = np.dot(target_vec, other_vec)
-                norm_product = np.linalg.norm(target_vec) * np.linalg.norm(other_vec)
+        Returns:
+            Number of embeddings written
+        """
+        if self.embedding_store is None:
+            return 0
 
-                if norm_product > 0:
-                    similarity = dot_product / norm_product
-                else:
-                    similarity = 0.0
-
-                similarities.append(
-                    {
-                        "contact_id": row["contact_id"],
-                        "similarity": float(similarity),
-                        "updated_at": row.get("updated_at"),
-                    }
-                )
+        contact_ids, vectors = self._fetch_embeddings_from_db(None)
+        self.embedding_store.upsert_many(contact_ids, vectors)
+        logger.info(f"Synced {len(contact_ids)} embeddings to {self.embedding_store.path}")
+        return len(contact_ids)
 
-            # Sort by similarity DESC and take top N
-            similarities.sort(key=lambda x: x["similarity"], reverse=True)
-            top_similar = similarities[:top_n]
+    def _fetch_embeddings(self, workspace_id: Optional[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        Load embeddings of a workspace (local store if configured, else database).
 
-            logger.info(f"Found {len(top_similar)} similar contacts for {contact_id}")
+        Returns:
+            Tuple (contact_ids, matrix of shape (n, embedding_dimension))
+        """
+        store = self.embedding_store
+        if store is None:
+            return self._fetch_embeddings_from_db(workspace_id)
+
+        store.refresh()
+        if len(store) == 0:
+            self.sync_embedding_store()
+
+        contact_ids = None if workspace_id is None else self._workspace_contact_ids(workspace_id)
+        return store.load(contact_ids)
+
+    def _workspace_contact_ids(self, workspace_id: str) -> List[str]:
+        """Contact ids of a workspace (paged: PostgREST caps a response at 1000 rows)."""
+        contact_ids = []
+        start = 0
+        while True:
+            page = (
+                self.supabase.table("contacts")
+                .select("id")
+                .eq("workspace_id", workspace_id)
+                .range(start, start + self.INDEX_PAGE_SIZE - 1)
+                .execute()
+            ).data or []
+            contact_ids.extend(contact["id"] for contact in page)
+            if len(page) < self.INDEX_PAGE_SIZE:
+                return contact_ids
+            start += self.INDEX_PAGE_SIZE
+
+    def _fetch_embeddings_from_db(
+        self, workspace_id: Optional[str]
+    ) -> Tuple[List[str], np.ndarray]:
+        """
+        Load embeddings from contact_embeddings page by page.
 
-            return top_similar
+        Returns:
+            Tuple (contact_ids, float32 matrix of shape (n, embedding_dimension))
+        """
+        rows = []
+
+        if workspace_id is None:
+            start = 0
+            while True:
+                page = (
+                    self.supabase.table("contact_embeddings")
+                    .select("contact_id, embedding")
+                    .range(start, start + self.INDEX_PAGE_SIZE - 1)
+                    .execute()
+                ).data or []
+                rows.extend(page)
+                if len(page) < self.INDEX_PAGE_SIZE:
+                    break
+                start += self.INDEX_PAGE_SIZE
+        else:
+            ids = self._workspace_contact_ids(workspace_id)
+            for start in range(0, len(ids), self.INDEX_PAGE_SIZE):
+                rows.extend(
+                    (
+                        self.supabase.table("contact_embeddings")
+                        .select("contact_id, embedding")
+                        .in_("contact_id", ids[start : start + self.INDEX_PAGE_SIZE])
+                        .execute()
+                    ).data
+                    or []
+                )
 
-        except Exception as e:
-            logger.error(f"Failed to find similar contacts for {contact_id}: {str(e)}")
-            return []
+        vectors = np.empty((len(rows), self.embedding_dimension), dtype=np.float32)
+        for i, row in enumerate(rows):
+            vectors[i] = parse_embedding(row["embedding"])
+
+        return [row["contact_id"] for row in rows], vectors
+
+    def _load_contact_embedding(self, index: VectorIndex, contact_id: str) -> bool:
+        """Fetch one embedding missing from the index (e.g. written by another worker)."""
+        if self.embedding_store is not None:
+            self.embedding_store.refresh()
+            vector = self.embedding_store.get(contact_id)
+            if vector is not None:
+                index.upsert(contact_id, vector)
+                return True
+
+        response = (
+            self.supabase.table("contact_embeddings")
+            .select("contact_id, embedding")
+            .eq("contact_id", contact_id)
+            .execute()
+        )
+        if not response.data:
+            return False
+
+        index.upsert(contact_id, parse_embedding(response.data[0]["embedding"]))
+        return True
+
+    def _update_indexes(self, contact: Dict, embedding: np.ndarray) -> None:
+        """Apply an upsert to every loaded index the contact belongs to."""
+        for workspace_id in {None, contact.get("workspace_id")}:
+            index = self._indexes.get(workspace_id)
+            if index is not None:
+                index.upsert(contact["id"], embedding)
 
     async def batch_generate_embeddings(
-        self, contacts: List[Dict], batch_size: int = 10, delay_seconds: float = 1.0
-    ) -> None:
+        self,
+        contacts: List[Dict],
+        batch_size: int = MAX_BATCH_INPUTS,
+        max_batch_tokens: int = MAX_BATCH_TOKENS,
+        max_concurrency: int = 4,
+        force: bool = False,
+    ) -> int:
         """
-        Generate embeddings for multiple contacts with rate limiting.
+        Generate embeddings for multiple contacts.
 
-        Processes contacts in batches to avoid OpenAI rate limits.
-        Upserts results to contact_embeddings table.
+        Pipeline:
+        1. Build each contact's text and hash it; skip contacts whose stored
+           text_hash is unchanged (unless force=True)
+        2. Pack texts into requests of up to batch_size inputs / max_batch_tokens tokens
+        3. Send requests through the adaptive rate limiter (max_concurrency in flight)
+        4. Write each request's results with one bulk upsert
 
         Args:
             contacts: List of contact dictionaries
-            batch_size: Number of contacts to process in parallel
-            delay_seconds: Delay between batches to avoid rate limits
+            batch_size: Maximum number of inputs per embeddings request
+            max_batch_tokens: Token budget per embeddings request
+            max_concurrency: Requests in flight at the same time
+            force: Re-embed contacts even if their text did not change
+
+        Returns:
+            Number of contacts embedded and saved
 
         Raises:
             Exception: If critical errors occur during processing
@@ -190,45 +481,125 @@ class ContactEmbeddingsService:
         try:
             total = len(contacts)
             logger.info(f"Starting batch embedding generation for {total} contacts")
+            start_time = datetime.utcnow()
+
+            # Step 1: Texts, hashes, change detection
+            pending = []
+            for contact in contacts:
+                if not contact.get("id"):
+                    logger.warning("Contact missing ID, skipping")
+                    continue
+                text = self._truncate(self.build_embedding_text(contact))
+                pending.append((contact, text, self.text_hash(text)))
+
+            if not force:
+                stored = self._fetch_text_hashes([contact["id"] for contact, _, _ in pending])
+                pending = [item for item in pending if stored.get(item[0]["id"]) != item[2]]
+
+            skipped = total - len(pending)
+            batches = self._pack_batches(pending, batch_size, max_batch_tokens)
+            logger.info(
+                f"{len(pending)} contacts to embed in {len(batches)} requests "
+                f"({skipped} unchanged or invalid skipped)"
+            )
 
-            successful = 0
-            failed = 0
-
-            for i in range(0, total, batch_size):
-                batch = contacts[i : i + batch_size]
-                logger.info(
-                    f"Processing batch {i//batch_size + 1}/{(total + batch_size - 1)//batch_size}"
-                )
-
-                # Process batch
-                tasks = []
-                for contact in batch:
-                    task = self._process_single_contact(contact)
-                    tasks.append(task)
+            # Steps 2-4: Requests + bulk upserts
+            semaphore = asyncio.Semaphore(max_concurrency)
 
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+            async def run_batch(batch) -> int:
+                async with semaphore:
+                    return await self._embed_and_save_batch(batch)
 
-                # Count successes and failures
-                for result in results:
-                    if isinstance(result, Exception):
-                        failed += 1
-                        logger.error(f"Batch processing error: {str(result)}")
-                    elif result:
-                        successful += 1
+            results = await asyncio.gather(
+                *(run_batch(batch) for batch in batches), return_exceptions=True
+            )
 
-                # Rate limiting delay
-                if i + batch_size < total:
-                    logger.info(f"Waiting {delay_seconds}s before next batch...")
-                    await asyncio.sleep(delay_seconds)
+            successful = 0
+            failed = 0
+            for batch, result in zip(batches, results):
+                if isinstance(result, Exception):
+                    failed += len(batch)
+                    logger.error(f"Batch processing error: {str(result)}")
+                else:
+                    successful += result
 
+            duration = (datetime.utcnow() - start_time).total_seconds()
             logger.info(
-                f"Batch processing complete: {successful} successful, {failed} failed out of {total}"
+                f"Batch processing complete: {successful} successful, {failed} failed, "
+                f"{skipped} skipped out of {total} in {duration:.2f}s "
+                f"({self.rate_limiter.rate_limited} rate limit responses)"
             )
 
+            return successful
+
         except Exception as e:
             logger.error(f"Critical error in batch_generate_embeddings: {str(e)}")
             raise
 
+    def _truncate(self, text: str) -> str:
+        """Keep a single input under the model's per-input token limit."""
+        max_chars = (self.MAX_INPUT_TOKENS - 1) * 4
+        return text if len(text) <= max_chars else text[:max_chars]
+
+    def _pack_batches(
+        self, items: List[Tuple[Dict, str, str]], batch_size: int, max_batch_tokens: int
+    ) -> List[List[Tuple[Dict, str, str]]]:
+        """Greedily pack (contact, text, hash) items into requests under both limits."""
+        batches = []
+        current = []
+        current_tokens = 0
+
+        for item in items:
+            tokens = self.estimate_tokens(item[1])
+            if current and (
+                len(current) >= batch_size or current_tokens + tokens > max_batch_tokens
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(item)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _fetch_text_hashes(self, contact_ids: List[str]) -> Dict[str, str]:
+        """Stored text_hash per contact (one query per INDEX_PAGE_SIZE ids)."""
+        hashes = {}
+        for start in range(0, len(contact_ids), self.INDEX_PAGE_SIZE):
+            rows = (
+                self.supabase.table("contact_embeddings")
+                .select("contact_id, text_hash")
+                .in_("contact_id", contact_ids[start : start + self.INDEX_PAGE_SIZE])
+                .execute()
+            ).data or []
+            hashes.update({row["contact_id"]: row.get("text_hash") for row in rows})
+        return hashes
+
+    async def _embed_and_save_batch(self, batch: List[Tuple[Dict, str, str]]) -> int:
+        """One embeddings request and one bulk upsert for a packed batch."""
+        embeddings = await self._request_embeddings([text for _, text, _ in batch])
+
+        updated_at = datetime.utcnow().isoformat()
+        rows = [
+            {
+                "contact_id": contact["id"],
+                "embedding": embedding.tolist(),
+                "text_hash": text_hash,
+                "updated_at": updated_at,
+            }
+            for (contact, _, text_hash), embedding in zip(batch, embeddings)
+        ]
+        self.supabase.table("contact_embeddings").upsert(rows, on_conflict="contact_id").execute()
+
+        if self.embedding_store is not None:
+            self.embedding_store.upsert_many([contact["id"] for contact, _, _ in batch], embeddings)
+        for (contact, _, _), embedding in zip(batch, embeddings):
+            self._update_indexes(contact, embedding)
+
+        return len(rows)
+
     async def _process_single_contact(self, contact: Dict) -> bool:
         """
         Process single contact: generate embedding and upsert to database.
@@ -252,10 +623,14 @@ class ContactEmbeddingsService:
             embedding_data = {
                 "contact_id": contact_id,
                 "embedding": embedding.tolist(),  # Convert numpy array to list
+                "text_hash": self.text_hash(self._truncate(self.build_embedding_text(contact))),
                 "updated_at": datetime.utcnow().isoformat(),
             }
 
             self.supabase.table("contact_embeddings").upsert(embedding_data).execute()
+            if self.embedding_store is not None:
+                self.embedding_store.upsert(contact_id, embedding)
+            self._update_indexes(contact, embedding)
 
             logger.info(f"Successfully saved embedding for contact {contact_id}")
             return True
@@ -0,0 +1,144 @@
+"""
+Optimized GNN Inference
+
+Serving artifact for a trained ContactRecommenderGNN:
+
+- eval-only copy: dropout removed, BatchNorm folded into the preceding SAGEConv
+  linear layers (conv -> relu -> conv ...)
+- optional dynamic int8 quantization of those linear layers
+- TorchScript trace (or torch.compile) of the result
+
+Embeddings can additionally be stored as float16 (see EmbeddingSnapshot.dtype).
+
+The eager model stays the source of truth: artifacts are derived from it when a
+workspace model is loaded and never persisted.
+"""
+
+import copy
+import logging
+import os
+from dataclasses import dataclass
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_MODES = ("eager", "torchscript", "compile")
+EMBEDDING_DTYPES = {"float32": torch.float32, "float16": torch.float16}
+
+
+@dataclass
+class InferenceConfig:
+    """How GNNRecommender runs the GNN forward pass and stores embeddings."""
+
+    # "eager" (model as trained), "torchscript" (traced) or "compile" (torch.compile)
+    mode: str = "eager"
+    # Dynamic int8 quantization of the linear layers
+    quantize: bool = False
+    # Storage dtype of snapshot embeddings ("float32" or "float16")
+    embedding_dtype: str = "float32"
+
+    def __post_init__(self):
+        if self.mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown GNN inference mode: {self.mode}")
+        if self.embedding_dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {self.embedding_dtype}")
+
+    @classmethod
+    def from_env(cls) -> "InferenceConfig":
+        """GNN_INFERENCE_MODE, GNN_INFERENCE_QUANTIZE, GNN_EMBEDDING_DTYPE"""
+        return cls(
+            mode=os.getenv("GNN_INFERENCE_MODE", "eager"),
+            quantize=os.getenv("GNN_INFERENCE_QUANTIZE", "").lower() in ("1", "true", "yes"),
+            embedding_dtype=os.getenv("GNN_EMBEDDING_DTYPE", "float32"),
+        )
+
+    @property
+    def torch_dtype(self) -> torch.dtype:
+        return EMBEDDING_DTYPES[self.embedding_dtype]
+
+    @property
+    def optimized(self) -> bool:
+        return self.mode != "eager" or self.quantize
+
+
+def fold_batch_norms(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Eval-only copy of a ContactRecommenderGNN with BatchNorm folded into the convs.
+
+    In eval mode BatchNorm is the affine map y = scale * x + shift. SAGEConv computes
+    lin_l(aggregated) + lin_r(x), so scaling both weight matrices and lin_l's bias
+    gives the same output without the extra pass. Dropout becomes Identity.
+    """
+    model = copy.deepcopy(model).eval()
+
+    with torch.no_grad():
+        for i, batch_norm in enumerate(model.batch_norms):
+            conv = model.layers[i]
+            scale = batch_norm.weight / torch.sqrt(batch_norm.running_var + batch_norm.eps)
+            shift = batch_norm.bias - batch_norm.running_mean * scale
+
+            conv.lin_l.weight.mul_(scale.unsqueeze(1))
+            conv.lin_l.bias.mul_(scale).add_(shift)
+            conv.lin_r.weight.mul_(scale.unsqueeze(1))
+
+            model.batch_norms[i] = torch.nn.Identity()
+            model.dropouts[i] = torch.nn.Identity()
+
+    return model
+
+
+def quantize_linear_layers(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Dynamic int8 quantization of the SAGEConv linear layers (in place).
+
+    PyG's Linear is not a torch.nn.Linear, so the layers are swapped for
+    equivalent torch.nn.Linear modules first.
+    """
+    for conv in model.layers:
+        for name in ("lin_l", "lin_r"):
+            layer = getattr(conv, name)
+            linear = torch.nn.Linear(
+                layer.in_channels, layer.out_channels, bias=layer.bias is not None
+            )
+            with torch.no_grad():
+                linear.weight.copy_(layer.weight)
+                if layer.bias is not None:
+                    linear.bias.copy_(layer.bias)
+            setattr(conv, name, linear)
+
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def optimize_for_inference(model: torch.nn.Module, config: InferenceConfig) -> torch.nn.Module:
+    """
+    Build the serving artifact for a trained model.
+
+    Args:
+        model: Trained ContactRecommenderGNN
+        config: Inference configuration
+
+    Returns:
+        Callable module (x, edge_index) -> embeddings; the model itself in eager mode
+    """
+    if not config.optimized:
+        return model.eval()
+
+    optimized = fold_batch_norms(model)
+    if config.quantize:
+        optimized = quantize_linear_layers(optimized)
+
+    if config.mode == "torchscript":
+        # Tiny ring graph: traced ops are shape-generic, so it serves any graph size
+        num_nodes = 8
+        example_inputs = (
+            torch.rand(num_nodes, model.in_features),
+            torch.stack([torch.arange(num_nodes), torch.arange(1, num_nodes + 1) % num_nodes]),
+        )
+        with torch.no_grad():
+            optimized = torch.jit.trace(optimized, example_inputs, check_trace=False)
+    elif config.mode == "compile":
+        optimized = torch.compile(optimized, dynamic=True)
+
+    logger.info(f"✅ GNN inference model ready: mode={config.mode}, quantized={config.quantize}")
+    return optimized
@@ -6,6 +6,7 @@ contact embeddings for high-quality recommendations.
 """
 
 import logging
+from typing import Optional, Sequence, Tuple
 
 import torch
 import torch.nn.functional as F
@@ -14,6 +15,80 @@ from torch_geometric.nn import SAGEConv
 
 logger = logging.getLogger(__name__)
 
+# Default cap on similarity block + top-k scratch memory in batch_top_k
+TOPK_MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+
+
+def batch_top_k(
+    embeddings: torch.Tensor,
+    k: int = 20,
+    query_indices: Optional[Sequence[int]] = None,
+    exclude: Optional[torch.Tensor] = None,
+    normalized: bool = False,
+    memory_budget_bytes: int = TOPK_MEMORY_BUDGET_BYTES,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Top-k cosine neighbours for many nodes in one pass.
+
+    Embeddings are normalized once; similarities are computed for a block of query
+    rows at a time with one matmul, masked and reduced with topk before the next
+    block, so memory stays O(block_rows * num_nodes) within memory_budget_bytes.
+
+    Args:
+        embeddings: [num_nodes, dim]
+        k: Neighbours per query
+        query_indices: Nodes to recommend for (default: all nodes, in order)
+        exclude: [2, M] pairs (query position, node index) to leave out; every
+            query's own node is always excluded
+        normalized: Rows are already L2-normalized
+        memory_budget_bytes: Cap on the similarity block + top-k scratch memory
+
+    Returns:
+        (values [Q, k'], indices [Q, k']) with k' = min(k, num_nodes), most similar
+        first; slots without a candidate have value -inf
+    """
+    num_nodes = embeddings.shape[0]
+    if query_indices is None:
+        query_indices = torch.arange(num_nodes)
+    else:
+        query_indices = torch.as_tensor(query_indices, dtype=torch.long)
+    num_queries = len(query_indices)
+
+    k = max(min(k, num_nodes), 0)
+    values = torch.full((num_queries, k), -float("inf"))
+    indices = torch.zeros((num_queries, k), dtype=torch.long)
+    if num_queries == 0 or k == 0:
+        return values, indices
+
+    if not normalized:
+        embeddings = F.normalize(embeddings.float(), p=2, dim=1)
+
+    if exclude is not None:
+        exclude = torch.as_tensor(exclude, dtype=torch.long).reshape(2, -1)
+        valid = (exclude[1] >= 0) & (exclude[1] < num_nodes)
+        exclude = exclude[:, valid]
+        # Sorted by query so each block masks one contiguous slice
+        exclude = exclude[:, torch.argsort(exclude[0], stable=True)]
+
+    # Similarity block + topk scratch: ~2 float32 values per (query, node)
+    block = max(1, min(num_queries, memory_budget_bytes // (num_nodes * 4 * 2)))
+    embeddings_t = embeddings.t()
+
+    for start in range(0, num_queries, block):
+        stop = min(start + block, num_queries)
+        rows = query_indices[start:stop]
+
+        similarities = embeddings[rows] @ embeddings_t
+        similarities[torch.arange(stop - start), rows] = -float("inf")
+
+        if exclude is not None and exclude.shape[1]:
+            lo, hi = torch.searchsorted(exclude[0], torch.tensor([start, stop])).tolist()
+            similarities[exclude[0, lo:hi] - start, exclude[1, lo:hi]] = -float("inf")
+
+        values[start:stop], indices[start:stop] = torch.topk(similarities, k, dim=1)
+
+    return values, indices
+
 
 class ContactRecommenderGNN(torch.nn.Module):
     """
@@ -116,29 +191,44 @@ class ContactRecommenderGNN(torch.nn.Module):
         if exclude_indices is None:
             exclude_indices = []
 
-        # Normalize embeddings
-        embeddings_norm = F.normalize(embeddings, p=2, dim=1)
-
-        # Get target embedding
-        target_embedding = embeddings_norm[target_idx].unsqueeze(0)  # [1, dim]
-
-        # Compute cosine similarity
-        similarities = F.cosine_similarity(target_embedding, embeddings_norm, dim=1)  # [num_nodes]
-
-        # Set excluded to -inf
-        similarities[target_idx] = -float("inf")
-        for idx in exclude_indices:
-            if idx < len(similarities):
-                similarities[idx] = -float("inf")
-
         # Get top-k
-        k = min(k, len(similarities) - 1 - len(exclude_indices))
+        k = min(k, len(embeddings) - 1 - len(exclude_indices))
         if k <= 0:
             return torch.tensor([], dtype=torch.long)
 
-        top_k_values, top_k_indices = torch.topk(similarities, k)
+        exclude = torch.tensor([[0] * len(exclude_indices), list(exclude_indices)])
+        _, top_k_indices = batch_top_k(embeddings, k, query_indices=[target_idx], exclude=exclude)
+
+        return top_k_indices[0]
+
+    def get_batch_recommendations(
+        self,
+        embeddings: torch.Tensor,
+        target_indices: Optional[Sequence[int]] = None,
+        k: int = 20,
+        exclude: Optional[torch.Tensor] = None,
+        memory_budget_bytes: int = TOPK_MEMORY_BUDGET_BYTES,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Получи top-k рекомендаций сразу для многих контактов (см. batch_top_k)
+
+        Args:
+            embeddings: [num_nodes, embedding_dim]
+            target_indices: Indices целевых контактов (по умолчанию все)
+            k: Кол-во рекомендаций
+            exclude: [2, M] пары (позиция в target_indices, index для исключения)
+            memory_budget_bytes: Лимит памяти на блок similarity
 
-        return top_k_indices
+        Returns:
+            (similarities [Q, k], indices [Q, k]); -inf = нет кандидата
+        """
+        return batch_top_k(
+            embeddings,
+            k,
+            query_indices=target_indices,
+            exclude=exclude,
+            memory_budget_bytes=memory_budget_bytes,
+        )
 
     def save(self, path: str):
         """Сохрани модель"""
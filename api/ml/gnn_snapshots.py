@@ -0,0 +1,272 @@
+"""
+GNN Embedding Snapshots
+
+Versioned per-workspace snapshots of GNN node embeddings, keyed by a fingerprint
+of the graph they were computed from. Serving a recommendation only needs the
+snapshot (normalized embedding matrix + contact-id index) and a top-k lookup;
+graph build and forward pass run only when the fingerprint changes.
+
+Layout:
+    <root>/<workspace_id>/<fingerprint>/embeddings.pt   float32 [num_nodes, dim], L2-normalized
+    <root>/<workspace_id>/<fingerprint>/contact_ids.json
+    <root>/<workspace_id>/CURRENT                       fingerprint of the latest snapshot
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from api.ml.gnn_model import batch_top_k
+
+logger = logging.getLogger(__name__)
+
+# Bump when node features / edge construction change so old snapshots are ignored
+GRAPH_FEATURE_VERSION = "1"
+
+
+def graph_fingerprint(rows: Iterable[Dict], version: str = GRAPH_FEATURE_VERSION) -> str:
+    """
+    Order-independent fingerprint of the rows a workspace graph is built from.
+
+    Args:
+        rows: Dicts with "id" and "updated_at" (e.g. contacts of the workspace)
+        version: Graph feature version mixed into the hash
+
+    Returns:
+        Hex digest (16 characters)
+    """
+    digest = hashlib.sha256(f"v{version}".encode())
+    for key in sorted(f"{row['id']}:{row.get('updated_at') or ''}" for row in rows):
+        digest.update(key.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class EmbeddingSnapshot:
+    """Normalized GNN embeddings of one workspace graph."""
+
+    workspace_id: str
+    fingerprint: str
+    embeddings: torch.Tensor
+    contact_ids: List[str]
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    # Heuristic embeddings served until the workspace has a trained model (never persisted)
+    fallback: bool = False
+    # Storage dtype (float16 halves memory and disk; similarities are computed in it)
+    dtype: torch.dtype = torch.float32
+    id_to_idx: Dict[str, int] = field(init=False)
+
+    def __post_init__(self):
+        embeddings = F.normalize(self.embeddings.detach().float().cpu(), p=2, dim=1)
+        self.embeddings = embeddings.to(self.dtype)
+        self.id_to_idx = {cid: idx for idx, cid in enumerate(self.contact_ids)}
+
+    def __len__(self) -> int:
+        return len(self.contact_ids)
+
+    def top_k(
+        self, contact_id: str, k: int = 20, exclude: Sequence[str] = ()
+    ) -> List[Tuple[str, float]]:
+        """
+        Most similar contacts by cosine similarity.
+
+        Args:
+            contact_id: Target contact UUID
+            k: Number of results
+            exclude: Contact ids to leave out (the target itself is always excluded)
+
+        Returns:
+            List of (contact_id, cosine_similarity), most similar first
+        """
+        target_idx = self.id_to_idx.get(str(contact_id))
+        if target_idx is None or k <= 0:
+            return []
+
+        similarities = self.embeddings @ self.embeddings[target_idx]
+        similarities[target_idx] = -float("inf")
+        for other in exclude:
+            idx = self.id_to_idx.get(other)
+            if idx is not None:
+                similarities[idx] = -float("inf")
+
+        k = min(k, len(similarities))
+        values, indices = torch.topk(similarities, k)
+        return [
+            (self.contact_ids[idx], value)
+            for idx, value in zip(indices.tolist(), values.tolist())
+            if value != -float("inf")
+        ]
+
+    def top_k_many(
+        self,
+        contact_ids: Optional[Sequence[str]] = None,
+        k: int = 20,
+        exclude: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        top_k for many contacts in one pass (blocked matmul, see batch_top_k).
+
+        Args:
+            contact_ids: Target contacts (default: every contact); unknown ids are skipped
+            k: Number of results per contact
+            exclude: contact_id -> contact ids to leave out for that target
+
+        Returns:
+            contact_id -> [(contact_id, cosine_similarity), ...], most similar first
+        """
+        if contact_ids is None:
+            targets = list(self.contact_ids)
+        else:
+            targets = [str(cid) for cid in contact_ids if str(cid) in self.id_to_idx]
+        if not targets or k <= 0:
+            return {cid: [] for cid in targets}
+
+        pairs = [
+            (position, self.id_to_idx[other])
+            for position, cid in enumerate(targets)
+            for other in (exclude or {}).get(cid, ())
+            if other in self.id_to_idx
+        ]
+        values, indices = batch_top_k(
+            self.embeddings,
+            k,
+            query_indices=[self.id_to_idx[cid] for cid in targets],
+            exclude=torch.tensor(pairs, dtype=torch.long).t() if pairs else None,
+            normalized=True,
+        )
+
+        contact_ids = self.contact_ids
+        return {
+            cid: [
+                (contact_ids[idx], value)
+                for idx, value in zip(row_indices, row_values)
+                if value != -float("inf")
+            ]
+            for cid, row_indices, row_values in zip(targets, indices.tolist(), values.tolist())
+        }
+
+
+class EmbeddingSnapshotStore:
+    """Filesystem store of EmbeddingSnapshots (atomic publish, keeps a few versions)."""
+
+    CURRENT_FILE = "CURRENT"
+
+    def __init__(self, root: str, keep_versions: int = 2):
+        """
+        Initialize EmbeddingSnapshotStore.
+
+        Args:
+            root: Directory holding one subdirectory per workspace
+            keep_versions: Snapshots kept per workspace (older ones are deleted)
+        """
+        self.root = root
+        self.keep_versions = keep_versions
+        os.makedirs(root, exist_ok=True)
+
+    def current_fingerprint(self, workspace_id: str) -> Optional[str]:
+        """Fingerprint of the latest published snapshot, or None."""
+        try:
+            with open(os.path.join(self._workspace_dir(workspace_id), self.CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(
+        self, workspace_id: str, fingerprint: Optional[str] = None
+    ) -> Optional[EmbeddingSnapshot]:
+        """
+        Load a snapshot.
+
+        Args:
+            workspace_id: Workspace ID
+            fingerprint: Specific version (default: current)
+
+        Returns:
+            EmbeddingSnapshot or None if missing/unreadable
+        """
+        fingerprint = fingerprint or self.current_fingerprint(workspace_id)
+        if not fingerprint:
+            return None
+
+        path = os.path.join(self._workspace_dir(workspace_id), fingerprint)
+        if not os.path.isdir(path):
+            return None
+
+        try:
+            embeddings = torch.load(os.path.join(path, "embeddings.pt"), weights_only=True)
+            with open(os.path.join(path, "contact_ids.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError, RuntimeError) as e:
+            logger.warning(f"Could not load GNN snapshot {workspace_id}/{fingerprint}: {e}")
+            return None
+
+        return EmbeddingSnapshot(
+            workspace_id=workspace_id,
+            fingerprint=fingerprint,
+            embeddings=embeddings,
+            contact_ids=meta["contact_ids"],
+            created_at=datetime.fromisoformat(meta["created_at"]),
+            dtype=embeddings.dtype,
+        )
+
+    def save(self, snapshot: EmbeddingSnapshot) -> None:
+        """Write a snapshot and make it current (readers never see partial files)."""
+        if snapshot.fallback:
+            raise ValueError("Fallback snapshots are not persisted")
+
+        workspace_dir = self._workspace_dir(snapshot.workspace_id)
+        os.makedirs(workspace_dir, exist_ok=True)
+
+        tmp_dir = tempfile.mkdtemp(dir=workspace_dir, prefix=".tmp-")
+        try:
+            torch.save(snapshot.embeddings, os.path.join(tmp_dir, "embeddings.pt"))
+            with open(os.path.join(tmp_dir, "contact_ids.json"), "w") as f:
+                json.dump(
+                    {
+                        "contact_ids": snapshot.contact_ids,
+                        "created_at": snapshot.created_at.isoformat(),
+                    },
+                    f,
+                )
+
+            final_dir = os.path.join(workspace_dir, snapshot.fingerprint)
+            if os.path.exists(final_dir):
+                shutil.rmtree(final_dir)
+            os.replace(tmp_dir, final_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        current_tmp = os.path.join(workspace_dir, self.CURRENT_FILE + ".tmp")
+        with open(current_tmp, "w") as f:
+            f.write(snapshot.fingerprint)
+        os.replace(current_tmp, os.path.join(workspace_dir, self.CURRENT_FILE))
+
+        self._prune(workspace_dir, snapshot.fingerprint)
+        logger.info(
+            f"Saved GNN snapshot {snapshot.workspace_id}/{snapshot.fingerprint} "
+            f"({len(snapshot)} nodes)"
+        )
+
+    def _prune(self, workspace_dir: str, current: str) -> None:
+        versions = [
+            entry
+            for entry in os.scandir(workspace_dir)
+            if entry.is_dir() and not entry.name.startswith(".") and entry.name != current
+        ]
+        versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in versions[max(self.keep_versions - 1, 0) :]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _workspace_dir(self, workspace_id: str) -> str:
+        return os.path.join(self.root, str(workspace_id))
@@ -2,20 +2,36 @@
 GNN Training Module
 
 Trains Graph Neural Network models using contrastive learning.
+
+Small graphs train full-batch; large graphs train on mini-batches of positive
+edges with sampled neighbourhoods (see neighbor_sampler), so memory per step is
+bounded. The CPU-bound loop runs in an executor so the event loop stays free.
 """
 
+import asyncio
 import logging
+import time
+from concurrent.futures import Executor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence
 
+import numpy as np
 import torch
 import torch.nn.functional as F
 from torch_geometric.data import Data
 
+from api.ml.neighbor_sampler import NeighborSampler
+
 logger = logging.getLogger(__name__)
 
 
 class GNNTrainer:
     """Обучение GNN модели"""
 
+    # Graphs with more edges than this are trained on mini-batches
+    MINIBATCH_EDGE_THRESHOLD = 200_000
+    DEFAULT_BATCH_SIZE = 2048
+
     def __init__(self, device="cpu"):
         self.device = torch.device(device)
         self.model = None
@@ -48,33 +64,40 @@ class GNNTrainer:
             # No edges - return dummy loss
             return torch.tensor(0.0, device=self.device, requires_grad=True)
 
-        # Get positive pairs (connected nodes)
         pos_src, pos_dst = edge_index
+        neg_dst = torch.randint(
+            0, embeddings.shape[0], (len(pos_src), negative_samples), device=self.device
+        )
+
+        return self._pair_loss(embeddings, pos_src, pos_dst, neg_dst)
+
+    @staticmethod
+    def _pair_loss(
+        embeddings: torch.Tensor,
+        pos_src: torch.Tensor,
+        pos_dst: torch.Tensor,
+        neg_dst: torch.Tensor,
+    ) -> torch.Tensor:
+        """
+        Positive loss relu(1 - cos) + negative loss relu(cos + 1), all negatives in one op.
 
-        # Compute positive scores (should be high)
-        pos_scores = F.cosine_similarity(
-            embeddings[pos_src], embeddings[pos_dst], dim=1
-        )  # [num_edges]
+        Args:
+            embeddings: [num_nodes, dim]
+            pos_src, pos_dst: [num_pairs] positive pairs
+            neg_dst: [num_pairs, negative_samples] negatives for each pos_src
+        """
+        normalized = F.normalize(embeddings, p=2, dim=1)
+        src = normalized[pos_src]
 
-        # Positive loss: push towards +1
+        # Positive scores: push towards +1
+        pos_scores = (src * normalized[pos_dst]).sum(dim=1)
         pos_loss = F.relu(1 - pos_scores).mean()
 
-        # Negative samples
-        num_nodes = embeddings.shape[0]
-        neg_loss = 0
-
-        for _ in range(negative_samples):
-            # Random negative pairs - sample len(pos_src) random node indices
-            neg_idx = torch.randint(0, num_nodes, (len(pos_src),), device=self.device)
-
-            neg_scores = F.cosine_similarity(embeddings[pos_src], embeddings[neg_idx], dim=1)
+        # Negative scores [num_pairs, negative_samples]: push towards -1
+        neg_scores = torch.bmm(normalized[neg_dst], src.unsqueeze(2)).squeeze(2)
+        neg_loss = F.relu(neg_scores + 1).mean()
 
-            # Negative loss: push towards -1
-            neg_loss += F.relu(neg_scores + 1).mean()
-
-        total_loss = pos_loss + neg_loss / negative_samples
-
-        return total_loss
+        return pos_loss + neg_loss
 
     async def train(
         self,
@@ -82,20 +105,68 @@ class GNNTrainer:
         epochs: int = 20,
         learning_rate: float = 0.01,
         negative_samples: int = 5,
-    ):
+        batch_size: Optional[int] = None,
+        num_neighbors: Optional[Sequence[int]] = None,
+        batches_per_epoch: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        on_epoch: Optional[Callable[[int, int, float], None]] = None,
+    ) -> Dict:
         """
-        Обучи модель
+        Обучи модель (в executor'е, не блокируя event loop)
 
         Args:
             graph_data: PyTorch Geometric Data object
             epochs: Кол-во эпох
             learning_rate: Learning rate
             negative_samples: Кол-во негативных сэмплов на позитивный
+            batch_size: Positive edges per mini-batch (None = full-batch for graphs up
+                to MINIBATCH_EDGE_THRESHOLD edges, DEFAULT_BATCH_SIZE above)
+            num_neighbors: Sampled neighbours per hop (default: 10 per model layer)
+            batches_per_epoch: Cap on mini-batches per epoch (default: one pass over edges)
+            executor: Executor to run in (default: the loop's default thread pool)
+            on_epoch: Called as on_epoch(epoch, epochs, loss) after every epoch
+
+        Returns:
+            {'loss_history': [...], 'final_loss': float, 'mode': 'full' | 'minibatch',
+             'epochs': int, 'duration_seconds': float}
         """
 
         if self.model is None:
             raise ValueError("Model not created. Call create_model() first")
 
+        fit = partial(
+            self.fit,
+            graph_data,
+            epochs=epochs,
+            learning_rate=learning_rate,
+            negative_samples=negative_samples,
+            batch_size=batch_size,
+            num_neighbors=num_neighbors,
+            batches_per_epoch=batches_per_epoch,
+            on_epoch=on_epoch,
+        )
+        return await asyncio.get_running_loop().run_in_executor(executor, fit)
+
+    def fit(
+        self,
+        graph_data: Data,
+        epochs: int = 20,
+        learning_rate: float = 0.01,
+        negative_samples: int = 5,
+        batch_size: Optional[int] = None,
+        num_neighbors: Optional[Sequence[int]] = None,
+        batches_per_epoch: Optional[int] = None,
+        on_epoch: Optional[Callable[[int, int, float], None]] = None,
+    ) -> Dict:
+        """Synchronous training loop (runs in the executor or a worker process); see train()."""
+        if self.model is None:
+            raise ValueError("Model not created. Call create_model() first")
+
+        if batch_size is None and graph_data.edge_index.shape[1] > self.MINIBATCH_EDGE_THRESHOLD:
+            batch_size = self.DEFAULT_BATCH_SIZE
+
+        start = time.time()
+
         # Move graph to device
         x = graph_data.x.to(self.device)
         edge_index = graph_data.edge_index.to(self.device)
@@ -103,31 +174,132 @@ class GNNTrainer:
         # Optimizer
         self.optimizer = torch.optim.Adam(self.model.parameters(), lr=learning_rate)
 
-        logger.info(f"Starting training for {epochs} epochs")
+        mode = "minibatch" if batch_size else "full"
+        logger.info(f"Starting {mode} training for {epochs} epochs")
 
         self.model.train()
 
-        for epoch in range(epochs):
-            self.optimizer.zero_grad()
+        if batch_size:
+            loss_history = self._fit_minibatch(
+                x,
+                edge_index,
+                epochs,
+                negative_samples,
+                batch_size,
+                num_neighbors or [10] * self.model.num_layers,
+                batches_per_epoch,
+                on_epoch,
+            )
+        else:
+            loss_history = []
+            for epoch in range(epochs):
+                self.optimizer.zero_grad()
 
-            # Forward pass
-            embeddings = self.model(x, edge_index)
+                # Forward pass
+                embeddings = self.model(x, edge_index)
 
-            # Compute loss
-            loss = self.compute_contrastive_loss(
-                embeddings, edge_index, negative_samples=negative_samples
-            )
+                # Compute loss
+                loss = self.compute_contrastive_loss(
+                    embeddings, edge_index, negative_samples=negative_samples
+                )
 
-            # Backward pass
-            loss.backward()
-            self.optimizer.step()
+                # Backward pass
+                loss.backward()
+                self.optimizer.step()
 
-            if (epoch + 1) % 5 == 0 or epoch == 0:
-                logger.info(f"Epoch {epoch + 1}/{epochs}, Loss: {loss.item():.4f}")
+                loss_history.append(loss.item())
+                self._log_epoch(epoch, epochs, loss_history[-1], on_epoch)
 
         logger.info("✅ Training complete")
 
-        return loss.item()
+        return {
+            "loss_history": loss_history,
+            "final_loss": loss_history[-1] if loss_history else 0.0,
+            "mode": mode,
+            "epochs": epochs,
+            "duration_seconds": time.time() - start,
+        }
+
+    def _fit_minibatch(
+        self,
+        x: torch.Tensor,
+        edge_index: torch.Tensor,
+        epochs: int,
+        negative_samples: int,
+        batch_size: int,
+        num_neighbors: Sequence[int],
+        batches_per_epoch: Optional[int],
+        on_epoch: Optional[Callable[[int, int, float], None]] = None,
+    ) -> List[float]:
+        """
+        Mini-batch epochs: each step takes batch_size positive edges plus negatives,
+        samples their neighbourhoods and runs the model on that subgraph only.
+        """
+        num_nodes = x.shape[0]
+        num_edges = edge_index.shape[1]
+        if num_edges == 0:
+            return [0.0] * epochs
+
+        sampler = NeighborSampler(edge_index, num_nodes, num_neighbors)
+        rng = sampler.rng
+        edges = edge_index.cpu().numpy()
+
+        steps = -(-num_edges // batch_size)
+        if batches_per_epoch:
+            steps = min(steps, batches_per_epoch)
+
+        loss_history = []
+        for epoch in range(epochs):
+            permutation = rng.permutation(num_edges)
+            epoch_loss = 0.0
+
+            for step in range(steps):
+                batch = permutation[step * batch_size : (step + 1) * batch_size]
+                pos_src, pos_dst = edges[0, batch], edges[1, batch]
+                neg_dst = rng.integers(0, num_nodes, size=(len(batch), negative_samples))
+
+                # Seeds = every node the loss needs an embedding for
+                seeds, inverse = np.unique(
+                    np.concatenate([pos_src, pos_dst, neg_dst.ravel()]), return_inverse=True
+                )
+                node_ids, sub_edge_index = sampler.sample(seeds)
+
+                self.optimizer.zero_grad()
+
+                embeddings = self.model(
+                    x[torch.from_numpy(node_ids).to(self.device)],
+                    sub_edge_index.to(self.device),
+                )
+
+                inverse = torch.from_numpy(inverse).to(self.device)
+                count = len(batch)
+                loss = self._pair_loss(
+                    embeddings,
+                    inverse[:count],
+                    inverse[count : 2 * count],
+                    inverse[2 * count :].view(count, negative_samples),
+                )
+
+                loss.backward()
+                self.optimizer.step()
+                epoch_loss += loss.item()
+
+            loss_history.append(epoch_loss / steps)
+            self._log_epoch(epoch, epochs, loss_history[-1], on_epoch)
+
+        return loss_history
+
+    @staticmethod
+    def _log_epoch(
+        epoch: int,
+        epochs: int,
+        loss: float,
+        on_epoch: Optional[Callable[[int, int, float], None]] = None,
+    ) -> None:
+        if (epoch + 1) % 5 == 0 or epoch == 0:
+            logger.info(f"Epoch {epoch + 1}/{epochs}, Loss: {loss:.4f}")
+        if on_epoch is not None:
+            on_epoch(epoch + 1, epochs, loss)
 
     def predict(self, x, edge_index):
         """Получи embeddings"""
@@ -0,0 +1,397 @@
+"""
+GNN Training Jobs
+
+Background training for per-workspace GNN models, so requests never train a
+model themselves:
+
+- single-flight: at most one queued/running job per workspace; submitting again
+  returns the existing job (and raises its priority if the new one is more urgent)
+- priority queue: lower number runs first, FIFO within a priority
+- CPU work runs in a worker pool (a spawned process pool for large graphs, a
+  thread pool for small ones where process start-up would dominate); per-epoch
+  progress is reported back to the job while it runs
+
+The job itself (build graph, train, publish artifacts) is a coroutine supplied by
+the caller - see GNNRecommender._run_training_job.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import queue
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Job priorities (lower runs first)
+PRIORITY_HIGH = 0  # explicit training request
+PRIORITY_NORMAL = 10  # workspace has no model yet / retrain requested by a request
+PRIORITY_LOW = 20  # background refresh
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Progress queue of a worker process (set by the pool initializer)
+_worker_progress_queue = None
+
+
+def _init_worker(progress_queue) -> None:
+    global _worker_progress_queue
+    _worker_progress_queue = progress_queue
+
+
+def train_workspace_model(
+    job_id: str,
+    graph_data,
+    epochs: int = 20,
+    learning_rate: float = 0.01,
+    progress_queue=None,
+) -> Dict:
+    """
+    Train a fresh GNN on a workspace graph (runs in a worker thread or process).
+
+    Args:
+        job_id: Job the progress updates belong to
+        graph_data: PyTorch Geometric Data object
+        epochs: Training epochs
+        learning_rate: Learning rate
+        progress_queue: Queue for (job_id, epoch, epochs, loss) updates
+            (default: the worker process queue)
+
+    Returns:
+        {'state_dict': ..., 'embeddings': Tensor [num_nodes, dim], 'history': {...}}
+    """
+    from api.ml.gnn_trainer import GNNTrainer
+
+    progress_queue = progress_queue if progress_queue is not None else _worker_progress_queue
+
+    def report(epoch: int, total: int, loss: float) -> None:
+        if progress_queue is not None:
+            progress_queue.put((job_id, epoch, total, loss))
+
+    trainer = GNNTrainer(device="cpu")
+    model = trainer.create_model(in_features=graph_data.x.shape[1], hidden_dim=64, out_dim=128)
+    history = trainer.fit(graph_data, epochs=epochs, learning_rate=learning_rate, on_epoch=report)
+    embeddings = trainer.predict(graph_data.x, graph_data.edge_index)
+
+    return {"state_dict": model.state_dict(), "embeddings": embeddings, "history": history}
+
+
+@dataclass
+class TrainingJob:
+    """One training run for a workspace."""
+
+    job_id: str
+    workspace_id: str
+    priority: int
+    params: Dict[str, Any] = field(default_factory=dict, repr=False)
+    status: str = QUEUED
+    submitted_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    epoch: int = 0
+    epochs: Optional[int] = None
+    loss: Optional[float] = None
+    result: Optional[Dict] = field(default=None, repr=False)
+    error: Optional[str] = None
+    run: Optional[Callable[["TrainingJob"], Awaitable[Dict]]] = field(default=None, repr=False)
+    done: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def progress(self) -> float:
+        """Fraction of epochs finished (1.0 once completed)."""
+        if self.status == COMPLETED:
+            return 1.0
+        if not self.epochs:
+            return 0.0
+        return min(self.epoch / self.epochs, 1.0)
+
+    def to_dict(self) -> Dict:
+        """JSON-friendly job status."""
+        return {
+            "job_id": self.job_id,
+            "workspace_id": self.workspace_id,
+            "status": self.status,
+            "priority": self.priority,
+            "progress": round(self.progress, 4),
+            "epoch": self.epoch,
+            "epochs": self.epochs,
+            "loss": self.loss,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+class TrainingJobManager:
+    """Per-workspace single-flight training queue with a CPU worker pool."""
+
+    # How often a running job's progress updates are collected
+    PROGRESS_POLL_SECONDS = 0.2
+
+    def __init__(
+        self,
+        max_concurrent: int = 1,
+        max_workers: int = 1,
+        use_processes: bool = True,
+        history_size: int = 200,
+    ):
+        """
+        Initialize TrainingJobManager.
+
+        Args:
+            max_concurrent: Jobs running at the same time
+            max_workers: Worker processes (and threads) for CPU work
+            use_processes: Run in_process CPU work in a process pool (False = threads only)
+            history_size: Finished jobs kept for status queries
+        """
+        self.max_concurrent = max_concurrent
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.history_size = history_size
+
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._active: Dict[str, TrainingJob] = {}
+        self._latest: Dict[str, TrainingJob] = {}
+        self._seq = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._thread_progress: "queue.Queue[Tuple]" = queue.Queue()
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_progress = None
+
+    def submit(
+        self,
+        workspace_id: str,
+        run: Callable[[TrainingJob], Awaitable[Dict]],
+        priority: int = PRIORITY_NORMAL,
+        **params,
+    ) -> TrainingJob:
+        """
+        Queue a training job unless one is already queued/running for the workspace.
+
+        Args:
+            workspace_id: Workspace ID
+            run: Coroutine function doing the work; its return value is the job result
+            priority: PRIORITY_HIGH / PRIORITY_NORMAL / PRIORITY_LOW (lower runs first)
+            **params: Job parameters, available to run() as job.params
+
+        Returns:
+            The new job, or the workspace's active job (single-flight)
+        """
+        self._ensure_workers()
+
+        job = self._active.get(workspace_id)
+        if job is not None:
+            if job.status == QUEUED and priority < job.priority:
+                job.priority = priority
+                self._enqueue(job)
+            return job
+
+        job = TrainingJob(
+            job_id=uuid.uuid4().hex,
+            workspace_id=workspace_id,
+            priority=priority,
+            params=params,
+            epochs=params.get("epochs"),
+            run=run,
+            done=self._loop.create_future(),
+        )
+        # Failures are reported through the job; don't warn when nobody awaits it
+        job.done.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+        self._active[workspace_id] = job
+        self._latest[workspace_id] = job
+        self._remember(job)
+        self._enqueue(job)
+
+        logger.info(
+            f"Queued GNN training job {job.job_id} for {workspace_id} (priority {priority})"
+        )
+        return job
+
+    async def wait(self, job: TrainingJob, timeout: Optional[float] = None) -> Dict:
+        """
+        Wait for a job to finish.
+
+        Raises:
+            asyncio.TimeoutError: timeout passed (the job keeps running)
+            Exception: whatever the job raised
+        """
+        return await asyncio.wait_for(asyncio.shield(job.done), timeout)
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def active(self, workspace_id: str) -> Optional[TrainingJob]:
+        """Queued or running job of a workspace."""
+        return self._active.get(workspace_id)
+
+    def latest(self, workspace_id: str) -> Optional[TrainingJob]:
+        """Most recently submitted job of a workspace."""
+        return self._latest.get(workspace_id)
+
+    def stats(self) -> Dict[str, int]:
+        statuses = [job.status for job in self._active.values()]
+        return {"queued": statuses.count(QUEUED), "running": statuses.count(RUNNING)}
+
+    async def run_cpu(self, job: TrainingJob, fn: Callable, *args, in_process: bool = True):
+        """
+        Run fn(job.job_id, *args) in the worker pool, collecting its progress updates.
+
+        Args:
+            job: Job the work belongs to
+            fn: Picklable top-level function (e.g. train_workspace_model)
+            in_process: Use the process pool (if enabled); False = thread pool
+
+        Returns:
+            fn's return value
+        """
+        executor, progress = self._executor(in_process)
+        if progress is self._thread_progress:
+            call = partial(fn, job.job_id, *args, progress_queue=progress)
+        else:
+            call = partial(fn, job.job_id, *args)
+
+        try:
+            future = asyncio.wrap_future(executor.submit(call))
+        except BrokenProcessPool:
+            self._reset_process_pool()
+            raise
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=self.PROGRESS_POLL_SECONDS)
+                self._drain_progress(progress)
+                if done:
+                    return future.result()
+        except BrokenProcessPool:
+            self._reset_process_pool()
+            raise
+
+    def shutdown(self) -> None:
+        """Stop workers and worker pools (running CPU work is not interrupted)."""
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+        self._loop = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False)
+            self._thread_pool = None
+        self._reset_process_pool()
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        # First use, or the previous event loop is gone along with its jobs
+        for job in self._active.values():
+            job.status = FAILED
+            job.error = "event loop closed"
+        self._active.clear()
+
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.max_concurrent)]
+
+    def _enqueue(self, job: TrainingJob) -> None:
+        # Re-prioritized jobs are queued again; the stale entry is skipped by the worker
+        self._seq += 1
+        self._queue.put_nowait((job.priority, self._seq, job))
+
+    async def _worker(self) -> None:
+        while True:
+            priority, _, job = await self._queue.get()
+            if job.status != QUEUED or priority != job.priority:
+                continue
+
+            job.status = RUNNING
+            job.started_at = datetime.utcnow()
+            start = time.monotonic()
+            try:
+                result = await job.run(job)
+            except asyncio.CancelledError:
+                job.status = FAILED
+                job.error = "cancelled"
+                job.done.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"GNN training job {job.job_id} failed: {e}", exc_info=True)
+                job.status = FAILED
+                job.error = str(e)
+                job.done.set_exception(e)
+            else:
+                job.status = COMPLETED
+                job.result = result
+                job.done.set_result(result)
+                logger.info(
+                    f"✅ GNN training job {job.job_id} for {job.workspace_id} done "
+                    f"in {time.monotonic() - start:.2f}s"
+                )
+            finally:
+                job.finished_at = datetime.utcnow()
+                if self._active.get(job.workspace_id) is job:
+                    del self._active[job.workspace_id]
+
+    def _remember(self, job: TrainingJob) -> None:
+        self._jobs[job.job_id] = job
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history_size:
+                break
+            if not self._jobs[job_id].active:
+                del self._jobs[job_id]
+
+    def _executor(self, in_process: bool) -> Tuple[Executor, Any]:
+        if in_process and self.use_processes:
+            if self._process_pool is None:
+                context = multiprocessing.get_context("spawn")
+                self._process_progress = context.Queue()
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self._process_progress,),
+                )
+            return self._process_pool, self._process_progress
+
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="gnn-training"
+            )
+        return self._thread_pool, self._thread_progress
+
+    def _reset_process_pool(self) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+        self._process_pool = None
+        self._process_progress = None
+
+    def _drain_progress(self, progress) -> None:
+        while True:
+            try:
+                job_id, epoch, epochs, loss = progress.get_nowait()
+            except queue.Empty:
+                return
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.epoch, job.epochs, job.loss = epoch, epochs, loss
@@ -4,6 +4,9 @@ Graph construction module for contact recommendation GNN.
 Builds PyTorch Geometric graph from Supabase contact data:
 - Nodes: Contacts with features (influence, tags, organization)
 - Edges: Interactions with weights (frequency, recency)
+
+Workspace graphs are kept in a WorkspaceGraphStore (see graph_store) when one
+is passed in: after the first load only changed contacts are re-read.
 """
 
 import logging
@@ -13,20 +16,34 @@ from typing import Dict, List, Optional, Tuple
 import torch
 from torch_geometric.data import Data
 
+from .gnn_snapshots import graph_fingerprint
+from .graph_store import (
+    MAX_TAG_FANOUT,
+    WorkspaceGraph,
+    WorkspaceGraphStore,
+    contact_features,
+    tag_cooccurrence_edges,
+)
+
 logger = logging.getLogger(__name__)
 
 
 class ContactGraphBuilder:
     """Builds PyTorch Geometric graphs from contact and interaction data."""
 
-    def __init__(self, supabase_client):
+    # Contacts re-read per in_() query when syncing a stored workspace graph
+    SYNC_BATCH_SIZE = 500
+
+    def __init__(self, supabase_client, graph_store: Optional[WorkspaceGraphStore] = None):
         """
         Initialize graph builder.
 
         Args:
             supabase_client: Supabase client for database queries
+            graph_store: Incrementally maintained workspace graphs (optional)
         """
         self.supabase = supabase_client
+        self.graph_store = graph_store
         self.contact_id_to_idx: Dict[str, int] = {}
         self.idx_to_contact_id: Dict[int, str] = {}
 
@@ -85,6 +102,149 @@ class ContactGraphBuilder:
             edge_attr=edge_weights.unsqueeze(1),  # [num_edges, 1]
         )
 
+    async def build_graph_for_workspace(
+        self, workspace_id: str
+    ) -> Tuple[Data, List[str], Dict[str, int]]:
+        """
+        Build the graph of a workspace's contacts (shared-tag edges).
+
+        Args:
+            workspace_id: Workspace ID
+
+        Returns:
+            Tuple (graph data, contact_ids in node order, contact_id -> node index)
+        """
+        if self.graph_store is not None:
+            graph = self.graph_store.get(workspace_id) or await self.sync_workspace_graph(
+                workspace_id
+            )
+        else:
+            graph = WorkspaceGraph(workspace_id)
+            graph.load(await self._fetch_workspace_contacts(workspace_id))
+
+        if len(graph) == 0:
+            logger.warning(f"No contacts found for workspace {workspace_id}")
+            return self._create_empty_graph(), [], {}
+
+        graph_data, contact_ids, id_to_idx = graph.snapshot()
+        self.contact_id_to_idx = dict(id_to_idx)
+        self.idx_to_contact_id = dict(enumerate(contact_ids))
+
+        logger.info(
+            f"Workspace graph: {graph_data.num_nodes} nodes, {graph_data.edge_index.shape[1]} edges"
+        )
+
+        return graph_data, contact_ids, id_to_idx
+
+    async def sync_workspace_graph(self, workspace_id: str) -> WorkspaceGraph:
+        """
+        Bring the stored graph of a workspace up to date.
+
+        The first call loads all contacts; later calls read only (id, updated_at)
+        and re-fetch contacts that changed since the last sync.
+
+        Args:
+            workspace_id: Workspace ID
+
+        Returns:
+            The stored WorkspaceGraph
+        """
+        graph = self.graph_store.get(workspace_id)
+
+        if graph is None:
+            graph = WorkspaceGraph(workspace_id)
+            graph.load(await self._fetch_workspace_contacts(workspace_id))
+            if len(graph):
+                self.graph_store.put(graph)
+            return graph
+
+        changed, removed = graph.diff(await self._fetch_contact_versions(workspace_id))
+
+        if removed:
+            graph.remove_contacts(removed)
+        if changed:
+            contacts = []
+            for start in range(0, len(changed), self.SYNC_BATCH_SIZE):
+                response = (
+                    self.supabase.table("contacts")
+                    .select("id, organization, influence_score, tags, updated_at")
+                    .eq("workspace_id", workspace_id)
+                    .in_("id", changed[start : start + self.SYNC_BATCH_SIZE])
+                    .execute()
+                )
+                contacts.extend(response.data or [])
+            graph.upsert_contacts(contacts)
+
+        if changed or removed:
+            logger.info(
+                f"Workspace graph {workspace_id} synced: "
+                f"{len(changed)} changed, {len(removed)} removed"
+            )
+        return graph
+
+    async def get_graph_fingerprint(self, workspace_id: str) -> str:
+        """
+        Fingerprint of the data build_graph_for_workspace would use.
+
+        Only contact ids and updated_at are fetched, so this is much cheaper than
+        building the graph. With a graph store the same read also syncs the
+        stored graph, so a following build_graph_for_workspace needs no query.
+        """
+        if self.graph_store is not None:
+            return (await self.sync_workspace_graph(workspace_id)).fingerprint
+
+        return graph_fingerprint(await self._fetch_contact_versions(workspace_id))
+
+    async def _fetch_contact_versions(self, workspace_id: str) -> List[Dict]:
+        response = (
+            self.supabase.table("contacts")
+            .select("id, updated_at")
+            .eq("workspace_id", workspace_id)
+            .execute()
+        )
+        return response.data or []
+
+    async def get_contacts_details(
+        self, workspace_id: str, contact_ids: List[str]
+    ) -> Dict[str, Dict]:
+        """
+        Contact fields shown in recommendations, one query for all ids.
+
+        Args:
+            workspace_id: Workspace ID
+            contact_ids: Contact ids to load
+
+        Returns:
+            Dictionary contact_id -> contact (ids outside the workspace are left out)
+        """
+        if not contact_ids:
+            return {}
+
+        response = (
+            self.supabase.table("contacts")
+            .select("id, first_name, last_name, email, organization, tags")
+            .eq("workspace_id", workspace_id)
+            .in_("id", list(contact_ids))
+            .execute()
+        )
+        return {str(row["id"]): row for row in response.data or []}
+
+    async def _fetch_workspace_contacts(self, workspace_id: str) -> List[Dict]:
+        """Fetch all contacts of a workspace (ordered by id for stable node indices)."""
+        try:
+            response = (
+                self.supabase.table("contacts")
+                .select("id, organization, influence_score, tags, updated_at")
+                .eq("workspace_id", workspace_id)
+                .order("id")
+                .execute()
+            )
+
+            return response.data if response.data else []
+        except Exception as e:
+            logger.error(f"Error fetching workspace contacts: {e}")
+            return []
+
     async def _fetch_contacts(self, user_id: str) -> List[Dict]:
         """Fetch all contacts for a user from database."""
         try:
@@ -117,22 +277,7 @@ class ContactGraphBuilder:
         Returns:
             Tensor of shape [num_contacts, 3]
         """
-        features = []
-
-        for contact in contacts:
-            # Feature 1: Normalized influence score
-            influence = contact.get("influence_score", 0.0)
-            norm_influence = min(influence / 100.0, 1.0)
-
-            # Feature 2: Tag count (normalized)
-            tags = contact.get("tags", [])
-            tag_count = len(tags) if tags else 0
-            norm_tag_count = min(tag_count / 10.0, 1.0)
-
-            # Feature 3: Has organization (binary)
-            has_org = 1.0 if contact.get("organization") else 0.0
-
-            features.append([norm_influence, norm_tag_count, has_org])
+        features = [contact_features(contact) for contact in contacts]
 
         return torch.tensor(features, dtype=torch.float)
 
@@ -199,54 +344,17 @@ class ContactGraphBuilder:
             logger.error(f"Error building edges from interactions: {e}")
             return torch.empty((2, 0), dtype=torch.long), torch.empty(0)
 
-    def _build_edges_from_tags(self, contacts: List[Dict]) -> Tuple[torch.Tensor, torch.Tensor]:
+    def _build_edges_from_tags(
+        self, contacts: List[Dict], max_tag_fanout: int = MAX_TAG_FANOUT
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
         """
         Build edges between contacts with shared tags.
 
-        Weight = number of shared tags / max(tags_a, tags_b)
+        Edges come from a sparse contact x tag incidence product (see
+        tag_cooccurrence_edges): TF-IDF weights down-weight common tags and tags
+        on more than max_tag_fanout contacts create no edges.
         """
-        edges = []
-        weights = []
-
-        # Build tag -> contact_indices mapping
-        tag_to_contacts = {}
-        for idx, contact in enumerate(contacts):
-            tags = contact.get("tags", [])
-            if not tags:
-                continue
-
-            for tag in tags:
-                if tag not in tag_to_contacts:
-                    tag_to_contacts[tag] = []
-                tag_to_contacts[tag].append(idx)
-
-        # Create edges for contacts sharing tags
-        for tag, contact_indices in tag_to_contacts.items():
-            if len(contact_indices) < 2:
-                continue
-
-            # Connect all pairs with this tag
-            for i in range(len(contact_indices)):
-                for j in range(i + 1, len(contact_indices)):
-                    idx_a, idx_b = contact_indices[i], contact_indices[j]
-
-                    # Calculate shared tags
-                    tags_a = set(contacts[idx_a].get("tags", []))
-                    tags_b = set(contacts[idx_b].get("tags", []))
-                    shared = len(tags_a & tags_b)
-
-                    if shared > 0:
-                        weight = shared / max(len(tags_a), len(tags_b))
-                        edges.append([idx_a, idx_b])
-                        weights.append(weight)
-
-        if not edges:
-            return torch.empty((2, 0), dtype=torch.long), torch.empty(0)
-
-        edge_index = torch.tensor(edges, dtype=torch.long).t()
-        edge_weights = torch.tensor(weights, dtype=torch.float)
-
-        return edge_index, edge_weights
+        return tag_cooccurrence_edges([contact.get("tags") for contact in contacts], max_tag_fanout)
 
     def _make_bidirectional(
         self, edge_index: torch.Tensor, edge_weights: torch.Tensor
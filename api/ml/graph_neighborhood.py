@@ -0,0 +1,115 @@
+"""
+Contact Graph Neighbourhood
+
+Compact in-memory adjacency of contact_connections for 2-hop queries.
+The undirected graph is stored as CSR arrays (indptr/indices over int32 node
+numbers), so friends-of-friends with mutual-friend counts for a contact is one
+pass over its friends' neighbour lists (the contact's row of A²) instead of
+one REST query per friend.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ContactAdjacency:
+    """Undirected contact graph in CSR form."""
+
+    def __init__(self, edges: Iterable[Tuple[str, str]] = ()):
+        """
+        Initialize ContactAdjacency.
+
+        Args:
+            edges: (contact_id_1, contact_id_2) pairs; direction and duplicates are ignored
+        """
+        pairs = [(a, b) for a, b in edges if a and b and a != b]
+
+        if pairs:
+            ids, codes = np.unique(np.asarray(pairs, dtype=object).ravel(), return_inverse=True)
+            codes = codes.reshape(-1, 2).astype(np.int64)
+        else:
+            ids, codes = np.empty(0, dtype=object), np.empty((0, 2), dtype=np.int64)
+
+        self.ids: List[str] = ids.tolist()
+        self._index: Dict[str, int] = {cid: i for i, cid in enumerate(self.ids)}
+
+        # Both directions, deduplicated, sorted by source
+        n = len(self.ids)
+        src = np.concatenate([codes[:, 0], codes[:, 1]])
+        dst = np.concatenate([codes[:, 1], codes[:, 0]])
+        keys = np.unique(src * n + dst)
+        src, dst = keys // max(n, 1), keys % max(n, 1)
+
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+        self.indices = dst.astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, contact_id: str) -> bool:
+        return contact_id in self._index
+
+    @property
+    def num_edges(self) -> int:
+        """Number of undirected edges."""
+        return len(self.indices) // 2
+
+    def degree(self, contact_id: str) -> int:
+        node = self._index.get(contact_id)
+        return 0 if node is None else int(self.indptr[node + 1] - self.indptr[node])
+
+    def neighbors(self, contact_id: str) -> Set[str]:
+        """Direct connections of a contact."""
+        return {self.ids[i] for i in self._neighbor_nodes(contact_id).tolist()}
+
+    def friends_of_friends(self, contact_id: str) -> Dict[str, int]:
+        """
+        2-hop candidates with mutual-friend counts.
+
+        Equivalent to the contact's row of A² with the contact itself and its
+        direct friends removed.
+
+        Args:
+            contact_id: Source contact UUID
+
+        Returns:
+            Dictionary candidate_id -> number of mutual friends
+        """
+        friends = self._neighbor_nodes(contact_id)
+        if len(friends) == 0:
+            return {}
+
+        # Concatenate all friends' neighbour lists without a Python loop
+        starts = self.indptr[friends]
+        lengths = self.indptr[friends + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        two_hop = self.indices[offsets + np.arange(lengths.sum())]
+
+        candidates, counts = np.unique(two_hop, return_counts=True)
+        keep = ~np.isin(candidates, friends) & (candidates != self._index[contact_id])
+
+        return {
+            self.ids[node]: count
+            for node, count in zip(candidates[keep].tolist(), counts[keep].tolist())
+        }
+
+    def mutual_friends(self, contact_id_1: str, contact_id_2: str) -> int:
+        """Number of common direct connections."""
+        return len(
+            np.intersect1d(
+                self._neighbor_nodes(contact_id_1),
+                self._neighbor_nodes(contact_id_2),
+                assume_unique=True,
+            )
+        )
+
+    def _neighbor_nodes(self, contact_id: str) -> np.ndarray:
+        node: Optional[int] = self._index.get(contact_id)
+        if node is None:
+            return np.empty(0, dtype=np.int32)
+        return self.indices[self.indptr[node] : self.indptr[node + 1]]
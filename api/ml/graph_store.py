@@ -0,0 +1,663 @@
+"""
+Incremental Workspace Graph Store
+
+Keeps the GNN input graph of a workspace in memory and applies deltas
+(contact added/updated/removed, interaction logged) instead of rebuilding it
+from the full contacts table:
+
+- Node features live in a growable float32 matrix, one row per node slot
+- Edges live in growable COO arrays (src, dst, weight) with an alive mask;
+  each undirected edge is stored once (src <= dst)
+- Removed nodes/edges are tombstoned and compacted away lazily
+- Shared-tag edges come from a sparse contact x tag incidence product with
+  TF-IDF weights and a per-tag fan-out cap (see tag_cooccurrence_edges);
+  deltas patch them per contact and a periodic bulk rebuild refreshes weights
+
+snapshot() returns an immutable torch_geometric Data (bidirectional edges,
+compacted node indices), cached until the next mutation.
+"""
+
+import logging
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+import torch
+from torch_geometric.data import Data
+
+from .gnn_snapshots import GRAPH_FEATURE_VERSION, graph_fingerprint
+
+logger = logging.getLogger(__name__)
+
+NUM_NODE_FEATURES = 3
+
+# Edge kinds (part of the edge key, so a tag edge and an interaction edge can coexist)
+TAG_EDGE = 0
+INTERACTION_EDGE = 1
+
+# Tags shared by more contacts than this do not create edges (quadratic blowup,
+# and a tag on everyone carries no signal)
+MAX_TAG_FANOUT = 200
+
+# Contact fields the graph depends on
+GRAPH_FIELDS = ("organization", "influence_score", "tags")
+
+EdgeKey = Tuple[int, int, int]  # (src slot, dst slot, kind), src <= dst
+
+
+def contact_features(contact: Dict) -> List[float]:
+    """
+    Normalized node features of a contact.
+
+    Features (3-dimensional):
+    1. Influence score (normalized to 0-1)
+    2. Tag count (normalized by /10)
+    3. Has organization (binary 0/1)
+    """
+    influence = contact.get("influence_score") or 0.0
+    norm_influence = min(influence / 100.0, 1.0)
+
+    tags = contact.get("tags") or []
+    norm_tag_count = min(len(tags) / 10.0, 1.0)
+
+    has_org = 1.0 if contact.get("organization") else 0.0
+
+    return [norm_influence, norm_tag_count, has_org]
+
+
+def tag_idf(doc_freq, num_contacts: int):
+    """Smoothed inverse document frequency: log((1 + N) / (1 + df)) + 1"""
+    return np.log((1.0 + num_contacts) / (1.0 + np.asarray(doc_freq, dtype=np.float64))) + 1.0
+
+
+def tag_cooccurrence_edges(
+    tag_lists: Sequence[Optional[Iterable[str]]],
+    max_tag_fanout: int = MAX_TAG_FANOUT,
+    num_contacts: Optional[int] = None,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Shared-tag edges from the sparse contact x tag incidence matrix.
+
+    Weight(a, b) = sum of idf over shared linking tags / max(idf mass of a, idf mass of b),
+    where the idf mass is the sum of idf over all tags of a contact. Only tags with
+    2..max_tag_fanout contacts link contacts, so the number of edges is bounded by
+    sum(df^2) over those tags.
+
+    Args:
+        tag_lists: Tags per contact (node order)
+        max_tag_fanout: Tags on more contacts than this create no edges
+        num_contacts: N for idf (default: len(tag_lists))
+
+    Returns:
+        edge_index: int64 [2, num_edges], each undirected edge once (src < dst)
+        edge_weights: float32 [num_edges]
+    """
+    num_nodes = len(tag_lists)
+    vocabulary: Dict[str, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    for idx, tags in enumerate(tag_lists):
+        for tag in set(tags or ()):
+            rows.append(idx)
+            cols.append(vocabulary.setdefault(tag, len(vocabulary)))
+
+    if not rows:
+        return torch.empty((2, 0), dtype=torch.long), torch.empty(0)
+
+    incidence = sp.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(num_nodes, len(vocabulary)),
+    )
+    doc_freq = np.bincount(cols, minlength=len(vocabulary))
+    idf = tag_idf(doc_freq, num_contacts or num_nodes).astype(np.float32)
+
+    weighted = incidence.multiply(idf[np.newaxis, :]).tocsr()
+    idf_mass = np.asarray(weighted.sum(axis=1)).ravel()
+
+    linking = np.flatnonzero((doc_freq >= 2) & (doc_freq <= max_tag_fanout))
+    shared = weighted[:, linking] @ incidence[:, linking].T
+    upper = sp.triu(shared, k=1, format="coo")
+
+    # Written straight into preallocated tensors (no Python edge lists)
+    edge_index = torch.empty((2, upper.nnz), dtype=torch.long)
+    edge_weights = torch.empty(upper.nnz, dtype=torch.float)
+    edge_index.numpy()[0] = upper.row
+    edge_index.numpy()[1] = upper.col
+    edge_weights.numpy()[:] = upper.data / np.maximum(idf_mass[upper.row], idf_mass[upper.col])
+
+    return edge_index, edge_weights
+
+
+class WorkspaceGraph:
+    """Mutable contact graph of one workspace with cheap immutable snapshots."""
+
+    INITIAL_CAPACITY = 64
+
+    # Per-contact tag deltas tolerated before all tag edges are rebuilt (refreshes idf
+    # weights and fan-out caps that drifted as tag frequencies changed)
+    TAG_REBUILD_MIN_UPDATES = 1000
+    TAG_REBUILD_FRACTION = 0.1
+
+    def __init__(self, workspace_id: str, max_tag_fanout: int = MAX_TAG_FANOUT):
+        """
+        Initialize an empty WorkspaceGraph.
+
+        Args:
+            workspace_id: Workspace ID
+            max_tag_fanout: Tags on more contacts than this create no edges
+        """
+        self.workspace_id = workspace_id
+        self.max_tag_fanout = max_tag_fanout
+
+        # Nodes (slot-indexed; removed slots hold None until compaction)
+        self._ids: List[Optional[str]] = []
+        self._slot: Dict[str, int] = {}
+        self._rows: List[Optional[Dict]] = []
+        self._tags: List[FrozenSet[str]] = []
+        self._features = np.zeros((self.INITIAL_CAPACITY, NUM_NODE_FEATURES), dtype=np.float32)
+        self._updated_at: Dict[str, str] = {}
+        self._tag_members: Dict[str, Set[int]] = {}
+        self._dead_nodes = 0
+        self._stale_tag_updates = 0
+
+        # Edges (COO with alive mask)
+        self._src = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._dst = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._weight = np.zeros(self.INITIAL_CAPACITY, dtype=np.float32)
+        self._alive = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        self._num_edge_slots = 0
+        self._edge_slot: Dict[EdgeKey, int] = {}
+        self._node_edges: List[Set[EdgeKey]] = []
+        self._dead_edges = 0
+
+        # Bumped on every mutation; snapshot/fingerprint are cached per revision
+        self.revision = 0
+        self._interaction_revision = 0
+        self._snapshot: Optional[Tuple[Data, List[str], Dict[str, int]]] = None
+        self._fingerprint: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def __contains__(self, contact_id) -> bool:
+        return str(contact_id) in self._slot
+
+    @property
+    def num_edges(self) -> int:
+        """Undirected edges (self-loops included)."""
+        return len(self._edge_slot)
+
+    @property
+    def fingerprint(self) -> str:
+        """graph_fingerprint of the contacts, plus a suffix once interactions were applied."""
+        if self._fingerprint is None:
+            version = GRAPH_FEATURE_VERSION
+            if self._interaction_revision:
+                version = f"{version}+i{self._interaction_revision}"
+            self._fingerprint = graph_fingerprint(
+                ({"id": cid, "updated_at": ts} for cid, ts in self._updated_at.items()), version
+            )
+        return self._fingerprint
+
+    # ------------------------------------------------------------------
+    # Deltas
+    # ------------------------------------------------------------------
+
+    def load(self, contacts: Iterable[Dict]) -> None:
+        """
+        Bulk-add contacts.
+
+        Loading into an empty graph builds all tag edges with one sparse product;
+        otherwise only the new contacts are connected.
+
+        Args:
+            contacts: Rows with id, organization, influence_score, tags, updated_at
+        """
+        was_empty = len(self) == 0
+        new_slots = [self._put_node(contact) for contact in contacts]
+
+        for slot in new_slots:
+            for tag in self._tags[slot]:
+                self._tag_members.setdefault(tag, set()).add(slot)
+
+        if was_empty:
+            self.rebuild_tag_edges()
+        else:
+            for slot in new_slots:
+                self._connect_tags(slot)
+            self._stale_tag_updates += len(new_slots)
+
+        self._touch()
+
+    def rebuild_tag_edges(self) -> None:
+        """Recompute all tag edges (current idf weights and fan-out caps)."""
+        interactions = [
+            (key, float(self._weight[edge]))
+            for key, edge in self._edge_slot.items()
+            if key[2] == INTERACTION_EDGE
+        ]
+        self._reset_edges()
+
+        edge_index, edge_weights = tag_cooccurrence_edges(
+            self._tags, self.max_tag_fanout, num_contacts=len(self)
+        )
+        self._add_edges(edge_index.numpy(), edge_weights.numpy(), TAG_EDGE)
+        for (src, dst, kind), weight in interactions:
+            self._add_edge(src, dst, kind, weight)
+
+        self._stale_tag_updates = 0
+        self._touch()
+
+    def upsert_contact(self, contact: Dict) -> None:
+        """Add a contact or replace its graph fields (tag edges are recomputed for it only)."""
+        contact_id = str(contact["id"])
+        slot = self._slot.get(contact_id)
+
+        if slot is None:
+            self.load([contact])
+            return
+
+        self._rows[slot] = {field: contact.get(field) for field in GRAPH_FIELDS}
+        self._features[slot] = contact_features(contact)
+        self._updated_at[contact_id] = str(contact.get("updated_at") or "")
+        self._set_tags(slot, frozenset(contact.get("tags") or []))
+        self._touch()
+
+    def upsert_contacts(self, contacts: Iterable[Dict]) -> None:
+        contacts = list(contacts)
+        new = [contact for contact in contacts if str(contact["id"]) not in self._slot]
+        for contact in contacts:
+            if str(contact["id"]) in self._slot:
+                self.upsert_contact(contact)
+        if new:
+            self.load(new)
+
+    def update_contact(self, contact_id: str, changes: Dict) -> bool:
+        """
+        Apply a partial update (e.g. a realtime contact_updated event).
+
+        The contact is marked as locally modified, so the next sync re-reads it.
+
+        Returns:
+            False if the contact is not in the graph
+        """
+        contact_id = str(contact_id)
+        slot = self._slot.get(contact_id)
+        if slot is None:
+            return False
+
+        row = dict(self._rows[slot])
+        row.update({field: changes[field] for field in GRAPH_FIELDS if field in changes})
+        row["id"] = contact_id
+        row["updated_at"] = f"local:{self.revision + 1}"
+        self.upsert_contact(row)
+        return True
+
+    def remove_contact(self, contact_id: str) -> bool:
+        """
+        Remove a contact and all its edges.
+
+        Returns:
+            False if the contact is not in the graph
+        """
+        contact_id = str(contact_id)
+        slot = self._slot.pop(contact_id, None)
+        if slot is None:
+            return False
+
+        for key in list(self._node_edges[slot]):
+            self._remove_edge(key)
+        for tag in self._tags[slot]:
+            members = self._tag_members.get(tag)
+            if members is not None:
+                members.discard(slot)
+                if not members:
+                    del self._tag_members[tag]
+
+        self._ids[slot] = None
+        self._rows[slot] = None
+        self._tags[slot] = frozenset()
+        self._updated_at.pop(contact_id, None)
+        self._dead_nodes += 1
+        self._stale_tag_updates += 1
+        self._touch()
+
+        if self._dead_nodes > max(self.INITIAL_CAPACITY, len(self._ids) // 2):
+            self._compact_nodes()
+        return True
+
+    def remove_contacts(self, contact_ids: Iterable[str]) -> None:
+        for contact_id in contact_ids:
+            self.remove_contact(contact_id)
+
+    def log_interaction(
+        self, contact_id: str, other_contact_id: Optional[str] = None, weight: float = 1.0
+    ) -> bool:
+        """
+        Add interaction weight between two contacts (self-loop if other is None).
+
+        Returns:
+            False if a contact is not in the graph
+        """
+        slot_a = self._slot.get(str(contact_id))
+        slot_b = slot_a if other_contact_id is None else self._slot.get(str(other_contact_id))
+        if slot_a is None or slot_b is None:
+            return False
+
+        key = (min(slot_a, slot_b), max(slot_a, slot_b), INTERACTION_EDGE)
+        edge = self._edge_slot.get(key)
+        if edge is None:
+            self._add_edge(key[0], key[1], INTERACTION_EDGE, weight)
+        else:
+            self._weight[edge] += weight
+
+        self._interaction_revision += 1
+        self._touch()
+        return True
+
+    def diff(self, versions: Iterable[Dict]) -> Tuple[List[str], List[str]]:
+        """
+        Compare with the current (id, updated_at) rows of the workspace.
+
+        Returns:
+            Tuple (changed or new contact ids, removed contact ids)
+        """
+        seen = set()
+        changed = []
+        for row in versions:
+            contact_id = str(row["id"])
+            seen.add(contact_id)
+            if self._updated_at.get(contact_id) != str(row.get("updated_at") or ""):
+                changed.append(contact_id)
+
+        removed = [contact_id for contact_id in self._slot if contact_id not in seen]
+        return changed, removed
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Tuple[Data, List[str], Dict[str, int]]:
+        """
+        Immutable graph for training/inference.
+
+        Returns:
+            Tuple (Data with x, edge_index, edge_attr, num_nodes;
+                   contact_ids in node order; contact_id -> node index)
+        """
+        if self._stale_tag_updates > max(
+            self.TAG_REBUILD_MIN_UPDATES, self.TAG_REBUILD_FRACTION * len(self)
+        ):
+            self.rebuild_tag_edges()
+
+        if self._snapshot is not None:
+            return self._snapshot
+
+        num_slots = len(self._ids)
+        node_alive = np.fromiter((cid is not None for cid in self._ids), bool, num_slots)
+        remap = np.cumsum(node_alive) - 1
+
+        edges = np.flatnonzero(self._alive[: self._num_edge_slots])
+        src = remap[self._src[edges]]
+        dst = remap[self._dst[edges]]
+        weight = self._weight[edges]
+
+        # Undirected: add reverse edges (self-loops only once)
+        reverse = src != dst
+        edge_index = np.concatenate(
+            [np.stack([src, dst]), np.stack([dst[reverse], src[reverse]])], 1
+        )
+        edge_weight = np.concatenate([weight, weight[reverse]])
+
+        contact_ids = [cid for cid in self._ids if cid is not None]
+        data = Data(
+            x=torch.from_numpy(self._features[:num_slots][node_alive].copy()),
+            edge_index=torch.from_numpy(np.ascontiguousarray(edge_index, dtype=np.int64)),
+            edge_attr=torch.from_numpy(edge_weight.astype(np.float32)).unsqueeze(1),
+            num_nodes=len(contact_ids),
+        )
+
+        self._snapshot = (data, contact_ids, {cid: idx for idx, cid in enumerate(contact_ids)})
+        return self._snapshot
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _touch(self) -> None:
+        self.revision += 1
+        self._snapshot = None
+        self._fingerprint = None
+
+    def _put_node(self, contact: Dict) -> int:
+        contact_id = str(contact["id"])
+        slot = len(self._ids)
+
+        if slot >= len(self._features):
+            grown = np.zeros((2 * len(self._features), NUM_NODE_FEATURES), dtype=np.float32)
+            grown[:slot] = self._features[:slot]
+            self._features = grown
+
+        self._ids.append(contact_id)
+        self._slot[contact_id] = slot
+        self._rows.append({field: contact.get(field) for field in GRAPH_FIELDS})
+        self._tags.append(frozenset(contact.get("tags") or []))
+        self._node_edges.append(set())
+        self._features[slot] = contact_features(contact)
+        self._updated_at[contact_id] = str(contact.get("updated_at") or "")
+        return slot
+
+    def _set_tags(self, slot: int, tags: FrozenSet[str]) -> None:
+        for key in [key for key in self._node_edges[slot] if key[2] == TAG_EDGE]:
+            self._remove_edge(key)
+        for tag in self._tags[slot] - tags:
+            members = self._tag_members[tag]
+            members.discard(slot)
+            if not members:
+                del self._tag_members[tag]
+
+        self._tags[slot] = tags
+        for tag in tags:
+            self._tag_members.setdefault(tag, set()).add(slot)
+
+        self._connect_tags(slot)
+        self._stale_tag_updates += 1
+
+    def _connect_tags(self, slot: int) -> None:
+        """Tag edges of one contact, weighted with the current tag frequencies."""
+        num_contacts = len(self)
+        linking = [
+            tag
+            for tag in self._tags[slot]
+            if 2 <= len(self._tag_members[tag]) <= self.max_tag_fanout
+        ]
+        if not linking:
+            return
+
+        candidates: Set[int] = set()
+        for tag in linking:
+            candidates |= self._tag_members[tag]
+        candidates.discard(slot)
+
+        idf = {}
+
+        def idf_of(tag):
+            if tag not in idf:
+                idf[tag] = float(tag_idf(len(self._tag_members[tag]), num_contacts))
+            return idf[tag]
+
+        mass = sum(idf_of(tag) for tag in self._tags[slot])
+        linking = frozenset(linking)
+        for other in candidates:
+            other_tags = self._tags[other]
+            shared = sum(idf_of(tag) for tag in linking & other_tags)
+            other_mass = sum(idf_of(tag) for tag in other_tags)
+            key = (min(slot, other), max(slot, other), TAG_EDGE)
+            edge = self._edge_slot.get(key)
+            weight = shared / max(mass, other_mass)
+            if edge is None:
+                self._add_edge(key[0], key[1], TAG_EDGE, weight)
+            else:
+                self._weight[edge] = weight
+
+    def _reset_edges(self) -> None:
+        self._src = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._dst = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._weight = np.zeros(self.INITIAL_CAPACITY, dtype=np.float32)
+        self._alive = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        self._num_edge_slots = 0
+        self._edge_slot = {}
+        self._node_edges = [set() for _ in self._ids]
+        self._dead_edges = 0
+
+    def _reserve_edges(self, count: int) -> None:
+        needed = self._num_edge_slots + count
+        if needed <= len(self._src):
+            return
+        capacity = max(2 * len(self._src), needed)
+        self._src = np.resize(self._src, capacity)
+        self._dst = np.resize(self._dst, capacity)
+        self._weight = np.resize(self._weight, capacity)
+        self._alive = np.resize(self._alive, capacity)
+        self._alive[self._num_edge_slots :] = False
+
+    def _add_edges(self, edge_index: np.ndarray, weights: np.ndarray, kind: int) -> None:
+        """Append new edges in bulk (edge_index [2, n] with src < dst, no existing keys)."""
+        count = edge_index.shape[1]
+        self._reserve_edges(count)
+
+        start = self._num_edge_slots
+        self._src[start : start + count] = edge_index[0]
+        self._dst[start : start + count] = edge_index[1]
+        self._weight[start : start + count] = weights
+        self._alive[start : start + count] = True
+        self._num_edge_slots += count
+
+        node_edges = self._node_edges
+        edge_slot = self._edge_slot
+        for edge, (src, dst) in enumerate(zip(*edge_index.tolist()), start):
+            key = (src, dst, kind)
+            edge_slot[key] = edge
+            node_edges[src].add(key)
+            node_edges[dst].add(key)
+
+    def _add_edge(self, src: int, dst: int, kind: int, weight: float) -> None:
+        self._reserve_edges(1)
+        edge = self._num_edge_slots
+
+        key = (src, dst, kind)
+        self._src[edge] = src
+        self._dst[edge] = dst
+        self._weight[edge] = weight
+        self._alive[edge] = True
+        self._num_edge_slots += 1
+        self._edge_slot[key] = edge
+        self._node_edges[src].add(key)
+        self._node_edges[dst].add(key)
+
+    def _remove_edge(self, key: EdgeKey) -> None:
+        edge = self._edge_slot.pop(key)
+        self._alive[edge] = False
+        self._node_edges[key[0]].discard(key)
+        self._node_edges[key[1]].discard(key)
+        self._dead_edges += 1
+
+        if self._dead_edges > max(self.INITIAL_CAPACITY, self._num_edge_slots // 2):
+            self._compact_edges()
+
+    def _compact_edges(self) -> None:
+        """Drop tombstoned edge slots (amortized O(1) per removal)."""
+        alive = np.flatnonzero(self._alive[: self._num_edge_slots])
+        new_index = np.full(self._num_edge_slots, -1, dtype=np.int64)
+        new_index[alive] = np.arange(len(alive))
+
+        self._src[: len(alive)] = self._src[alive]
+        self._dst[: len(alive)] = self._dst[alive]
+        self._weight[: len(alive)] = self._weight[alive]
+        self._alive[: len(alive)] = True
+        self._alive[len(alive) :] = False
+        self._num_edge_slots = len(alive)
+        self._edge_slot = {key: int(new_index[edge]) for key, edge in self._edge_slot.items()}
+        self._dead_edges = 0
+
+    def _compact_nodes(self) -> None:
+        """Renumber node slots after many removals (rebuilds index structures)."""
+        rows = [
+            {**self._rows[slot], "id": cid, "updated_at": self._updated_at[cid]}
+            for slot, cid in enumerate(self._ids)
+            if cid is not None
+        ]
+        interactions = [
+            (self._ids[key[0]], self._ids[key[1]], float(self._weight[edge]))
+            for key, edge in self._edge_slot.items()
+            if key[2] == INTERACTION_EDGE
+        ]
+        interaction_revision = self._interaction_revision
+        revision = self.revision
+
+        self.__init__(self.workspace_id, self.max_tag_fanout)
+        self.load(rows)
+        for contact_a, contact_b, weight in interactions:
+            self.log_interaction(contact_a, contact_b, weight)
+
+        self._interaction_revision = interaction_revision
+        self.revision = revision + 1
+        self._fingerprint = None
+
+
+class WorkspaceGraphStore:
+    """Per-process registry of WorkspaceGraphs with delta helpers for change events."""
+
+    def __init__(self):
+        self._graphs: Dict[str, WorkspaceGraph] = {}
+
+    def __contains__(self, workspace_id) -> bool:
+        return workspace_id in self._graphs
+
+    def get(self, workspace_id: str) -> Optional[WorkspaceGraph]:
+        return self._graphs.get(workspace_id)
+
+    def put(self, graph: WorkspaceGraph) -> None:
+        self._graphs[graph.workspace_id] = graph
+
+    def drop(self, workspace_id: str) -> None:
+        self._graphs.pop(workspace_id, None)
+
+    def apply_contact_change(
+        self,
+        workspace_id: str,
+        contact_id: str,
+        changes: Optional[Dict] = None,
+        deleted: bool = False,
+    ) -> bool:
+        """
+        Apply a contact event to a loaded workspace graph.
+
+        Args:
+            workspace_id: Workspace ID
+            contact_id: Changed contact
+            changes: Changed fields (a full row for new contacts)
+            deleted: Contact was removed
+
+        Returns:
+            True if the graph changed
+        """
+        graph = self._graphs.get(workspace_id)
+        if graph is None:
+            return False
+        if deleted:
+            return graph.remove_contact(contact_id)
+        if contact_id not in graph:
+            if not changes:
+                return False
+            graph.upsert_contact({**(changes or {}), "id": contact_id, "updated_at": "local"})
+            return True
+        if changes and any(field in changes for field in GRAPH_FIELDS):
+            return graph.update_contact(contact_id, changes)
+        return False
+
+    def apply_interaction(
+        self, workspace_id: str, contact_id: str, other_contact_id: Optional[str] = None
+    ) -> bool:
+        graph = self._graphs.get(workspace_id)
+        return graph is not None and graph.log_interaction(contact_id, other_contact_id)
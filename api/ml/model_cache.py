@@ -0,0 +1,227 @@
+"""
+Bounded Workspace Model Cache
+
+In-memory cache of per-workspace GNN serving state (model, embedding snapshot,
+contact index) with a memory budget, idle TTL and LRU or LFU eviction.
+
+Evicted workspaces are not lost: the embedding snapshot is reloaded from the
+snapshot store and the model from <models_dir>/<workspace_id>.pt the next time
+they are needed (see GNNRecommender._get_snapshot / _get_model).
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Approximate per-contact cost of the contact_ids list + id_to_idx dict (str, slot, dict entry)
+CONTACT_INDEX_BYTES = 200
+
+
+def entry_nbytes(entry: Dict) -> int:
+    """
+    Approximate memory held by a cache entry: model (and optimized inference model)
+    parameters and buffers, embeddings and the contact id index.
+    """
+    total = 0
+
+    modules = [entry.get("model")]
+    if entry.get("inference_model") is not modules[0]:
+        # Eager mode serves the model itself
+        modules.append(entry.get("inference_model"))
+
+    for module in modules:
+        if module is None:
+            continue
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+
+    embeddings = entry.get("embeddings")
+    if isinstance(embeddings, torch.Tensor):
+        total += embeddings.numel() * embeddings.element_size()
+
+    total += len(entry.get("contact_ids") or ()) * CONTACT_INDEX_BYTES
+    return total
+
+
+class WorkspaceModelCache:
+    """
+    Dict-like workspace_id -> entry cache bounded by bytes, with idle TTL.
+
+    get() is the lookup used when serving: it counts hits/misses, refreshes
+    recency/frequency and drops expired entries. peek(), `in` and [] do not.
+    """
+
+    POLICIES = ("lru", "lfu")
+
+    def __init__(
+        self,
+        max_bytes: int = 512 * 1024 * 1024,
+        ttl_seconds: Optional[float] = 6 * 3600,
+        policy: str = "lru",
+        on_evict: Optional[Callable[[str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize WorkspaceModelCache.
+
+        Args:
+            max_bytes: Memory budget (see entry_nbytes)
+            ttl_seconds: Entries idle longer than this expire (None = no TTL)
+            policy: "lru" (least recently used) or "lfu" (least frequently used,
+                ties broken by recency) eviction
+            on_evict: Called with the workspace_id of every evicted/expired entry
+            clock: Time source (for tests)
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.policy = policy
+        self.on_evict = on_evict
+        self.clock = clock
+
+        # workspace_id -> entry; order = recency (oldest first)
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._frequency: Dict[str, int] = {}
+        self._last_access: Dict[str, float] = {}
+        self.nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, workspace_id: str, default=None) -> Optional[Dict]:
+        """Serving lookup: counts hit/miss and refreshes recency."""
+        entry = self._entries.get(workspace_id)
+        if entry is not None and self._expired(workspace_id):
+            self._remove(workspace_id, expired=True)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._touch(workspace_id)
+        return entry
+
+    def peek(self, workspace_id: str, default=None) -> Optional[Dict]:
+        """Lookup without touching statistics, recency or TTL."""
+        return self._entries.get(workspace_id, default)
+
+    def __getitem__(self, workspace_id: str) -> Dict:
+        return self._entries[workspace_id]
+
+    def __setitem__(self, workspace_id: str, entry: Dict) -> None:
+        if workspace_id in self._entries:
+            self.nbytes -= self._sizes[workspace_id]
+            del self._entries[workspace_id]
+
+        size = entry_nbytes(entry)
+        self._entries[workspace_id] = entry
+        self._sizes[workspace_id] = size
+        self.nbytes += size
+        self._touch(workspace_id)
+
+        if size > self.max_bytes:
+            logger.warning(
+                f"GNN cache entry for {workspace_id} ({size} bytes) exceeds the "
+                f"{self.max_bytes} byte budget"
+            )
+        self._evict(keep=workspace_id)
+
+    def __delitem__(self, workspace_id: str) -> None:
+        if workspace_id not in self._entries:
+            raise KeyError(workspace_id)
+        self._remove(workspace_id)
+
+    def __contains__(self, workspace_id) -> bool:
+        return workspace_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def pop(self, workspace_id: str, default=None) -> Optional[Dict]:
+        entry = self._entries.get(workspace_id)
+        if entry is None:
+            return default
+        self._remove(workspace_id)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._sizes.clear()
+        self._frequency.clear()
+        self._last_access.clear()
+        self.nbytes = 0
+
+    def expire(self) -> int:
+        """Drop all entries idle longer than the TTL; returns how many were dropped."""
+        expired = [workspace_id for workspace_id in self._entries if self._expired(workspace_id)]
+        for workspace_id in expired:
+            self._remove(workspace_id, expired=True)
+        return len(expired)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "policy": self.policy,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _touch(self, workspace_id: str) -> None:
+        self._entries.move_to_end(workspace_id)
+        self._frequency[workspace_id] = self._frequency.get(workspace_id, 0) + 1
+        self._last_access[workspace_id] = self.clock()
+
+    def _expired(self, workspace_id: str) -> bool:
+        return (
+            self.ttl_seconds is not None
+            and self.clock() - self._last_access[workspace_id] > self.ttl_seconds
+        )
+
+    def _evict(self, keep: str) -> None:
+        self.expire()
+
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            candidates = (workspace_id for workspace_id in self._entries if workspace_id != keep)
+            if self.policy == "lfu":
+                # min() keeps the first (least recent) of equally frequent entries
+                victim = min(candidates, key=self._frequency.__getitem__)
+            else:
+                victim = next(candidates)
+            self._remove(victim, evicted=True)
+
+    def _remove(self, workspace_id: str, evicted: bool = False, expired: bool = False) -> None:
+        del self._entries[workspace_id]
+        self.nbytes -= self._sizes.pop(workspace_id)
+        self._frequency.pop(workspace_id, None)
+        self._last_access.pop(workspace_id, None)
+
+        if evicted or expired:
+            if evicted:
+                self.evictions += 1
+            else:
+                self.expirations += 1
+            logger.info(f"GNN cache {'evicted' if evicted else 'expired'} workspace {workspace_id}")
+            if self.on_evict is not None:
+                self.on_evict(workspace_id)
@@ -0,0 +1,114 @@
+"""
+Neighbour Sampling for Mini-Batch GNN Training
+
+GraphSAGE-style sampler: starting from a batch of seed nodes, take up to
+num_neighbors[l] in-neighbours per node at hop l and return the induced
+message-passing subgraph with local node indices. Memory per step is bounded by
+the fan-outs, not by the size of the workspace graph.
+
+Pure numpy over a CSR index (no pyg-lib / torch-sparse needed).
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+
+class NeighborSampler:
+    """Samples fixed-fanout neighbourhoods of seed nodes."""
+
+    def __init__(
+        self,
+        edge_index: torch.Tensor,
+        num_nodes: int,
+        num_neighbors: Sequence[int] = (10, 10, 10),
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize NeighborSampler.
+
+        Args:
+            edge_index: [2, num_edges] (source, target); messages flow source -> target
+            num_nodes: Number of nodes
+            num_neighbors: Neighbours sampled per node at each hop (one entry per GNN layer)
+            seed: Random seed
+        """
+        self.num_nodes = num_nodes
+        self.num_neighbors = list(num_neighbors)
+        self.rng = np.random.default_rng(seed)
+
+        src = edge_index[0].cpu().numpy()
+        dst = edge_index[1].cpu().numpy()
+
+        # CSR over targets: in-neighbours of v are sources[indptr[v]:indptr[v + 1]]
+        order = np.argsort(dst, kind="stable")
+        self.sources = src[order]
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=num_nodes), out=self.indptr[1:])
+
+        # global -> local index scratch space, reset after every sample()
+        self._local = np.full(num_nodes, -1, dtype=np.int64)
+
+    def sample(self, seeds: np.ndarray) -> Tuple[np.ndarray, torch.Tensor]:
+        """
+        Sampled subgraph around seed nodes.
+
+        Args:
+            seeds: Unique global node indices; they get local indices 0..len(seeds)-1
+
+        Returns:
+            Tuple (global ids of subgraph nodes, local edge_index [2, num_sampled_edges])
+        """
+        seeds = np.asarray(seeds, dtype=np.int64)
+        local = self._local
+        local[seeds] = np.arange(len(seeds))
+
+        node_ids = [seeds]
+        num_sampled = len(seeds)
+        edge_src = []
+        edge_dst = []
+        frontier = seeds
+
+        for fanout in self.num_neighbors:
+            if len(frontier) == 0:
+                break
+
+            starts = self.indptr[frontier]
+            degrees = self.indptr[frontier + 1] - starts
+            take = np.minimum(degrees, fanout)
+            total = int(take.sum())
+            if total == 0:
+                break
+
+            # Position of each sample within its node: all neighbours when the degree fits
+            # the fan-out, otherwise uniform random picks (with replacement)
+            first = np.repeat(np.cumsum(take) - take, take)
+            position = np.arange(total) - first
+            node_degree = np.repeat(degrees, take)
+            random_pick = (self.rng.random(total) * node_degree).astype(np.int64)
+            offsets = np.where(node_degree > fanout, random_pick, position)
+
+            neighbors = self.sources[np.repeat(starts, take) + offsets]
+            targets = np.repeat(frontier, take)
+
+            new_nodes = np.unique(neighbors[local[neighbors] < 0])
+            local[new_nodes] = np.arange(num_sampled, num_sampled + len(new_nodes))
+            num_sampled += len(new_nodes)
+            node_ids.append(new_nodes)
+
+            edge_src.append(local[neighbors])
+            edge_dst.append(local[targets])
+            frontier = new_nodes
+
+        node_ids = np.concatenate(node_ids)
+        local[node_ids] = -1
+
+        if edge_src:
+            edge_index = torch.from_numpy(
+                np.stack([np.concatenate(edge_src), np.concatenate(edge_dst)])
+            )
+        else:
+            edge_index = torch.empty((2, 0), dtype=torch.long)
+
+        return node_ids, edge_index
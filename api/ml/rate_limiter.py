@@ -0,0 +1,168 @@
+"""
+Adaptive Rate Limiter
+
+Token bucket for OpenAI-style limits (requests per minute and tokens per minute).
+Instead of fixed sleeps between batches, capacity follows the x-ratelimit-* response
+headers and backs off multiplicatively on 429 responses.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Awaitable, Callable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI reset durations like "1s", "6m0s", "250ms" into seconds."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class AdaptiveRateLimiter:
+    """Requests/tokens per minute token bucket with AIMD backoff."""
+
+    def __init__(
+        self,
+        requests_per_minute: int = 3000,
+        tokens_per_minute: int = 1_000_000,
+        min_rate_fraction: float = 0.05,
+        recovery_step: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Initialize AdaptiveRateLimiter.
+
+        Args:
+            requests_per_minute: Initial request limit (updated from headers)
+            tokens_per_minute: Initial token limit (updated from headers)
+            min_rate_fraction: Lowest refill rate after repeated 429s (fraction of limit)
+            recovery_step: Rate fraction regained after each successful request
+            clock: Monotonic clock (injectable for tests)
+            sleep: Async sleep (injectable for tests)
+        """
+        self.requests_per_minute = float(requests_per_minute)
+        self.tokens_per_minute = float(tokens_per_minute)
+        self.min_rate_fraction = min_rate_fraction
+        self.recovery_step = recovery_step
+        self._clock = clock
+        self._sleep = sleep
+
+        self.rate_fraction = 1.0
+        self._request_level = self.requests_per_minute
+        self._token_level = self.tokens_per_minute
+        self._paused_until = 0.0
+        self._last_refill = clock()
+        self._lock = asyncio.Lock()
+
+        # Counters
+        self.rate_limited = 0
+        self.waited_seconds = 0.0
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until one request carrying `tokens` tokens may be sent."""
+        async with self._lock:
+            # A single request larger than the bucket would wait forever
+            tokens = min(tokens, self.tokens_per_minute)
+
+            while True:
+                self._refill()
+                now = self._clock()
+
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._request_level >= 1 and self._token_level >= tokens:
+                    self._request_level -= 1
+                    self._token_level -= tokens
+                    return
+                else:
+                    wait = max(
+                        (1 - self._request_level) / self._rate(self.requests_per_minute),
+                        (tokens - self._token_level) / self._rate(self.tokens_per_minute),
+                        0.001,
+                    )
+
+                self.waited_seconds += wait
+                await self._sleep(wait)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Align limits and current levels with x-ratelimit-* response headers."""
+        if not headers:
+            return
+        headers = {key.lower(): value for key, value in headers.items()}
+
+        self._refill()
+        for kind in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            try:
+                if limit is not None:
+                    setattr(self, f"{kind}_per_minute", float(limit))
+                if remaining is not None:
+                    level = f"_{kind[:-1]}_level"
+                    setattr(self, level, min(getattr(self, level), float(remaining)))
+            except ValueError:
+                logger.debug(f"Ignoring malformed rate limit header for {kind}")
+
+    def on_success(self) -> None:
+        """Additive increase of the refill rate after a successful request."""
+        self.rate_fraction = min(1.0, self.rate_fraction + self.recovery_step)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease after a 429 and pause until retry_after."""
+        self.rate_limited += 1
+        self.rate_fraction = max(self.min_rate_fraction, self.rate_fraction / 2)
+        self._request_level = min(self._request_level, 0.0)
+
+        pause = retry_after if retry_after is not None else 60.0 / self.requests_per_minute
+        self._paused_until = max(self._paused_until, self._clock() + pause)
+        logger.warning(
+            f"Rate limited: pausing {pause:.2f}s, rate reduced to {self.rate_fraction:.0%}"
+        )
+
+    def _rate(self, per_minute: float) -> float:
+        return max(per_minute * self.rate_fraction / 60.0, 1e-9)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_level = min(
+            self.requests_per_minute,
+            self._request_level + elapsed * self._rate(self.requests_per_minute),
+        )
+        self._token_level = min(
+            self.tokens_per_minute,
+            self._token_level + elapsed * self._rate(self.tokens_per_minute),
+        )
+
+
+def retry_after_from_headers(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds to wait from retry-after-ms / retry-after / x-ratelimit-reset-* headers."""
+    if not headers:
+        return None
+    headers = {key.lower(): value for key, value in headers.items()}
+
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    for key in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        seconds = parse_duration(headers.get(key))
+        if seconds is not None:
+            return seconds
+    return None
@@ -6,15 +6,35 @@ Recommendation Engine
 - Semantic similarity (embeddings)
 - Influence scores
 - Organization overlap
+
+Friends-of-friends and mutual-friend counts come from an in-memory
+ContactAdjacency loaded once from contact_connections and cached (TTL, explicit
+invalidation after connection writes). Candidates are hydrated with one
+batched query and scored together as NumPy arrays.
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Set
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
 from supabase import Client
 
+from .graph_neighborhood import ContactAdjacency
+
 logger = logging.getLogger(__name__)
 
+# Live engines in this process, so connection writes can drop their cached graphs
+_engines: "weakref.WeakSet[RecommendationEngine]" = weakref.WeakSet()
+
+
+def invalidate_connection_graphs() -> None:
+    """Drop the cached connection graph of every engine in this process."""
+    for engine in list(_engines):
+        engine.invalidate_adjacency()
+
 
 class RecommendationEngine:
     """Engine for generating contact recommendations."""
@@ -25,178 +45,293 @@ class RecommendationEngine:
     WEIGHT_INFLUENCE_SCORE = 0.25
     WEIGHT_SAME_ORGANIZATION = 0.15
 
-    def __init__(self, supabase_client: Client, embeddings_service):
+    # Rows per request when loading contact_connections
+    CONNECTIONS_PAGE_SIZE = 1000
+
+    # Candidate ids per contacts in_() query (keeps the URL short)
+    CANDIDATE_BATCH_SIZE = 500
+
+    # 10+ mutual friends = full mutual_friends score
+    MUTUAL_FRIENDS_SATURATION = 10.0
+
+    def __init__(
+        self, supabase_client: Client, embeddings_service, adjacency_ttl_seconds: float = 300.0
+    ):
         """
         Initialize RecommendationEngine.
 
         Args:
             supabase_client: Supabase client instance
             embeddings_service: ContactEmbeddingsService instance
+            adjacency_ttl_seconds: Reload the connection graph after this many seconds
+                (picks up writes from other processes)
         """
         self.supabase = supabase_client
         self.embeddings_service = embeddings_service
+        self.adjacency_ttl_seconds = adjacency_ttl_seconds
+
+        self._adjacency: Optional[ContactAdjacency] = None
+        self._adjacency_loaded_at = 0.0
+        self._adjacency_lock = asyncio.Lock()
+
+        _engines.add(self)
 
     async def recommend_contacts(
-        self, user_contact_id: str, limit: int = 20, min_score: float = 0.6
-    ) -> List[Dict]:
+        self,
+        user_contact_id: str,
+        limit: int = 20,
+        min_score: float = 0.6,
+        return_timings: bool = False,
+    ) -> Union[List[Dict], Dict]:
         """
         Generate contact recommendations for a user.
 
         Algorithm:
-        1. Get friends-of-friends (2-hop network)
-        2. Compute recommendation score for each candidate
-        3. Filter by min_score
-        4. Return top-N with explanations
+        1. Get friends-of-friends (2-hop network) with mutual-friend counts
+        2. Load all candidate contacts in batched in_() queries
+        3. Get semantic similarity to all candidates in one call
+        4. Score all candidates as arrays, filter by min_score, select top-N
 
         Args:
             user_contact_id: Target user's contact UUID
             limit: Maximum number of recommendations
             min_score: Minimum recommendation score (0.0-1.0)
+            return_timings: Also return per-stage timings
 
         Returns:
-            List of recommended contacts with scores and reasons
+            List of recommended contacts with scores and reasons, or with
+            return_timings={"recommendations": [...], "timings_ms": {stage: ms}}
         """
+        timings = {}
+        stage_start = time.perf_counter()
+
+        def finish_stage(name: str) -> None:
+            nonlocal stage_start
+            now = time.perf_counter()
+            timings[name] = round((now - stage_start) * 1000, 3)
+            stage_start = now
+
+        def respond(recommendations: List[Dict]) -> Union[List[Dict], Dict]:
+            timings["total"] = round(sum(timings.values()), 3)
+            logger.info(f"Recommendation timings for {user_contact_id} (ms): {timings}")
+            if return_timings:
+                return {"recommendations": recommendations, "timings_ms": timings}
+            return recommendations
+
         try:
             logger.info(f"Generating {limit} recommendations for contact {user_contact_id}")
 
-            # Step 1: Get user's direct connections
+            # Step 1: Get user contact
             user_response = (
                 self.supabase.table("contacts").select("*").eq("id", user_contact_id).execute()
             )
 
             if not user_response.data or len(user_response.data) == 0:
                 logger.warning(f"Contact {user_contact_id} not found")
-                return []
+                return respond([])
 
             user_contact = user_response.data[0]
+            finish_stage("user")
 
             # Step 2: Get friends-of-friends
             candidates = await self._get_friends_of_friends(user_contact_id)
+            finish_stage("candidates")
 
             if not candidates:
                 logger.info(f"No candidate contacts found for {user_contact_id}")
-                return []
+                return respond([])
 
             logger.info(f"Found {len(candidates)} candidate contacts")
 
-            # Step 3: Compute recommendation scores
-            recommendations = []
-
-            for candidate_id in candidates:
-                try:
-                    score_data = await self._compute_recommendation_score(
-                        user_contact_id, candidate_id, user_contact
-                    )
-
-                    if score_data["total_score"] >= min_score:
-                        # Get candidate contact data
-                        candidate_response = (
-                            self.supabase.table("contacts")
-                            .select("*")
-                            .eq("id", candidate_id)
-                            .execute()
-                        )
-
-                        if candidate_response.data:
-                            candidate = candidate_response.data[0]
-
-                            recommendations.append(
-                                {
-                                    "contact_id": candidate_id,
-                                    "first_name": candidate.get("first_name"),
-                                    "last_name": candidate.get("last_name"),
-                                    "organization": candidate.get("organization"),
-                                    "influence_score": candidate.get("influence_score", 0.0),
-                                    "recommendation_score": score_data["total_score"],
-                                    "score_components": score_data["components"],
-                                    "reason": self._explain_reason(score_data),
-                                }
-                            )
-
-                except Exception as e:
-                    logger.error(f"Error computing score for candidate {candidate_id}: {str(e)}")
-                    continue
-
-            # Step 4: Sort by score and return top-N
-            recommendations.sort(key=lambda x: x["recommendation_score"], reverse=True)
-            top_recommendations = recommendations[:limit]
+            # Step 3: Candidate contact rows (missing contacts are dropped)
+            rows = self._fetch_candidates(list(candidates))
+            finish_stage("hydrate")
+
+            if not rows:
+                return respond([])
+
+            # Step 4: Semantic similarity for all candidates at once
+            candidate_ids = [row["id"] for row in rows]
+            try:
+                similarities = await self.embeddings_service.get_similarities(
+                    user_contact_id, candidate_ids
+                )
+                # Cosine similarity is -1..1, shift to 0..1 (unknown embedding = 0)
+                semantic = (
+                    np.array([similarities.get(cid, 0.0) for cid in candidate_ids]) + 1.0
+                ) / 2.0
+            except Exception as e:
+                logger.warning(f"Could not compute semantic similarity: {str(e)}")
+                semantic = np.zeros(len(rows))
+            finish_stage("similarity")
+
+            # Step 5: Vectorized scoring and top-N selection
+            components, total = self._score_candidates(
+                user_contact,
+                rows,
+                np.array([candidates[cid] for cid in candidate_ids], dtype=np.float64),
+                semantic,
+            )
+
+            passing = np.flatnonzero(total >= min_score)
+            if limit < len(passing):
+                passing = passing[np.argpartition(-total[passing], limit - 1)[:limit]]
+            top = passing[np.argsort(-total[passing], kind="stable")]
+
+            top_recommendations = []
+            for i in top.tolist():
+                score_data = {
+                    "total_score": float(total[i]),
+                    "components": {name: float(values[i]) for name, values in components.items()},
+                }
+                top_recommendations.append(
+                    {
+                        "contact_id": candidate_ids[i],
+                        "first_name": rows[i].get("first_name"),
+                        "last_name": rows[i].get("last_name"),
+                        "organization": rows[i].get("organization"),
+                        "influence_score": rows[i].get("influence_score", 0.0),
+                        "recommendation_score": score_data["total_score"],
+                        "score_components": score_data["components"],
+                        "reason": self._explain_reason(score_data),
+                    }
+                )
+            finish_stage("scoring")
 
             logger.info(
-                f"Generated {len(top_recommendations)} recommendations (filtered from {len(recommendations)} with score >= {min_score})"
+                f"Generated {len(top_recommendations)} recommendations "
+                f"({len(passing)} of {len(rows)} candidates with score >= {min_score})"
             )
 
-            return top_recommendations
+            return respond(top_recommendations)
 
         except Exception as e:
             logger.error(f"Failed to generate recommendations for {user_contact_id}: {str(e)}")
-            return []
+            return respond([])
 
-    async def _get_friends_of_friends(self, contact_id: str) -> Set[str]:
+    def _fetch_candidates(self, candidate_ids: List[str]) -> List[Dict]:
+        """Candidate contact rows, CANDIDATE_BATCH_SIZE ids per query."""
+        rows = []
+        for start in range(0, len(candidate_ids), self.CANDIDATE_BATCH_SIZE):
+            response = (
+                self.supabase.table("contacts")
+                .select("id, first_name, last_name, organization, influence_score")
+                .in_("id", candidate_ids[start : start + self.CANDIDATE_BATCH_SIZE])
+                .execute()
+            )
+            rows.extend(response.data or [])
+        return rows
+
+    def _score_candidates(
+        self,
+        user_contact: Dict,
+        rows: List[Dict],
+        mutual_counts: np.ndarray,
+        semantic: np.ndarray,
+    ) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
         """
-        Get 2-hop network: friends of friends who are not direct friends.
+        Weighted recommendation scores for all candidates.
+
+        Components:
+        - mutual_friends: 0.3
+        - semantic_similarity: 0.3
+        - influence_score: 0.25
+        - same_organization: 0.15
 
         Args:
-            contact_id: Source contact UUID
+            user_contact: User contact data
+            rows: Candidate contact rows
+            mutual_counts: Mutual friends per candidate
+            semantic: Semantic similarity per candidate (0-1)
 
         Returns:
-            Set of candidate contact IDs
+            Tuple (components name -> array, total score array rounded to 3 places)
         """
-        try:
-            # Get direct connections (1-hop)
-            direct_friends_response = (
-                self.supabase.table("contact_connections")
-                .select("contact_id_2")
-                .eq("contact_id_1", contact_id)
-                .execute()
-            )
+        user_org = (user_contact.get("organization") or "").lower().strip()
+
+        components = {
+            "mutual_friends": np.minimum(mutual_counts / self.MUTUAL_FRIENDS_SATURATION, 1.0),
+            "semantic_similarity": semantic,
+            "influence_score": np.array(
+                [row.get("influence_score") or 0.0 for row in rows], dtype=np.float64
+            ),
+            "same_organization": np.array(
+                [
+                    bool(user_org) and (row.get("organization") or "").lower().strip() == user_org
+                    for row in rows
+                ],
+                dtype=np.float64,
+            ),
+        }
+
+        total = (
+            components["mutual_friends"] * self.WEIGHT_MUTUAL_FRIENDS
+            + components["semantic_similarity"] * self.WEIGHT_SEMANTIC_SIMILARITY
+            + components["influence_score"] * self.WEIGHT_INFLUENCE_SCORE
+            + components["same_organization"] * self.WEIGHT_SAME_ORGANIZATION
+        )
+
+        return components, np.round(total, 3)
+
+    async def get_adjacency(self) -> ContactAdjacency:
+        """
+        Connection graph, loaded once and cached.
 
-            direct_friends = set()
-            for row in direct_friends_response.data:
-                direct_friends.add(row["contact_id_2"])
+        Concurrent callers share a single load; the cache expires after
+        adjacency_ttl_seconds or on invalidate_adjacency().
 
-            # Also check reverse connections
-            reverse_friends_response = (
+        Returns:
+            ContactAdjacency over all contact_connections
+        """
+        async with self._adjacency_lock:
+            expired = time.monotonic() - self._adjacency_loaded_at > self.adjacency_ttl_seconds
+            if self._adjacency is None or expired:
+                start = time.monotonic()
+                self._adjacency = ContactAdjacency(self._fetch_connections())
+                self._adjacency_loaded_at = time.monotonic()
+                logger.info(
+                    f"Loaded connection graph: {len(self._adjacency)} contacts, "
+                    f"{self._adjacency.num_edges} connections "
+                    f"in {self._adjacency_loaded_at - start:.2f}s"
+                )
+            return self._adjacency
+
+    def invalidate_adjacency(self) -> None:
+        """Drop the cached graph (call after writing contact_connections)."""
+        self._adjacency = None
+
+    def _fetch_connections(self) -> List[Tuple[str, str]]:
+        """All (contact_id_1, contact_id_2) pairs, paged."""
+        edges = []
+        start = 0
+        while True:
+            rows = (
                 self.supabase.table("contact_connections")
-                .select("contact_id_1")
-                .eq("contact_id_2", contact_id)
+                .select("contact_id_1, contact_id_2")
+                .range(start, start + self.CONNECTIONS_PAGE_SIZE - 1)
                 .execute()
-            )
-
-            for row in reverse_friends_response.data:
-                direct_friends.add(row["contact_id_1"])
+            ).data or []
+            edges.extend((row["contact_id_1"], row["contact_id_2"]) for row in rows)
+            if len(rows) < self.CONNECTIONS_PAGE_SIZE:
+                return edges
+            start += self.CONNECTIONS_PAGE_SIZE
 
-            logger.info(f"Contact {contact_id} has {len(direct_friends)} direct friends")
+    async def _get_friends_of_friends(self, contact_id: str) -> Dict[str, int]:
+        """
+        Get 2-hop network: friends of friends who are not direct friends.
 
-            # Get friends-of-friends (2-hop)
-            friends_of_friends = set()
+        Args:
+            contact_id: Source contact UUID
 
-            for friend_id in direct_friends:
-                # Get friend's connections
-                fof_response = (
-                    self.supabase.table("contact_connections")
-                    .select("contact_id_2")
-                    .eq("contact_id_1", friend_id)
-                    .execute()
-                )
+        Returns:
+            Dictionary candidate contact ID -> number of mutual friends
+        """
+        try:
+            adjacency = await self.get_adjacency()
 
-                for row in fof_response.data:
-                    fof_id = row["contact_id_2"]
-                    # Exclude self and direct friends
-                    if fof_id != contact_id and fof_id not in direct_friends:
-                        friends_of_friends.add(fof_id)
-
-                # Check reverse connections
-                fof_reverse_response = (
-                    self.supabase.table("contact_connections")
-                    .select("contact_id_1")
-                    .eq("contact_id_2", friend_id)
-                    .execute()
-                )
+            logger.info(f"Contact {contact_id} has {adjacency.degree(contact_id)} direct friends")
 
-                for row in fof_reverse_response.data:
-                    fof_id = row["contact_id_1"]
-                    if fof_id != contact_id and fof_id not in direct_friends:
-                        friends_of_friends.add(fof_id)
+            friends_of_friends = adjacency.friends_of_friends(contact_id)
 
             logger.info(f"Found {len(friends_of_friends)} friends-of-friends candidates")
 
@@ -204,7 +339,7 @@ class RecommendationEngine:
 
         except Exception as e:
             logger.error(f"Error getting friends-of-friends for {contact_id}: {str(e)}")
-            return set()
+            return {}
 
     async def _count_mutual_friends(self, contact_id_1: str, contact_id_2: str) -> int:
         """
@@ -218,149 +353,13 @@ class RecommendationEngine:
             Number of mutual friends
         """
         try:
-            # Get friends of contact 1
-            friends_1_response = (
-                self.supabase.table("contact_connections")
-                .select("contact_id_2")
-                .eq("contact_id_1", contact_id_1)
-                .execute()
-            )
-            friends_1 = set(row["contact_id_2"] for row in friends_1_response.data)
-
-            # Also check reverse
-            reverse_1_response = (
-                self.supabase.table("contact_connections")
-                .select("contact_id_1")
-                .eq("contact_id_2", contact_id_1)
-                .execute()
-            )
-            friends_1.update(row["contact_id_1"] for row in reverse_1_response.data)
-
-            # Get friends of contact 2
-            friends_2_response = (
-                self.supabase.table("contact_connections")
-                .select("contact_id_2")
-                .eq("contact_id_1", contact_id_2)
-                .execute()
-            )
-            friends_2 = set(row["contact_id_2"] for row in friends_2_response.data)
-
-            # Also check reverse
-            reverse_2_response = (
-                self.supabase.table("contact_connections")
-                .select("contact_id_1")
-                .eq("contact_id_2", contact_id_2)
-                .execute()
-            )
-            friends_2.update(row["contact_id_1"] for row in reverse_2_response.data)
-
-            # Count mutual friends
-            mutual = friends_1.intersection(friends_2)
-
-            return len(mutual)
+            adjacency = await self.get_adjacency()
+            return adjacency.mutual_friends(contact_id_1, contact_id_2)
 
         except Exception as e:
             logger.error(f"Error counting mutual friends: {str(e)}")
             return 0
 
-    async def _compute_recommendation_score(
-        self, user_id: str, candidate_id: str, user_contact: Dict
-    ) -> Dict:
-        """
-        Compute weighted recommendation score.
-
-        Components:
-        - mutual_friends: 0.3
-        - semantic_similarity: 0.3
-        - influence_score: 0.25
-        - same_organization: 0.15
-
-        Args:
-            user_id: User contact UUID
-            candidate_id: Candidate contact UUID
-            user_contact: User contact data
-
-        Returns:
-            Dictionary with total_score and components breakdown
-        """
-        try:
-            components = {}
-
-            # Component 1: Mutual friends (normalized 0-1)
-            mutual_count = await self._count_mutual_friends(user_id, candidate_id)
-            mutual_score = min(mutual_count / 10.0, 1.0)  # Normalize: 10+ mutual friends = 1.0
-            components["mutual_friends"] = mutual_score
-
-            # Component 2: Semantic similarity (from embeddings)
-            try:
-                similar_contacts = await self.embeddings_service.find_similar_contacts(
-                    user_id, top_n=100
-                )
-
-                similarity_score = 0.0
-                for similar in similar_contacts:
-                    if similar["contact_id"] == candidate_id:
-                        similarity_score = similar["similarity"]
-                        break
-
-                # Normalize to 0-1 range (cosine similarity is already -1 to 1, shift to 0-1)
-                similarity_score = (similarity_score + 1.0) / 2.0
-                components["semantic_similarity"] = similarity_score
-
-            except Exception as e:
-                logger.warning(f"Could not compute semantic similarity: {str(e)}")
-                components["semantic_similarity"] = 0.0
-
-            # Component 3: Influence score (higher influence = better recommendation)
-            candidate_response = (
-                self.supabase.table("contacts")
-                .select("influence_score")
-                .eq("id", candidate_id)
-                .execute()
-            )
-
-            if candidate_response.data:
-                influence_score = candidate_response.data[0].get("influence_score", 0.0)
-                components["influence_score"] = influence_score
-            else:
-                components["influence_score"] = 0.0
-
-            # Component 4: Same organization bonus
-            candidate_org_response = (
-                self.supabase.table("contacts")
-                .select("organization")
-                .eq("id", candidate_id)
-                .execute()
-            )
-
-            same_org_score = 0.0
-            if candidate_org_response.data:
-                candidate_org = candidate_org_response.data[0].get("organization")
-                user_org = user_contact.get("organization")
-
-                if (
-                    candidate_org
-                    and user_org
-                    and candidate_org.lower().strip() == user_org.lower().strip()
-                ):
-                    same_org_score = 1.0
-
-            components["same_organization"] = same_org_score
-
-            # Compute weighted total score
-            total_score = (
-                components["mutual_friends"] * self.WEIGHT_MUTUAL_FRIENDS
-                + components["semantic_similarity"] * self.WEIGHT_SEMANTIC_SIMILARITY
-                + components["influence_score"] * self.WEIGHT_INFLUENCE_SCORE
-                + components["same_organization"] * self.WEIGHT_SAME_ORGANIZATION
-            )
-
-            return {"total_score": round(total_score, 3), "components": components}
-
-        except Exception as e:
-            logger.error(f"Error computing recommendation score: {str(e)}")
-            return {"total_score": 0.0, "components": {}}
-
     def _explain_reason(self, score_data: Dict) -> str:
         """
         Generate human-readable explanation for recommendation.
@@ -5,6 +5,7 @@ API endpoints for Graph Neural Network-based contact recommendations.
 """
 
 import logging
+from dataclasses import asdict
 from datetime import datetime
 from typing import Dict
 
@@ -14,6 +15,41 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/ml/gnn", tags=["GNN Recommendations"])
 
+# Shared recommender: keeps embedding snapshots in memory between requests
+_recommender = None
+
+
+def get_recommender():
+    """Lazy initialization of the shared GNNRecommender."""
+    global _recommender
+    if _recommender is None:
+        # Import here to avoid circular imports
+        from api.main import supabase
+        from api.ml.gnn_recommender import GNNRecommender
+
+        _recommender = GNNRecommender(supabase)
+    return _recommender
+
+
+def invalidate_contact_details(workspace_id: str, contact_ids=None) -> None:
+    """Contact update/delete hook: drop cached details so recommendations show the edit."""
+    if _recommender is not None:
+        _recommender.invalidate_contacts(workspace_id, contact_ids)
+
+
+def apply_contact_change(
+    workspace_id: str, contact_id: str, changes=None, deleted: bool = False
+) -> None:
+    """Contact created/updated/deleted hook: patch cached details and the workspace graph."""
+    if _recommender is not None:
+        _recommender.apply_contact_change(workspace_id, contact_id, changes, deleted)
+
+
+def record_interaction(workspace_id: str, contact_id: str) -> None:
+    """Interaction hook (e.g. note added): add interaction weight to the workspace graph."""
+    if _recommender is not None:
+        _recommender.record_interaction(workspace_id, contact_id)
+
 
 @router.get("/recommendations/{workspace_id}/{contact_id}")
 async def get_gnn_recommendations(
@@ -55,11 +91,7 @@ async def get_gnn_recommendations(
     """
 
     try:
-        # Import here to avoid circular imports
-        from api.main import supabase
-        from api.ml.gnn_recommender import GNNRecommender
-
-        recommender = GNNRecommender(supabase)
+        recommender = get_recommender()
 
         result = await recommender.get_recommendations(
             workspace_id=workspace_id,
@@ -80,23 +112,38 @@ async def get_gnn_recommendations(
 
 
 @router.post("/train/{workspace_id}")
-async def train_gnn_model(workspace_id: str, epochs: int = 20) -> Dict:
+async def train_gnn_model(workspace_id: str, epochs: int = 20, wait: bool = False) -> Dict:
     """
-    Обучи GNN модель на данных workspace'а
+    Обучи GNN модель на данных workspace'а (фоновая задача)
 
     Запусти это если:
     - Добавили много новых контактов
     - Изменились взаимодействия
     - Хочешь улучшить accuracy
 
+    Обучение идёт в очереди: одна задача на workspace, повторный вызов вернёт
+    уже запущенную. Прогресс: GET /model-status/{workspace_id}.
+
     Args:
         workspace_id: ID workspace'а
         epochs: Кол-во эпох обучения (по умолчанию 20)
+        wait: Дождаться окончания обучения (по умолчанию false)
 
     Returns:
+        {
+            "job_id": "...",
+            "workspace_id": "...",
+            "status": "queued",
+            "progress": 0.0,
+            "epoch": 0,
+            "epochs": 20,
+            ...
+        }
+        with wait=true:
         {
             "status": "training_complete",
             "workspace_id": "...",
+            "job_id": "...",
             "epochs": 20,
             "nodes": 150,
             "edges": 1200,
@@ -110,14 +157,14 @@ async def train_gnn_model(workspace_id: str, epochs: int = 20) -> Dict:
     try:
         logger.info(f"Starting model training for workspace {workspace_id}")
 
-        from api.main import supabase
-        from api.ml.gnn_recommender import GNNRecommender
+        recommender = get_recommender()
 
-        recommender = GNNRecommender(supabase)
+        job = recommender.submit_training(workspace_id=workspace_id, epochs=epochs)
 
-        result = await recommender.train_model(workspace_id=workspace_id, epochs=epochs)
+        if wait:
+            return await recommender.training_jobs.wait(job)
 
-        return result
+        return job.to_dict()
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -136,54 +183,66 @@ async def get_model_status(workspace_id: str) -> Dict:
             'workspace_id': '...',
             'is_trained': true,
             'last_trained': '2024-12-13T...',
-            'model_version': '1.0'
+            'model_version': '1.0',
+            'training': {'job_id': '...', 'status': 'running', 'progress': 0.45, ...}
         }
     """
 
     try:
-        from api.main import supabase
-        from api.ml.gnn_recommender import GNNRecommender
+        recommender = get_recommender()
+
+        status = _model_status(recommender, workspace_id)
+
+        # Latest training job (queued / running / finished) with its progress
+        job = recommender.training_jobs.latest(workspace_id)
+        if job is not None:
+            status["training"] = job.to_dict()
+            if not status["is_trained"] and job.active:
+                status["status"] = "training"
+                status["message"] = "Model is training; recommendations use a fallback meanwhile"
+
+        return status
+
+    except Exception as e:
+        logger.error(f"Error checking model status: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _model_status(recommender, workspace_id: str) -> Dict:
+    # Check if model is cached
+    entry = recommender.model_cache.peek(workspace_id)
 
-        recommender = GNNRecommender(supabase)
+    if entry is not None and entry["model"] is not None:
+        return {
+            "workspace_id": workspace_id,
+            "is_trained": True,
+            "last_trained": entry["timestamp"].isoformat(),
+            "model_version": "1.0",
+            "graph_fingerprint": entry["fingerprint"],
+            "status": "ready",
+        }
+    else:
+        # Check if model file exists
+        import os
 
-        # Check if model is cached
-        is_cached = workspace_id in recommender.model_cache
+        model_path = os.path.join(recommender.models_dir, f"{workspace_id}.pt")
 
-        if is_cached:
-            _, _, _, cache_time = recommender.model_cache[workspace_id]
+        if os.path.exists(model_path):
+            mtime = datetime.fromtimestamp(os.path.getmtime(model_path))
             return {
                 "workspace_id": workspace_id,
                 "is_trained": True,
-                "last_trained": cache_time.isoformat(),
+                "last_trained": mtime.isoformat(),
                 "model_version": "1.0",
-                "status": "ready",
+                "status": "saved_to_disk",
             }
         else:
-            # Check if model file exists
-            import os
-
-            model_path = os.path.join(recommender.models_dir, f"{workspace_id}.pt")
-
-            if os.path.exists(model_path):
-                mtime = datetime.fromtimestamp(os.path.getmtime(model_path))
-                return {
-                    "workspace_id": workspace_id,
-                    "is_trained": True,
-                    "last_trained": mtime.isoformat(),
-                    "model_version": "1.0",
-                    "status": "saved_to_disk",
-                }
-            else:
-                return {
-                    "workspace_id": workspace_id,
-                    "is_trained": False,
-                    "status": "not_trained",
-                    "message": "Model needs training. Call POST /train/{workspace_id}",
-                }
-
-    except Exception as e:
-        logger.error(f"Error checking model status: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+            return {
+                "workspace_id": workspace_id,
+                "is_trained": False,
+                "status": "not_trained",
+                "message": "Model needs training. Call POST /train/{workspace_id}",
+            }
 
 
 @router.get("/health")
@@ -196,7 +255,7 @@ async def gnn_health_check() -> Dict:
         import torch
         import torch_geometric
 
-        return {
+        health = {
             "status": "healthy",
             "service": "gnn_recommendations",
             "pytorch_version": torch.__version__,
@@ -204,5 +263,13 @@ async def gnn_health_check() -> Dict:
             "device": "cpu",
             "timestamp": datetime.utcnow().isoformat(),
         }
+
+        # Cache / queue counters of the shared recommender (not created just for this)
+        if _recommender is not None:
+            health["model_cache"] = _recommender.model_cache.stats()
+            health["training_jobs"] = _recommender.training_jobs.stats()
+            health["inference"] = asdict(_recommender.inference)
+
+        return health
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
@@ -16,6 +16,8 @@ from typing import Dict, List, Optional
 from supabase import Client
 from textblob import TextBlob
 
+from api.analytics.aggregates import InteractionAggregates
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,14 +60,17 @@ class SentimentAnalyzer:
     WEIGHT_NOTES = 0.3
     WEIGHT_INTERACTIONS = 0.3
 
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: Client, aggregates: Optional[InteractionAggregates] = None):
         """
         Initialize SentimentAnalyzer.
 
         Args:
             supabase_client: Supabase client instance
+            aggregates: Rolling per-contact interaction counters (optional); used
+                for the 90-day interaction count instead of a history query
         """
         self.supabase = supabase_client
+        self.aggregates = aggregates
 
     async def analyze_contact_sentiment(self, contact_id: str) -> Dict:
         """
@@ -109,7 +114,9 @@ class SentimentAnalyzer:
             notes_sentiment = self._analyze_notes_sentiment(contact.get("notes"))
 
             # Component 3: Interaction pattern sentiment
-            interaction_sentiment = await self._analyze_interaction_sentiment(contact_id)
+            interaction_sentiment = await self._analyze_interaction_sentiment(
+                contact_id, contact.get("workspace_id")
+            )
 
             # Weighted average
             overall_sentiment = (
@@ -222,7 +229,9 @@ class SentimentAnalyzer:
             logger.error(f"Error analyzing notes sentiment: {str(e)}")
             return 0.0
 
-    async def _analyze_interaction_sentiment(self, contact_id: str) -> float:
+    async def _analyze_interaction_sentiment(
+        self, contact_id: str, workspace_id: Optional[str] = None
+    ) -> float:
         """
         Compute interaction pattern sentiment.
 
@@ -231,23 +240,32 @@ class SentimentAnalyzer:
 
         Args:
             contact_id: Contact UUID
+            workspace_id: Contact's workspace (reads the rolling aggregates when set)
 
         Returns:
             Sentiment score (-1 to 1)
         """
         try:
-            # Get interactions in last 3 months
-            three_months_ago = (datetime.utcnow() - timedelta(days=90)).isoformat()
-
-            interaction_response = (
-                self.supabase.table("sync_history")
-                .select("id")
-                .eq("contact_id", contact_id)
-                .gte("synced_at", three_months_ago)
-                .execute()
-            )
-
-            interaction_count = len(interaction_response.data) if interaction_response.data else 0
+            # Interactions in last 3 months
+            if self.aggregates is not None and workspace_id:
+                aggregate = await self.aggregates.get_contact(
+                    self.supabase, workspace_id, contact_id
+                )
+                interaction_count = aggregate.last_90d
+            else:
+                three_months_ago = (datetime.utcnow() - timedelta(days=90)).isoformat()
+
+                interaction_response = (
+                    self.supabase.table("sync_history")
+                    .select("id")
+                    .eq("contact_id", contact_id)
+                    .gte("synced_at", three_months_ago)
+                    .execute()
+                )
+
+                interaction_count = (
+                    len(interaction_response.data) if interaction_response.data else 0
+                )
 
             # Calculate interactions per month
             interactions_per_month = interaction_count / 3.0
@@ -0,0 +1,293 @@
+"""
+In-process Vector Index
+
+Top-k cosine similarity search over contact embeddings without a database round trip.
+Vectors are L2-normalized float32 rows of one contiguous matrix, so cosine similarity
+is a single matrix-vector product.
+
+Modes:
+- brute: exact search (one matmul over all rows) - default for small sets
+- ivf: inverted file index (k-means coarse quantizer), only nprobe nearest lists
+  are scanned - used automatically above exact_threshold vectors
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """Incrementally updated cosine similarity index for one workspace."""
+
+    def __init__(
+        self,
+        dimension: int = 1536,
+        mode: str = "auto",
+        exact_threshold: int = 20000,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        seed: int = 42,
+    ):
+        """
+        Initialize VectorIndex.
+
+        Args:
+            dimension: Embedding dimension
+            mode: "brute", "ivf" or "auto" (ivf above exact_threshold vectors)
+            exact_threshold: Size at which auto mode switches to IVF
+            nlist: Number of IVF lists (default: ~sqrt(size), set at training time)
+            nprobe: Number of IVF lists scanned per query
+            seed: Seed for k-means initialization
+        """
+        if mode not in ("auto", "brute", "ivf"):
+            raise ValueError(f"Unknown index mode: {mode}")
+
+        self.dimension = dimension
+        self.mode = mode
+        self.exact_threshold = exact_threshold
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+        # IVF state
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, contact_id: str) -> bool:
+        return contact_id in self._rows
+
+    @property
+    def active_mode(self) -> str:
+        """Mode used by the next query."""
+        if self.mode == "auto":
+            return "ivf" if len(self) >= self.exact_threshold else "brute"
+        return self.mode
+
+    def upsert(self, contact_id: str, vector: Sequence[float]) -> None:
+        """Insert or replace one vector."""
+        self.upsert_many([contact_id], np.asarray(vector, dtype=np.float32)[None, :])
+
+    def upsert_many(self, contact_ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Insert or replace vectors.
+
+        Args:
+            contact_ids: Contact UUIDs
+            vectors: Array of shape (len(contact_ids), dimension)
+        """
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension))
+        if len(contact_ids) != len(vectors):
+            raise ValueError("contact_ids and vectors must have the same length")
+
+        # Last occurrence wins for duplicate ids in one call
+        latest = {contact_id: i for i, contact_id in enumerate(contact_ids)}
+        existing = [(self._rows[cid], i) for cid, i in latest.items() if cid in self._rows]
+        new = [(cid, i) for cid, i in latest.items() if cid not in self._rows]
+
+        if existing:
+            rows, positions = map(list, zip(*existing))
+            self._vectors[rows] = vectors[positions]
+            if self._centroids is not None:
+                self._assignments[rows] = self._assign(vectors[positions])
+
+        if new:
+            start = len(self._ids)
+            positions = [i for _, i in new]
+            self._reserve(start + len(new))
+            self._vectors[start : start + len(new)] = vectors[positions]
+            for offset, (contact_id, _) in enumerate(new):
+                self._rows[contact_id] = start + offset
+                self._ids.append(contact_id)
+            if self._centroids is not None:
+                self._assignments[start : start + len(new)] = self._assign(vectors[positions])
+
+    def remove(self, contact_ids: Iterable[str]) -> int:
+        """Remove vectors (last row is moved into the hole). Returns number removed."""
+        removed = 0
+        for contact_id in contact_ids:
+            row = self._rows.pop(contact_id, None)
+            if row is None:
+                continue
+
+            last = len(self._ids) - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._vectors[row] = self._vectors[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+                if self._centroids is not None:
+                    self._assignments[row] = self._assignments[last]
+            self._ids.pop()
+            removed += 1
+
+        return removed
+
+    def get(self, contact_id: str) -> Optional[np.ndarray]:
+        """Normalized vector of a contact (a copy) or None."""
+        row = self._rows.get(contact_id)
+        return None if row is None else self._vectors[row].copy()
+
+    def similarities(self, contact_id: str, other_ids: Sequence[str]) -> Dict[str, float]:
+        """Exact cosine similarity between one contact and a set of others."""
+        row = self._rows.get(contact_id)
+        if row is None:
+            return {}
+
+        known = [other for other in other_ids if other in self._rows]
+        if not known:
+            return {}
+
+        rows = np.fromiter((self._rows[other] for other in known), dtype=np.int64)
+        scores = self._vectors[rows] @ self._vectors[row]
+        return dict(zip(known, scores.tolist()))
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int = 10,
+        exclude: Iterable[str] = (),
+        exact: bool = False,
+    ) -> List[Tuple[str, float]]:
+        """
+        Top-k most similar vectors.
+
+        Args:
+            query: Query vector (normalized internally)
+            k: Number of results
+            exclude: Contact ids to leave out (e.g. the query contact itself)
+            exact: Force brute-force search regardless of mode
+
+        Returns:
+            List of (contact_id, cosine_similarity), most similar first
+        """
+        size = len(self._ids)
+        if size == 0 or k <= 0:
+            return []
+
+        query = self._normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        if not query.any():
+            return []
+
+        excluded_rows = [self._rows[cid] for cid in exclude if cid in self._rows]
+
+        if exact or self.active_mode == "brute":
+            candidates = None
+            scores = self._vectors[:size] @ query
+        else:
+            self._ensure_trained()
+            probe = np.argsort(-(self._centroids @ query))[: self.nprobe]
+            candidates = np.flatnonzero(np.isin(self._assignments[:size], probe))
+            scores = self._vectors[candidates] @ query
+
+        if excluded_rows:
+            if candidates is None:
+                scores[excluded_rows] = -np.inf
+            else:
+                scores[np.isin(candidates, excluded_rows)] = -np.inf
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        rows = top if candidates is None else candidates[top]
+        return [
+            (self._ids[row], float(score))
+            for row, score in zip(rows.tolist(), scores[top].tolist())
+            if score != -np.inf
+        ]
+
+    def search_by_id(self, contact_id: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k contacts most similar to an indexed contact (excluding itself)."""
+        row = self._rows.get(contact_id)
+        if row is None:
+            return []
+        return self.search(self._vectors[row], k=k, exclude=[contact_id])
+
+    def train(self, iterations: int = 10, sample_size: int = 100000) -> None:
+        """
+        Train the IVF coarse quantizer (spherical k-means) and assign all rows.
+
+        Args:
+            iterations: k-means iterations
+            sample_size: Max rows used for training
+        """
+        size = len(self._ids)
+        if size == 0:
+            return
+
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or max(1, int(np.sqrt(size)))
+        nlist = min(nlist, size)
+
+        sample_rows = rng.choice(size, size=min(size, max(sample_size, nlist)), replace=False)
+        sample = self._vectors[np.sort(sample_rows)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+
+            # Empty lists keep their old centroid
+            filled = counts > 0
+            centroids[filled] = self._normalize(sums[filled])
+
+        self._centroids = centroids
+        self._assignments = np.empty(len(self._vectors), dtype=np.int32)
+        self._assignments[:size] = self._assign(self._vectors[:size])
+        self._trained_size = size
+
+        logger.info(f"Trained IVF index: {size} vectors, {nlist} lists")
+
+    def _ensure_trained(self) -> None:
+        """(Re)train when untrained or the index has doubled since training."""
+        if self._centroids is None or len(self._ids) > 2 * self._trained_size:
+            self.train()
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return self._nearest(vectors, self._centroids).astype(np.int32)
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        """Index of the most similar centroid for each row (chunked matmul)."""
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            labels[start : start + chunk] = np.argmax(
+                vectors[start : start + chunk] @ centroids.T, axis=1
+            )
+        return labels
+
+    def _reserve(self, size: int) -> None:
+        """Grow the contiguous matrix (capacity doubling)."""
+        capacity = len(self._vectors)
+        if size <= capacity:
+            return
+
+        capacity = max(size, 2 * capacity, 1024)
+        vectors = np.empty((capacity, self.dimension), dtype=np.float32)
+        vectors[: len(self._ids)] = self._vectors[: len(self._ids)]
+        self._vectors = vectors
+
+        if self._centroids is not None:
+            assignments = np.empty(capacity, dtype=np.int32)
+            assignments[: len(self._ids)] = self._assignments[: len(self._ids)]
+            self._assignments = assignments
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
@@ -48,6 +48,36 @@ async def get_user_from_token(token: Optional[str]) -> tuple:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+def _notify_recommender(hook: str, *args, **kwargs) -> None:
+    """Forward a contact event to the GNN recommender caches (see routes_gnn hooks)."""
+    try:
+        from api.ml import routes_gnn
+
+        getattr(routes_gnn, hook)(*args, **kwargs)
+    except Exception as e:
+        logger.warning(f"Could not apply {hook} to recommender caches: {e}")
+
+
+def _invalidate_connection_graphs() -> None:
+    """Drop cached connection graphs (a deleted contact takes its connections with it)."""
+    try:
+        from api.ml.recommendation_engine import invalidate_connection_graphs
+
+        invalidate_connection_graphs()
+    except Exception as e:
+        logger.warning(f"Could not invalidate connection graphs: {e}")
+
+
+def _remove_contact_embeddings(contact_id: str) -> None:
+    """Drop a deleted contact from the in-process vector indexes."""
+    try:
+        from api.ml.embeddings_service import remove_contact_embeddings
+
+        remove_contact_embeddings([contact_id])
+    except Exception as e:
+        logger.warning(f"Could not remove embeddings of contact {contact_id}: {e}")
+
+
 @router.websocket("/workspace/{workspace_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
@@ -166,6 +196,11 @@ async def websocket_endpoint(
                     exclude_websocket=websocket,  # Don't send back to sender
                 )
 
+                if contact.get("id"):
+                    _notify_recommender(
+                        "apply_contact_change", workspace_id, str(contact["id"]), contact
+                    )
+
                 logger.info(f"Contact created by {user_id} in workspace {workspace_id}")
 
             elif message_type == "contact_updated":
@@ -193,6 +228,8 @@ async def websocket_endpoint(
                     exclude_websocket=websocket,
                 )
 
+                _notify_recommender("apply_contact_change", workspace_id, contact_id, changes)
+
                 logger.info(
                     f"Contact {contact_id} updated by {user_id} in workspace {workspace_id}"
                 )
@@ -219,6 +256,10 @@ async def websocket_endpoint(
                     exclude_websocket=websocket,
                 )
 
+                _notify_recommender("apply_contact_change", workspace_id, contact_id, deleted=True)
+                _invalidate_connection_graphs()
+                _remove_contact_embeddings(contact_id)
+
                 logger.info(
                     f"Contact {contact_id} deleted by {user_id} in workspace {workspace_id}"
                 )
@@ -247,6 +288,8 @@ async def websocket_endpoint(
                     exclude_websocket=websocket,
                 )
 
+                _notify_recommender("record_interaction", workspace_id, contact_id)
+
                 logger.info(
                     f"Note added to contact {contact_id} by {user_id} in workspace {workspace_id}"
                 )
@@ -11,6 +11,7 @@ import logging
 
 from fastapi import APIRouter, Depends, HTTPException
 
+from api.analytics.aggregates import get_interaction_aggregates
 from api.analytics.metrics import AnalyticsMetrics
 from api.core.supabase_client import get_current_user
 
@@ -25,7 +26,7 @@ async def get_analytics_manager() -> AnalyticsMetrics:
 
     if not supabase:
         raise HTTPException(status_code=500, detail="Database not initialized")
-    return AnalyticsMetrics(supabase)
+    return AnalyticsMetrics(supabase, aggregates=get_interaction_aggregates())
 
 
 @router.get("/metrics/{workspace_id}")
@@ -4,6 +4,7 @@ Cache API Routes для Phase 9
 Endpoints:
     POST /api/cache/invalidate/{workspace_id} - Clear workspace cache
     GET /api/cache/stats - Cache statistics
+    GET /api/cache/metrics - Cluster-wide cache metrics (Prometheus text format)
     DELETE /api/cache/{key} - Delete specific cache key
     POST /api/cache/warmup/{workspace_id} - Pre-compute recommendations
 
@@ -15,8 +16,10 @@ import logging
 from typing import Dict
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 
 from api.cache import CacheManager
+from api.cache.metrics import render_prometheus
 from api.core.supabase_client import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -85,7 +88,13 @@ async def get_cache_statistics(
             "hit_count": int,
             "miss_count": int,
             "hit_rate": float (0.0 - 1.0),
-            "miss_rate": float (0.0 - 1.0)
+            "miss_rate": float (0.0 - 1.0),
+            "cluster": {
+                "latency_ms": {operation: {"count", "mean", "p50", "p95", "p99"}},
+                "payload_bytes": {"count", "mean", "p50", "p95", "p99"},
+                "workspaces": {workspace_id: {"lookups", "hit_ratio", "l1_hits"}},
+                "hot_keys": [{"key", "estimated_lookups"}]
+            }
         }
     """
     try:
@@ -97,6 +106,28 @@ async def get_cache_statistics(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_cache_metrics(
+    cache_manager: CacheManager = Depends(get_cache_manager),
+    current_user: Dict = Depends(get_current_user),
+):
+    """
+    Cluster-wide cache metrics in Prometheus text format
+
+    Aggregated over all pods: operation latency histograms, lookups and hit
+    ratio per workspace, payload size histogram, estimated hot keys.
+    """
+    try:
+        snapshot = await cache_manager.collect_metrics()
+        return PlainTextResponse(
+            render_prometheus(snapshot), media_type="text/plain; version=0.0.4"
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to get cache metrics: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/{key}")
 async def delete_cache_key(
     key: str,
@@ -107,7 +138,7 @@ async def delete_cache_key(
     Delete specific cache key
 
     Args:
-        key: Full cache key (e.g., "superbrain:rec:ws123:contact456:20")
+        key: Full cache key (e.g., "superbrain:rec:ws123:g0:contact456:20")
 
     Returns:
         {
@@ -167,13 +198,18 @@ async def warmup_workspace_cache(
     """
     try:
         # Import GNN recommender functions
-        from api.ml.gnn_recommender import generate_recommendations, get_top_contacts
+        from api.ml.gnn_recommender import (
+            generate_recommendations,
+            generate_recommendations_batch,
+            get_top_contacts,
+        )
 
         result = await cache_manager.warmup_cache(
             workspace_id=workspace_id,
             limit=limit,
             get_top_contacts_func=get_top_contacts,
             generate_recommendations_func=generate_recommendations,
+            generate_batch_recommendations_func=generate_recommendations_batch,
         )
 
         return {"workspace_id": workspace_id, **result}
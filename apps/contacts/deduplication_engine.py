@@ -3,11 +3,18 @@
 # Based on: Levenshtein, Phonetic, Embedding matching
 
 import asyncio
+import hashlib
 import logging
+import os
+import re
+import zlib
+from abc import ABC, abstractmethod
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Tuple
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import numpy as np
 import openai
@@ -124,58 +131,390 @@ class PhoneNumberMatcher:
         return 0.0, False
 
 
+class EmbeddingProvider(ABC):
+    """Источник эмбеддингов (подключаемый)"""
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Эмбеддинги для списка текстов: матрица [len(texts), dim]"""
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Эмбеддинги OpenAI - один запрос на батч текстов"""
+
+    def __init__(self, model: str = "text-embedding-3-small"):
+        self.model = model
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        response = await asyncio.to_thread(openai.Embedding.create, input=texts, model=self.model)
+        rows = sorted(response["data"], key=lambda row: row["index"])
+        return np.array([row["embedding"] for row in rows], dtype=np.float32)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Детерминированные локальные эмбеддинги (hashing trick по q-граммам)
+
+    Для тестов и бенчмарков - без сети и без OpenAI
+    """
+
+    def __init__(self, dim: int = 256, qgram: int = 3):
+        self.dim = dim
+        self.qgram = qgram
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            padded = f" {text} "
+            for i in range(max(len(padded) - self.qgram + 1, 1)):
+                bucket = zlib.crc32(padded[i : i + self.qgram].encode("utf-8")) % self.dim
+                matrix[row, bucket] += 1.0
+        return matrix
+
+
+class EmbeddingStore:
+    """Хранилище эмбеддингов по хешу нормализованного текста
+
+    Векторы хранятся L2-нормализованными в одной матрице float32,
+    опционально сохраняются в .npz файл между запусками.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        # np.savez дописывает .npz сам - путь нормализуется, чтобы save и load совпадали
+        if path and not path.endswith(".npz"):
+            path = f"{path}.npz"
+        self.path = path
+        self._index: Dict[str, int] = {}
+        self._chunks: List[np.ndarray] = []
+        self._dirty = False
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Все векторы одной матрицей (новые батчи склеиваются лениво)"""
+        if len(self._chunks) > 1:
+            self._chunks = [np.vstack(self._chunks)]
+        return self._chunks[0] if self._chunks else np.zeros((0, 0), dtype=np.float32)
+
+    def rows(self, keys: List[str]) -> np.ndarray:
+        """Индексы строк матрицы для ключей"""
+        return np.fromiter((self._index[key] for key in keys), dtype=np.int64, count=len(keys))
+
+    def put_many(self, keys: List[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1.0)
+
+        start = len(self._index)
+        for offset, key in enumerate(keys):
+            self._index[key] = start + offset
+
+        self._chunks.append(vectors)
+        self._dirty = True
+
+    def save(self) -> None:
+        """Сохранить на диск (если задан path)"""
+        if not self.path or not self._dirty:
+            return
+
+        keys = sorted(self._index, key=self._index.get)
+        np.savez(self.path, keys=np.array(keys), vectors=self.matrix)
+        self._dirty = False
+
+    def _load(self) -> None:
+        data = np.load(self.path)
+        self._index = {str(key): row for row, key in enumerate(data["keys"])}
+        self._chunks = [data["vectors"].astype(np.float32)] if len(self._index) else []
+        logger.info(f"Загружено {len(self._index)} эмбеддингов из {self.path}")
+
+
 class EmbeddingMatcher:
-    """Эмбеддинг-базированный матчинг (семантический поиск)"""
+    """Эмбеддинг-базированный матчинг (семантический поиск)
 
-    def __init__(self, threshold: float = 0.90):
+    Каждый уникальный нормализованный текст эмбеддится один раз,
+    запросы к провайдеру идут батчами, схожесть по парам - одной матричной операцией.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.90,
+        provider: Optional[EmbeddingProvider] = None,
+        store: Optional[EmbeddingStore] = None,
+        batch_size: int = 256,
+    ):
         self.threshold = threshold
         self.model = "text-embedding-3-small"  # OpenAI
+        self.provider = provider or OpenAIEmbeddingProvider(self.model)
+        self.store = store if store is not None else EmbeddingStore()
+        self.batch_size = batch_size
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        return re.sub(r"\s+", " ", text.lower()).strip()
+
+    def _key(self, text: str) -> str:
+        return self.store.text_key(self.normalize_text(text))
+
+    async def prepare(self, texts: Iterable[str]) -> int:
+        """
+        Заэмбеддить тексты, которых еще нет в хранилище
+        Возвращает количество новых эмбеддингов
+        """
+        missing = {}
+        for text in texts:
+            normalized = self.normalize_text(text)
+            key = self.store.text_key(normalized)
+            if key not in self.store and key not in missing:
+                missing[key] = normalized
+
+        keys = list(missing)
+        for i in range(0, len(keys), self.batch_size):
+            batch_keys = keys[i : i + self.batch_size]
+            vectors = await self.provider.embed([missing[key] for key in batch_keys])
+            self.store.put_many(batch_keys, vectors)
+
+        if keys:
+            self.store.save()
+            logger.debug(f"Заэмбеддено {len(keys)} новых текстов")
+
+        return len(keys)
 
     async def get_embedding(self, text: str) -> np.ndarray:
-        """Получить embedding для текста"""
-        response = await asyncio.to_thread(openai.Embedding.create, input=text, model=self.model)
-        return np.array(response["data"][0]["embedding"])
+        """Получить embedding для текста (нормализованный)"""
+        await self.prepare([text])
+        return self.store.matrix[self.store.rows([self._key(text)])[0]]
 
     @staticmethod
     def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
         """Косинусная симилярность"""
         return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
+    async def score_many(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """Схожесть для списка пар текстов - одна матричная операция"""
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+
+        try:
+            await self.prepare(text for pair in pairs for text in pair)
+
+            left = self.store.rows([self._key(a) for a, _ in pairs])
+            right = self.store.rows([self._key(b) for _, b in pairs])
+            matrix = self.store.matrix
+
+            return np.einsum("ij,ij->i", matrix[left], matrix[right])
+        except Exception as e:
+            logger.error(f"Embedding scoring failed: {e}")
+            return np.zeros(len(pairs), dtype=np.float32)
+
     async def score(self, text1: str, text2: str) -> Tuple[float, bool]:
         """Оценить семантическое схожество"""
-        try:
-            emb1 = await self.get_embedding(text1)
-            emb2 = await self.get_embedding(text2)
+        score = float((await self.score_many([(text1, text2)]))[0])
+        return score, score >= self.threshold
 
-            score = self.cosine_similarity(emb1, emb2)
-            is_match = score >= self.threshold
 
-            return float(score), is_match
-        except:
-            return 0.0, False
+class BlockingKeyGenerator:
+    """Генерация кандидатов через blocking keys
+
+    Вместо сравнения всех O(N²) пар контакты раскладываются по блокам,
+    и в скоринг идут только пары, делящие хотя бы один ключ:
+    - phone: последние 7 цифр номера (как в PhoneNumberMatcher)
+    - email: email в нижнем регистре
+    - metaphone: фонетический код полного имени
+    - minhash: LSH-бакеты по q-граммам имени
+
+    Точные ключи (phone/email) не ограничиваются по размеру - они покрывают
+    все пары, которые могут пройти порог composite >= 0.95.
+    Нечеткие блоки больше max_block_size обрабатываются скользящим окном
+    размера window по отсортированным именам (sorted neighbourhood).
+    """
+
+    EXACT_KEYS = ("phone", "email")
+
+    _PRIME = (1 << 31) - 1
+
+    def __init__(
+        self,
+        max_block_size: int = 100,
+        window: int = 20,
+        qgram: int = 3,
+        num_perm: int = 32,
+        bands: int = 8,
+        seed: int = 42,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.max_block_size = max_block_size
+        self.window = window
+        self.qgram = qgram
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.default_rng(seed)
+        self._perm_a = rng.integers(1, self._PRIME, size=num_perm, dtype=np.int64)
+        self._perm_b = rng.integers(0, self._PRIME, size=num_perm, dtype=np.int64)
+
+    @staticmethod
+    def normalize_name(contact: Dict) -> str:
+        """Нормализованное полное имя"""
+        name = f"{contact.get('first_name') or ''} {contact.get('last_name') or ''}"
+        return re.sub(r"\s+", " ", name.lower()).strip()
+
+    def _qgrams(self, name: str) -> Set[str]:
+        padded = f" {name} "
+        if len(padded) <= self.qgram:
+            return {padded}
+        return {padded[i : i + self.qgram] for i in range(len(padded) - self.qgram + 1)}
+
+    def _minhash_buckets(self, name: str) -> List[Tuple]:
+        """MinHash сигнатура, разбитая на LSH-бэнды"""
+        grams = np.fromiter(
+            (zlib.crc32(g.encode("utf-8")) % self._PRIME for g in self._qgrams(name)),
+            dtype=np.int64,
+        )
+        signature = (
+            (self._perm_a[:, None] * grams[None, :] + self._perm_b[:, None]) % self._PRIME
+        ).min(axis=1)
+
+        return [
+            (band, tuple(signature[band * self.rows : (band + 1) * self.rows].tolist()))
+            for band in range(self.bands)
+        ]
+
+    def blocking_keys(self, contact: Dict) -> List[Tuple]:
+        """Все blocking keys контакта"""
+        keys = []
+
+        if contact.get("phone_number"):
+            digits = PhoneNumberMatcher.normalize_phone(contact["phone_number"])
+            # Короткие/пустые номера не блокируют: exact-блок не ограничен по размеру
+            if len(digits) >= 7:
+                keys.append(("phone", digits[-7:]))
+
+        if contact.get("email"):
+            keys.append(("email", contact["email"].lower()))
+
+        name = self.normalize_name(contact)
+        if name:
+            try:
+                code = metaphone(name)
+                if code:
+                    keys.append(("metaphone", code))
+            except Exception:
+                pass
+
+            for band, bucket in self._minhash_buckets(name):
+                keys.append(("minhash", band, bucket))
+
+        return keys
+
+    def build_blocks(self, contacts: List[Dict]) -> Dict[Tuple, List[int]]:
+        """Инвертированный индекс: ключ -> индексы контактов"""
+        blocks = defaultdict(list)
+        for idx, contact in enumerate(contacts):
+            for key in self.blocking_keys(contact):
+                blocks[key].append(idx)
+        return blocks
+
+    def candidate_pairs(self, contacts: List[Dict]) -> List[Tuple[int, int]]:
+        """
+        Пары индексов (i < j), которые стоит отправить в скоринг
+        Возвращает отсортированный список без повторов
+        """
+        pairs: Set[Tuple[int, int]] = set()
+        windowed_blocks = 0
+
+        for key, members in self.build_blocks(contacts).items():
+            if len(members) < 2:
+                continue
+
+            if key[0] in self.EXACT_KEYS or len(members) <= self.max_block_size:
+                pairs.update(self._block_pairs(members))
+            else:
+                windowed_blocks += 1
+                members = sorted(members, key=lambda i: self.normalize_name(contacts[i]))
+                pairs.update(self._window_pairs(members, self.window))
+
+        if windowed_blocks:
+            logger.debug(f"{windowed_blocks} нечетких блоков обработано окном")
+
+        return sorted(pairs)
+
+    @staticmethod
+    def _block_pairs(members: List[int]) -> Iterable[Tuple[int, int]]:
+        for a in range(len(members)):
+            for b in range(a + 1, len(members)):
+                i, j = members[a], members[b]
+                yield (i, j) if i < j else (j, i)
+
+    @staticmethod
+    def _window_pairs(members: List[int], window: int) -> Iterable[Tuple[int, int]]:
+        for a in range(len(members)):
+            for b in range(a + 1, min(a + window, len(members))):
+                i, j = members[a], members[b]
+                yield (i, j) if i < j else (j, i)
 
 
 class ContactDeduplicationEngine:
     """Главный двигатель дедупликации"""
 
-    def __init__(self, supabase_client):
+    # Сколько пар скорить за один проход эмбеддингов
+    SCORING_CHUNK_SIZE = 10000
+
+    def __init__(
+        self,
+        supabase_client,
+        embedding_provider: Optional[EmbeddingProvider] = None,
+        embedding_store_path: Optional[str] = None,
+    ):
         self.supabase = supabase_client
         self.levenshtein = LevenshteinMatcher(threshold=0.85)
         self.phonetic = PhoneticMatcher(threshold=0.90)
         self.phone = PhoneNumberMatcher()
-        self.embedding = EmbeddingMatcher(threshold=0.90)
+        self.embedding = EmbeddingMatcher(
+            threshold=0.90,
+            provider=embedding_provider,
+            store=EmbeddingStore(embedding_store_path),
+        )
+        self.blocker = BlockingKeyGenerator()
 
-    async def detect_duplicates(self, contacts: List[Dict]) -> List[DuplicateCandidate]:
+    async def detect_duplicates(
+        self, contacts: List[Dict], use_blocking: bool = True
+    ) -> List[DuplicateCandidate]:
         """
         Найти все вероятные дубликаты
         Возвращает сортированные по убыванию confidence
+
+        use_blocking=False включает полный перебор пар (baseline для проверки recall)
         """
         candidates = []
 
-        # Проверить каждую пару
-        for i, c1 in enumerate(contacts):
-            for c2 in contacts[i + 1 :]:
-                scores = await self._score_pair(c1, c2)
+        if use_blocking:
+            pairs = self.blocker.candidate_pairs(contacts)
+            total_pairs = len(contacts) * (len(contacts) - 1) // 2
+            logger.info(f"Blocking: {len(pairs)} пар-кандидатов из {total_pairs}")
+        else:
+            pairs = ((i, j) for i in range(len(contacts)) for j in range(i + 1, len(contacts)))
+
+        # Проверить пары-кандидаты (чанками: эмбеддинги считаются батчем на чанк)
+        pairs = iter(pairs)
+        while chunk := list(islice(pairs, self.SCORING_CHUNK_SIZE)):
+            embedding_scores = await self._embedding_scores(contacts, chunk)
+
+            for (i, j), emb_score in zip(chunk, embedding_scores):
+                c1, c2 = contacts[i], contacts[j]
+                scores = await self._score_pair(c1, c2, embedding_score=emb_score)
 
                 if scores["composite"] >= 0.95:
                     candidate = DuplicateCandidate(
@@ -197,8 +536,39 @@ class ContactDeduplicationEngine:
 
         return candidates
 
-    async def _score_pair(self, c1: Dict, c2: Dict) -> Dict:
-        """Оценить пару контактов по всем метрикам"""
+    @staticmethod
+    def _full_name(contact: Dict) -> Optional[str]:
+        if contact.get("first_name") and contact.get("last_name"):
+            return f"{contact['first_name']} {contact['last_name']}"
+        return None
+
+    async def _embedding_scores(
+        self, contacts: List[Dict], pairs: List[Tuple[int, int]]
+    ) -> List[Optional[float]]:
+        """Embedding-схожесть полных имен для чанка пар (None - имени нет)"""
+        positions = []
+        name_pairs = []
+
+        for pos, (i, j) in enumerate(pairs):
+            name1 = self._full_name(contacts[i])
+            name2 = self._full_name(contacts[j])
+            if name1 and name2:
+                positions.append(pos)
+                name_pairs.append((name1, name2))
+
+        result: List[Optional[float]] = [None] * len(pairs)
+        for pos, score in zip(positions, await self.embedding.score_many(name_pairs)):
+            result[pos] = float(score)
+
+        return result
+
+    async def _score_pair(
+        self, c1: Dict, c2: Dict, embedding_score: Optional[float] = None
+    ) -> Dict:
+        """Оценить пару контактов по всем метрикам
+
+        embedding_score - заранее посчитанная схожесть полных имен (батчем)
+        """
         scores = {
             "name_levenshtein": 0.0,
             "name_phonetic": 0.0,
@@ -219,16 +589,14 @@ class ContactDeduplicationEngine:
                 scores["evidence"]["first_name_lev"] = lev_score
 
         # Полное имя
-        if (
-            c1.get("first_name")
-            and c1.get("last_name")
-            and c2.get("first_name")
-            and c2.get("last_name")
-        ):
-            full_name1 = f"{c1['first_name']} {c1['last_name']}"
-            full_name2 = f"{c2['first_name']} {c2['last_name']}"
-
-            emb_score, emb_match = await self.embedding.score(full_name1, full_name2)
+        full_name1 = self._full_name(c1)
+        full_name2 = self._full_name(c2)
+        if full_name1 and full_name2:
+            if embedding_score is None:
+                emb_score, emb_match = await self.embedding.score(full_name1, full_name2)
+            else:
+                emb_score = embedding_score
+                emb_match = emb_score >= self.embedding.threshold
             scores["embedding"] = emb_score
             if emb_match:
                 scores["evidence"]["embedding"] = emb_score
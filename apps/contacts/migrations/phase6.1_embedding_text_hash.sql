@@ -0,0 +1,8 @@
+-- PHASE 6.1: Embedding text hash
+-- Created: 2026-10-18
+-- Description: Hash of the text each embedding was generated from, so batch jobs
+-- can skip contacts whose name/organization/tags/notes did not change
+
+ALTER TABLE contact_embeddings ADD COLUMN IF NOT EXISTS text_hash TEXT;
+
+COMMENT ON COLUMN contact_embeddings.text_hash IS 'SHA-256 of the embedded contact text';
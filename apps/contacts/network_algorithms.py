@@ -0,0 +1,520 @@
+# 🧮 Network Algorithms - PHASE 2
+# Массивные (CSR) структуры графа и алгоритмы для SocialNetworkAnalyzer
+
+# Brandes betweenness (exact / sampled, weighted / unweighted)
+# Компактное хранение ребер, пары из posting lists (инвертированный индекс)
+# Louvain community detection с Leiden-уточнением (связные сообщества)
+
+import heapq
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CSRGraph:
+    """Неориентированный граф в формате CSR (compressed sparse row)
+
+    Соседи вершины v: indices[indptr[v]:indptr[v + 1]]
+    Веса ребер (strength) лежат параллельно в weights.
+    """
+
+    node_ids: List[str]
+    indptr: np.ndarray  # [num_nodes + 1] int64
+    indices: np.ndarray  # [2 * num_edges] int64
+    weights: np.ndarray  # [2 * num_edges] float64
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices) // 2
+
+    def degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    @classmethod
+    def from_edges(
+        cls,
+        node_ids: List[str],
+        src: np.ndarray,
+        dst: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+    ) -> "CSRGraph":
+        """
+        Построить CSR из списка ребер (каждое ребро - один раз, в любом направлении)
+        Петли отбрасываются, для параллельных ребер остается максимальный вес
+        """
+        n = len(node_ids)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        if weights is None:
+            weights = np.ones(len(src), dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        keep = src != dst
+        src, dst, weights = src[keep], dst[keep], weights[keep]
+
+        # Симметризация
+        rows = np.concatenate([src, dst])
+        cols = np.concatenate([dst, src])
+        vals = np.concatenate([weights, weights])
+
+        # Сортировка по (row, col, -weight) и удаление дублей
+        order = np.lexsort((-vals, cols, rows))
+        rows, cols, vals = rows[order], cols[order], vals[order]
+        if len(rows):
+            first = np.ones(len(rows), dtype=bool)
+            first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+            rows, cols, vals = rows[first], cols[first], vals[first]
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+        return cls(node_ids=list(node_ids), indptr=indptr, indices=cols, weights=vals)
+
+
+class EdgeList:
+    """Ребра графа, каждое хранится один раз в параллельных массивах
+
+    src/dst - индексы вершин (int32), types - код типа связи (int8),
+    strength - сила связи (float32). ~13 байт на ребро вместо двух объектов Connection.
+    """
+
+    def __init__(self):
+        self._chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return sum(len(chunk[0]) for chunk in self._chunks)
+
+    def append(
+        self, src: np.ndarray, dst: np.ndarray, types: np.ndarray, strength: np.ndarray
+    ) -> None:
+        if len(src) == 0:
+            return
+        self._chunks.append(
+            (
+                np.asarray(src, dtype=np.int32),
+                np.asarray(dst, dtype=np.int32),
+                np.asarray(types, dtype=np.int8),
+                np.asarray(strength, dtype=np.float32),
+            )
+        )
+        self._arrays = None
+
+    @property
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(src, dst, types, strength) одним набором массивов"""
+        if self._arrays is None:
+            if not self._chunks:
+                self._arrays = (
+                    np.zeros(0, dtype=np.int32),
+                    np.zeros(0, dtype=np.int32),
+                    np.zeros(0, dtype=np.int8),
+                    np.zeros(0, dtype=np.float32),
+                )
+            else:
+                self._arrays = tuple(np.concatenate(column) for column in zip(*self._chunks))
+                self._chunks = [self._arrays]
+        return self._arrays
+
+    def to_csr(self, node_ids: List[str]) -> CSRGraph:
+        src, dst, _, strength = self.arrays
+        return CSRGraph.from_edges(node_ids, src, dst, strength)
+
+
+def posting_list_pairs(
+    members: np.ndarray, max_size: int, fanout: int, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Пары вершин внутри одного posting list (контакты с общим атрибутом)
+
+    Списки до max_size - все пары. Большие списки (популярный тег, крупный город)
+    сэмплируются: каждый участник связывается с fanout следующими в случайном
+    кольцевом порядке, т.е. O(m * fanout) ребер вместо O(m^2).
+
+    Returns:
+        (i, j) с i < j, без повторов
+    """
+    members = np.unique(np.asarray(members, dtype=np.int64))
+    m = len(members)
+    if m < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    if m <= max_size:
+        left, right = np.triu_indices(m, k=1)
+        return members[left], members[right]
+
+    ring = rng.permutation(members)
+    offsets = np.arange(1, min(fanout, m - 1) + 1)
+    left = np.repeat(ring, len(offsets))
+    right = ring[(np.repeat(np.arange(m), len(offsets)) + np.tile(offsets, m)) % m]
+
+    # Кольцо короче 2 * fanout дает одну пару дважды - убрать повторы
+    base = int(members[-1]) + 1
+    keys = np.unique(np.minimum(left, right) * base + np.maximum(left, right))
+    return keys // base, keys % base
+
+
+def brandes_betweenness(
+    graph: CSRGraph,
+    weighted: bool = False,
+    sample_size: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Betweenness centrality (алгоритм Brandes) для всех вершин за один проход
+
+    Учитывает все кратчайшие пути (доли sigma_st(v) / sigma_st), а не один путь на пару.
+
+    Args:
+        graph: CSR граф
+        weighted: Использовать веса - длина ребра = 1 / strength (сильная связь = короткий путь)
+        sample_size: Если задан и меньше числа вершин - приближенный режим:
+            BFS/Dijkstra из случайной выборки источников, результат масштабируется на N / k
+        seed: Seed для выборки источников
+
+    Returns:
+        Ненормализованная betweenness для неориентированного графа, shape [num_nodes]
+    """
+    n = graph.num_nodes
+    betweenness = np.zeros(n, dtype=np.float64)
+    if n < 3:
+        return betweenness
+
+    sources = np.arange(n)
+    if sample_size is not None and sample_size < n:
+        rng = np.random.default_rng(seed)
+        sources = rng.choice(n, size=sample_size, replace=False)
+
+    if weighted:
+        lengths = 1.0 / np.maximum(graph.weights, 1e-9)
+        indptr, indices, lengths = graph.indptr.tolist(), graph.indices.tolist(), lengths.tolist()
+        for s in sources:
+            _accumulate_weighted(betweenness, indptr, indices, lengths, int(s))
+    else:
+        for s in sources:
+            _accumulate_unweighted(betweenness, graph.indptr, graph.indices, int(s))
+
+    # Каждая пара (s, t) посчитана в обе стороны
+    betweenness /= 2.0
+    if len(sources) < n:
+        betweenness *= n / len(sources)
+
+    return betweenness
+
+
+def _accumulate_unweighted(
+    betweenness: np.ndarray, indptr: np.ndarray, indices: np.ndarray, source: int
+) -> None:
+    """Один источник: уровневый BFS на массивах + обратное накопление зависимостей"""
+    n = len(indptr) - 1
+    dist = np.full(n, -1, dtype=np.int64)
+    sigma = np.zeros(n, dtype=np.float64)
+    dist[source] = 0
+    sigma[source] = 1.0
+
+    frontier = np.array([source], dtype=np.int64)
+    level_edges = []
+    depth = 0
+
+    while frontier.size:
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            break
+
+        # Все ребра (v -> w) из текущего фронта одним вектором
+        src = np.repeat(frontier, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        nbr = indices[np.repeat(starts, counts) + offsets]
+
+        discovered = np.unique(nbr[dist[nbr] < 0])
+        dist[discovered] = depth + 1
+
+        # Ребра дерева кратчайших путей
+        on_path = dist[nbr] == depth + 1
+        v, w = src[on_path], nbr[on_path]
+        np.add.at(sigma, w, sigma[v])
+        level_edges.append((v, w))
+
+        frontier = discovered
+        depth += 1
+
+    delta = np.zeros(n, dtype=np.float64)
+    for v, w in reversed(level_edges):
+        np.add.at(delta, v, sigma[v] / sigma[w] * (1.0 + delta[w]))
+
+    delta[source] = 0.0
+    betweenness += delta
+
+
+def _accumulate_weighted(
+    betweenness: np.ndarray,
+    indptr: List[int],
+    indices: List[int],
+    lengths: List[float],
+    source: int,
+) -> None:
+    """Один источник: Dijkstra с подсчетом sigma + обратное накопление зависимостей"""
+    stack = []
+    preds = {source: []}
+    sigma = {source: 1.0}
+    settled = {}
+    seen = {source: 0.0}
+    heap = [(0.0, source, source)]
+
+    while heap:
+        dist, pred, v = heapq.heappop(heap)
+        if v in settled:
+            continue
+        if pred != v:
+            sigma[v] += sigma[pred]
+        stack.append(v)
+        settled[v] = dist
+
+        for pos in range(indptr[v], indptr[v + 1]):
+            w = indices[pos]
+            candidate = dist + lengths[pos]
+            if w in settled:
+                continue
+            known = seen.get(w)
+            tolerance = 1e-9 * max(1.0, candidate)
+            if known is None or candidate < known - tolerance:
+                seen[w] = candidate
+                heapq.heappush(heap, (candidate, v, w))
+                sigma[w] = 0.0
+                preds[w] = [v]
+            elif abs(candidate - known) <= tolerance:
+                sigma[w] += sigma[v]
+                preds[w].append(v)
+
+    delta = dict.fromkeys(stack, 0.0)
+    while stack:
+        w = stack.pop()
+        coeff = (1.0 + delta[w]) / sigma[w]
+        for v in preds[w]:
+            delta[v] += sigma[v] * coeff
+        if w != source:
+            betweenness[w] += delta[w]
+
+
+def modularity(graph: CSRGraph, labels: np.ndarray, resolution: float = 1.0) -> float:
+    """Взвешенная модулярность разбиения (с параметром resolution)"""
+    m2 = graph.weights.sum()
+    if m2 == 0:
+        return 0.0
+
+    labels = np.asarray(labels)
+    rows = np.repeat(np.arange(graph.num_nodes), graph.degree())
+    internal = graph.weights[labels[rows] == labels[graph.indices]].sum()
+    strength = np.bincount(rows, weights=graph.weights, minlength=graph.num_nodes)
+    totals = np.bincount(labels, weights=strength)
+
+    return float(internal / m2 - resolution * np.sum((totals / m2) ** 2))
+
+
+def louvain_communities(
+    graph: CSRGraph,
+    resolution: float = 1.0,
+    initial: Optional[np.ndarray] = None,
+    seed: Optional[int] = None,
+    max_levels: int = 20,
+    max_passes: int = 50,
+    refine: bool = True,
+) -> np.ndarray:
+    """
+    Сообщества максимизацией модулярности (Louvain + Leiden-уточнение)
+
+    Уровень: локальные перемещения вершин в соседнее сообщество с максимальным
+    приростом модулярности, затем агрегация сообществ в вершины нового графа.
+    С refine=True сообщества перед агрегацией разбиваются на связные части
+    (как в Leiden), поэтому в результате нет несвязных сообществ.
+
+    Args:
+        graph: CSR граф, weights - веса ребер
+        resolution: > 1 - больше мелких сообществ, < 1 - меньше крупных
+        initial: Начальные метки (например, прошлый запуск), -1 - новая вершина
+        seed: Seed для порядка обхода вершин
+        max_levels: Максимум уровней агрегации
+        max_passes: Максимум проходов локальных перемещений на уровне
+        refine: Leiden-уточнение (разбиение несвязных сообществ)
+
+    Returns:
+        Метки сообществ [num_nodes], 0 - самое большое сообщество
+    """
+    n = graph.num_nodes
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    m2 = float(graph.weights.sum())
+
+    # Текущий (агрегированный) граф: CSR без петель + веса петель
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+    loops = np.zeros(n, dtype=np.float64)
+    node_to_agg = np.arange(n)
+    community = _initial_labels(initial, n)
+
+    if m2 == 0:
+        return _relabel_by_size(community)
+
+    for _ in range(max_levels):
+        num_current = len(indptr) - 1
+        rows = np.repeat(np.arange(num_current), np.diff(indptr))
+        strength = np.bincount(rows, weights=weights, minlength=num_current) + 2 * loops
+
+        community = _local_moving(
+            indptr, indices, weights, strength, community, resolution, m2, rng, max_passes
+        )
+
+        refined = _split_disconnected(indptr, indices, community) if refine else community
+        groups = np.unique(refined, return_inverse=True)[1]
+        num_groups = int(groups.max()) + 1
+        if num_groups == num_current:
+            break
+
+        # Агрегированная вершина начинает в сообществе своих участников
+        next_community = np.zeros(num_groups, dtype=np.int64)
+        next_community[groups] = community
+        community = np.unique(next_community, return_inverse=True)[1]
+
+        node_to_agg = groups[node_to_agg]
+        indptr, indices, weights, loops = _aggregate(indptr, indices, weights, loops, groups)
+
+    labels = community[node_to_agg]
+    if refine:
+        labels = _split_disconnected(graph.indptr, graph.indices, labels)
+    return _relabel_by_size(labels)
+
+
+def _initial_labels(initial: Optional[np.ndarray], n: int) -> np.ndarray:
+    """Начальное разбиение: метки прошлого запуска, новые вершины - одиночки"""
+    if initial is None:
+        return np.arange(n)
+
+    labels = np.asarray(initial, dtype=np.int64).copy()
+    new = labels < 0
+    labels[new] = labels.max(initial=-1) + 1 + np.arange(new.sum())
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def _relabel_by_size(labels: np.ndarray) -> np.ndarray:
+    """Компактные метки, 0 - самое большое сообщество"""
+    unique, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(unique), dtype=np.int64)
+    rank[np.argsort(-counts, kind="stable")] = np.arange(len(unique))
+    return rank[inverse]
+
+
+def _local_moving(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    weights: np.ndarray,
+    strength: np.ndarray,
+    community: np.ndarray,
+    resolution: float,
+    m2: float,
+    rng: np.random.Generator,
+    max_passes: int,
+) -> np.ndarray:
+    """
+    Фаза 1 Louvain: жадные перемещения вершин между соседними сообществами
+
+    Очередь как в Leiden: после первого прохода пересматриваются только соседи
+    переместившихся вершин. max_passes ограничивает число просмотров на вершину.
+    """
+    ptr, nbr, wgt = indptr.tolist(), indices.tolist(), weights.tolist()
+    k = strength.tolist()
+    labels = community.tolist()
+    totals = np.bincount(community, weights=strength, minlength=len(k)).tolist()
+    scale = resolution / m2
+
+    queue = deque(rng.permutation(len(k)).tolist())
+    queued = [True] * len(k)
+    budget = max_passes * len(k)
+
+    while queue and budget > 0:
+        i = queue.popleft()
+        queued[i] = False
+        budget -= 1
+        current = labels[i]
+        ki = k[i]
+
+        links = {}
+        for pos in range(ptr[i], ptr[i + 1]):
+            c = labels[nbr[pos]]
+            links[c] = links.get(c, 0.0) + wgt[pos]
+
+        totals[current] -= ki
+        best = current
+        best_gain = links.get(current, 0.0) - scale * totals[current] * ki
+        for c, w in links.items():
+            gain = w - scale * totals[c] * ki
+            if gain > best_gain + 1e-12:
+                best, best_gain = c, gain
+        totals[best] += ki
+
+        if best != current:
+            labels[i] = best
+            for pos in range(ptr[i], ptr[i + 1]):
+                j = nbr[pos]
+                if not queued[j] and labels[j] != best:
+                    queued[j] = True
+                    queue.append(j)
+
+    return np.asarray(labels, dtype=np.int64)
+
+
+def _split_disconnected(indptr: np.ndarray, indices: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Разбить каждое сообщество на связные компоненты (min-label propagation)"""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    inside = labels[rows] == labels[indices]
+    src, dst = rows[inside], indices[inside]
+
+    component = np.arange(len(labels))
+    while True:
+        previous = component
+        component = component.copy()
+        np.minimum.at(component, src, component[dst])
+        component = component[component]  # pointer jumping
+        if np.array_equal(component, previous):
+            return component
+
+
+def _aggregate(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    weights: np.ndarray,
+    loops: np.ndarray,
+    groups: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Фаза 2 Louvain: сообщества -> вершины, веса ребер суммируются"""
+    num_groups = int(groups.max()) + 1
+    rows = groups[np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))]
+    cols = groups[indices]
+
+    # Ребра внутри группы становятся петлей (каждое ребро было в CSR дважды)
+    internal = rows == cols
+    new_loops = np.bincount(groups, weights=loops, minlength=num_groups)
+    new_loops += np.bincount(rows[internal], weights=weights[internal], minlength=num_groups) / 2
+
+    keys = rows[~internal] * num_groups + cols[~internal]
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    new_weights = np.bincount(inverse, weights=weights[~internal])
+    new_rows, new_cols = unique_keys // num_groups, unique_keys % num_groups
+
+    new_indptr = np.zeros(num_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(new_rows, minlength=num_groups), out=new_indptr[1:])
+
+    return new_indptr, new_cols, new_weights, new_loops
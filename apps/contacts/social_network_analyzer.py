@@ -8,7 +8,18 @@ from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.ml.recommendation_engine import invalidate_connection_graphs
+from apps.contacts.network_algorithms import (
+    CSRGraph,
+    EdgeList,
+    brandes_betweenness,
+    louvain_communities,
+    posting_list_pairs,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -48,62 +59,228 @@ class ContactNode:
     name: str
     organization: str
     location: str
-    connections: List[Connection] = field(default_factory=list)
     influence_score: float = 0.0
     betweenness_centrality: float = 0.0
     degree_centrality: float = 0.0
     community_id: int = -1  # Community detection result
 
 
+# Коды типов связи для компактного хранения ребер (EdgeList.types)
+CONNECTION_TYPES = list(ConnectionType)
+CONNECTION_TYPE_CODES = {ctype: code for code, ctype in enumerate(CONNECTION_TYPES)}
+
+
 class SocialNetworkAnalyzer:
     """Главный анализатор социальных сетей"""
 
+    # Выше этого размера betweenness считается по выборке источников
+    APPROXIMATE_BETWEENNESS_NODES = 50000
+
+    # Posting lists больше этого размера сэмплируются (fanout соседей на участника)
+    MAX_POSTING_LIST_SIZE = 1000
+    POSTING_LIST_FANOUT = 20
+
     def __init__(self, supabase_client):
         self.supabase = supabase_client
         self.graph: Dict[str, ContactNode] = {}
+        self.contacts: Dict[str, Dict] = {}
+        self.edges = EdgeList()
+        self._node_index: Dict[str, int] = {}
+        self._csr: Optional[CSRGraph] = None
+        # Инвертированные индексы (organization / location / tag -> вузлы) живут между
+        # вызовами build_graph, чтобы новые контакты связывались и с уже добавленными
+        self._postings: Tuple[Dict[str, List[int]], ...] = (
+            defaultdict(list),
+            defaultdict(list),
+            defaultdict(list),
+        )
 
-    async def build_graph(self, contacts: List[Dict]) -> Dict[str, ContactNode]:
-        """Построить граф социальных нетей"""
+    async def build_graph(
+        self,
+        contacts: List[Dict],
+        max_posting_size: Optional[int] = None,
+        fanout: Optional[int] = None,
+        seed: int = 0,
+    ) -> Dict[str, ContactNode]:
+        """Построить граф социальных нетей
+
+        Ребра генерируются только внутри posting lists инвертированного индекса
+        (organization / location / tag -> контакты), а не по всем O(N^2) парам.
+        Списки больше max_posting_size сэмплируются (fanout соседей на участника).
+        """
+        max_posting_size = max_posting_size or self.MAX_POSTING_LIST_SIZE
+        fanout = fanout or self.POSTING_LIST_FANOUT
 
         # Создать вузлы
+        first_new = len(self.graph)
+        batch = []
         for contact in contacts:
             if contact["id"] not in self.graph:
-                self.graph[contact["id"]] = ContactNode(
-                    contact_id=contact["id"],
-                    name=f"{contact.get('first_name', '')} {contact.get('last_name', '')}".strip(),
-                    organization=contact.get("organization", ""),
-                    location=contact.get("location", ""),
-                )
-
-        # Найти связи
-        for i, c1 in enumerate(contacts):
-            for c2 in contacts[i + 1 :]:
-                connection_type, strength, shared = self._detect_connection(c1, c2)
-
-                if connection_type:
-                    conn = Connection(
-                        contact_id_1=c1["id"],
-                        contact_id_2=c2["id"],
-                        connection_type=connection_type,
-                        strength=strength,
-                        shared_attributes=shared,
-                    )
-
-                    # Односторонняя связь (добавляем в обе стороны)
-                    self.graph[c1["id"]].connections.append(conn)
-                    self.graph[c2["id"]].connections.append(
-                        Connection(
-                            contact_id_1=c2["id"],
-                            contact_id_2=c1["id"],
-                            connection_type=connection_type,
-                            strength=strength,
-                            shared_attributes=shared,
-                        )
-                    )
-
-        logger.info(f"Граф построен: {len(self.graph)} вузлов")
+                self._add_node(contact)
+                batch.append((self._node_index[contact["id"]], contact))
+
+        # Дополнить инвертированные индексы; пересчитываются только затронутые списки
+        organizations, locations, tags = self._postings
+        touched = (set(), set(), set())
+
+        for idx, contact in batch:
+            if contact.get("organization"):
+                organizations[contact["organization"]].append(idx)
+                touched[0].add(contact["organization"])
+            if contact.get("location"):
+                locations[contact["location"]].append(idx)
+                touched[1].add(contact["location"])
+            for tag in set(contact.get("tags") or []):
+                tags[tag].append(idx)
+                touched[2].add(tag)
+
+        # Пары только внутри posting lists, хотя бы один конец - новый вузол
+        # (пары старых вузлов уже добавлены предыдущими вызовами)
+        rng = np.random.default_rng(seed)
+        sampled_lists = 0
+        pairs = []
+        for index, keys in zip(self._postings, touched):
+            left, right = [], []
+            for key in sorted(keys):
+                members = index[key]
+                if len(members) > max_posting_size:
+                    sampled_lists += 1
+                i, j = posting_list_pairs(np.array(members), max_posting_size, fanout, rng)
+                new = (i >= first_new) | (j >= first_new)
+                left.append(i[new])
+                right.append(j[new])
+            pairs.append(
+                (np.concatenate(left), np.concatenate(right))
+                if left
+                else (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+            )
+
+        self._add_posting_edges(*pairs)
+
+        logger.info(
+            f"Граф построен: {len(self.graph)} вузлов, {len(self.edges)} связей "
+            f"(сэмплировано posting lists: {sampled_lists})"
+        )
         return self.graph
 
+    def _add_node(self, contact: Dict) -> None:
+        self._node_index[contact["id"]] = len(self.graph)
+        self.contacts[contact["id"]] = contact
+        self.graph[contact["id"]] = ContactNode(
+            contact_id=contact["id"],
+            name=f"{contact.get('first_name', '')} {contact.get('last_name', '')}".strip(),
+            organization=contact.get("organization", ""),
+            location=contact.get("location", ""),
+        )
+        self._csr = None
+
+    def _add_posting_edges(
+        self,
+        organization_pairs: Tuple[np.ndarray, np.ndarray],
+        location_pairs: Tuple[np.ndarray, np.ndarray],
+        tag_pairs: Tuple[np.ndarray, np.ndarray],
+    ) -> None:
+        """Свести пары из разных индексов в ребра (те же правила, что _detect_connection)"""
+        base = len(self.graph)
+        keys = [
+            i.astype(np.int64) * base + j
+            for i, j in (organization_pairs, location_pairs, tag_pairs)
+        ]
+        all_keys = np.concatenate(keys)
+        if len(all_keys) == 0:
+            return
+
+        unique_keys, inverse = np.unique(all_keys, return_inverse=True)
+        org_end = len(keys[0])
+        loc_end = org_end + len(keys[1])
+
+        same_org = np.zeros(len(unique_keys), dtype=bool)
+        same_org[inverse[:org_end]] = True
+        same_location = np.zeros(len(unique_keys), dtype=bool)
+        same_location[inverse[org_end:loc_end]] = True
+        shared_tags = np.bincount(inverse[loc_end:], minlength=len(unique_keys))
+
+        strength = np.minimum(same_org * 0.5 + same_location * 0.3 + 0.2 * shared_tags, 1.0)
+        types = np.where(
+            same_org,
+            CONNECTION_TYPE_CODES[ConnectionType.COLLEAGUES],
+            np.where(
+                same_location,
+                CONNECTION_TYPE_CODES[ConnectionType.PROXIMITY],
+                CONNECTION_TYPE_CODES[ConnectionType.SOCIAL],
+            ),
+        )
+
+        self.edges.append(unique_keys // base, unique_keys % base, types, strength)
+        self._csr = None
+
+    def add_connection(
+        self,
+        contact_id_1: str,
+        contact_id_2: str,
+        connection_type: ConnectionType = ConnectionType.DIRECT,
+        strength: float = 1.0,
+    ) -> None:
+        """Добавить одну связь между существующими вузлами"""
+        self.edges.append(
+            np.array([self._node_index[contact_id_1]]),
+            np.array([self._node_index[contact_id_2]]),
+            np.array([CONNECTION_TYPE_CODES[connection_type]]),
+            np.array([strength]),
+        )
+        self._csr = None
+
+    def _get_csr(self) -> CSRGraph:
+        """CSR-представление графа (кешируется до следующего изменения)"""
+        if self._csr is None:
+            self._csr = self.edges.to_csr(list(self.graph.keys()))
+        return self._csr
+
+    def neighbors(self, contact_id: str) -> List[str]:
+        """Соседи контакта"""
+        csr = self._get_csr()
+        idx = self._node_index[contact_id]
+        return [csr.node_ids[n] for n in csr.indices[csr.indptr[idx] : csr.indptr[idx + 1]]]
+
+    def connections(self, contact_id: str) -> List[Connection]:
+        """Связи контакта в виде Connection (материализуются по запросу)
+
+        contact_id_1 - сам контакт, contact_id_2 - сосед
+        """
+        idx = self._node_index[contact_id]
+        src, dst, _, _ = self.edges.arrays
+
+        connections = []
+        for conn in self._iter_connections((src == idx) | (dst == idx)):
+            if conn.contact_id_1 != contact_id:
+                conn.contact_id_1, conn.contact_id_2 = contact_id, conn.contact_id_1
+            connections.append(conn)
+        return connections
+
+    def _iter_connections(self, mask: Optional[np.ndarray] = None):
+        """Ребра по одному разу (contact_id_1 < contact_id_2)"""
+        src, dst, types, strength = self.edges.arrays
+        if mask is not None:
+            src, dst, types, strength = src[mask], dst[mask], types[mask], strength[mask]
+        node_ids = list(self.graph.keys())
+        seen = set()
+
+        for i, j, code, value in zip(src.tolist(), dst.tolist(), types.tolist(), strength.tolist()):
+            id1, id2 = sorted((node_ids[i], node_ids[j]))
+            if id1 == id2 or (id1, id2) in seen:
+                continue
+            seen.add((id1, id2))
+
+            c1, c2 = self.contacts.get(id1), self.contacts.get(id2)
+            shared = self._detect_connection(c1, c2)[2] if c1 and c2 else []
+            yield Connection(
+                contact_id_1=id1,
+                contact_id_2=id2,
+                connection_type=CONNECTION_TYPES[code],
+                strength=round(value, 6),
+                shared_attributes=shared,
+            )
+
     def _detect_connection(
         self, c1: Dict, c2: Dict
     ) -> Tuple[Optional[ConnectionType], float, List[str]]:
@@ -126,8 +303,8 @@ class SocialNetworkAnalyzer:
                 connection_type = ConnectionType.PROXIMITY
 
         # Одни теги/группы
-        tags1 = set(c1.get("tags", []))
-        tags2 = set(c2.get("tags", []))
+        tags1 = set(c1.get("tags") or [])
+        tags2 = set(c2.get("tags") or [])
         shared_tags = tags1 & tags2
 
         if shared_tags:
@@ -143,32 +320,56 @@ class SocialNetworkAnalyzer:
 
         return None, 0.0, []
 
-    def calculate_centrality_measures(self) -> Dict[str, Dict]:
-        """Рассчитать центральность для каждого вузла"""
+    def calculate_centrality_measures(
+        self,
+        weighted: bool = False,
+        approximate: Optional[bool] = None,
+        sample_size: int = 1000,
+        seed: Optional[int] = None,
+    ) -> Dict[str, Dict]:
+        """Рассчитать центральность для каждого вузла
+
+        Betweenness считается один раз для всех вершин (Brandes на CSR массивах).
+        weighted=True - длина ребра 1 / Connection.strength.
+        approximate=None - приближенный режим включается автоматически для графов
+        больше APPROXIMATE_BETWEENNESS_NODES вершин (sample_size источников).
+        """
 
         results = {}
         total_nodes = len(self.graph)
 
-        for contact_id, node in self.graph.items():
+        csr = self._get_csr()
+        if approximate is None:
+            approximate = total_nodes > self.APPROXIMATE_BETWEENNESS_NODES
+
+        # Betweenness centrality (нода как "поворотная точка") - все кратчайшие пути
+        betweenness = brandes_betweenness(
+            csr,
+            weighted=weighted,
+            sample_size=sample_size if approximate else None,
+            seed=seed,
+        )
+        max_betweenness = (total_nodes - 1) * (total_nodes - 2) / 2.0
+        if max_betweenness > 0:
+            betweenness = betweenness / max_betweenness
+
+        degrees = csr.degree()
+        strength_sums = np.bincount(
+            np.repeat(np.arange(total_nodes), degrees), weights=csr.weights, minlength=total_nodes
+        )
+
+        for idx, (contact_id, node) in enumerate(self.graph.items()):
             # Degree centrality (сколько связей)
-            degree = len(node.connections)
+            degree = int(degrees[idx])
             node.degree_centrality = degree / (total_nodes - 1) if total_nodes > 1 else 0.0
 
-            # Betweenness centrality (нода как "поворотная точка")
-            # Прымой сдвиговые пути
-            betweenness = self._calculate_betweenness(contact_id)
-            node.betweenness_centrality = betweenness
+            node.betweenness_centrality = float(betweenness[idx])
 
             # Influence score (влияние)
             node.influence_score = (
                 node.degree_centrality * 0.4
                 + node.betweenness_centrality * 0.4
-                + (
-                    sum(c.strength for c in node.connections) / len(node.connections)
-                    if node.connections
-                    else 0
-                )
-                * 0.2
+                + (float(strength_sums[idx]) / degree if degree else 0) * 0.2
             )
 
             results[contact_id] = {
@@ -180,43 +381,6 @@ class SocialNetworkAnalyzer:
 
         return results
 
-    def _calculate_betweenness(self, node_id: str) -> float:
-        """Построить график Betweenness centrality
-        Определяет ноду как 'мост' в сети
-        """
-        # Найти количество кратчайших путей, подождаўщих через тот же нод
-        betweenness = 0.0
-        shortest_paths = self._all_pairs_shortest_paths()
-
-        for source in self.graph:
-            for target in self.graph:
-                if source != target and source != node_id and target != node_id:
-                    # Если путь проходит через node_id
-                    path_key = (source, target)
-                    if path_key in shortest_paths and node_id in shortest_paths[path_key]:
-                        betweenness += 1.0
-
-        # Нормализация
-        max_betweenness = (len(self.graph) - 1) * (len(self.graph) - 2) / 2.0
-        return betweenness / max_betweenness if max_betweenness > 0 else 0.0
-
-    def _all_pairs_shortest_paths(self) -> Dict[Tuple, List[str]]:
-        """Найти все кратчайшие пути между всеми парами вузлов
-        BFS algorithm
-        """
-        paths = {}
-
-        for start_id in self.graph:
-            # BFS из каждого вузла
-            distances, predecessors = self._bfs(start_id)
-
-            for end_id in self.graph:
-                if start_id != end_id:
-                    path = self._reconstruct_path(start_id, end_id, predecessors)
-                    paths[(start_id, end_id)] = path
-
-        return paths
-
     def _bfs(self, start_id: str) -> Tuple[Dict, Dict]:
         """Ширинный поиск в ширину"""
         distances = {node_id: float("inf") for node_id in self.graph}
@@ -228,9 +392,7 @@ class SocialNetworkAnalyzer:
         while queue:
             current = queue.popleft()
 
-            for connection in self.graph[current].connections:
-                neighbor = connection.contact_id_2
-
+            for neighbor in self.neighbors(current):
                 if distances[neighbor] > distances[current] + 1:
                     distances[neighbor] = distances[current] + 1
                     predecessors[neighbor] = current
@@ -253,14 +415,15 @@ class SocialNetworkAnalyzer:
     def find_influencers(self, top_n: int = 10) -> List[Dict]:
         """Найти топ влиятелей"""
         influencers = []
+        degrees = self._get_csr().degree()
 
-        for contact_id, node in self.graph.items():
+        for idx, (contact_id, node) in enumerate(self.graph.items()):
             influencers.append(
                 {
                     "contact_id": contact_id,
                     "name": node.name,
                     "influence_score": node.influence_score,
-                    "connections": len(node.connections),
+                    "connections": int(degrees[idx]),
                     "organization": node.organization,
                 }
             )
@@ -270,49 +433,30 @@ class SocialNetworkAnalyzer:
 
         return influencers[:top_n]
 
-    def detect_communities(self, resolution: float = 1.0) -> Dict[int, List[str]]:
+    def detect_communities(
+        self, resolution: float = 1.0, incremental: bool = False, seed: Optional[int] = None
+    ) -> Dict[int, List[str]]:
         """Найти коммунитеты (группы тесно связанных контактов)
-        Конитец Louvain algorithm (simplified)
-        """
-        # Определить каждым нодам откытою коммунитета
-        community_id = 0
-        assigned = set()
-        communities = defaultdict(list)
-
-        # Простое равъждательное воскох (удар)
-        for node_id, node in self.graph.items():
-            if node_id not in assigned:
-                # BFS для нахождения коннектед компоненты
-                component = self._dfs_component(node_id, assigned)
-
-                for component_node in component:
-                    communities[community_id].append(component_node)
-                    self.graph[component_node].community_id = community_id
+        Louvain с Leiden-уточнением по взвешенному графу (вес = Connection.strength)
 
-                community_id += 1
-
-        return dict(communities)
-
-    def _dfs_component(self, start_id: str, assigned: Set[str]) -> List[str]:
-        """Найти все вузлы в коннектед компоненте
-        DFS algorithm
+        resolution > 1 - больше мелких сообществ, < 1 - меньше крупных.
+        incremental=True - старт с прошлых community_id (новые вузлы - одиночки),
+        повторный запуск после добавления контактов сходится за пару проходов.
         """
-        component = []
-        stack = [start_id]
-
-        while stack:
-            current = stack.pop()
+        initial = None
+        if incremental:
+            initial = np.array([node.community_id for node in self.graph.values()])
 
-            if current not in assigned:
-                assigned.add(current)
-                component.append(current)
+        labels = louvain_communities(
+            self._get_csr(), resolution=resolution, initial=initial, seed=seed
+        )
 
-                for connection in self.graph[current].connections:
-                    neighbor = connection.contact_id_2
-                    if neighbor not in assigned:
-                        stack.append(neighbor)
+        communities = defaultdict(list)
+        for (node_id, node), community_id in zip(self.graph.items(), labels.tolist()):
+            node.community_id = community_id
+            communities[community_id].append(node_id)
 
-        return component
+        return dict(sorted(communities.items()))
 
     def find_shortest_path(self, start_id: str, end_id: str) -> Tuple[List[str], float]:
         """Найти кратчайший путь между двумя контактами
@@ -330,26 +474,27 @@ class SocialNetworkAnalyzer:
         # Сохранить связи
         connections_data = []
 
-        for node in self.graph.values():
-            for conn in node.connections:
-                # Обработать дубликаты (save only one direction)
-                if conn.contact_id_1 < conn.contact_id_2:  # Применить канонический порядок
-                    connections_data.append(
-                        {
-                            "contact_id_1": conn.contact_id_1,
-                            "contact_id_2": conn.contact_id_2,
-                            "connection_type": conn.connection_type.value,
-                            "strength": conn.strength,
-                            "weight": conn.weight,
-                            "shared_attributes": conn.shared_attributes,
-                        }
-                    )
+        # Каждое ребро хранится один раз, в каноническом порядке (contact_id_1 < contact_id_2)
+        for conn in self._iter_connections():
+            connections_data.append(
+                {
+                    "contact_id_1": conn.contact_id_1,
+                    "contact_id_2": conn.contact_id_2,
+                    "connection_type": conn.connection_type.value,
+                    "strength": conn.strength,
+                    "weight": conn.weight,
+                    "shared_attributes": conn.shared_attributes,
+                }
+            )
 
         # Обработать все связи
         response = (
             await self.supabase.table("contact_connections").insert(connections_data).execute()
         )
 
+        # Сбросить закэшированный граф связей у движков рекомендаций
+        invalidate_connection_graphs()
+
         # Обновить метрики контактов
         for contact_id, node in self.graph.items():
             await self.supabase.table("apple_contacts").update(
@@ -368,7 +513,7 @@ class SocialNetworkAnalyzer:
     async def get_statistics(self) -> Dict:
         """Получить статистику социальной сети"""
 
-        total_connections = sum(len(node.connections) for node in self.graph.values()) // 2
+        total_connections = self._get_csr().num_edges
 
         influencers = self.find_influencers(top_n=10)
         communities = self.detect_communities()
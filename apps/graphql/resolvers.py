@@ -20,6 +20,7 @@ import os
 from dotenv import load_dotenv
 from supabase import Client, create_client
 
+from api.analytics.aggregates import get_interaction_aggregates
 from api.ml.churn_predictor import ChurnPredictor
 from api.ml.clustering_service import ContactClusteringService
 
@@ -74,14 +75,14 @@ def get_recommendation_engine() -> RecommendationEngine:
 def get_churn_predictor() -> ChurnPredictor:
     global _churn_predictor
     if _churn_predictor is None:
-        _churn_predictor = ChurnPredictor()
+        _churn_predictor = ChurnPredictor(supabase, aggregates=get_interaction_aggregates())
     return _churn_predictor
 
 
 def get_sentiment_analyzer() -> SentimentAnalyzer:
     global _sentiment_analyzer
     if _sentiment_analyzer is None:
-        _sentiment_analyzer = SentimentAnalyzer()
+        _sentiment_analyzer = SentimentAnalyzer(supabase, aggregates=get_interaction_aggregates())
     return _sentiment_analyzer
 
 
@@ -0,0 +1,393 @@
+"""
+Shared test fakes
+
+In-memory stand-ins for the services the API talks to:
+1. FakeSupabase / FakeQuery: PostgREST query builder over dict-of-lists tables
+2. FakeRedis / FakePipeline / FakePubSub / FakeBroker: redis.asyncio subset
+3. FakeClock: manual monotonic clock with an instant async sleep
+4. FakeGraphBuilder: ContactGraphBuilder stand-in over a seeded random graph
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import torch
+from torch_geometric.data import Data
+
+INTERACTION_TYPES = ["email", "meeting", "call", "message", "note"]
+
+
+# =============================================================================
+# Supabase
+# =============================================================================
+
+
+class FakeQuery:
+    """Minimal PostgREST query builder over an in-memory table"""
+
+    def __init__(self, table_name, rows, calls, latency=0.0):
+        self.table_name = table_name
+        self.rows = rows
+        self.calls = calls
+        self.latency = latency
+        self.filters = []
+        self.bounds = None
+        self.max_rows = None
+        self.columns = None
+        self.ids = None
+        self.order_by = None
+        self.payload = None
+
+    def select(self, columns="*", **kwargs):
+        self.columns = columns
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) >= value)
+        return self
+
+    def in_(self, column, values):
+        self.ids = list(values)
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, count):
+        self.max_rows = count
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end + 1)
+        return self
+
+    def upsert(self, data, on_conflict=None):
+        self.payload = data if isinstance(data, list) else [data]
+        return self
+
+    def execute(self):
+        self.calls.append(self)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.payload is not None:
+            ids = {row["contact_id"] for row in self.payload}
+            self.rows[:] = [row for row in self.rows if row["contact_id"] not in ids]
+            self.rows.extend(self.payload)
+            return SimpleNamespace(data=self.payload)
+        rows = [row for row in self.rows if all(f(row) for f in self.filters)]
+        if self.bounds:
+            rows = rows[self.bounds[0] : self.bounds[1]]
+        if self.max_rows is not None:
+            rows = rows[: self.max_rows]
+        return SimpleNamespace(data=rows)
+
+
+class FakeSupabase:
+    """Supabase client over ``{table_name: rows}``; every executed query lands in ``calls``"""
+
+    def __init__(self, tables=None, latency=0.0):
+        self.tables = {} if tables is None else tables
+        self.latency = latency
+        self.calls = []
+
+    def table(self, name):
+        return FakeQuery(name, self.tables.setdefault(name, []), self.calls, self.latency)
+
+    def calls_to(self, name):
+        return [call for call in self.calls if call.table_name == name]
+
+    @property
+    def upserts(self):
+        return [call for call in self.calls if call.payload is not None]
+
+
+def make_workspace(num_contacts=50, max_interactions=40, seed=0, workspace_id="ws_1"):
+    """Contacts (some without interactions) and interactions spread over ~400 days"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    contacts, interactions = [], []
+    for i in range(num_contacts):
+        contact_id = str(uuid.UUID(int=seed * 100_000 + i + 1))
+        contacts.append(
+            {
+                "id": contact_id,
+                "workspace_id": workspace_id,
+                "first_name": f"First{i}" if i % 7 else "",
+                "last_name": f"Last{i}" if i % 7 else "",
+                "email": f"contact{i}@example.com",
+                "organization": f"Org{i % 5}",
+            }
+        )
+        for _ in range(rng.choice([0, 1, 3, rng.randint(1, max_interactions)])):
+            occurred_at = now - timedelta(days=rng.uniform(0, 400), seconds=rng.randint(0, 86399))
+            interactions.append(
+                {
+                    "contact_id": contact_id,
+                    "workspace_id": workspace_id,
+                    "type": rng.choice(INTERACTION_TYPES),
+                    "occurred_at": occurred_at.replace(microsecond=0)
+                    .isoformat()
+                    .replace("+00:00", "Z"),
+                }
+            )
+    return contacts, interactions
+
+
+# =============================================================================
+# Redis
+# =============================================================================
+
+
+class FakeBroker:
+    """Shared Redis server state: keys and pub/sub subscribers"""
+
+    def __init__(self, values=None):
+        self.values = {} if values is None else values
+        self.subscribers = {}
+
+    def publish(self, channel, message):
+        queues = self.subscribers.get(channel, [])
+        for queue in queues:
+            queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(queues)
+
+
+class FakeRedis:
+    """
+    In-memory redis.asyncio subset; every awaited command / pipeline execute is one RTT.
+
+    Clients built over the same ``values`` dict (or ``broker``) share one server.
+    """
+
+    def __init__(self, values=None, latency: float = 0.0, broker: FakeBroker = None):
+        self.broker = broker or FakeBroker(values)
+        self.values = self.broker.values
+        self.latency = latency
+        self.round_trips = 0
+        self.scans = 0
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    # Commands (applied synchronously; shared by the pipeline)
+    def _get(self, key):
+        return self.values.get(key)
+
+    def _setex(self, key, ttl, value):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def _incrby(self, key, amount=1):
+        value = int(self.values.get(key, 0)) + amount
+        self.values[key] = str(value).encode()
+        return value
+
+    def _incr(self, key):
+        return self._incrby(key, 1)
+
+    def _expire(self, key, ttl):
+        return key in self.values
+
+    def _pttl(self, key):
+        return 3_600_000 if key in self.values else -2
+
+    def _delete(self, *keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    def _hincrby(self, key, field, amount):
+        hash_ = self.values.setdefault(key, {})
+        hash_[field.encode()] = int(hash_.get(field.encode(), 0)) + amount
+
+    def _hincrbyfloat(self, key, field, amount):
+        hash_ = self.values.setdefault(key, {})
+        hash_[field.encode()] = float(hash_.get(field.encode(), 0.0)) + amount
+
+    def _hgetall(self, key):
+        return dict(self.values.get(key, {}))
+
+    def _zincrby(self, key, amount, member):
+        zset = self.values.setdefault(key, {})
+        zset[member.encode()] = zset.get(member.encode(), 0) + amount
+
+    def _zremrangebyrank(self, key, start, stop):
+        zset = self.values.get(key, {})
+        ranked = sorted(zset, key=zset.get)
+        stop = len(ranked) + stop if stop < 0 else stop
+        for member in ranked[start : stop + 1]:
+            del zset[member]
+
+    def _zrevrange(self, key, start, stop):
+        zset = self.values.get(key, {})
+        return sorted(zset, key=zset.get, reverse=True)[start : stop + 1]
+
+    async def get(self, key):
+        await self._round_trip()
+        return self._get(key)
+
+    async def mget(self, keys):
+        await self._round_trip()
+        return [self._get(key) for key in keys]
+
+    async def setex(self, key, ttl, value):
+        await self._round_trip()
+        return self._setex(key, ttl, value)
+
+    async def incr(self, key):
+        await self._round_trip()
+        return self._incrby(key)
+
+    async def delete(self, *keys):
+        await self._round_trip()
+        return self._delete(*keys)
+
+    async def scan(self, cursor=0, match=None, count=None):
+        self.scans += 1
+        await self._round_trip()
+        return 0, list(self.values)
+
+    async def publish(self, channel, message):
+        await self._round_trip()
+        return self.broker.publish(channel, message)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self):
+        return FakePubSub(self.broker)
+
+    async def close(self):
+        pass
+
+
+class FakePipeline:
+    """Buffers ``FakeRedis._<command>`` calls and applies them in one round trip"""
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, f"_{name}")
+
+        def buffer(*args):
+            self.commands.append((command, args))
+
+        return buffer
+
+    async def execute(self):
+        await self.redis._round_trip()
+        commands, self.commands = self.commands, []
+        return [command(*args) for command, args in commands]
+
+
+class FakePubSub:
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.broker.subscribers.setdefault(channel, []).append(self.queue)
+
+    async def unsubscribe(self, channel):
+        self.broker.subscribers.get(channel, []).remove(self.queue)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        pass
+
+
+class BrokenRedis:
+    """Every command fails as if the server were down"""
+
+    async def get(self, key):
+        raise ConnectionError("Redis unavailable")
+
+    async def mget(self, keys):
+        raise ConnectionError("Redis unavailable")
+
+    def pipeline(self, transaction=True):
+        raise ConnectionError("Redis unavailable")
+
+
+# =============================================================================
+# Clock
+# =============================================================================
+
+
+class FakeClock:
+    """Manual clock; sleeping advances time instantly"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+# =============================================================================
+# GNN
+# =============================================================================
+
+
+def make_graph(num_nodes=50, num_edges=200, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.rand(num_nodes, 3, generator=generator)
+    edge_index = torch.randint(0, num_nodes, (2, num_edges), generator=generator)
+    return Data(x=x, edge_index=edge_index, num_nodes=num_nodes)
+
+
+class FakeGraphBuilder:
+    """ContactGraphBuilder stand-in recording fingerprint checks, builds and detail loads"""
+
+    def __init__(self, num_nodes=50, num_edges=200, seed=0):
+        self.num_nodes = num_nodes
+        self.num_edges = num_edges
+        self.seed = seed
+        self.fingerprint = "fp-1"
+        self.fingerprints = {}  # per-workspace overrides of ``fingerprint``
+        self.fingerprint_checks = 0
+        self.builds = []
+        self.details_calls = []
+
+    def __call__(self, supabase, **kwargs):
+        return self
+
+    async def get_graph_fingerprint(self, workspace_id):
+        self.fingerprint_checks += 1
+        return self.fingerprints.get(workspace_id, self.fingerprint)
+
+    async def build_graph_for_workspace(self, workspace_id):
+        self.builds.append(workspace_id)
+        contact_ids = [f"c{i}" for i in range(self.num_nodes)]
+        return (
+            make_graph(self.num_nodes, self.num_edges, self.seed),
+            contact_ids,
+            {cid: i for i, cid in enumerate(contact_ids)},
+        )
+
+    async def get_contacts_details(self, workspace_id, contact_ids):
+        self.details_calls.append(list(contact_ids))
+        return {cid: {"id": cid, "first_name": "Contact", "last_name": cid} for cid in contact_ids}
@@ -0,0 +1,225 @@
+"""
+Analytics Engine Tests
+
+Test Coverage:
+1. InteractionDataset group-bys: counts, last interaction, recency, distinct types
+2. Equivalence with the per-contact formulas (CLV, health score, top contacts)
+3. get_metrics: one dataset shared by all four metrics, paged queries
+4. Engagement trends from the dataset and from the standalone query
+5. Benchmark: set-based get_metrics vs one interactions query per contact
+"""
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from api.analytics import AnalyticsMetrics, InteractionDataset
+
+from fakes import FakeSupabase, make_workspace
+
+
+def per_contact_reference(contacts, interactions):
+    """The previous implementation's per-contact formulas (one pass per contact)"""
+    by_contact = {}
+    for row in interactions:
+        by_contact.setdefault(row["contact_id"], []).append(row)
+
+    clvs, healths, top = [], [], []
+    for contact in contacts:
+        rows = by_contact.get(contact["id"], [])
+        count = len(rows)
+        if not rows:
+            clvs.append(0.0)
+            healths.append(0)
+            continue
+
+        last = max(datetime.fromisoformat(r["occurred_at"].replace("Z", "+00:00")) for r in rows)
+        days = (datetime.utcnow().replace(tzinfo=last.tzinfo) - last).days
+        weight = max(0.1, 1 - (days / 365))
+        clvs.append(count * weight * min(1.0, count / 20) * 1000)
+
+        frequency = min(40, count * 2)
+        recency = max(0, 30 - (days / 3))
+        diversity = min(20, len({r["type"] for r in rows}) * 5)
+        healths.append(frequency + recency + diversity + 10)
+
+        mini_clv = count * weight * 1000
+        mini_health = frequency + recency
+        top.append(
+            {
+                "contact_id": contact["id"],
+                "score": round(mini_clv / 100 + mini_health, 2),
+                "clv": round(mini_clv, 2),
+                "health_score": round(mini_health, 1),
+                "interaction_count": count,
+                "last_interaction": last.isoformat(),
+            }
+        )
+    top.sort(key=lambda x: x["score"], reverse=True)
+    return clvs, healths, top
+
+
+class TestInteractionDataset:
+    """Columnar group-bys"""
+
+    def test_group_by_features(self):
+        now = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+        contacts = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+        interactions = [
+            {"contact_id": "a", "type": "email", "occurred_at": "2025-05-31T12:00:00Z"},
+            {"contact_id": "a", "type": "email", "occurred_at": "2025-05-01T00:00:00+00:00"},
+            {"contact_id": "a", "type": "call", "occurred_at": "2025-05-20T08:00:00"},
+            {"contact_id": "c", "type": "meeting", "occurred_at": "2025-03-03T12:00:00Z"},
+            {"contact_id": "other", "type": "email", "occurred_at": "2025-05-31T00:00:00Z"},
+            {"contact_id": "c", "type": "email", "occurred_at": None},
+        ]
+
+        dataset = InteractionDataset.from_rows("ws_1", contacts, interactions, now.timestamp())
+
+        assert dataset.num_interactions == 4  # unknown contact and missing timestamp skipped
+        assert dataset.interaction_counts.tolist() == [3, 0, 1]
+        assert dataset.distinct_types.tolist() == [2, 0, 1]
+        assert dataset.recency_days[[0, 2]].tolist() == [1, 90]
+        assert np.isinf(dataset.recency_days[1])
+        assert dataset.recency_weight[1] == 0.1
+        assert dataset.health_score[1] == 0
+        # 2*3 + (30 - 1/3) + 2*5 + 10
+        assert dataset.health_score[0] == pytest.approx(6 + 30 - 1 / 3 + 10 + 10)
+        assert dataset.daily_counts(2) == {"2025-05-31": 1}
+
+    def test_empty_workspace(self):
+        dataset = InteractionDataset.from_rows("ws_1", [], [])
+
+        assert dataset.interaction_counts.size == 0
+        assert dataset.clv.sum() == 0
+        assert dataset.daily_counts(30) == {}
+
+
+class TestAnalyticsMetrics:
+    """Set-based metrics match the per-contact formulas"""
+
+    @pytest.mark.asyncio
+    async def test_matches_per_contact_formulas(self):
+        contacts, interactions = make_workspace(num_contacts=120, seed=1)
+        analytics = AnalyticsMetrics(
+            FakeSupabase({"contacts": contacts, "interactions": interactions})
+        )
+        clvs, healths, top = per_contact_reference(contacts, interactions)
+
+        clv = await analytics.calculate_clv("ws_1")
+        health = await analytics.calculate_health_score("ws_1")
+        top_contacts = await analytics.get_top_contacts("ws_1", limit=15)
+
+        assert clv["total_clv"] == pytest.approx(round(sum(clvs), 2))
+        assert clv["avg_clv_per_contact"] == pytest.approx(round(sum(clvs) / len(contacts), 2))
+        assert clv["high_value_contacts"] == sum(1 for c in clvs if c > 10000)
+        assert clv["total_contacts"] == len(contacts)
+
+        assert health["overall_score"] == round(sum(healths) / len(contacts), 1)
+        assert health["breakdown"] == {
+            "excellent": sum(1 for s in healths if s >= 80),
+            "good": sum(1 for s in healths if 60 <= s < 80),
+            "fair": sum(1 for s in healths if 40 <= s < 60),
+            "poor": sum(1 for s in healths if s < 40),
+        }
+
+        assert len(top_contacts) == 15
+        for actual, expected in zip(top_contacts, top[:15]):
+            assert {key: actual[key] for key in expected} == expected
+        assert top_contacts[0]["name"] and top_contacts[0]["organization"]
+
+    @pytest.mark.asyncio
+    async def test_empty_workspace_shapes(self):
+        analytics = AnalyticsMetrics(FakeSupabase({}))
+
+        assert await analytics.calculate_clv("ws_1") == {
+            "total_clv": 0,
+            "avg_clv_per_contact": 0,
+            "high_value_contacts": 0,
+        }
+        assert await analytics.calculate_health_score("ws_1") == {
+            "overall_score": 0,
+            "breakdown": {},
+        }
+        assert await analytics.get_top_contacts("ws_1") == []
+
+    @pytest.mark.asyncio
+    async def test_get_metrics_shares_one_dataset(self):
+        contacts, interactions = make_workspace(num_contacts=300, max_interactions=60, seed=2)
+        supabase = FakeSupabase({"contacts": contacts, "interactions": interactions})
+        analytics = AnalyticsMetrics(supabase)
+        analytics.PAGE_SIZE = 250
+
+        metrics = await analytics.get_metrics("ws_1")
+
+        assert set(metrics) == {"clv", "health_score", "engagement", "top_contacts", "generated_at"}
+        assert metrics["clv"]["total_contacts"] == 300
+        assert len(metrics["top_contacts"]) == 10
+        # Paged contacts + paged interactions, nothing per contact
+        assert len(supabase.calls_to("contacts")) == 300 // 250 + 1
+        assert len(supabase.calls_to("interactions")) == len(interactions) // 250 + 1
+
+    @pytest.mark.asyncio
+    async def test_engagement_trends_dataset_and_query_agree(self):
+        contacts, interactions = make_workspace(num_contacts=80, seed=3)
+        supabase = FakeSupabase({"contacts": contacts, "interactions": interactions})
+        analytics = AnalyticsMetrics(supabase)
+        dataset = await analytics.load_dataset("ws_1")
+
+        from_dataset = await analytics.get_engagement_trends("ws_1", 30, dataset=dataset)
+        from_query = await analytics.get_engagement_trends("ws_1", 30)
+
+        assert from_dataset == from_query
+        assert len(from_dataset["daily_counts"]) == 30
+        assert sum(day["count"] for day in from_dataset["daily_counts"]) > 0
+
+
+class TestAnalyticsBenchmark:
+    """Dashboard load: per-contact queries vs one shared dataset"""
+
+    @pytest.mark.asyncio
+    async def test_get_metrics_benchmark(self):
+        contacts, interactions = make_workspace(num_contacts=2000, max_interactions=30, seed=4)
+        latency = 0.0005  # per REST call
+        tables = {"contacts": contacts, "interactions": interactions}
+
+        # Previous access pattern: contacts + one interactions query per contact, per metric
+        by_contact = {}
+        for row in interactions:
+            by_contact.setdefault(row["contact_id"], []).append(row)
+        start = time.perf_counter()
+        legacy_calls = 0
+        for _ in range(3):  # CLV, health score, top contacts
+            time.sleep(latency)
+            legacy_calls += 1
+            for contact in contacts:
+                time.sleep(latency)
+                legacy_calls += 1
+                by_contact.get(contact["id"], [])
+        per_contact_reference(contacts, interactions)
+        legacy_time = time.perf_counter() - start
+
+        supabase = FakeSupabase(tables, latency=latency)
+        analytics = AnalyticsMetrics(supabase)
+        start = time.perf_counter()
+        metrics = await analytics.get_metrics("ws_1")
+        engine_time = time.perf_counter() - start
+
+        assert "error" not in metrics
+        print(
+            f"\n📊 get_metrics, {len(contacts)} contacts / {len(interactions)} interactions "
+            f"({latency * 1000:.1f}ms per REST call):"
+        )
+        print(f"   per-contact queries: {legacy_calls:5d} calls  {legacy_time * 1000:8.1f}ms")
+        print(
+            f"   shared dataset:      {len(supabase.calls):5d} calls  {engine_time * 1000:8.1f}ms"
+        )
+
+        assert len(supabase.calls) < legacy_calls / 100
+        assert engine_time < legacy_time
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
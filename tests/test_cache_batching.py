@@ -0,0 +1,202 @@
+"""
+Bulk Cache Operation Tests
+
+Test Coverage:
+1. mget_recommendations: one MGET for many contacts, hit/miss stats
+2. set_many_recommendations: one pipeline, batched by PIPELINE_BATCH_SIZE
+3. invalidate_workspace: generation bump instead of SCAN + DEL
+4. warmup_cache: 10K contacts in one pipeline
+5. Error handling
+6. Benchmark: warmup round trips and time vs per-key writes
+
+Runs against an in-memory Redis stand-in that counts round trips (no server needed).
+"""
+
+import time
+
+import pytest
+
+from api.cache import CacheManager, ContactRecommendation
+
+from fakes import BrokenRedis, FakeRedis
+
+
+def make_recs(prefix: str, k: int = 20):
+    return [
+        ContactRecommendation(contact_id=f"{prefix}_{i}", score=0.9 - i * 0.01) for i in range(k)
+    ]
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache_manager(redis_client):
+    return CacheManager(redis_client=redis_client, key_prefix="test_superbrain")
+
+
+class TestBulkOperations:
+    """mget / pipelined setex"""
+
+    @pytest.mark.asyncio
+    async def test_mget_hits_and_misses(self, cache_manager, redis_client):
+        await cache_manager.set_many_recommendations(
+            "ws_1", {"c1": make_recs("c1"), "c2": make_recs("c2")}, k=20
+        )
+        redis_client.round_trips = 0
+
+        cached = await cache_manager.mget_recommendations("ws_1", ["c1", "c2", "c3"], k=20)
+
+        assert redis_client.round_trips == 2  # generation + MGET
+        assert cached["c1"][0].contact_id == "c1_0"
+        assert len(cached["c2"]) == 20
+        assert cached["c3"] is None
+        assert (cache_manager.stats.hit_count, cache_manager.stats.miss_count) == (2, 1)
+        # Same entries as the single-key API
+        assert await cache_manager.get_recommendations("ws_1", "c2", 20) == cached["c2"]
+
+    @pytest.mark.asyncio
+    async def test_set_many_is_one_pipeline(self, cache_manager, redis_client):
+        recommendations = {f"c{i}": make_recs(f"c{i}") for i in range(50)}
+
+        cached = await cache_manager.set_many_recommendations("ws_1", recommendations)
+
+        assert cached == 50
+        assert redis_client.round_trips == 2  # generation + pipeline
+        assert await cache_manager.set_many_recommendations("ws_1", {}) == 0
+
+    @pytest.mark.asyncio
+    async def test_pipeline_batch_size(self, cache_manager, redis_client):
+        cache_manager.PIPELINE_BATCH_SIZE = 10
+        recommendations = {f"c{i}": make_recs(f"c{i}", k=2) for i in range(25)}
+
+        await cache_manager.set_many_recommendations("ws_1", recommendations, k=2)
+
+        assert redis_client.round_trips == 1 + 3
+        cached = await cache_manager.mget_recommendations("ws_1", list(recommendations), k=2)
+        assert all(recs is not None for recs in cached.values())
+
+
+class TestGenerationInvalidation:
+    """Workspace invalidation without SCAN"""
+
+    @pytest.mark.asyncio
+    async def test_invalidate_bumps_generation(self, cache_manager, redis_client):
+        for i in range(3):
+            await cache_manager.set_recommendations("ws_1", f"contact_{i}", make_recs("r"), k=20)
+        await cache_manager.set_recommendations("ws_2", "contact_0", make_recs("r"), k=20)
+        redis_client.round_trips = 0
+
+        invalidated = await cache_manager.invalidate_workspace("ws_1")
+
+        assert invalidated == 3
+        assert redis_client.round_trips == 2  # INCR + pipeline
+        assert redis_client.scans == 0
+        assert await cache_manager.get_recommendations("ws_1", "contact_0", 20) is None
+        # Other workspaces keep their entries
+        assert await cache_manager.get_recommendations("ws_2", "contact_0", 20) is not None
+
+        # New writes land in the new generation
+        await cache_manager.set_recommendations("ws_1", "contact_0", make_recs("new"), k=20)
+        cached = await cache_manager.get_recommendations("ws_1", "contact_0", 20)
+        assert cached[0].contact_id == "new_0"
+        assert await cache_manager.invalidate_workspace("ws_1") == 1
+
+    @pytest.mark.asyncio
+    async def test_write_racing_invalidation_is_not_served(self, cache_manager):
+        """A write computed before an invalidation lands in the old generation"""
+        stale_generation = await cache_manager._get_generation("ws_1")
+        await cache_manager.invalidate_workspace("ws_1")
+
+        original = cache_manager._get_generation
+
+        async def stale(workspace_id):
+            return stale_generation
+
+        cache_manager._get_generation = stale
+        await cache_manager.set_recommendations("ws_1", "c1", make_recs("stale"), k=20)
+        cache_manager._get_generation = original
+
+        assert await cache_manager.get_recommendations("ws_1", "c1", 20) is None
+
+
+class TestWarmup:
+    """Warmup writes in one pipeline"""
+
+    @pytest.mark.asyncio
+    async def test_warmup_10k_contacts_one_pipeline(self, cache_manager, redis_client):
+        async def get_top_contacts(workspace_id, limit):
+            return [{"id": f"contact_{i}"} for i in range(limit)]
+
+        async def generate_batch(workspace_id, contact_ids, k):
+            return {contact_id: make_recs(contact_id, k=k) for contact_id in contact_ids}
+
+        result = await cache_manager.warmup_cache(
+            "ws_1",
+            limit=10_000,
+            get_top_contacts_func=get_top_contacts,
+            generate_batch_recommendations_func=generate_batch,
+        )
+
+        assert result["contacts_cached"] == 10_000
+        assert result["recommendations_generated"] == 10_000 * 20
+        assert redis_client.round_trips == 2  # generation + one pipeline
+        cached = await cache_manager.get_recommendations("ws_1", "contact_9999", 20)
+        assert cached[0].contact_id == "contact_9999_0"
+
+
+class TestErrorHandling:
+    """Redis unavailable"""
+
+    @pytest.mark.asyncio
+    async def test_bulk_operations_degrade(self):
+        cache_manager = CacheManager(redis_client=BrokenRedis())
+
+        cached = await cache_manager.mget_recommendations("ws_1", ["c1", "c2"], k=20)
+        assert cached == {"c1": None, "c2": None}
+        assert cache_manager.stats.miss_count == 2
+        assert await cache_manager.set_many_recommendations("ws_1", {"c1": make_recs("c1")}) == 0
+        assert await cache_manager.invalidate_workspace("ws_1") == 0
+
+
+class TestBulkBenchmark:
+    """Round trips dominate warmup"""
+
+    @pytest.mark.asyncio
+    async def test_warmup_vs_per_key_writes(self):
+        num_contacts, sample = 10_000, 200
+        latency = 0.0005  # 0.5ms network round trip
+        recommendations = {f"contact_{i}": make_recs(f"contact_{i}") for i in range(num_contacts)}
+
+        per_key_redis = FakeRedis(latency=latency)
+        per_key = CacheManager(redis_client=per_key_redis)
+        start = time.perf_counter()
+        for contact_id in list(recommendations)[:sample]:
+            await per_key.set_recommendations("ws_1", contact_id, recommendations[contact_id])
+        per_key_time = (time.perf_counter() - start) / sample * num_contacts
+        per_key_trips = per_key_redis.round_trips / sample * num_contacts
+
+        bulk_redis = FakeRedis(latency=latency)
+        bulk = CacheManager(redis_client=bulk_redis)
+        start = time.perf_counter()
+        await bulk.set_many_recommendations("ws_1", recommendations)
+        bulk_time = time.perf_counter() - start
+        bulk_trips = bulk_redis.round_trips
+
+        start = time.perf_counter()
+        await bulk.mget_recommendations("ws_1", list(recommendations)[:1000])
+        mget_time = time.perf_counter() - start
+
+        print(f"\n📊 Cache warmup ({num_contacts} contacts, {latency * 1000:.1f}ms RTT):")
+        print(f"   Per-key writes (est.): {per_key_time:.2f}s, {per_key_trips:.0f} round trips")
+        print(f"   Pipelined writes:      {bulk_time:.2f}s, {bulk_trips} round trips")
+        print(f"   mget 1000 contacts:    {mget_time * 1000:.1f}ms")
+
+        assert bulk_trips == 2
+        assert bulk_time < per_key_time
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,227 @@
+"""
+Cache Codec Tests
+
+Test Coverage:
+1. Round trips: json / msgpack / packed, UUID and free-form ids, reason codes and literals
+2. Compression: zlib (and zstd when installed), small payloads stay uncompressed
+3. Version header: legacy JSON, other versions, unknown codecs, corrupt values -> miss
+4. CacheManager: codec selection, cross-codec reads, legacy entries served as misses
+5. Benchmark: bytes per key and encode/decode time on k=20 / k=100 payloads
+"""
+
+import json
+import struct
+import timeit
+import uuid
+
+import pytest
+
+from api.cache import CacheManager, ContactRecommendation
+from api.cache.codecs import (
+    HEADER,
+    MAGIC,
+    REASON_CODES,
+    CacheCodec,
+    JsonCodec,
+    MsgpackCodec,
+    PackedCodec,
+    decode_value,
+    get_codec,
+    msgpack,
+    zstandard,
+)
+
+from fakes import FakeRedis
+
+
+def make_recs(k: int = 20, uuid_ids: bool = True, seed: int = 0):
+    """GNN-shaped recommendations: UUID contacts, descending scores, explanations"""
+    recs = []
+    for i in range(k):
+        score = 0.95 - i * 0.9 / k
+        contact_id = str(uuid.UUID(int=seed * 1000 + i + 1)) if uuid_ids else f"contact_{i}"
+        reason = REASON_CODES[1 + min(3, int((1 - score) * 4))]
+        recs.append(ContactRecommendation(contact_id=contact_id, score=score, reason=reason))
+    return recs
+
+
+def available_codecs():
+    codecs = [JsonCodec(), PackedCodec()]
+    if msgpack is not None:
+        codecs.append(MsgpackCodec())
+    return codecs
+
+
+def to_models(rows):
+    return [ContactRecommendation(contact_id=c, score=s, reason=r) for c, s, r in rows]
+
+
+def assert_same(actual, expected):
+    assert [rec.contact_id for rec in actual] == [rec.contact_id for rec in expected]
+    assert [rec.reason for rec in actual] == [rec.reason for rec in expected]
+    assert [rec.score for rec in actual] == pytest.approx([rec.score for rec in expected], abs=1e-6)
+
+
+class TestRoundTrip:
+    """Encode -> decode_value"""
+
+    @pytest.mark.parametrize("codec", available_codecs(), ids=lambda codec: codec.name)
+    @pytest.mark.parametrize("uuid_ids", [True, False])
+    def test_round_trip(self, codec, uuid_ids):
+        recs = make_recs(20, uuid_ids=uuid_ids)
+        recs[3].reason = None
+        recs[5].reason = "Shared board membership at Acme"
+
+        assert_same(to_models(decode_value(codec.encode(recs))), recs)
+        assert decode_value(codec.encode([])) == []
+
+    def test_packed_layout(self):
+        codec = PackedCodec()
+        recs = make_recs(20)
+
+        encoded = codec.encode(recs)
+
+        # header + count + score mode + scores + codes + id mode + UUIDs
+        assert len(encoded) == HEADER.size + 3 + 20 * 4 + 20 + 1 + 20 * 16
+        assert decode_value(encoded)[0][1] == 0.95  # exact, not float32-rounded
+        # Scores outside the fixed-point range are kept as float64
+        large = [ContactRecommendation(contact_id="c1", score=12345.678901234)]
+        assert decode_value(codec.encode(large))[0][1] == 12345.678901234
+        # Non-canonical UUID spelling falls back to UTF-8 ids (exact round trip)
+        upper = [ContactRecommendation(contact_id=str(uuid.uuid4()).upper(), score=0.5)]
+        assert decode_value(codec.encode(upper))[0][0] == upper[0].contact_id
+
+    def test_compression(self):
+        recs = make_recs(100, uuid_ids=False)
+        plain = JsonCodec().encode(recs)
+        compressed = JsonCodec(compression="zlib").encode(recs)
+
+        assert len(compressed) < len(plain)
+        assert_same(to_models(decode_value(compressed)), recs)
+        # Below compress_min_bytes: stored as is
+        small = JsonCodec(compression="zlib").encode(recs[:1])
+        assert small[3] == 0
+
+    @pytest.mark.skipif(zstandard is None, reason="zstandard not installed")
+    def test_zstd(self):
+        recs = make_recs(100)
+        assert_same(to_models(decode_value(PackedCodec(compression="zstd").encode(recs))), recs)
+
+
+class TestVersionHeader:
+    """Unreadable values are misses"""
+
+    def test_rejected_values(self):
+        recs = make_recs(5)
+        encoded = PackedCodec().encode(recs)
+        legacy = json.dumps([rec.model_dump() for rec in recs])
+
+        assert decode_value(legacy) is None
+        assert decode_value(legacy.encode()) is None
+        assert decode_value(b"") is None
+        assert decode_value(struct.pack("!BBBB", MAGIC, 3, 2, 0) + encoded[4:]) is None
+        assert decode_value(struct.pack("!BBBB", MAGIC, 99, 1, 0) + encoded[4:]) is None
+        assert decode_value(struct.pack("!BBBB", MAGIC, 3, 1, 7) + encoded[4:]) is None
+        assert decode_value(encoded[:-3]) is None  # truncated
+        assert decode_value(encoded + b"x") is None  # trailing bytes
+
+    def test_get_codec(self, monkeypatch):
+        assert isinstance(get_codec(), PackedCodec)
+        monkeypatch.setenv("CACHE_CODEC", "json")
+        monkeypatch.setenv("CACHE_COMPRESSION", "zlib")
+        codec = get_codec()
+        assert isinstance(codec, JsonCodec) and codec.compression == "zlib"
+
+        with pytest.raises(ValueError):
+            get_codec("pickle")
+        with pytest.raises(ValueError):
+            JsonCodec(compression="lzma")
+
+    def test_codec_must_implement_body(self):
+        class EncodeOnlyCodec(CacheCodec):
+            def encode_body(self, recommendations):
+                return b""
+
+        with pytest.raises(TypeError):
+            EncodeOnlyCodec()
+
+
+class TestCacheManagerCodec:
+    """Codec wiring"""
+
+    @pytest.mark.asyncio
+    async def test_cross_codec_reads_and_legacy_misses(self):
+        redis_client = FakeRedis()
+        json_cache = CacheManager(redis_client, codec=JsonCodec())
+        packed_cache = CacheManager(redis_client, codec=PackedCodec())
+        recs = make_recs(20)
+
+        await json_cache.set_recommendations("ws_1", "c1", recs)
+        assert_same(await packed_cache.get_recommendations("ws_1", "c1", 20), recs)
+
+        # Entry written by the previous JSON format
+        legacy_key = packed_cache._rec_key("ws_1", 0, "c2", 20)
+        redis_client.values[legacy_key] = json.dumps([rec.model_dump() for rec in recs]).encode()
+
+        assert await packed_cache.get_recommendations("ws_1", "c2", 20) is None
+        cached = await packed_cache.mget_recommendations("ws_1", ["c1", "c2"], 20)
+        assert cached["c2"] is None and cached["c1"] is not None
+        assert (packed_cache.stats.hit_count, packed_cache.stats.miss_count) == (2, 2)
+
+
+class TestCodecBenchmark:
+    """Payload size and CPU per codec"""
+
+    def test_codec_micro_benchmark(self):
+        codecs = {
+            "legacy json+pydantic": None,
+            "json": JsonCodec(),
+            "packed": PackedCodec(),
+            "packed+zlib": PackedCodec(compression="zlib"),
+        }
+        if msgpack is not None:
+            codecs["msgpack"] = MsgpackCodec()
+        if zstandard is not None:
+            codecs["packed+zstd"] = PackedCodec(compression="zstd")
+
+        def legacy_encode(recs):
+            return json.dumps([rec.model_dump() for rec in recs]).encode()
+
+        def legacy_decode(value):
+            return [ContactRecommendation(**item) for item in json.loads(value)]
+
+        def best_us(func, number=500):
+            """Best of 5 runs (robust to a busy machine)"""
+            return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+        results = {}
+        for k in (20, 100):
+            recs = make_recs(k)
+            for name, codec in codecs.items():
+                encode = legacy_encode if codec is None else codec.encode
+                decode = legacy_decode if codec is None else CacheManager._deserialize
+
+                value = encode(recs)
+                encode_us = best_us(lambda: encode(recs))
+                decode_us = best_us(lambda: decode(value))
+
+                decoded = decode(value)
+                assert_same(decoded, recs)
+                results[(k, name)] = (len(value), encode_us, decode_us)
+
+        print("\n📊 Cache codecs (UUID contact ids, GNN explanations):")
+        for (k, name), (size, encode_us, decode_us) in results.items():
+            print(
+                f"   k={k:<3d} {name:22s} {size:6d} B  "
+                f"encode {encode_us:6.1f}us  decode {decode_us:6.1f}us"
+            )
+
+        for k in (20, 100):
+            legacy_size, _, legacy_decode_us = results[(k, "legacy json+pydantic")]
+            packed_size, _, packed_decode_us = results[(k, "packed")]
+            assert packed_size < legacy_size / 3
+            assert packed_decode_us < legacy_decode_us
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,314 @@
+"""
+Cache Instrumentation Tests
+
+Test Coverage:
+1. Histogram buckets / quantiles, count-min sketch bounds and mergeability
+2. CacheManager and TieredCacheManager record latency, lookups per workspace/tier, payloads
+3. Cluster aggregation: two pods flush into shared Redis, totals survive a restart,
+   a failed flush keeps its deltas for the next one
+4. Hot keys: sampled sketch finds the hottest keys and estimates their volume
+5. Prometheus text exposition
+6. Benchmark: recording overhead per lookup
+"""
+
+import random
+import time
+
+import pytest
+
+from api.cache import CacheManager, ContactRecommendation, TieredCacheManager
+from api.cache.metrics import (
+    LATENCY_BUCKETS,
+    OTHER_WORKSPACES,
+    CacheMetrics,
+    CountMinSketch,
+    Histogram,
+    render_prometheus,
+    summarize,
+)
+
+from fakes import BrokenRedis, FakePipeline, FakeRedis
+
+
+def make_recs(k: int = 20):
+    return [ContactRecommendation(contact_id=f"r{i}", score=0.9 - i * 0.01) for i in range(k)]
+
+
+def parse_prometheus(text: str):
+    """{(name, frozenset(labels)): value} of the sample lines"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, value = line.rsplit(" ", 1)
+        name, _, labels = series.partition("{")
+        pairs = frozenset(
+            tuple(pair.split("=", 1)) for pair in labels.rstrip("}").split('",') if pair
+        )
+        samples[(name, frozenset((k, v.strip('"')) for k, v in pairs))] = float(value)
+    return samples
+
+
+class TestPrimitives:
+    """Histogram and count-min sketch"""
+
+    def test_histogram_quantiles(self):
+        histogram = Histogram(LATENCY_BUCKETS)
+        for _ in range(90):
+            histogram.observe(0.0008)  # (0.0005, 0.001]
+        for _ in range(10):
+            histogram.observe(0.04)  # (0.025, 0.05]
+
+        assert histogram.count == 100
+        assert histogram.counts[LATENCY_BUCKETS.index(0.001)] == 90
+        assert 0.0005 < histogram.quantile(0.5) <= 0.001
+        assert 0.025 < histogram.quantile(0.99) <= 0.05
+        histogram.observe(100.0)
+        assert histogram.counts[-1] == 1  # +Inf
+
+    def test_sketch_bounds_and_merge(self):
+        rng = random.Random(0)
+        keys = [f"ws:c{rng.randint(0, 5000)}:20" for _ in range(20_000)] + ["ws:hot:20"] * 3000
+        first, second, merged = (CountMinSketch(width=512) for _ in range(3))
+        true_counts = {}
+        for i, key in enumerate(keys):
+            (first if i % 2 else second).add(key)
+            merged.add(key)
+            true_counts[key] = true_counts.get(key, 0) + 1
+
+        # Cell-wise sum of two pods' sketches == sketch of all traffic
+        combined = CountMinSketch(width=512)
+        for sketch in (first, second):
+            for (row, column), count in sketch.cells().items():
+                combined.rows[row][column] += count
+        assert combined.rows == merged.rows
+
+        assert all(merged.estimate(key) >= count for key, count in true_counts.items())
+        assert merged.estimate("ws:hot:20") <= 3000 + 2 * len(keys) / 512
+
+
+class TestInstrumentation:
+    """What the cache managers record"""
+
+    @pytest.mark.asyncio
+    async def test_cache_manager_records(self):
+        cache = CacheManager(FakeRedis())
+        await cache.set_recommendations("ws_1", "c1", make_recs(20))
+        await cache.set_many_recommendations("ws_1", {"c2": make_recs(100)})
+        await cache.get_recommendations("ws_1", "c1", 20)
+        await cache.get_recommendations("ws_1", "missing", 20)
+        await cache.mget_recommendations("ws_2", ["c1", "c2"], 20)
+        await cache.invalidate_workspace("ws_1")
+
+        metrics = cache.metrics
+        assert {op: h.count for op, h in metrics.latency.items()} == {
+            "set": 1,
+            "set_many": 1,
+            "get": 2,
+            "mget": 1,
+            "invalidate": 1,
+        }
+        assert metrics.lookups == {
+            ("ws_1", "redis", "hit"): 1,
+            ("ws_1", "redis", "miss"): 1,
+            ("ws_2", "redis", "miss"): 2,
+        }
+        assert metrics.payload.count == 2
+        assert metrics.payload.sum > 0
+
+    @pytest.mark.asyncio
+    async def test_tiered_records_l1_hits_and_compute(self):
+        cache = TieredCacheManager(FakeRedis())
+
+        async def compute():
+            return make_recs()
+
+        await cache.get_or_compute("ws_1", "c1", 20, compute)  # Redis miss + compute
+        for _ in range(9):
+            await cache.get_or_compute("ws_1", "c1", 20, compute)  # L1
+
+        assert cache.metrics.lookups == {("ws_1", "redis", "miss"): 1, ("ws_1", "l1", "hit"): 9}
+        assert cache.metrics.latency["compute"].count == 1
+        assert cache.stats.hit_count == 0  # instance stats stay Redis-only
+
+        summary = summarize(await cache.collect_metrics())
+        assert summary["workspaces"]["ws_1"] == {"lookups": 10, "hit_ratio": 0.9, "l1_hits": 9}
+
+    def test_workspace_cardinality_cap(self):
+        metrics = CacheMetrics(max_workspaces=2)
+        for workspace_id in ("ws_1", "ws_2", "ws_3", "ws_4", "ws_1"):
+            metrics.record_lookup(workspace_id, hit=True)
+
+        assert metrics.lookups == {
+            ("ws_1", "redis", "hit"): 2,
+            ("ws_2", "redis", "hit"): 1,
+            (OTHER_WORKSPACES, "redis", "hit"): 2,
+        }
+
+
+class TestClusterAggregation:
+    """Pods share totals through Redis"""
+
+    @pytest.mark.asyncio
+    async def test_two_pods_and_restart(self):
+        shared = {}
+        pod_a = CacheManager(FakeRedis(shared))
+        pod_b = CacheManager(FakeRedis(shared))
+        await pod_a.set_recommendations("ws_1", "c1", make_recs())
+
+        for _ in range(3):
+            await pod_a.get_recommendations("ws_1", "c1", 20)
+        await pod_b.get_recommendations("ws_1", "c1", 20)
+        await pod_b.get_recommendations("ws_1", "c2", 20)
+        await pod_b.metrics.flush(pod_b.redis, pod_b.key_prefix)
+
+        snapshot = await pod_a.collect_metrics()
+        assert snapshot["lookups"]["ws_1"] == {"redis_hit": 4, "redis_miss": 1}
+        assert snapshot["latency"]["get"]["count"] == 5
+        assert sum(snapshot["latency"]["get"]["counts"]) == 5
+        assert snapshot["payload"]["count"] == 1
+
+        # Nothing left to flush; a restarted pod sees the same totals
+        assert not await pod_a.metrics.flush(pod_a.redis, pod_a.key_prefix)
+        restarted = CacheManager(FakeRedis(shared))
+        assert (await restarted.collect_metrics())["lookups"] == snapshot["lookups"]
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_is_logged(self):
+        metrics = CacheMetrics()
+        metrics.record_lookup("ws_1", hit=True)
+        assert await metrics.flush(BrokenRedis(), "superbrain") is False
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_deltas(self):
+        class FailingPipeline(FakePipeline):
+            async def execute(self):
+                raise ConnectionError("Redis unavailable")
+
+        class FlakyRedis(FakeRedis):
+            def pipeline(self, transaction=True):
+                return FailingPipeline(self)
+
+        metrics = CacheMetrics(hot_key_sample_rate=1.0, rng=lambda: 0.0)
+        metrics.record_lookup("ws_1", hit=True)
+        metrics.observe_latency("get", 0.002)
+        metrics.observe_payload(300)
+        metrics.sample_key("ws_1:c1:20")
+        assert await metrics.flush(FlakyRedis(), "test") is False
+
+        metrics.record_lookup("ws_1", hit=True)
+        metrics.observe_latency("get", 0.003)
+        metrics.sample_key("ws_1:c1:20")
+        redis = FakeRedis()
+        assert await metrics.flush(redis, "test")
+
+        snapshot = await metrics.collect(redis, "test")
+        assert snapshot["lookups"]["ws_1"] == {"redis_hit": 2}
+        assert snapshot["latency"]["get"]["count"] == 2
+        assert snapshot["payload"]["count"] == 1
+        assert snapshot["hot_keys"] == [("ws_1:c1:20", 2)]
+
+
+class TestHotKeys:
+    """Sampled count-min sketch top-N"""
+
+    @pytest.mark.asyncio
+    async def test_top_keys_across_pods(self):
+        shared = {}
+        rng = random.Random(1)
+        pods = [CacheMetrics(hot_key_sample_rate=0.2, hot_keys=5, rng=rng.random) for _ in range(2)]
+        true_counts = {}
+        for i in range(50_000):
+            # Zipf-like: key n has weight 1 / n
+            n = int(1 / (rng.random() + 1e-9) ** 0.9)
+            key = f"ws_1:c{min(n, 10_000)}:20"
+            pods[i % 2].sample_key(key)
+            true_counts[key] = true_counts.get(key, 0) + 1
+        for pod in pods:
+            await pod.flush(FakeRedis(shared), "test")
+
+        hot_keys = (await pods[0].collect(FakeRedis(shared), "test"))["hot_keys"]
+        expected = sorted(true_counts, key=true_counts.get, reverse=True)[:5]
+
+        assert [key for key, _ in hot_keys[:3]] == expected[:3]
+        top_key, estimate = hot_keys[0]
+        assert estimate == pytest.approx(true_counts[top_key], rel=0.1)
+
+
+class TestPrometheus:
+    """Text exposition"""
+
+    @pytest.mark.asyncio
+    async def test_render(self):
+        metrics = CacheMetrics(hot_key_sample_rate=1.0)
+        for seconds in (0.0002, 0.0008, 0.003, 0.2):
+            metrics.observe_latency("get", seconds)
+        metrics.observe_payload(600)
+        metrics.record_lookup('ws "quoted"', hit=True, tier="l1")
+        metrics.record_lookup('ws "quoted"', hit=False)
+        metrics.sample_key("ws_1:c1:20")
+        redis_client = FakeRedis()
+        await metrics.flush(redis_client, "test")
+
+        text = render_prometheus(await metrics.collect(redis_client, "test"))
+        samples = parse_prometheus(text)
+
+        assert "# TYPE superbrain_cache_operation_duration_seconds histogram" in text
+        buckets = [
+            value
+            for (name, labels), value in samples.items()
+            if name == "superbrain_cache_operation_duration_seconds_bucket"
+        ]
+        assert buckets == sorted(buckets)  # cumulative
+        assert (
+            samples[
+                (
+                    "superbrain_cache_operation_duration_seconds_bucket",
+                    frozenset({("operation", "get"), ("le", "+Inf")}),
+                )
+            ]
+            == 4
+        )
+        assert (
+            samples[
+                (
+                    "superbrain_cache_operation_duration_seconds_count",
+                    frozenset({("operation", "get")}),
+                )
+            ]
+            == 4
+        )
+        assert samples[("superbrain_cache_payload_bytes_count", frozenset())] == 1
+        assert 'workspace_id="ws \\"quoted\\""' in text
+        assert 'superbrain_cache_hit_ratio{workspace_id="ws \\"quoted\\""} 0.5' in text
+        assert 'superbrain_cache_hot_key_lookups{key="ws_1:c1:20",rank="1"} 1' in text
+
+
+class TestMetricsBenchmark:
+    """Recording cost"""
+
+    def test_recording_overhead(self):
+        metrics = CacheMetrics()
+        keys = [f"ws_{i % 20}:c{i % 5000}:20" for i in range(100_000)]
+
+        start = time.perf_counter()
+        for key in keys:
+            workspace_id = key.split(":", 1)[0]
+            with metrics.timer("get"):
+                pass
+            metrics.record_lookup(workspace_id, hit=True)
+            metrics.sample_key(key)
+        per_lookup = (time.perf_counter() - start) / len(keys)
+
+        sketch_bytes = metrics.sketch_width * metrics.sketch_depth * 8
+        print("\n📊 Cache instrumentation:")
+        print(f"   Recording per lookup (timer + counters + 10% sketch): {per_lookup * 1e6:.2f}us")
+        print(
+            f"   Sketch: {metrics.sketch_depth}x{metrics.sketch_width} ({sketch_bytes // 1024} KB)"
+        )
+
+        assert per_lookup < 50e-6
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
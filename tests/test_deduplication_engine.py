@@ -0,0 +1,274 @@
+"""
+Contact Deduplication Engine Tests
+
+Test Coverage:
+1. Blocking keys (phone suffix, email, metaphone, MinHash)
+2. Candidate pairs vs all-pairs baseline (recall)
+3. Candidate generation scalability (20K contacts)
+4. Embedding store: one embedding per distinct name, batching, persistence
+"""
+
+import random
+import string
+import time
+
+import numpy as np
+import pytest
+
+from apps.contacts.deduplication_engine import (
+    BlockingKeyGenerator,
+    ContactDeduplicationEngine,
+    EmbeddingMatcher,
+    EmbeddingProvider,
+    EmbeddingStore,
+    HashingEmbeddingProvider,
+)
+
+FIRST_NAMES = [
+    "John", "Maria", "Alex", "Olga", "Ivan", "Anna", "Peter", "Elena", "Mike", "Sofia",
+    "David", "Irina", "Sergey", "Kate", "Nikolay", "Laura", "Victor", "Daria", "Paul", "Nina",
+]  # fmt: skip
+SYLLABLES = ["ka", "ro", "mi", "sha", "lev", "dor", "an", "tel", "vin", "gor", "ber", "sky"]
+
+
+def _typo(value: str, rng: random.Random) -> str:
+    """Swap two adjacent characters"""
+    if len(value) < 3:
+        return value
+    i = rng.randrange(len(value) - 1)
+    return value[:i] + value[i + 1] + value[i] + value[i + 2 :]
+
+
+def make_synthetic_contacts(n: int, duplicate_rate: float = 0.2, seed: int = 7):
+    """Generate contacts where ~duplicate_rate of them are perturbed copies"""
+    rng = random.Random(seed)
+    contacts = []
+
+    for i in range(n):
+        if contacts and rng.random() < duplicate_rate:
+            src = rng.choice(contacts)
+            digits = "".join(c for c in src["phone_number"] if c.isdigit())
+            contacts.append(
+                {
+                    "id": f"c{i}",
+                    "first_name": _typo(src["first_name"], rng),
+                    "last_name": src["last_name"],
+                    "email": src["email"].upper() if rng.random() < 0.5 else src["email"],
+                    # Same number, different formatting / country prefix
+                    "phone_number": f"+1 ({digits[-10:-7]}) {digits[-7:-4]}-{digits[-4:]}",
+                }
+            )
+        else:
+            first = rng.choice(FIRST_NAMES)
+            last = "".join(rng.choices(SYLLABLES, k=3)).capitalize()
+            user = "".join(rng.choices(string.ascii_lowercase, k=8))
+            contacts.append(
+                {
+                    "id": f"c{i}",
+                    "first_name": first,
+                    "last_name": last,
+                    "email": f"{user}@example.com",
+                    "phone_number": "".join(rng.choices(string.digits, k=10)),
+                }
+            )
+
+    return contacts
+
+
+class CountingProvider(HashingEmbeddingProvider):
+    """Local provider that records every request"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    async def embed(self, texts):
+        self.requests.append(list(texts))
+        return await super().embed(texts)
+
+
+@pytest.fixture
+def engine():
+    """Engine with deterministic local embeddings (no OpenAI calls)"""
+    return ContactDeduplicationEngine(
+        supabase_client=None, embedding_provider=HashingEmbeddingProvider()
+    )
+
+
+class TestBlockingKeys:
+    """Test blocking key generation"""
+
+    def test_phone_suffix_key(self):
+        blocker = BlockingKeyGenerator()
+        keys_a = blocker.blocking_keys({"phone_number": "+7 (916) 123-45-67"})
+        keys_b = blocker.blocking_keys({"phone_number": "8 916 1234567"})
+
+        assert ("phone", "1234567") in keys_a
+        assert ("phone", "1234567") in keys_b
+
+    def test_short_or_missing_phone_has_no_key(self):
+        blocker = BlockingKeyGenerator()
+
+        for phone in ("", "-", "12345", "+7 916"):
+            keys = blocker.blocking_keys({"phone_number": phone, "email": "a@b.c"})
+            assert not [key for key in keys if key[0] == "phone"]
+
+    def test_email_key_is_lowercased(self):
+        blocker = BlockingKeyGenerator()
+        keys = blocker.blocking_keys({"email": "John.Smith@Example.com"})
+
+        assert ("email", "john.smith@example.com") in keys
+
+    def test_similar_names_share_fuzzy_bucket(self):
+        blocker = BlockingKeyGenerator()
+        keys_a = set(blocker.blocking_keys({"first_name": "Jonathan", "last_name": "Smith"}))
+        keys_b = set(blocker.blocking_keys({"first_name": "Jonathon", "last_name": "Smith"}))
+
+        assert keys_a & keys_b
+
+    def test_oversized_fuzzy_block_is_windowed(self):
+        blocker = BlockingKeyGenerator(max_block_size=5, window=5)
+        contacts = [{"id": str(i), "first_name": "John", "last_name": "Smith"} for i in range(50)]
+
+        pairs = blocker.candidate_pairs(contacts)
+
+        # Full block would give 50*49/2 = 1225 pairs
+        assert 0 < len(pairs) < 50 * 5
+
+    def test_exact_blocks_are_not_capped(self):
+        blocker = BlockingKeyGenerator(max_block_size=5)
+        contacts = [{"id": str(i), "email": "shared@example.com"} for i in range(20)]
+
+        pairs = blocker.candidate_pairs(contacts)
+
+        assert len(pairs) == 20 * 19 // 2
+
+
+class TestDetectDuplicates:
+    """Test blocking keeps recall of the all-pairs baseline"""
+
+    @pytest.mark.asyncio
+    async def test_recall_matches_all_pairs(self, engine):
+        contacts = make_synthetic_contacts(300)
+
+        start = time.time()
+        baseline = await engine.detect_duplicates(contacts, use_blocking=False)
+        baseline_time = time.time() - start
+
+        start = time.time()
+        blocked = await engine.detect_duplicates(contacts, use_blocking=True)
+        blocked_time = time.time() - start
+
+        baseline_pairs = {(c.contact_id_1, c.contact_id_2) for c in baseline}
+        blocked_pairs = {(c.contact_id_1, c.contact_id_2) for c in blocked}
+
+        recall = len(baseline_pairs & blocked_pairs) / len(baseline_pairs)
+        print(f"\n📊 Dedup (300 contacts): {len(baseline_pairs)} duplicates")
+        print(f"   All pairs: {baseline_time * 1000:.0f}ms")
+        print(f"   Blocking:  {blocked_time * 1000:.0f}ms")
+        print(f"   Recall:    {recall:.3f}")
+
+        assert baseline_pairs
+        assert blocked_pairs == baseline_pairs
+        assert blocked_time < baseline_time
+
+    @pytest.mark.asyncio
+    async def test_results_sorted_by_confidence(self, engine):
+        contacts = make_synthetic_contacts(100)
+
+        candidates = await engine.detect_duplicates(contacts)
+        scores = [c.confidence_score for c in candidates]
+
+        assert scores == sorted(scores, reverse=True)
+
+
+class TestEmbeddingMatcher:
+    """Test batched, cached embedding lookups"""
+
+    @pytest.mark.asyncio
+    async def test_each_distinct_name_embedded_once(self):
+        provider = CountingProvider()
+        matcher = EmbeddingMatcher(provider=provider, batch_size=2)
+
+        pairs = [
+            ("John Smith", "john  smith"),
+            ("John Smith", "Jon Smith"),
+            ("Anna Lee", "JOHN SMITH"),
+        ]
+        await matcher.score_many(pairs)
+        await matcher.score_many(pairs)
+
+        embedded = [text for request in provider.requests for text in request]
+        assert sorted(embedded) == ["anna lee", "john smith", "jon smith"]
+        assert all(len(request) <= 2 for request in provider.requests)
+
+    @pytest.mark.asyncio
+    async def test_score_many_matches_pairwise_cosine(self):
+        matcher = EmbeddingMatcher(provider=HashingEmbeddingProvider())
+        pairs = [("Maria Ivanova", "Mariya Ivanova"), ("Peter Brown", "Olga Popova")]
+
+        scores = await matcher.score_many(pairs)
+
+        for (a, b), score in zip(pairs, scores):
+            emb_a = await matcher.provider.embed([matcher.normalize_text(a)])
+            emb_b = await matcher.provider.embed([matcher.normalize_text(b)])
+            expected = EmbeddingMatcher.cosine_similarity(emb_a[0], emb_b[0])
+            assert score == pytest.approx(expected, abs=1e-5)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("filename", ["dedup_embeddings.npz", "dedup_embeddings"])
+    async def test_store_persists_between_runs(self, tmp_path, filename):
+        path = str(tmp_path / filename)
+
+        first = EmbeddingMatcher(provider=CountingProvider(), store=EmbeddingStore(path))
+        await first.score_many([("John Smith", "Jon Smith")])
+
+        provider = CountingProvider()
+        second = EmbeddingMatcher(provider=provider, store=EmbeddingStore(path))
+        score, _ = await second.score("John Smith", "Jon Smith")
+
+        assert len(second.store) == 2
+        assert provider.requests == []
+        assert 0 < score < 1
+        assert [p.name for p in tmp_path.iterdir()] == ["dedup_embeddings.npz"]
+
+    def test_provider_must_implement_embed(self):
+        class IncompleteProvider(EmbeddingProvider):
+            pass
+
+        with pytest.raises(TypeError):
+            IncompleteProvider()
+
+    @pytest.mark.asyncio
+    async def test_provider_failure_scores_zero(self):
+        class FailingProvider(HashingEmbeddingProvider):
+            async def embed(self, texts):
+                raise RuntimeError("rate limited")
+
+        matcher = EmbeddingMatcher(provider=FailingProvider())
+        scores = await matcher.score_many([("a b", "c d")])
+
+        assert np.all(scores == 0)
+
+
+class TestBlockingScalability:
+    """Candidate generation must stay near-linear"""
+
+    def test_candidate_generation_20k(self):
+        contacts = make_synthetic_contacts(20000)
+        blocker = BlockingKeyGenerator()
+
+        start = time.time()
+        pairs = blocker.candidate_pairs(contacts)
+        duration = time.time() - start
+
+        all_pairs = 20000 * 19999 // 2
+        print(f"\n📊 Blocking (20K contacts): {len(pairs)} candidate pairs in {duration:.2f}s")
+        print(f"   Reduction vs all pairs: {all_pairs / max(len(pairs), 1):.0f}x")
+
+        assert len(pairs) < all_pairs / 100
+        assert duration < 30
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,331 @@
+"""
+Embedding Batching Tests
+
+Test Coverage:
+1. Adaptive rate limiter: token bucket, x-ratelimit-* headers, 429 backoff
+2. Token-budget packing of contact texts into embeddings requests
+3. One bulk upsert per request, store and index updates
+4. Skipping contacts whose text hash did not change
+5. Retry after simulated 429 responses
+6. Benchmark: batched pipeline vs per-contact requests
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import openai
+import pytest
+
+from api.ml.embedding_store import EmbeddingStore
+from api.ml.embeddings_service import ContactEmbeddingsService
+from api.ml.rate_limiter import AdaptiveRateLimiter, parse_duration, retry_after_from_headers
+
+from fakes import FakeClock, FakeSupabase
+
+
+class FakeEmbeddingsAPI:
+    """openai.embeddings.with_raw_response stand-in with headers and optional 429s"""
+
+    def __init__(self, dim=8, rate_limited_calls=0, latency=0.0, headers=None):
+        self.dim = dim
+        self.rate_limited_calls = rate_limited_calls
+        self.latency = latency
+        self.headers = headers or {}
+        self.requests = []
+        self.with_raw_response = self
+
+    async def create(self, model, input, encoding_format="float"):
+        self.requests.append(list(input))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.rate_limited_calls:
+            self.rate_limited_calls -= 1
+            response = httpx.Response(
+                429,
+                headers={"retry-after-ms": "250"},
+                request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"),
+            )
+            raise openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+        # Deliberately out of order: results must be placed by index
+        data = [
+            SimpleNamespace(index=i, embedding=self.vector(text).tolist())
+            for i, text in reversed(list(enumerate(input)))
+        ]
+        return SimpleNamespace(headers=self.headers, parse=lambda: SimpleNamespace(data=data))
+
+    def vector(self, text):
+        rng = np.random.default_rng(abs(hash(text)) % (2**32))
+        return rng.standard_normal(self.dim).astype(np.float32)
+
+
+def make_contacts(n, notes_length=20):
+    return [
+        {
+            "id": f"c{i}",
+            "workspace_id": "w1",
+            "first_name": f"Name{i}",
+            "organization": f"Org{i % 7}",
+            "tags": ["ml", f"t{i % 3}"],
+            "notes": "x" * notes_length,
+        }
+        for i in range(n)
+    ]
+
+
+def make_service(api=None, clock=None, embedding_store=None):
+    api = api or FakeEmbeddingsAPI()
+    clock = clock or FakeClock()
+    supabase = FakeSupabase()
+    limiter = AdaptiveRateLimiter(
+        requests_per_minute=600, tokens_per_minute=1_000_000, clock=clock, sleep=clock.sleep
+    )
+    service = ContactEmbeddingsService(
+        supabase,
+        SimpleNamespace(embeddings=api),
+        embedding_store=embedding_store,
+        rate_limiter=limiter,
+    )
+    service.embedding_dimension = api.dim
+    return service, supabase, api, clock
+
+
+class TestRateLimiter:
+    """Adaptive token bucket"""
+
+    @pytest.mark.asyncio
+    async def test_bucket_paces_requests(self):
+        clock = FakeClock()
+        limiter = AdaptiveRateLimiter(
+            requests_per_minute=60, tokens_per_minute=10_000, clock=clock, sleep=clock.sleep
+        )
+
+        for _ in range(61):
+            await limiter.acquire(10)
+
+        # Full bucket of 60, the 61st request waits one refill interval (1s)
+        assert clock.now == pytest.approx(1.0, abs=1e-6)
+
+    @pytest.mark.asyncio
+    async def test_token_budget_limits(self):
+        clock = FakeClock()
+        limiter = AdaptiveRateLimiter(
+            requests_per_minute=1000, tokens_per_minute=6000, clock=clock, sleep=clock.sleep
+        )
+
+        await limiter.acquire(6000)
+        await limiter.acquire(3000)
+
+        assert clock.now == pytest.approx(30.0, abs=1e-6)
+
+    @pytest.mark.asyncio
+    async def test_headers_update_limits(self):
+        clock = FakeClock()
+        limiter = AdaptiveRateLimiter(clock=clock, sleep=clock.sleep)
+
+        limiter.update_from_headers(
+            {
+                "X-RateLimit-Limit-Requests": "120",
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-limit-tokens": "50000",
+            }
+        )
+        await limiter.acquire(1)
+
+        assert limiter.requests_per_minute == 120
+        assert limiter.tokens_per_minute == 50000
+        assert clock.now == pytest.approx(0.5, abs=1e-6)
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_backoff_and_recovery(self):
+        clock = FakeClock()
+        limiter = AdaptiveRateLimiter(clock=clock, sleep=clock.sleep, recovery_step=0.25)
+
+        limiter.on_rate_limited(retry_after=2.0)
+        limiter.on_rate_limited(retry_after=1.0)
+        assert limiter.rate_fraction == 0.25
+
+        await limiter.acquire(1)
+        assert clock.now >= 2.0
+
+        limiter.on_success()
+        limiter.on_success()
+        limiter.on_success()
+        limiter.on_success()
+        assert limiter.rate_fraction == 1.0
+
+    def test_retry_after_parsing(self):
+        assert retry_after_from_headers({"retry-after-ms": "250"}) == 0.25
+        assert retry_after_from_headers({"Retry-After": "3"}) == 3.0
+        assert retry_after_from_headers({"x-ratelimit-reset-tokens": "6m0s"}) == 360.0
+        assert retry_after_from_headers({}) is None
+        assert parse_duration("1s250ms") == pytest.approx(1.25)
+
+
+class TestBatchGeneration:
+    """ContactEmbeddingsService.batch_generate_embeddings"""
+
+    @pytest.mark.asyncio
+    async def test_one_request_and_upsert_per_batch(self, tmp_path):
+        store = EmbeddingStore(str(tmp_path), dimension=8)
+        service, supabase, api, _ = make_service(embedding_store=store)
+
+        processed = await service.batch_generate_embeddings(make_contacts(25), batch_size=10)
+
+        assert processed == 25
+        assert [len(request) for request in api.requests] == [10, 10, 5]
+        assert len(supabase.upserts) == 3
+        assert len(store) == 25
+
+        # Vectors are matched to contacts by response index
+        text = service.build_embedding_text(make_contacts(25)[3])
+        np.testing.assert_allclose(store.get("c3"), api.vector(text))
+        row = next(
+            row for row in supabase.tables["contact_embeddings"] if row["contact_id"] == "c3"
+        )
+        assert row["text_hash"] == service.text_hash(text)
+
+    @pytest.mark.asyncio
+    async def test_token_budget_packing(self):
+        service, _, api, _ = make_service()
+        contacts = make_contacts(12, notes_length=400)  # ~120 tokens each
+
+        await service.batch_generate_embeddings(contacts, max_batch_tokens=500)
+
+        token_counts = [
+            sum(service.estimate_tokens(text) for text in request) for request in api.requests
+        ]
+        assert sum(len(request) for request in api.requests) == 12
+        assert all(tokens <= 500 for tokens in token_counts)
+        assert len(api.requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_unchanged_contacts_skipped(self):
+        service, supabase, api, _ = make_service()
+        contacts = make_contacts(20)
+        await service.batch_generate_embeddings(contacts)
+
+        contacts[5]["notes"] = "changed"
+        api.requests.clear()
+        processed = await service.batch_generate_embeddings(contacts)
+
+        assert processed == 1
+        assert api.requests == [[service.build_embedding_text(contacts[5])]]
+
+        api.requests.clear()
+        assert await service.batch_generate_embeddings(contacts, force=True) == 20
+
+    @pytest.mark.asyncio
+    async def test_retries_after_rate_limit(self):
+        service, _, api, clock = make_service(api=FakeEmbeddingsAPI(rate_limited_calls=2))
+
+        processed = await service.batch_generate_embeddings(make_contacts(5))
+
+        assert processed == 5
+        assert len(api.requests) == 3
+        assert service.rate_limiter.rate_limited == 2
+        assert clock.now >= 0.5  # two retry-after-ms: 250 pauses
+
+    @pytest.mark.asyncio
+    async def test_headers_feed_limiter(self):
+        api = FakeEmbeddingsAPI(headers={"x-ratelimit-limit-requests": "42"})
+        service, _, _, _ = make_service(api=api)
+
+        await service.batch_generate_embeddings(make_contacts(3))
+
+        assert service.rate_limiter.requests_per_minute == 42
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_does_not_stop_others(self):
+        service, supabase, api, _ = make_service(api=FakeEmbeddingsAPI(rate_limited_calls=100))
+
+        processed = await service.batch_generate_embeddings(make_contacts(4), batch_size=2)
+
+        assert processed == 0
+        assert supabase.upserts == []
+
+    @pytest.mark.asyncio
+    async def test_generate_embedding_single(self):
+        service, _, api, _ = make_service()
+        contact = make_contacts(1)[0]
+
+        embedding = await service.generate_embedding(contact)
+
+        np.testing.assert_allclose(embedding, api.vector(service.build_embedding_text(contact)))
+        assert service.build_embedding_text({"id": "x"}) == "Unknown contact"
+
+    @pytest.mark.asyncio
+    async def test_single_and_batch_paths_hash_the_same_text(self):
+        service, supabase, api, _ = make_service()
+        contact = make_contacts(1, notes_length=service.MAX_INPUT_TOKENS * 8)[0]
+
+        assert await service._process_single_contact(contact)
+        api.requests.clear()
+
+        # Long text is truncated in both paths, so the batch run sees it unchanged
+        assert await service.batch_generate_embeddings([contact]) == 0
+        assert api.requests == []
+
+    @pytest.mark.asyncio
+    async def test_missing_response_index_fails_batch(self):
+        class DroppingAPI(FakeEmbeddingsAPI):
+            async def create(self, model, input, encoding_format="float"):
+                raw = await super().create(model, input, encoding_format)
+                data = [item for item in raw.parse().data if item.index != 1]
+                return SimpleNamespace(
+                    headers=raw.headers, parse=lambda: SimpleNamespace(data=data)
+                )
+
+        service, supabase, _, _ = make_service(api=DroppingAPI())
+
+        assert await service.batch_generate_embeddings(make_contacts(3)) == 0
+        assert supabase.upserts == []
+
+    def test_workspace_contact_ids_are_paged(self):
+        service, supabase, _, _ = make_service()
+        service.INDEX_PAGE_SIZE = 100
+        supabase.tables["contacts"] = [
+            {"id": f"c{i}", "workspace_id": "w1" if i % 5 else "w2"} for i in range(1000)
+        ]
+
+        contact_ids = service._workspace_contact_ids("w1")
+
+        assert len(contact_ids) == 800
+        assert len(supabase.calls) == 9
+
+
+class TestBatchingBenchmark:
+    """Batched requests vs one request per contact"""
+
+    @pytest.mark.asyncio
+    async def test_throughput(self):
+        n, latency = 2000, 0.005
+        contacts = make_contacts(n)
+
+        batched, _, batched_api, _ = make_service(api=FakeEmbeddingsAPI(latency=latency))
+        start = time.time()
+        await batched.batch_generate_embeddings(contacts, batch_size=256)
+        batched_time = time.time() - start
+
+        # Previous behaviour: one request + one upsert per contact
+        single, single_db, single_api, _ = make_service(api=FakeEmbeddingsAPI(latency=latency))
+        sample = contacts[:200]
+        start = time.time()
+        for contact in sample:
+            await single._process_single_contact(contact)
+        single_time = (time.time() - start) * n / len(sample)
+
+        print(f"\n📊 Embedding generation ({n} contacts, {latency * 1000:.0f}ms API latency):")
+        print(f"   Batched:       {batched_time:.2f}s ({len(batched_api.requests)} requests)")
+        print(f"   Per contact:   {single_time:.2f}s (est., {n} requests)")
+
+        assert len(batched_api.requests) == 8
+        assert batched_time * 5 < single_time
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -3,12 +3,17 @@ Phase 8: GNN Unit Tests
 Tests for ContactRecommenderGNN model, forward pass, and training
 """
 
+import asyncio
+
+import numpy as np
 import pytest
 import torch
+import torch.nn.functional as F
 from torch_geometric.data import Data
 
 from api.ml.gnn_model import ContactRecommenderGNN
 from api.ml.gnn_trainer import GNNTrainer
+from api.ml.neighbor_sampler import NeighborSampler
 
 
 @pytest.fixture
@@ -166,6 +171,74 @@ class TestGNNTrainer:
             assert 0 <= rec["similarity"] <= 1
 
 
+class TestMiniBatchTraining:
+    """Neighbour sampling and batched negatives"""
+
+    def test_sampler_returns_real_edges_with_fanout(self):
+        edge_index = torch.randint(0, 200, (2, 3000))
+        sampler = NeighborSampler(edge_index, 200, num_neighbors=[5, 3], seed=0)
+        seeds = np.array([3, 17, 42])
+
+        node_ids, sub_edges = sampler.sample(seeds)
+
+        assert node_ids[:3].tolist() == [3, 17, 42]
+        assert len(set(node_ids.tolist())) == len(node_ids)
+        real = set(zip(*edge_index.tolist()))
+        sampled = [(node_ids[s], node_ids[d]) for s, d in sub_edges.t().tolist()]
+        assert all(edge in real for edge in sampled)
+        # Hop 1: at most 5 sampled in-neighbours per seed
+        for seed in seeds.tolist():
+            assert sum(1 for _, d in sampled if d == seed) <= 5
+
+        # Scratch index is reset between calls
+        assert (sampler._local == -1).all()
+
+    def test_batched_negatives_match_per_sample_loop(self):
+        embeddings = torch.randn(30, 8)
+        pos_src = torch.randint(0, 30, (40,))
+        pos_dst = torch.randint(0, 30, (40,))
+        neg_dst = torch.randint(0, 30, (40, 5))
+
+        batched = GNNTrainer._pair_loss(embeddings, pos_src, pos_dst, neg_dst)
+
+        pos = F.relu(1 - F.cosine_similarity(embeddings[pos_src], embeddings[pos_dst])).mean()
+        neg = sum(
+            F.relu(F.cosine_similarity(embeddings[pos_src], embeddings[neg_dst[:, k]]) + 1).mean()
+            for k in range(5)
+        )
+        assert batched.item() == pytest.approx((pos + neg / 5).item(), rel=1e-5)
+
+    @pytest.mark.asyncio
+    async def test_minibatch_training(self, dummy_graph):
+        trainer = GNNTrainer()
+        trainer.create_model(in_features=3)
+
+        history = await trainer.train(dummy_graph, epochs=3, batch_size=64, num_neighbors=[5, 5, 5])
+
+        assert history["mode"] == "minibatch"
+        assert len(history["loss_history"]) == 3
+        assert all(np.isfinite(history["loss_history"]))
+        assert trainer.predict(dummy_graph.x, dummy_graph.edge_index).shape == (100, 128)
+
+    @pytest.mark.asyncio
+    async def test_training_does_not_block_event_loop(self, dummy_graph):
+        trainer = GNNTrainer()
+        trainer.create_model(in_features=3)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        await trainer.train(dummy_graph, epochs=10)
+        task.cancel()
+
+        assert ticks > 1
+
+
 def test_model_with_different_architectures():
     """Test model works with different layer configurations"""
     configs = [
@@ -0,0 +1,272 @@
+"""
+Optimized GNN Inference Tests
+
+Test Coverage:
+1. fold_batch_norms: same embeddings as the eval-mode model, no BatchNorm / Dropout left
+2. TorchScript artifact: traced once, serves any graph size
+3. Dynamic int8 quantization: ranking agreement with the eager model
+4. float16 snapshots: top-k agreement, persisted as float16
+5. InferenceConfig validation / environment, GNNRecommender wiring and eager fallback
+6. Benchmark: latency, memory and ranking agreement vs the eager path
+"""
+
+import io
+import time
+from unittest.mock import patch
+
+import pytest
+import torch
+import torch.nn.functional as F
+from torch_geometric.data import Data
+
+from api.ml.gnn_inference import (
+    InferenceConfig,
+    fold_batch_norms,
+    optimize_for_inference,
+    quantize_linear_layers,
+)
+from api.ml.gnn_model import ContactRecommenderGNN, batch_top_k
+from api.ml.gnn_recommender import GNNRecommender
+from api.ml.gnn_snapshots import EmbeddingSnapshot, EmbeddingSnapshotStore
+from api.ml.gnn_training_jobs import TrainingJobManager
+from api.ml.model_cache import entry_nbytes
+
+from fakes import FakeGraphBuilder
+
+
+def make_graph(num_nodes=500, num_edges=3000, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.rand(num_nodes, 3, generator=generator)
+    edge_index = torch.randint(0, num_nodes, (2, num_edges), generator=generator)
+    return Data(x=x, edge_index=edge_index, num_nodes=num_nodes)
+
+
+def make_model(seed=0):
+    """Model with non-trivial BatchNorm statistics (as after training)"""
+    torch.manual_seed(seed)
+    model = ContactRecommenderGNN()
+    graph = make_graph(seed=seed)
+    model.train()
+    with torch.no_grad():
+        for _ in range(5):
+            model(graph.x, graph.edge_index)
+    return model.eval()
+
+
+def top_k_overlap(reference, candidate, k=20, num_queries=200):
+    """Mean fraction of the reference top-k found in the candidate top-k"""
+    queries = torch.arange(min(num_queries, len(reference)))
+    _, expected = batch_top_k(reference, k, query_indices=queries)
+    _, actual = batch_top_k(candidate, k, query_indices=queries)
+    hits = sum(
+        len(set(row_expected) & set(row_actual))
+        for row_expected, row_actual in zip(expected.tolist(), actual.tolist())
+    )
+    return hits / expected.numel()
+
+
+def weights_nbytes(module):
+    """Serialized weight size (quantized Linear keeps int8 weights in packed params)"""
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+    return buffer.tell()
+
+
+@pytest.fixture
+def builder():
+    fake = FakeGraphBuilder(num_nodes=60, num_edges=240)
+    with patch("api.ml.gnn_recommender.ContactGraphBuilder", fake):
+        yield fake
+
+
+class TestInferenceArtifact:
+    """Folding, tracing, quantization"""
+
+    def test_fold_batch_norms_matches_eval_model(self):
+        model = make_model()
+        graph = make_graph(seed=1)
+        folded = fold_batch_norms(model)
+
+        with torch.no_grad():
+            expected = model(graph.x, graph.edge_index)
+            actual = folded(graph.x, graph.edge_index)
+
+        assert torch.allclose(expected, actual, atol=1e-5)
+        assert not any(
+            isinstance(module, (torch.nn.BatchNorm1d, torch.nn.Dropout))
+            for module in folded.modules()
+        )
+        # The trained model is left untouched
+        assert isinstance(model.batch_norms[0], torch.nn.BatchNorm1d)
+
+    def test_torchscript_serves_any_graph_size(self):
+        model = make_model()
+        artifact = optimize_for_inference(model, InferenceConfig(mode="torchscript"))
+
+        assert isinstance(artifact, torch.jit.ScriptModule)
+        for num_nodes in (5, 300, 2000):
+            graph = make_graph(num_nodes, num_nodes * 4)
+            with torch.no_grad():
+                expected = model(graph.x, graph.edge_index)
+                actual = artifact(graph.x, graph.edge_index)
+            assert actual.shape == (num_nodes, 128)
+            assert torch.allclose(expected, actual, atol=1e-5)
+
+    def test_quantized_rankings_agree(self):
+        model = make_model()
+        graph = make_graph(2000, 12000, seed=2)
+        quantized = quantize_linear_layers(fold_batch_norms(model))
+
+        with torch.no_grad():
+            expected = model(graph.x, graph.edge_index)
+            actual = quantized(graph.x, graph.edge_index)
+
+        assert any("quantized" in type(module).__module__ for module in quantized.modules())
+        assert top_k_overlap(expected, actual) > 0.8
+
+    def test_eager_config_returns_model(self):
+        model = make_model()
+        assert optimize_for_inference(model, InferenceConfig()) is model
+
+
+class TestFloat16Snapshots:
+    """Half-precision embedding storage"""
+
+    def test_top_k_agrees_and_persists(self, tmp_path):
+        generator = torch.Generator().manual_seed(0)
+        embeddings = torch.randn(1000, 128, generator=generator)
+        contact_ids = [f"c{i}" for i in range(1000)]
+        full = EmbeddingSnapshot("w1", "fp", embeddings, contact_ids)
+        half = EmbeddingSnapshot("w1", "fp", embeddings, contact_ids, dtype=torch.float16)
+
+        assert half.embeddings.dtype == torch.float16
+        assert entry_nbytes({"embeddings": half.embeddings}) * 2 == entry_nbytes(
+            {"embeddings": full.embeddings}
+        )
+        assert top_k_overlap(full.embeddings, half.embeddings.float()) > 0.95
+        assert len(half.top_k("c1", k=10)) == 10
+        assert len(half.top_k_many(["c1", "c2"], k=10)["c2"]) == 10
+
+        store = EmbeddingSnapshotStore(str(tmp_path))
+        store.save(half)
+        assert store.load("w1").embeddings.dtype == torch.float16
+
+
+class TestInferenceConfig:
+    """Configuration"""
+
+    def test_validation(self):
+        with pytest.raises(ValueError):
+            InferenceConfig(mode="onnx")
+        with pytest.raises(ValueError):
+            InferenceConfig(embedding_dtype="int8")
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("GNN_INFERENCE_MODE", "torchscript")
+        monkeypatch.setenv("GNN_INFERENCE_QUANTIZE", "true")
+        monkeypatch.setenv("GNN_EMBEDDING_DTYPE", "float16")
+
+        config = InferenceConfig.from_env()
+
+        assert config == InferenceConfig("torchscript", True, "float16")
+        assert config.torch_dtype == torch.float16
+
+
+class TestRecommenderInference:
+    """GNNRecommender uses the configured artifact"""
+
+    @pytest.mark.asyncio
+    async def test_graph_change_uses_artifact(self, tmp_path, builder):
+        recommender = GNNRecommender(
+            supabase_client=None,
+            models_dir=str(tmp_path),
+            training_jobs=TrainingJobManager(use_processes=False),
+            inference=InferenceConfig("torchscript", quantize=True, embedding_dtype="float16"),
+        )
+        await recommender.train_model("w1", epochs=2)
+        assert recommender.model_cache["w1"]["snapshot"].embeddings.dtype == torch.float16
+
+        # Graph changed: embeddings recomputed with the traced, quantized model
+        builder.fingerprint = "fp-2"
+        recommender._expire_fingerprint_check("w1")
+        result = await recommender.get_recommendations("w1", "c0", k=5)
+
+        entry = recommender.model_cache["w1"]
+        assert isinstance(entry["inference_model"], torch.jit.ScriptModule)
+        assert entry["snapshot"].embeddings.dtype == torch.float16
+        assert result["graph_fingerprint"] == "fp-2"
+        assert len(result["recommendations"]) == 5
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_eager(self, tmp_path, builder):
+        recommender = GNNRecommender(
+            supabase_client=None,
+            models_dir=str(tmp_path),
+            training_jobs=TrainingJobManager(use_processes=False),
+            inference=InferenceConfig("torchscript"),
+        )
+        await recommender.train_model("w1", epochs=2)
+        builder.fingerprint = "fp-2"
+        recommender._expire_fingerprint_check("w1")
+
+        def broken(model, config):
+            raise RuntimeError("tracing not supported")
+
+        with patch("api.ml.gnn_recommender.optimize_for_inference", broken):
+            result = await recommender.get_recommendations("w1", "c0", k=5)
+
+        entry = recommender.model_cache["w1"]
+        assert entry["inference_model"] is entry["model"]
+        assert len(result["recommendations"]) == 5
+
+
+class TestInferenceBenchmark:
+    """Optimized vs eager inference"""
+
+    def test_latency_memory_agreement(self):
+        num_nodes, num_edges = 20_000, 200_000
+        model = make_model()
+        graph = make_graph(num_nodes, num_edges, seed=3)
+
+        variants = {
+            "eager": (InferenceConfig(), model),
+            "torchscript": (InferenceConfig("torchscript"), fold_batch_norms(model)),
+            "torchscript+int8": (
+                InferenceConfig("torchscript", quantize=True),
+                quantize_linear_layers(fold_batch_norms(model)),
+            ),
+        }
+        results = {}
+        for name, (config, weights) in variants.items():
+            artifact = optimize_for_inference(model, config)
+            with torch.no_grad():
+                embeddings = artifact(graph.x, graph.edge_index)  # warm-up
+                start = time.perf_counter()
+                for _ in range(3):
+                    artifact(graph.x, graph.edge_index)
+            latency = (time.perf_counter() - start) / 3
+            results[name] = (latency, weights_nbytes(weights), embeddings)
+
+        reference = results["eager"][2]
+        half = F.normalize(reference, p=2, dim=1).half()
+
+        print(f"\n📊 GNN inference ({num_nodes} nodes, {num_edges} edges):")
+        for name, (latency, nbytes, embeddings) in results.items():
+            overlap = top_k_overlap(reference, embeddings)
+            print(
+                f"   {name:18s} {latency * 1000:7.1f}ms  model {nbytes / 1024:6.1f} KB  "
+                f"top-20 agreement {overlap:.1%}"
+            )
+        print(
+            f"   Embeddings:        float32 {reference.numel() * 4 / 1e6:.1f} MB, "
+            f"float16 {half.numel() * 2 / 1e6:.1f} MB "
+            f"(top-20 agreement {top_k_overlap(reference, half.float()):.1%})"
+        )
+
+        assert top_k_overlap(reference, results["torchscript"][2]) > 0.99
+        assert top_k_overlap(reference, results["torchscript+int8"][2]) > 0.8
+        assert results["torchscript+int8"][1] < results["eager"][1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -9,6 +9,7 @@ from unittest.mock import AsyncMock, Mock, patch
 import pytest
 
 from api.ml.gnn_recommender import GNNRecommender
+from api.ml.gnn_snapshots import EmbeddingSnapshot
 
 
 @pytest.fixture
@@ -69,15 +70,23 @@ def mock_graph_builder():
             return graph_data, contact_ids, id_to_idx
 
         builder.build_graph_for_workspace = AsyncMock(side_effect=mock_build_graph)
+        builder.get_graph_fingerprint = AsyncMock(return_value="fingerprint-1")
+
+        async def mock_contacts_details(workspace_id, contact_ids):
+            return {
+                cid: {"id": cid, "first_name": "Contact", "last_name": cid} for cid in contact_ids
+            }
+
+        builder.get_contacts_details = AsyncMock(side_effect=mock_contacts_details)
         mock.return_value = builder
 
         yield builder
 
 
 @pytest.mark.asyncio
-async def test_get_recommendations_basic(mock_supabase, mock_graph_builder):
+async def test_get_recommendations_basic(mock_supabase, mock_graph_builder, tmp_path):
     """Test basic recommendation retrieval"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
 
     result = await recommender.get_recommendations(
         workspace_id="test_workspace", contact_id="contact_0", k=10, explain=True
@@ -111,9 +120,29 @@ async def test_get_recommendations_basic(mock_supabase, mock_graph_builder):
 
 
 @pytest.mark.asyncio
-async def test_get_recommendations_with_explanation(mock_supabase, mock_graph_builder):
+async def test_similarity_score_clamps_cosine(mock_supabase, mock_graph_builder, tmp_path):
+    """Test negative cosine similarities are reported as 0, positive ones as is"""
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
+    top = [("contact_1", 0.9), ("contact_2", 0.5), ("contact_3", 0.0), ("contact_4", -0.8)]
+
+    with patch.object(EmbeddingSnapshot, "top_k", return_value=top):
+        result = await recommender.get_recommendations(
+            workspace_id="test_workspace", contact_id="contact_0", k=4
+        )
+
+    recommendations = result["recommendations"]
+    assert [rec["similarity_score"] for rec in recommendations] == [0.9, 0.5, 0.0, 0.0]
+    assert [rec["confidence"] for rec in recommendations] == pytest.approx([0.97, 0.85, 0.7, 0.7])
+    assert (
+        recommendations[0]["reason"] == "Very similar network patterns and professional interests"
+    )
+    assert recommendations[2]["reason"] == "Potential connection based on network proximity"
+
+
+@pytest.mark.asyncio
+async def test_get_recommendations_with_explanation(mock_supabase, mock_graph_builder, tmp_path):
     """Test recommendations include explanations"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
 
     result = await recommender.get_recommendations(
         workspace_id="test_workspace", contact_id="contact_0", k=5, explain=True
@@ -128,9 +157,9 @@ async def test_get_recommendations_with_explanation(mock_supabase, mock_graph_bu
 
 
 @pytest.mark.asyncio
-async def test_recommendations_exclude_self(mock_supabase, mock_graph_builder):
+async def test_recommendations_exclude_self(mock_supabase, mock_graph_builder, tmp_path):
     """Test recommendations don't include the target contact"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
 
     target_id = "contact_5"
 
@@ -146,9 +175,9 @@ async def test_recommendations_exclude_self(mock_supabase, mock_graph_builder):
 
 
 @pytest.mark.asyncio
-async def test_model_caching(mock_supabase, mock_graph_builder):
+async def test_model_caching(mock_supabase, mock_graph_builder, tmp_path):
     """Test model is cached after first use"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
     workspace_id = "test_workspace"
 
     # First call - should create model
@@ -175,9 +204,9 @@ async def test_model_caching(mock_supabase, mock_graph_builder):
 
 
 @pytest.mark.asyncio
-async def test_train_model_endpoint(mock_supabase, mock_graph_builder):
+async def test_train_model_endpoint(mock_supabase, mock_graph_builder, tmp_path):
     """Test model training functionality"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
     workspace_id = "test_workspace"
 
     # Train model
@@ -196,9 +225,9 @@ async def test_train_model_endpoint(mock_supabase, mock_graph_builder):
 
 
 @pytest.mark.asyncio
-async def test_different_k_values(mock_supabase, mock_graph_builder):
+async def test_different_k_values(mock_supabase, mock_graph_builder, tmp_path):
     """Test recommendations with different k values"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
 
     k_values = [5, 10, 20]
 
@@ -213,9 +242,9 @@ async def test_different_k_values(mock_supabase, mock_graph_builder):
 
 
 @pytest.mark.asyncio
-async def test_recommendations_sorted_by_similarity(mock_supabase, mock_graph_builder):
+async def test_recommendations_sorted_by_similarity(mock_supabase, mock_graph_builder, tmp_path):
     """Test recommendations are sorted by similarity (descending)"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
 
     result = await recommender.get_recommendations(
         workspace_id="test_workspace", contact_id="contact_0", k=10
@@ -229,9 +258,9 @@ async def test_recommendations_sorted_by_similarity(mock_supabase, mock_graph_bu
 
 
 @pytest.mark.asyncio
-async def test_rank_assignment(mock_supabase, mock_graph_builder):
+async def test_rank_assignment(mock_supabase, mock_graph_builder, tmp_path):
     """Test recommendations have correct rank assignments"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
 
     result = await recommender.get_recommendations(
         workspace_id="test_workspace", contact_id="contact_0", k=10
@@ -245,9 +274,9 @@ async def test_rank_assignment(mock_supabase, mock_graph_builder):
 
 
 @pytest.mark.asyncio
-async def test_error_handling_invalid_contact(mock_supabase, mock_graph_builder):
+async def test_error_handling_invalid_contact(mock_supabase, mock_graph_builder, tmp_path):
     """Test error handling for invalid contact ID"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
 
     # This should handle gracefully
     try:
@@ -262,9 +291,9 @@ async def test_error_handling_invalid_contact(mock_supabase, mock_graph_builder)
 
 
 @pytest.mark.asyncio
-async def test_concurrent_requests(mock_supabase, mock_graph_builder):
+async def test_concurrent_requests(mock_supabase, mock_graph_builder, tmp_path):
     """Test handling concurrent recommendation requests"""
-    recommender = GNNRecommender(mock_supabase)
+    recommender = GNNRecommender(mock_supabase, models_dir=str(tmp_path))
 
     # Create multiple concurrent requests
     tasks = [
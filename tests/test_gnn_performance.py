@@ -3,6 +3,7 @@ Phase 8: GNN Performance Tests
 Benchmark tests for latency and scalability
 """
 
+import asyncio
 import time
 
 import pytest
@@ -37,6 +38,15 @@ def large_graph():
     return Data(x=x, edge_index=edge_index, num_nodes=10000)
 
 
+@pytest.fixture(scope="module")
+def huge_graph():
+    """Huge graph: 100K nodes, 1M edges"""
+    generator = torch.Generator().manual_seed(0)
+    x = torch.randn(100_000, 3, generator=generator)
+    edge_index = torch.randint(0, 100_000, (2, 1_000_000), generator=generator)
+    return Data(x=x, edge_index=edge_index, num_nodes=100_000)
+
+
 class TestForwardPassLatency:
     """Test model forward pass performance"""
 
@@ -250,6 +260,54 @@ class TestTrainingPerformance:
         # Should be reasonable for 1K nodes
 
 
+class TestMiniBatchTrainingPerformance:
+    """Mini-batch training on a 1M-edge graph"""
+
+    @pytest.mark.asyncio
+    async def test_minibatch_training_1m_edges(self, huge_graph):
+        """Neighbour-sampled steps stay bounded and keep the event loop responsive"""
+        trainer = GNNTrainer()
+        trainer.create_model(in_features=3)
+
+        max_lag = 0.0
+
+        async def probe():
+            nonlocal max_lag
+            while True:
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                max_lag = max(max_lag, time.perf_counter() - start - 0.01)
+
+        task = asyncio.create_task(probe())
+        start = time.time()
+        history = await trainer.train(huge_graph, epochs=2, batches_per_epoch=3)
+        duration = time.time() - start
+        task.cancel()
+
+        print(f"\n📊 Mini-batch training (100K nodes, 1M edges, 2x3 steps): {duration:.2f}s")
+        print(f"   Time per step: {duration / 6 * 1000:.0f}ms")
+        print(f"   Max event loop lag: {max_lag * 1000:.0f}ms")
+
+        assert history["mode"] == "minibatch"
+        assert len(history["loss_history"]) == 2
+        assert max_lag < 0.5
+        assert duration < 120
+
+    def test_full_graph_forward_1m_edges(self, huge_graph):
+        """Inference after training still runs on the full graph"""
+        model = ContactRecommenderGNN()
+        model.eval()
+
+        start = time.time()
+        with torch.no_grad():
+            embeddings = model(huge_graph.x, huge_graph.edge_index)
+        latency = time.time() - start
+
+        print(f"\n📊 Huge graph (100K nodes, 1M edges) forward pass: {latency:.2f}s")
+
+        assert embeddings.shape == (100_000, 128)
+
+
 class TestMemoryEfficiency:
     """Test memory usage"""
 
@@ -0,0 +1,202 @@
+"""
+GNN Embedding Snapshot Tests
+
+Test Coverage:
+1. Graph fingerprint (order independence, sensitivity to updates)
+2. EmbeddingSnapshotStore: save/load, atomic CURRENT switch, version pruning
+3. GNNRecommender: graph build + forward pass only when the fingerprint changes
+4. Snapshot reuse across recommender instances (process restart)
+5. Benchmark: p50 latency of get_recommendations on a snapshot hit
+"""
+
+import statistics
+import time
+from unittest.mock import patch
+
+import pytest
+import torch
+
+from api.ml.gnn_recommender import GNNRecommender
+from api.ml.gnn_snapshots import EmbeddingSnapshot, EmbeddingSnapshotStore, graph_fingerprint
+
+from fakes import FakeGraphBuilder
+
+
+@pytest.fixture
+def builder():
+    fake = FakeGraphBuilder()
+    with patch("api.ml.gnn_recommender.ContactGraphBuilder", fake):
+        yield fake
+
+
+def make_recommender(tmp_path):
+    return GNNRecommender(supabase_client=None, models_dir=str(tmp_path))
+
+
+class TestFingerprint:
+    """graph_fingerprint"""
+
+    def test_order_independent(self):
+        rows = [{"id": "a", "updated_at": "1"}, {"id": "b", "updated_at": "2"}]
+
+        assert graph_fingerprint(rows) == graph_fingerprint(list(reversed(rows)))
+
+    def test_changes_on_update_and_version(self):
+        rows = [{"id": "a", "updated_at": "1"}, {"id": "b", "updated_at": "2"}]
+        updated = [{"id": "a", "updated_at": "1"}, {"id": "b", "updated_at": "3"}]
+
+        assert graph_fingerprint(rows) != graph_fingerprint(updated)
+        assert graph_fingerprint(rows) != graph_fingerprint(rows[:1])
+        assert graph_fingerprint(rows) != graph_fingerprint(rows, version="2")
+
+
+class TestSnapshotStore:
+    """Persisted snapshots"""
+
+    def test_save_and_load(self, tmp_path):
+        store = EmbeddingSnapshotStore(str(tmp_path))
+        embeddings = torch.randn(10, 4)
+        store.save(EmbeddingSnapshot("w1", "fp1", embeddings, [f"c{i}" for i in range(10)]))
+
+        snapshot = store.load("w1")
+
+        assert store.current_fingerprint("w1") == "fp1"
+        assert snapshot.contact_ids[3] == "c3"
+        torch.testing.assert_close(
+            snapshot.embeddings, torch.nn.functional.normalize(embeddings, dim=1)
+        )
+        assert store.load("w2") is None
+
+    def test_current_switch_and_pruning(self, tmp_path):
+        store = EmbeddingSnapshotStore(str(tmp_path), keep_versions=2)
+        for i in range(4):
+            store.save(EmbeddingSnapshot("w1", f"fp{i}", torch.randn(3, 2), ["a", "b", "c"]))
+            time.sleep(0.01)
+
+        assert store.current_fingerprint("w1") == "fp3"
+        assert store.load("w1", "fp2") is not None
+        assert store.load("w1", "fp0") is None
+        assert sorted(p.name for p in (tmp_path / "w1").iterdir() if p.is_dir()) == ["fp2", "fp3"]
+
+    def test_top_k(self):
+        embeddings = torch.tensor([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [-1.0, 0.0]])
+        snapshot = EmbeddingSnapshot("w1", "fp", embeddings, ["a", "b", "c", "d"])
+
+        top = snapshot.top_k("a", k=2)
+
+        assert [cid for cid, _ in top] == ["b", "c"]
+        assert top[0][1] == pytest.approx(0.9 / (0.82**0.5), abs=1e-5)
+        assert [cid for cid, _ in snapshot.top_k("a", k=10, exclude=["b"])] == ["c", "d"]
+        assert snapshot.top_k("missing") == []
+
+
+class TestRecommenderSnapshots:
+    """Serving from snapshots"""
+
+    @pytest.mark.asyncio
+    async def test_graph_built_once_while_fingerprint_unchanged(self, tmp_path, builder):
+        recommender = make_recommender(tmp_path)
+        recommender.FINGERPRINT_CHECK_SECONDS = 0.0  # check on every request
+
+        first = await recommender.get_recommendations("w1", "c0", k=5)
+        second = await recommender.get_recommendations("w1", "c1", k=5)
+
+        assert len(first["recommendations"]) == 5
+        assert len(second["recommendations"]) == 5
+        assert [r["rank"] for r in second["recommendations"]] == [1, 2, 3, 4, 5]
+        assert len(builder.builds) == 1
+        assert builder.fingerprint_checks == 2
+
+        entry = recommender.model_cache["w1"]
+        assert {"model", "embeddings", "contact_ids", "timestamp"} <= set(entry)
+
+    @pytest.mark.asyncio
+    async def test_fingerprint_change_recomputes_without_retraining(self, tmp_path, builder):
+        recommender = make_recommender(tmp_path)
+        recommender.FINGERPRINT_CHECK_SECONDS = 0.0
+        await recommender.get_recommendations("w1", "c0", k=5)
+        model = recommender.model_cache["w1"]["model"]
+
+        builder.fingerprint = "fp-2"
+        builder.num_nodes = 60
+        result = await recommender.get_recommendations("w1", "c55", k=5)
+
+        assert len(builder.builds) == 2
+        assert result["graph_fingerprint"] == "fp-2"
+        assert recommender.model_cache["w1"]["model"] is model
+        assert recommender.snapshots.current_fingerprint("w1") == "fp-2"
+
+    @pytest.mark.asyncio
+    async def test_fingerprint_checks_are_throttled(self, tmp_path, builder):
+        recommender = make_recommender(tmp_path)
+
+        for i in range(5):
+            await recommender.get_recommendations("w1", f"c{i}", k=3)
+
+        assert builder.fingerprint_checks == 1
+
+    @pytest.mark.asyncio
+    async def test_new_instance_loads_persisted_snapshot(self, tmp_path, builder):
+        await make_recommender(tmp_path).get_recommendations("w1", "c0", k=5)
+
+        restarted = make_recommender(tmp_path)
+        result = await restarted.get_recommendations("w1", "c0", k=5)
+
+        assert len(builder.builds) == 1
+        assert len(result["recommendations"]) == 5
+
+    @pytest.mark.asyncio
+    async def test_train_model_publishes_snapshot(self, tmp_path, builder):
+        recommender = make_recommender(tmp_path)
+
+        result = await recommender.train_model("w1", epochs=2, learning_rate=0.01)
+
+        assert result["graph_fingerprint"] == "fp-1"
+        assert recommender.snapshots.current_fingerprint("w1") == "fp-1"
+        assert (tmp_path / "w1.pt").exists()
+
+        await recommender.get_recommendations("w1", "c0", k=5)
+        assert len(builder.builds) == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_contact(self, tmp_path, builder):
+        result = await make_recommender(tmp_path).get_recommendations("w1", "missing", k=5)
+
+        assert result["recommendations"] == []
+        assert "not found" in result["error"]
+
+
+class TestSnapshotBenchmark:
+    """Request latency once the snapshot is in memory"""
+
+    @pytest.mark.asyncio
+    async def test_p50_latency(self, tmp_path):
+        fake = FakeGraphBuilder(num_nodes=10000, num_edges=50000)
+        with patch("api.ml.gnn_recommender.ContactGraphBuilder", fake):
+            recommender = make_recommender(tmp_path)
+
+            start = time.time()
+            await recommender.train_model("w1", epochs=2)
+            cold = time.time() - start
+
+            latencies = []
+            for i in range(200):
+                start = time.perf_counter()
+                result = await recommender.get_recommendations("w1", f"c{i}", k=20)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        p50 = statistics.median(latencies)
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+
+        print(f"\n📊 GNN recommendations (10K nodes):")
+        print(f"   Train + publish snapshot:      {cold * 1000:.0f}ms")
+        print(f"   Snapshot hit p50:              {p50:.2f}ms")
+        print(f"   Snapshot hit p95:              {p95:.2f}ms")
+
+        assert len(result["recommendations"]) == 20
+        assert len(fake.builds) == 1
+        assert p50 < 20
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
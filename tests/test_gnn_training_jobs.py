@@ -0,0 +1,345 @@
+"""
+GNN Training Job Tests
+
+Test Coverage:
+1. TrainingJobManager: per-workspace single-flight, priority order, re-prioritization
+2. Progress reporting from thread and process workers, failures
+3. GNNRecommender: no in-request training, heuristic fallback until the job publishes,
+   last-good model while retraining, retry cool-down after a failed job
+4. routes_gnn: train endpoint returns the job, model status exposes progress
+5. Benchmark: request latency while a workspace model is training
+"""
+
+import asyncio
+import statistics
+import time
+from unittest.mock import patch
+
+import pytest
+import torch
+from torch_geometric.data import Data
+
+from api.ml.gnn_recommender import GNNRecommender
+from api.ml.gnn_training_jobs import (
+    COMPLETED,
+    FAILED,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    QUEUED,
+    TrainingJobManager,
+    train_workspace_model,
+)
+
+from fakes import FakeGraphBuilder, make_graph
+
+
+@pytest.fixture
+def builder():
+    fake = FakeGraphBuilder()
+    with patch("api.ml.gnn_recommender.ContactGraphBuilder", fake):
+        yield fake
+
+
+def make_recommender(tmp_path, wait_seconds=0.0):
+    recommender = GNNRecommender(
+        supabase_client=None,
+        models_dir=str(tmp_path),
+        training_jobs=TrainingJobManager(use_processes=False),
+    )
+    recommender.MODEL_WAIT_SECONDS = wait_seconds
+    return recommender
+
+
+class TestTrainingJobManager:
+    """Queue semantics"""
+
+    @pytest.mark.asyncio
+    async def test_single_flight_per_workspace(self):
+        manager = TrainingJobManager(use_processes=False)
+        calls = []
+
+        async def run(job):
+            calls.append(job.workspace_id)
+            await asyncio.sleep(0.01)
+            return {"workspace_id": job.workspace_id}
+
+        first = manager.submit("w1", run)
+        second = manager.submit("w1", run)
+        other = manager.submit("w2", run)
+
+        assert first is second
+        assert other is not first
+        assert await manager.wait(first) == {"workspace_id": "w1"}
+        await manager.wait(other)
+
+        assert calls == ["w1", "w2"]
+        assert first.status == COMPLETED and first.progress == 1.0
+        assert manager.active("w1") is None
+        # Finished: the next submit starts a new job
+        assert manager.submit("w1", run) is not first
+
+    @pytest.mark.asyncio
+    async def test_priority_order_and_reprioritization(self):
+        manager = TrainingJobManager(use_processes=False)
+        release = asyncio.Event()
+        order = []
+
+        async def blocker(job):
+            await release.wait()
+            return {}
+
+        async def run(job):
+            order.append(job.workspace_id)
+            return {}
+
+        manager.submit("busy", blocker)
+        await asyncio.sleep(0)  # worker picks up the blocker
+        low = manager.submit("low", run, priority=PRIORITY_LOW)
+        normal = manager.submit("normal", run, priority=PRIORITY_NORMAL)
+        bumped = manager.submit("bumped", run, priority=PRIORITY_LOW)
+        high = manager.submit("high", run, priority=PRIORITY_HIGH)
+        assert manager.submit("bumped", run, priority=PRIORITY_HIGH) is bumped
+        assert manager.stats() == {"queued": 4, "running": 1}
+
+        release.set()
+        for job in (low, normal, bumped, high):
+            await manager.wait(job)
+
+        # FIFO within a priority: "high" was queued before "bumped" was raised
+        assert order == ["high", "bumped", "normal", "low"]
+        assert bumped.priority == PRIORITY_HIGH
+
+    @pytest.mark.asyncio
+    async def test_failure_is_reported(self):
+        manager = TrainingJobManager(use_processes=False)
+
+        async def run(job):
+            raise ValueError("No contacts found for training")
+
+        job = manager.submit("w1", run)
+        with pytest.raises(ValueError):
+            await manager.wait(job)
+
+        assert job.status == FAILED
+        assert job.error == "No contacts found for training"
+        assert manager.latest("w1") is job
+        assert manager.get(job.job_id).to_dict()["status"] == FAILED
+
+    @pytest.mark.asyncio
+    async def test_thread_worker_progress(self):
+        manager = TrainingJobManager(use_processes=False)
+        graph = make_graph(40, 160)
+        seen = []
+
+        async def run(job):
+            task = asyncio.ensure_future(
+                manager.run_cpu(job, train_workspace_model, graph, 30, 0.01, in_process=False)
+            )
+            while not task.done():
+                seen.append(job.epoch)
+                await asyncio.sleep(0.01)
+            return await task
+
+        job = manager.submit("w1", run, epochs=30)
+        assert job.to_dict()["status"] == QUEUED
+        trained = await manager.wait(job)
+
+        assert trained["embeddings"].shape == (40, 128)
+        assert len(trained["history"]["loss_history"]) == 30
+        assert (job.epoch, job.epochs) == (30, 30)
+        assert job.loss == pytest.approx(trained["history"]["final_loss"])
+        assert seen == sorted(seen)
+
+    @pytest.mark.asyncio
+    async def test_process_worker(self):
+        manager = TrainingJobManager(use_processes=True)
+        graph = make_graph(40, 160)
+
+        async def run(job):
+            return await manager.run_cpu(job, train_workspace_model, graph, 5, 0.01)
+
+        try:
+            job = manager.submit("w1", run, epochs=5)
+            trained = await manager.wait(job)
+        finally:
+            manager.shutdown()
+
+        assert trained["embeddings"].shape == (40, 128)
+        assert all(isinstance(t, torch.Tensor) for t in trained["state_dict"].values())
+        assert (job.epoch, job.epochs) == (5, 5)
+
+
+class TestRecommenderTraining:
+    """Requests never train; fallback until the job publishes"""
+
+    @pytest.mark.asyncio
+    async def test_fallback_until_model_published(self, tmp_path, builder):
+        recommender = make_recommender(tmp_path)
+
+        results = await asyncio.gather(
+            *[recommender.get_recommendations("w1", f"c{i}", k=5) for i in range(5)]
+        )
+
+        assert all(result["method"] == "graph_heuristic" for result in results)
+        assert all(len(result["recommendations"]) == 5 for result in results)
+        assert results[0]["model_status"] == "training"
+
+        job = recommender.training_jobs.latest("w1")
+        assert recommender.training_jobs.active("w1") is job  # one job for all requests
+        result = await recommender.training_jobs.wait(job)
+
+        assert result["status"] == "training_complete"
+        assert (tmp_path / "w1.pt").exists()
+        assert recommender.snapshots.current_fingerprint("w1") == "fp-1"
+        assert len(builder.builds) == 1  # the job reused the request's graph
+
+        served = await recommender.get_recommendations("w1", "c0", k=5)
+        assert served["method"] == "graph_neural_network"
+        assert recommender.model_cache["w1"]["model"] is not None
+
+    @pytest.mark.asyncio
+    async def test_small_graph_waits_for_first_model(self, tmp_path, builder):
+        recommender = make_recommender(tmp_path, wait_seconds=30.0)
+
+        result = await recommender.get_recommendations("w1", "c0", k=5)
+
+        assert result["method"] == "graph_neural_network"
+        assert recommender.training_jobs.latest("w1").status == COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_retrain_serves_last_good_model(self, tmp_path, builder):
+        recommender = make_recommender(tmp_path)
+        await recommender.train_model("w1", epochs=2)
+        model = recommender.model_cache["w1"]["model"]
+
+        result = await recommender.get_recommendations("w1", "c0", k=5, use_cache=False)
+
+        assert result["method"] == "graph_neural_network"
+        job = recommender.training_jobs.active("w1")
+        assert job is not None
+        assert recommender.model_cache["w1"]["model"] is model
+
+        await recommender.training_jobs.wait(job)
+        assert recommender.model_cache["w1"]["model"] is not model
+
+    @pytest.mark.asyncio
+    async def test_publish_after_graph_change_forces_recheck(self, tmp_path, builder):
+        recommender = make_recommender(tmp_path)
+        await recommender.get_recommendations("w1", "c0", k=5)
+        job = recommender.training_jobs.latest("w1")
+
+        # Graph changes while the first model trains
+        builder.fingerprint = "fp-2"
+        recommender._expire_fingerprint_check("w1")
+        assert (await recommender.get_recommendations("w1", "c1", k=5))["method"] == (
+            "graph_heuristic"
+        )
+        await recommender.training_jobs.wait(job)
+
+        result = await recommender.get_recommendations("w1", "c1", k=5)
+
+        assert result["method"] == "graph_neural_network"
+        assert result["graph_fingerprint"] == "fp-2"
+
+    @pytest.mark.asyncio
+    async def test_failed_training_is_not_retried_immediately(self, tmp_path, builder):
+        recommender = make_recommender(tmp_path)
+
+        async def failing(job):
+            raise RuntimeError("worker crashed")
+
+        with patch.object(recommender, "_run_training_job", failing):
+            await recommender.get_recommendations("w1", "c0", k=5)
+            job = recommender.training_jobs.latest("w1")
+            with pytest.raises(RuntimeError):
+                await recommender.training_jobs.wait(job)
+
+            recommender._expire_fingerprint_check("w1")
+            result = await recommender.get_recommendations("w1", "c1", k=5)
+
+        assert result["method"] == "graph_heuristic"
+        assert recommender.training_jobs.latest("w1") is job
+
+    def test_heuristic_embeddings_follow_neighbourhoods(self):
+        # Two disjoint cliques: neighbours of a node are in its own clique
+        clique_a = [(i, j) for i in range(5) for j in range(5) if i != j]
+        clique_b = [(i + 5, j + 5) for i, j in clique_a]
+        edge_index = torch.tensor(clique_a + clique_b).t()
+        graph = Data(x=torch.ones(10, 3), edge_index=edge_index, num_nodes=10)
+
+        embeddings = torch.nn.functional.normalize(GNNRecommender._heuristic_embeddings(graph))
+        similarities = embeddings @ embeddings[0]
+        similarities[0] = -1
+
+        assert set(torch.topk(similarities, 4).indices.tolist()) == {1, 2, 3, 4}
+
+
+class TestTrainingRoutes:
+    """routes_gnn train / model-status"""
+
+    @pytest.mark.asyncio
+    async def test_train_returns_job_and_status_shows_progress(self, tmp_path, builder):
+        from api.ml import routes_gnn
+
+        recommender = make_recommender(tmp_path)
+        with patch.object(routes_gnn, "_recommender", recommender):
+            queued = await routes_gnn.train_gnn_model("w1", epochs=3)
+            assert queued["status"] == QUEUED
+            assert queued["epochs"] == 3
+
+            status = await routes_gnn.get_model_status("w1")
+            assert status["status"] == "training"
+            assert status["training"]["job_id"] == queued["job_id"]
+
+            again = await routes_gnn.train_gnn_model("w1", epochs=3, wait=True)
+            assert again["job_id"] == queued["job_id"]  # single-flight
+
+            status = await routes_gnn.get_model_status("w1")
+
+        assert status["status"] == "ready"
+        assert status["training"]["status"] == COMPLETED
+        assert status["training"]["progress"] == 1.0
+
+
+class TestTrainingBenchmark:
+    """Requests stay fast while a large workspace trains"""
+
+    @pytest.mark.asyncio
+    async def test_latency_during_training(self, tmp_path):
+        fake = FakeGraphBuilder(num_nodes=10000, num_edges=50000)
+        with patch("api.ml.gnn_recommender.ContactGraphBuilder", fake):
+            recommender = make_recommender(tmp_path)
+
+            start = time.perf_counter()
+            first = await recommender.get_recommendations("w1", "c0", k=20)
+            first_latency = (time.perf_counter() - start) * 1000
+            job = recommender.training_jobs.latest("w1")
+
+            latencies = []
+            while job.active and len(latencies) < 200:
+                start = time.perf_counter()
+                result = await recommender.get_recommendations("w1", f"c{len(latencies)}", k=20)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert result["method"] == "graph_heuristic"
+                await asyncio.sleep(0.005)
+
+            await recommender.training_jobs.wait(job)
+            trained = await recommender.get_recommendations("w1", "c0", k=20)
+
+        p50 = statistics.median(latencies)
+
+        print(f"\n📊 GNN requests while training (10K nodes, 50K edges):")
+        print(f"   First request (graph + fallback): {first_latency:.0f}ms")
+        print(f"   Fallback p50 during training:     {p50:.2f}ms ({len(latencies)} requests)")
+        print(f"   Job progress at finish:           {job.epoch}/{job.epochs} epochs")
+
+        assert first["method"] == "graph_heuristic"
+        assert len(first["recommendations"]) == 20
+        assert latencies
+        assert trained["method"] == "graph_neural_network"
+        assert p50 < 50
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
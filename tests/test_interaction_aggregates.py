@@ -0,0 +1,336 @@
+"""
+Interaction Aggregates Tests
+
+Test Coverage:
+1. Bulk build: totals, last interaction, type bitmask, 30/90-day windows
+2. Incremental inserts, out-of-order backfill and lazy window expiry
+3. Rebuild from scratch matches the incrementally maintained counters
+4. Registry: build once per workspace, concurrent callers, max_age rebuilds
+5. AnalyticsMetrics, ChurnPredictor and SentimentAnalyzer read the aggregates
+6. Benchmark: O(1) aggregate reads vs a history query per call
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from api.analytics import (
+    AnalyticsMetrics,
+    InteractionAggregates,
+    WorkspaceAggregates,
+    get_interaction_aggregates,
+)
+from api.analytics.aggregates import popcount
+from api.analytics.engine import SECONDS_PER_DAY, parse_timestamp
+from api.ml.churn_predictor import ChurnPredictor
+from api.ml.sentiment_analyzer import SentimentAnalyzer
+
+from fakes import INTERACTION_TYPES, FakeSupabase, make_workspace
+
+DAY = SECONDS_PER_DAY
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc).timestamp()
+
+
+def iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def brute_force(interactions, contact_id, now):
+    """Counters re-derived from raw rows (what every caller used to do)"""
+    rows = [row for row in interactions if row["contact_id"] == contact_id]
+    times = [parse_timestamp(row["occurred_at"]) for row in rows]
+    return {
+        "total": len(rows),
+        "last_30d": sum(1 for t in times if t >= now - 30 * DAY),
+        "last_90d": sum(1 for t in times if t >= now - 90 * DAY),
+        "last_at": max(times) if times else None,
+        "distinct_types": len({row["type"] for row in rows}),
+    }
+
+
+def as_dict(aggregate):
+    return {
+        "total": aggregate.total,
+        "last_30d": aggregate.last_30d,
+        "last_90d": aggregate.last_90d,
+        "last_at": aggregate.last_at,
+        "distinct_types": aggregate.distinct_types,
+    }
+
+
+def random_interactions(contact_ids, count, now, seed=0, span_days=200):
+    rng = random.Random(seed)
+    return [
+        {
+            "contact_id": rng.choice(contact_ids),
+            "workspace_id": "ws_1",
+            "type": rng.choice(INTERACTION_TYPES),
+            "occurred_at": iso(now - rng.uniform(0, span_days) * DAY),
+        }
+        for _ in range(count)
+    ]
+
+
+class TestWorkspaceAggregates:
+    """Counters and rolling windows"""
+
+    def test_bulk_build_matches_raw_rows(self):
+        contact_ids = [f"c{i}" for i in range(40)]
+        interactions = random_interactions(contact_ids[:30], 600, NOW)
+
+        aggregates = WorkspaceAggregates.from_rows("ws_1", interactions, now=NOW)
+
+        for contact_id in contact_ids:
+            assert as_dict(aggregates.get(contact_id, NOW)) == brute_force(
+                interactions, contact_id, NOW
+            )
+
+        columns = aggregates.columns(contact_ids, now=NOW)
+        assert columns["total"].tolist() == [
+            brute_force(interactions, c, NOW)["total"] for c in contact_ids
+        ]
+        assert columns["window_counts"][90].tolist() == [
+            brute_force(interactions, c, NOW)["last_90d"] for c in contact_ids
+        ]
+        assert np.isneginf(columns["last_at"][-1])
+        assert columns["distinct_types"][-1] == 0
+
+    def test_record_and_expire(self):
+        aggregates = WorkspaceAggregates("ws_1", now=NOW)
+
+        aggregates.record("a", iso(NOW - 10 * DAY), "email")
+        aggregates.record("a", NOW - 60 * DAY, "call")
+        aggregates.record("a", datetime.fromtimestamp(NOW - 120 * DAY), "email")  # naive = UTC
+        aggregates.record("b", iso(NOW - 1 * DAY), None)
+
+        a = aggregates.get("a", NOW)
+        assert (a.total, a.last_30d, a.last_90d, a.distinct_types) == (3, 1, 2, 2)
+        assert a.last_at == NOW - 10 * DAY
+        assert a.days_since_last(NOW) == 10
+
+        # 35 days later: the 10-day-old event leaves the 30-day window,
+        # the 60-day-old one the 90-day window
+        a = aggregates.get("a", NOW + 35 * DAY)
+        assert (a.total, a.last_30d, a.last_90d) == (3, 0, 1)
+        # Time does not move backwards
+        assert aggregates.get("a", NOW).last_30d == 0
+        assert aggregates.get("missing") == (0, 0, 0, None, 0)
+
+    def test_incremental_matches_rebuild(self):
+        contact_ids = [f"c{i}" for i in range(25)]
+        history = random_interactions(contact_ids, 300, NOW, seed=1)
+        aggregates = WorkspaceAggregates.from_rows("ws_1", history, now=NOW)
+
+        # New interactions (including backfilled ones) over the next 60 days
+        inserted = []
+        rng = random.Random(2)
+        for step in range(200):
+            now = NOW + step * 0.3 * DAY
+            row = {
+                "contact_id": rng.choice(contact_ids + ["new_contact"]),
+                "type": rng.choice(["email", "call", "video"]),
+                "occurred_at": iso(now - rng.choice([0, 0, 5, 45, 100]) * DAY),
+            }
+            inserted.append(row)
+            aggregates.advance(now)
+            aggregates.record(row["contact_id"], row["occurred_at"], row["type"])
+
+        end = NOW + 70 * DAY
+        rebuilt = WorkspaceAggregates.from_rows("ws_1", history + inserted, now=end)
+        for contact_id in contact_ids + ["new_contact"]:
+            expected = brute_force(history + inserted, contact_id, end)
+            assert as_dict(aggregates.get(contact_id, end)) == expected
+            assert as_dict(rebuilt.get(contact_id, end)) == expected
+
+    def test_type_bits_overflow(self):
+        aggregates = WorkspaceAggregates("ws_1", now=NOW)
+        for i in range(70):
+            aggregates.record("a", NOW, f"type_{i}")
+
+        assert aggregates.get("a", NOW).distinct_types == 64
+
+    def test_popcount_matches_bin_count(self):
+        rng = np.random.default_rng(0)
+        masks = rng.integers(0, 2**63, size=1000, dtype=np.uint64) | np.uint64(2**63)
+        masks[:2] = [0, 2**64 - 1]
+
+        expected = [bin(int(mask)).count("1") for mask in masks]
+        assert popcount(masks).tolist() == expected
+        assert popcount(np.zeros(0, dtype=np.uint64)).tolist() == []
+
+
+class TestInteractionAggregates:
+    """Per-process registry"""
+
+    def test_one_registry_per_process(self):
+        registry = get_interaction_aggregates()
+
+        assert isinstance(registry, InteractionAggregates)
+        assert get_interaction_aggregates() is registry
+
+    @pytest.mark.asyncio
+    async def test_builds_once_and_records_inserts(self):
+        contacts, interactions = make_workspace(num_contacts=60, seed=5)
+        supabase = FakeSupabase({"contacts": contacts, "interactions": interactions})
+        store = InteractionAggregates()
+        store.PAGE_SIZE = 100
+        contact_id = contacts[3]["id"]
+
+        assert not store.record_interaction("ws_1", contact_id)  # not built yet
+        results = await asyncio.gather(
+            *(store.get_contact(supabase, "ws_1", c["id"]) for c in contacts[:10])
+        )
+        before = results[3]
+        calls = len(supabase.calls)
+
+        assert calls == len(interactions) // 100 + 1
+        assert store.record_interaction("ws_1", contact_id, type="meeting")
+        after = await store.get_contact(supabase, "ws_1", contact_id)
+
+        assert len(supabase.calls) == calls
+        assert (after.total, after.last_30d, after.last_90d) == (
+            before.total + 1,
+            before.last_30d + 1,
+            before.last_90d + 1,
+        )
+        assert after.days_since_last(time.time()) == 0
+
+    @pytest.mark.asyncio
+    async def test_max_age_rebuild(self):
+        contacts, interactions = make_workspace(num_contacts=20, seed=6)
+        supabase = FakeSupabase({"contacts": contacts, "interactions": interactions})
+        store = InteractionAggregates(max_age=60)
+
+        first = await store.ensure(supabase, "ws_1")
+        assert await store.ensure(supabase, "ws_1") is first
+
+        first.built_at -= 120
+        assert "ws_1" not in store
+        assert await store.ensure(supabase, "ws_1") is not first
+
+
+class TestAggregateReaders:
+    """Analytics, churn and sentiment read the counters instead of history"""
+
+    @pytest.mark.asyncio
+    async def test_analytics_metrics_match_scan(self):
+        contacts, interactions = make_workspace(num_contacts=150, seed=7)
+        tables = {"contacts": contacts, "interactions": interactions}
+
+        scanned = await AnalyticsMetrics(FakeSupabase(tables)).get_metrics("ws_1")
+        supabase = FakeSupabase(tables)
+        analytics = AnalyticsMetrics(supabase, aggregates=InteractionAggregates())
+        aggregated = await analytics.get_metrics("ws_1")
+
+        for key in ("clv", "health_score", "engagement", "top_contacts"):
+            assert aggregated[key] == scanned[key]
+
+        # Second load: contacts and the engagement window only, no full interactions scan
+        supabase.calls.clear()
+        await analytics.get_metrics("ws_1")
+        assert [call.table_name for call in supabase.calls] == ["contacts", "interactions"]
+        assert len(supabase.calls[1].filters) == 2  # workspace + date range
+
+    @pytest.mark.asyncio
+    async def test_churn_and_sentiment_read_aggregates(self):
+        now = datetime.now(timezone.utc)
+        contact_id = str(uuid.uuid4())
+        contact = {
+            "id": contact_id,
+            "workspace_id": "ws_1",
+            "updated_at": now.isoformat(),
+            "influence_score": 0.4,
+            "tags": ["mentor"],
+        }
+        interactions = [
+            {
+                "contact_id": contact_id,
+                "workspace_id": "ws_1",
+                "type": "email",
+                "occurred_at": (now - timedelta(days=days)).isoformat(),
+            }
+            for days in (1, 20, 80, 200)
+        ]
+        supabase = FakeSupabase({"contacts": [contact], "interactions": interactions})
+        store = InteractionAggregates()
+
+        churn = ChurnPredictor(supabase, aggregates=store)
+        sentiment = SentimentAnalyzer(supabase, aggregates=store)
+
+        features = await churn._extract_features(contact_id)
+        interaction_sentiment = await sentiment._analyze_interaction_sentiment(contact_id, "ws_1")
+        result = await sentiment.analyze_contact_sentiment(contact_id)
+
+        # 3 interactions in 90 days: frequency 1.0, 1 per month
+        assert features[ChurnPredictor.FEATURE_INTERACTION_FREQ] == 1.0
+        assert interaction_sentiment == pytest.approx(-0.3 + 0.9 / 0.9 * 0.6)
+        assert result["components"]["interactions"] == round(interaction_sentiment, 3)
+        assert not supabase.calls_to("sync_history")
+
+        # Without aggregates: previous history query
+        await ChurnPredictor(supabase)._extract_features(contact_id)
+        assert len(supabase.calls_to("sync_history")) == 1
+
+
+class TestAggregatesBenchmark:
+    """Per-contact reads: counters vs history scans"""
+
+    @pytest.mark.asyncio
+    async def test_contact_read_benchmark(self):
+        contacts, interactions = make_workspace(num_contacts=1000, max_interactions=30, seed=8)
+        supabase = FakeSupabase({"contacts": contacts, "interactions": interactions})
+        contact_ids = [contact["id"] for contact in contacts]
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=90)).isoformat()
+
+        start = time.perf_counter()
+        scanned = [
+            len(
+                supabase.table("interactions")
+                .select("id")
+                .eq("contact_id", contact_id)
+                .gte("occurred_at", cutoff)
+                .execute()
+                .data
+            )
+            for contact_id in contact_ids
+        ]
+        scan_time = time.perf_counter() - start
+        scan_calls = len(supabase.calls)
+
+        store = InteractionAggregates()
+        supabase.calls.clear()
+        start = time.perf_counter()
+        await store.ensure(supabase, "ws_1")
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        counts = [
+            (await store.get_contact(supabase, "ws_1", contact_id)).last_90d
+            for contact_id in contact_ids
+        ]
+        read_time = time.perf_counter() - start
+
+        print(
+            f"\n📊 90-day interaction counts, {len(contact_ids)} contacts / "
+            f"{len(interactions)} interactions:"
+        )
+        print(f"   history query per contact: {scan_calls:5d} calls  {scan_time * 1000:8.1f}ms")
+        print(
+            f"   bulk build:                {len(supabase.calls):5d} calls  {build_time * 1000:8.1f}ms"
+        )
+        print(
+            f"   aggregate reads:               0 calls  {read_time * 1000:8.1f}ms "
+            f"({read_time / len(contact_ids) * 1e6:.1f}us per contact)"
+        )
+
+        assert counts == scanned
+        assert read_time < scan_time / 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
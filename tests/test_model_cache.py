@@ -0,0 +1,255 @@
+"""
+Bounded Model Cache Tests
+
+Test Coverage:
+1. entry_nbytes: model parameters + embeddings + contact index
+2. WorkspaceModelCache: byte budget with LRU / LFU eviction, idle TTL, counters
+3. GNNRecommender: evicted workspaces reload the snapshot and .pt lazily (no retraining)
+4. gnn_health_check exposes cache counters
+5. Benchmark: many workspaces under a fixed memory budget
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+import torch
+
+from api.ml.gnn_model import ContactRecommenderGNN
+from api.ml.gnn_recommender import GNNRecommender
+from api.ml.gnn_training_jobs import TrainingJobManager
+from api.ml.model_cache import CONTACT_INDEX_BYTES, WorkspaceModelCache, entry_nbytes
+
+from fakes import FakeClock, FakeGraphBuilder
+
+
+def make_entry(num_contacts=100, dim=128):
+    return {
+        "model": None,
+        "embeddings": torch.zeros(num_contacts, dim),
+        "contact_ids": [f"c{i}" for i in range(num_contacts)],
+    }
+
+
+ENTRY_BYTES = entry_nbytes(make_entry())
+
+
+@pytest.fixture
+def builder():
+    fake = FakeGraphBuilder()
+    with patch("api.ml.gnn_recommender.ContactGraphBuilder", fake):
+        yield fake
+
+
+class TestEntrySize:
+    """Memory estimate"""
+
+    def test_counts_model_embeddings_and_index(self):
+        model = ContactRecommenderGNN()
+        params = sum(
+            t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers())
+        )
+        entry = {**make_entry(), "model": model}
+
+        assert entry_nbytes(make_entry()) == 100 * 128 * 4 + 100 * CONTACT_INDEX_BYTES
+        assert entry_nbytes(entry) == entry_nbytes(make_entry()) + params
+        assert entry_nbytes({}) == 0
+
+
+class TestWorkspaceModelCache:
+    """Budget, eviction, TTL"""
+
+    def test_lru_eviction_by_bytes(self):
+        evicted = []
+        cache = WorkspaceModelCache(max_bytes=3 * ENTRY_BYTES, on_evict=evicted.append)
+
+        for workspace_id in ("a", "b", "c"):
+            cache[workspace_id] = make_entry()
+        cache.get("a")  # a becomes most recently used
+        cache["d"] = make_entry()
+
+        assert list(cache) == ["c", "a", "d"]
+        assert evicted == ["b"]
+        assert cache.nbytes == 3 * ENTRY_BYTES
+        assert cache.stats()["evictions"] == 1
+
+    def test_lfu_eviction(self):
+        cache = WorkspaceModelCache(max_bytes=3 * ENTRY_BYTES, policy="lfu")
+        for workspace_id in ("a", "b", "c"):
+            cache[workspace_id] = make_entry()
+        for _ in range(3):
+            cache.get("a")
+        cache.get("b")
+
+        cache["d"] = make_entry()  # c is least frequently used
+        cache["e"] = make_entry()  # now d (one access) is
+
+        assert "a" in cache and "b" in cache and "e" in cache
+        assert "c" not in cache and "d" not in cache
+
+    def test_replace_updates_size(self):
+        cache = WorkspaceModelCache(max_bytes=10 * ENTRY_BYTES)
+        cache["a"] = make_entry()
+        cache["a"] = make_entry(num_contacts=200)
+
+        assert len(cache) == 1
+        assert cache.nbytes == entry_nbytes(make_entry(num_contacts=200))
+        assert cache.pop("a") is not None
+        assert cache.nbytes == 0
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        expired = []
+        cache = WorkspaceModelCache(ttl_seconds=60, clock=clock, on_evict=expired.append)
+        cache["a"] = make_entry()
+        cache["b"] = make_entry()
+
+        clock.now = 50
+        assert cache.get("a") is not None  # refreshes a
+        clock.now = 100
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        clock.now = 200
+        assert cache.expire() == 1
+
+        assert expired == ["b", "a"]
+        assert len(cache) == 0
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["expirations"]) == (2, 1, 2)
+
+    def test_oversized_entry_is_kept_alone(self):
+        cache = WorkspaceModelCache(max_bytes=ENTRY_BYTES // 2)
+        cache["a"] = make_entry()
+        cache["b"] = make_entry()
+
+        assert list(cache) == ["b"]
+
+    def test_peek_does_not_count(self):
+        cache = WorkspaceModelCache()
+        cache["a"] = make_entry()
+
+        assert cache.peek("a") is not None
+        assert "a" in cache
+        assert (cache.hits, cache.misses) == (0, 0)
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            WorkspaceModelCache(policy="random")
+
+
+class TestRecommenderEviction:
+    """Evicted workspaces come back from disk"""
+
+    @pytest.mark.asyncio
+    async def test_evicted_workspace_reloads_without_retraining(self, tmp_path, builder):
+        recommender = GNNRecommender(
+            supabase_client=None,
+            models_dir=str(tmp_path),
+            training_jobs=TrainingJobManager(use_processes=False),
+        )
+        # Budget for one trained workspace
+        recommender.model_cache.max_bytes = entry_nbytes(
+            {
+                "model": ContactRecommenderGNN(),
+                "embeddings": torch.zeros(50, 128),
+                "contact_ids": [""] * 75,
+            }
+        )
+
+        await recommender.train_model("w1", epochs=2)
+        await recommender.train_model("w2", epochs=2)
+        assert list(recommender.model_cache) == ["w2"]
+        assert recommender.model_cache.evictions == 1
+        assert "w1" not in recommender._workspace_locks
+
+        # Snapshot from disk: no graph build, no training
+        builds = len(builder.builds)
+        first = await recommender.get_recommendations("w1", "c0", k=5)
+        assert len(builder.builds) == builds
+        assert list(recommender.model_cache) == ["w1"]
+        assert recommender.model_cache["w1"]["model"] is None
+        assert first["method"] == "graph_neural_network"
+        await recommender.get_recommendations("w2", "c0", k=5)
+
+        # Graph changed: model comes lazily from w2.pt
+        builder.fingerprints["w2"] = "fp-2"
+        recommender._expire_fingerprint_check("w2")
+        changed = await recommender.get_recommendations("w2", "c1", k=5)
+
+        assert changed["graph_fingerprint"] == "fp-2"
+        assert recommender.model_cache["w2"]["model"] is not None
+        # Still the explicit job: nothing was retrained
+        assert recommender.training_jobs.latest("w2").params.get("epochs") == 2
+        assert len(first["recommendations"]) == 5
+        assert recommender.model_cache.evictions >= 2
+
+    @pytest.mark.asyncio
+    async def test_health_check_reports_counters(self, tmp_path, builder):
+        from api.ml import routes_gnn
+
+        recommender = GNNRecommender(
+            supabase_client=None,
+            models_dir=str(tmp_path),
+            training_jobs=TrainingJobManager(use_processes=False),
+        )
+        await recommender.train_model("w1", epochs=2)
+        await recommender.get_recommendations("w1", "c0", k=5)
+
+        with patch.object(routes_gnn, "_recommender", recommender):
+            health = await routes_gnn.gnn_health_check()
+
+        assert health["status"] == "healthy"
+        assert health["model_cache"]["entries"] == 1
+        assert health["model_cache"]["hits"] >= 1
+        assert {"misses", "evictions", "bytes", "max_bytes"} <= set(health["model_cache"])
+        assert health["training_jobs"] == {"queued": 0, "running": 0}
+
+
+class TestModelCacheBenchmark:
+    """Multi-tenant memory bound"""
+
+    def test_many_workspaces_under_budget(self):
+        model = ContactRecommenderGNN()
+        embeddings = torch.zeros(5000, 128)
+        contact_ids = [""] * 5000
+        entry_size = entry_nbytes(
+            {"model": model, "embeddings": embeddings, "contact_ids": contact_ids}
+        )
+        budget = 20 * entry_size
+        cache = WorkspaceModelCache(max_bytes=budget)
+
+        # Zipf-like traffic over 200 workspaces
+        generator = torch.Generator().manual_seed(0)
+        weights = 1.0 / torch.arange(1, 201, dtype=torch.float)
+        requests = torch.multinomial(weights, 5000, replacement=True, generator=generator)
+
+        peak = 0
+        start = time.perf_counter()
+        for workspace_idx in requests.tolist():
+            workspace_id = f"w{workspace_idx}"
+            if cache.get(workspace_id) is None:
+                cache[workspace_id] = {
+                    "model": model,
+                    "embeddings": embeddings,
+                    "contact_ids": contact_ids,
+                }
+            peak = max(peak, cache.nbytes)
+        elapsed = time.perf_counter() - start
+
+        stats = cache.stats()
+        unbounded = len(set(requests.tolist())) * entry_size
+
+        print(f"\n📊 Model cache (200 workspaces, 5K contacts each, 5000 requests):")
+        print(f"   Budget:             {budget / 1e6:.0f} MB (unbounded: {unbounded / 1e6:.0f} MB)")
+        print(f"   Peak held:          {peak / 1e6:.0f} MB")
+        print(f"   Hit ratio:          {stats['hit_ratio']:.1%}")
+        print(f"   Evictions:          {stats['evictions']}")
+        print(f"   Cache overhead:     {elapsed / len(requests) * 1e6:.1f}us/request")
+
+        assert peak <= budget
+        assert stats["entries"] <= 20
+        assert stats["hit_ratio"] > 0.3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,300 @@
+"""
+Recommendation Engine Tests
+
+Test Coverage:
+1. ContactAdjacency: neighbours, friends-of-friends with mutual counts (A² row)
+2. Connection graph loaded once (paged) and cached, TTL and invalidation
+   (per engine and process-wide after connection writes)
+3. recommend_contacts end-to-end on an in-memory Supabase
+4. Bulk candidate scoring: one in_() query, one similarity call, stage timings
+5. Benchmarks: friends-of-friends on a 100K-connection graph, full recommendation call
+"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from api.ml.graph_neighborhood import ContactAdjacency
+from api.ml.recommendation_engine import RecommendationEngine, invalidate_connection_graphs
+
+from fakes import FakeSupabase
+
+
+def reference_friends_of_friends(edges, contact_id):
+    """Set-based reference implementation"""
+    friends = {}
+    for a, b in edges:
+        friends.setdefault(a, set()).add(b)
+        friends.setdefault(b, set()).add(a)
+
+    direct = friends.get(contact_id, set())
+    counts = {}
+    for friend in direct:
+        for fof in friends[friend]:
+            if fof != contact_id and fof not in direct:
+                counts[fof] = counts.get(fof, 0) + 1
+    return counts
+
+
+def random_edges(num_nodes, num_edges, seed=0):
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, num_nodes, size=(num_edges, 2))
+    return [(f"c{a}", f"c{b}") for a, b in pairs.tolist() if a != b]
+
+
+def make_engine(edges, contacts=None, page_size=1000):
+    connections = [{"contact_id_1": a, "contact_id_2": b} for a, b in edges]
+    supabase = FakeSupabase({"contact_connections": connections, "contacts": contacts or []})
+
+    embeddings_service = MagicMock()
+    embeddings_service.get_similarities = AsyncMock(return_value={})
+
+    engine = RecommendationEngine(supabase, embeddings_service)
+    engine.CONNECTIONS_PAGE_SIZE = page_size
+    return engine, supabase
+
+
+class TestContactAdjacency:
+    """CSR adjacency"""
+
+    def test_neighbors_are_undirected_and_deduplicated(self):
+        adjacency = ContactAdjacency([("a", "b"), ("b", "a"), ("a", "c"), ("a", "a")])
+
+        assert adjacency.neighbors("a") == {"b", "c"}
+        assert adjacency.neighbors("b") == {"a"}
+        assert adjacency.num_edges == 2
+        assert adjacency.degree("missing") == 0
+
+    def test_friends_of_friends_counts(self):
+        edges = [("u", "f1"), ("u", "f2"), ("f1", "x"), ("f2", "x"), ("f2", "y"), ("f1", "f2")]
+        adjacency = ContactAdjacency(edges)
+
+        assert adjacency.friends_of_friends("u") == {"x": 2, "y": 1}
+        assert adjacency.mutual_friends("u", "x") == 2
+        assert adjacency.friends_of_friends("missing") == {}
+
+    def test_matches_reference_on_random_graph(self):
+        edges = random_edges(300, 1500)
+        adjacency = ContactAdjacency(edges)
+
+        for contact_id in ("c0", "c17", "c150", "c299"):
+            assert adjacency.friends_of_friends(contact_id) == reference_friends_of_friends(
+                edges, contact_id
+            )
+
+    def test_empty_graph(self):
+        adjacency = ContactAdjacency([])
+
+        assert len(adjacency) == 0
+        assert adjacency.friends_of_friends("a") == {}
+
+
+class TestEngineGraphCache:
+    """Connection graph loading and invalidation"""
+
+    @pytest.mark.asyncio
+    async def test_graph_loaded_once_with_paging(self):
+        engine, supabase = make_engine(random_edges(100, 450), page_size=100)
+
+        await engine._get_friends_of_friends("c1")
+        loads = len(supabase.calls)
+        await engine._get_friends_of_friends("c2")
+        await engine._count_mutual_friends("c1", "c2")
+
+        assert loads == 5
+        assert len(supabase.calls) == loads
+
+    @pytest.mark.asyncio
+    async def test_invalidate_and_ttl(self):
+        engine, supabase = make_engine([("a", "b"), ("b", "c")])
+        assert await engine._get_friends_of_friends("a") == {"c": 1}
+
+        supabase.tables["contact_connections"].append({"contact_id_1": "b", "contact_id_2": "d"})
+        assert await engine._get_friends_of_friends("a") == {"c": 1}
+
+        engine.invalidate_adjacency()
+        assert await engine._get_friends_of_friends("a") == {"c": 1, "d": 1}
+
+        supabase.tables["contact_connections"].append({"contact_id_1": "c", "contact_id_2": "a"})
+        engine.adjacency_ttl_seconds = 0.0
+        assert await engine._get_friends_of_friends("a") == {"d": 1}
+
+    @pytest.mark.asyncio
+    async def test_connection_writes_invalidate_live_engines(self):
+        engine, supabase = make_engine([("a", "b"), ("b", "c")])
+        other, _ = make_engine([("x", "y")])
+        assert await engine._get_friends_of_friends("a") == {"c": 1}
+        await other._get_friends_of_friends("x")
+
+        supabase.tables["contact_connections"].append({"contact_id_1": "b", "contact_id_2": "d"})
+        invalidate_connection_graphs()
+
+        assert other._adjacency is None
+        assert await engine._get_friends_of_friends("a") == {"c": 1, "d": 1}
+
+
+class TestRecommendContacts:
+    """End-to-end recommendations"""
+
+    @pytest.mark.asyncio
+    async def test_recommendations_use_mutual_counts(self):
+        edges = [("u", f"f{i}") for i in range(10)]
+        edges += [(f"f{i}", "x") for i in range(10)] + [("f0", "y")]
+        contacts = [
+            {"id": "u", "organization": "Acme"},
+            {"id": "x", "first_name": "X", "organization": "acme ", "influence_score": 0.5},
+            {"id": "y", "first_name": "Y", "organization": "Other", "influence_score": 0.5},
+        ]
+        engine, supabase = make_engine(edges, contacts)
+
+        recommendations = await engine.recommend_contacts("u", min_score=0.0)
+
+        assert [r["contact_id"] for r in recommendations] == ["x", "y"]
+        assert recommendations[0]["score_components"]["mutual_friends"] == 1.0
+        assert recommendations[1]["score_components"]["mutual_friends"] == 0.1
+        assert recommendations[0]["score_components"]["same_organization"] == 1.0
+        assert len(supabase.calls_to("contact_connections")) == 1
+
+
+class TestBulkScoring:
+    """Vectorized candidate scoring"""
+
+    def make_scored_engine(self, num_candidates=30, seed=0):
+        rng = np.random.default_rng(seed)
+        edges = [("u", "f0"), ("u", "f1"), ("u", "f2")]
+        contacts = [{"id": "u", "organization": "Acme"}]
+        similarities = {}
+        for i in range(num_candidates):
+            for friend in rng.choice(3, size=rng.integers(1, 4), replace=False).tolist():
+                edges.append((f"f{friend}", f"c{i}"))
+            contacts.append(
+                {
+                    "id": f"c{i}",
+                    "first_name": f"C{i}",
+                    "organization": "ACME" if i % 4 == 0 else "Other",
+                    "influence_score": round(float(rng.random()), 2),
+                }
+            )
+            similarities[f"c{i}"] = float(rng.uniform(-1, 1))
+
+        engine, supabase = make_engine(edges, contacts)
+        engine.embeddings_service.get_similarities = AsyncMock(return_value=similarities)
+        return engine, supabase, edges, contacts, similarities
+
+    @pytest.mark.asyncio
+    async def test_scores_match_per_candidate_formula(self):
+        engine, _, edges, contacts, similarities = self.make_scored_engine()
+
+        recommendations = await engine.recommend_contacts("u", limit=100, min_score=0.0)
+
+        mutual = reference_friends_of_friends(edges, "u")
+        by_id = {contact["id"]: contact for contact in contacts}
+        for rec in recommendations:
+            contact = by_id[rec["contact_id"]]
+            expected = (
+                min(mutual[rec["contact_id"]] / 10.0, 1.0) * 0.3
+                + (similarities[rec["contact_id"]] + 1.0) / 2.0 * 0.3
+                + contact["influence_score"] * 0.25
+                + (contact["organization"] == "ACME") * 0.15
+            )
+            assert rec["recommendation_score"] == pytest.approx(round(expected, 3))
+
+        scores = [rec["recommendation_score"] for rec in recommendations]
+        assert len(recommendations) == 30
+        assert scores == sorted(scores, reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_single_queries_and_timings(self):
+        engine, supabase, _, _, _ = self.make_scored_engine()
+
+        result = await engine.recommend_contacts("u", limit=5, min_score=0.3, return_timings=True)
+
+        assert len(result["recommendations"]) <= 5
+        assert all(r["recommendation_score"] >= 0.3 for r in result["recommendations"])
+        assert set(result["timings_ms"]) == {
+            "user",
+            "candidates",
+            "hydrate",
+            "similarity",
+            "scoring",
+            "total",
+        }
+        # user lookup + one in_() for all candidates
+        assert len(supabase.calls_to("contacts")) == 2
+        engine.embeddings_service.get_similarities.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_top_k_matches_full_sort(self):
+        engine, _, _, _, _ = self.make_scored_engine(num_candidates=200)
+
+        everything = await engine.recommend_contacts("u", limit=1000, min_score=0.0)
+        top = await engine.recommend_contacts("u", limit=10, min_score=0.0)
+
+        assert [r["recommendation_score"] for r in top] == [
+            r["recommendation_score"] for r in everything[:10]
+        ]
+
+    @pytest.mark.asyncio
+    async def test_similarity_failure_falls_back(self):
+        engine, _, _, _, _ = self.make_scored_engine(num_candidates=5)
+        engine.embeddings_service.get_similarities = AsyncMock(side_effect=RuntimeError("down"))
+
+        recommendations = await engine.recommend_contacts("u", min_score=0.0)
+
+        assert len(recommendations) == 5
+        assert all(r["score_components"]["semantic_similarity"] == 0.0 for r in recommendations)
+
+
+class TestFriendsOfFriendsBenchmark:
+    """Set-based 2-hop vs per-friend queries"""
+
+    def test_large_graph(self):
+        edges = random_edges(20000, 100000)
+
+        start = time.time()
+        adjacency = ContactAdjacency(edges)
+        build_time = time.time() - start
+
+        start = time.time()
+        for i in range(100):
+            adjacency.friends_of_friends(f"c{i}")
+        query_time = (time.time() - start) / 100
+
+        degree = np.mean([adjacency.degree(f"c{i}") for i in range(100)])
+
+        print(f"\n📊 Friends-of-friends (20K contacts, 100K connections):")
+        print(f"   Graph build:   {build_time:.2f}s")
+        print(f"   2-hop query:   {query_time * 1000:.2f}ms")
+        print(f"   REST queries replaced per call: {2 + 2 * degree:.0f}")
+
+        assert adjacency.friends_of_friends("c5") == reference_friends_of_friends(edges, "c5")
+        assert query_time < 0.01
+
+    @pytest.mark.asyncio
+    async def test_recommend_contacts_latency(self):
+        edges = [("u", f"f{i}") for i in range(50)]
+        edges += [(f"f{i % 50}", f"c{i}") for i in range(5000)]
+        contacts = [{"id": "u", "organization": "Acme"}] + [
+            {"id": f"c{i}", "organization": "Acme", "influence_score": 0.5} for i in range(5000)
+        ]
+        engine, _ = make_engine(edges, contacts)
+        engine.CANDIDATE_BATCH_SIZE = 5000  # in-memory table: avoid rescanning per batch
+        await engine.get_adjacency()
+
+        start = time.time()
+        result = await engine.recommend_contacts("u", limit=20, min_score=0.0, return_timings=True)
+        total_time = time.time() - start
+
+        print(f"\n📊 recommend_contacts (5000 candidates):")
+        for stage, ms in result["timings_ms"].items():
+            print(f"   {stage + ':':<14} {ms:.2f}ms")
+
+        assert len(result["recommendations"]) == 20
+        assert result["timings_ms"]["scoring"] < 100
+        assert total_time < 1.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
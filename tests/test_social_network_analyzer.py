@@ -0,0 +1,575 @@
+"""
+Social Network Analyzer Tests
+
+Test Coverage:
+1. Brandes betweenness on graphs with known values (multiple shortest paths)
+2. Weighted betweenness (Connection.strength)
+3. Sampled (approximate) betweenness
+4. Benchmark against the legacy per-node all-pairs implementation
+5. build_graph via inverted indexes: parity with all-pairs detection, posting-list caps
+6. Graph construction scalability (50K contacts)
+7. Community detection: modularity, resolution, incremental re-runs, 10K-100K benchmark
+"""
+
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from api.ml.graph_neighborhood import ContactAdjacency
+from api.ml.recommendation_engine import RecommendationEngine
+from apps.contacts.network_algorithms import (
+    CSRGraph,
+    brandes_betweenness,
+    louvain_communities,
+    modularity,
+)
+from apps.contacts.social_network_analyzer import ConnectionType, SocialNetworkAnalyzer
+
+
+def make_analyzer(edges, nodes=None):
+    """Analyzer with an explicit edge list: [(id1, id2, strength), ...]"""
+    analyzer = SocialNetworkAnalyzer(supabase_client=None)
+    node_ids = nodes or sorted({n for a, b, _ in edges for n in (a, b)})
+
+    for node_id in node_ids:
+        analyzer._add_node({"id": node_id})
+
+    for a, b, strength in edges:
+        analyzer.add_connection(a, b, ConnectionType.SOCIAL, strength)
+
+    return analyzer
+
+
+def random_edges(num_nodes, avg_degree, seed=42):
+    rng = random.Random(seed)
+    # Random spanning tree first so every node is present, then random extra edges
+    edges = {(rng.randrange(i), i) for i in range(1, num_nodes)}
+    while len(edges) < num_nodes * avg_degree // 2:
+        a, b = rng.randrange(num_nodes), rng.randrange(num_nodes)
+        if a != b:
+            edges.add((min(a, b), max(a, b)))
+    return [(f"n{a}", f"n{b}", rng.uniform(0.1, 1.0)) for a, b in sorted(edges)]
+
+
+def planted_partition(num_nodes, community_size=100, k_in=8, k_out=2, seed=0):
+    """Synthetic graph with known communities: (CSRGraph, planted labels)"""
+    rng = np.random.default_rng(seed)
+    planted = np.arange(num_nodes) // community_size
+
+    src_in = np.repeat(np.arange(num_nodes), k_in // 2)
+    dst_in = np.minimum(
+        planted[src_in] * community_size + rng.integers(0, community_size, len(src_in)),
+        num_nodes - 1,
+    )
+    src_out = np.repeat(np.arange(num_nodes), k_out // 2)
+    dst_out = rng.integers(0, num_nodes, len(src_out))
+
+    graph = CSRGraph.from_edges(
+        [f"n{i}" for i in range(num_nodes)],
+        np.concatenate([src_in, src_out]),
+        np.concatenate([dst_in, dst_out]),
+    )
+    return graph, planted
+
+
+def make_contacts(n, seed=7):
+    """Contacts with Zipf-like organizations, cities and tags"""
+    rng = random.Random(seed)
+    organizations = [f"org{i}" for i in range(max(n // 20, 1))]
+    cities = [f"city{i}" for i in range(max(n // 200, 1))]
+    tag_pool = [f"tag{i}" for i in range(max(n // 10, 1))]
+
+    def zipf(pool):
+        return pool[min(int(rng.paretovariate(1.2)) - 1, len(pool) - 1)]
+
+    return [
+        {
+            "id": f"c{i}",
+            "first_name": f"Name{i}",
+            "organization": zipf(organizations) if rng.random() < 0.7 else "",
+            "location": zipf(cities) if rng.random() < 0.8 else "",
+            "tags": [zipf(tag_pool) for _ in range(rng.randint(0, 3))],
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_betweenness(analyzer, node_id):
+    """Previous implementation: single BFS path per pair, recomputed for every node"""
+    paths = {}
+    for start_id in analyzer.graph:
+        _, predecessors = analyzer._bfs(start_id)
+        for end_id in analyzer.graph:
+            if start_id != end_id:
+                paths[(start_id, end_id)] = analyzer._reconstruct_path(
+                    start_id, end_id, predecessors
+                )
+
+    betweenness = 0.0
+    for source in analyzer.graph:
+        for target in analyzer.graph:
+            if source != target and node_id not in (source, target):
+                if node_id in paths.get((source, target), []):
+                    betweenness += 1.0
+
+    max_betweenness = (len(analyzer.graph) - 1) * (len(analyzer.graph) - 2) / 2.0
+    return betweenness / max_betweenness if max_betweenness > 0 else 0.0
+
+
+class TestBrandesBetweenness:
+    """Exact betweenness on small graphs"""
+
+    def test_path_graph(self):
+        analyzer = make_analyzer([("a", "b", 1.0), ("b", "c", 1.0)])
+        results = analyzer.calculate_centrality_measures()
+
+        assert results["b"]["betweenness_centrality"] == pytest.approx(1.0)
+        assert results["a"]["betweenness_centrality"] == 0.0
+
+    def test_multiple_shortest_paths_split_credit(self):
+        # Square a-b-c-d-a: a->c goes through b OR d
+        analyzer = make_analyzer(
+            [("a", "b", 1.0), ("b", "c", 1.0), ("c", "d", 1.0), ("d", "a", 1.0)]
+        )
+        results = analyzer.calculate_centrality_measures()
+
+        for node_id in "abcd":
+            assert results[node_id]["betweenness_centrality"] == pytest.approx(1 / 6)
+
+    def test_star_graph(self):
+        analyzer = make_analyzer([("hub", f"leaf{i}", 1.0) for i in range(5)])
+        results = analyzer.calculate_centrality_measures()
+
+        assert results["hub"]["betweenness_centrality"] == pytest.approx(1.0)
+        assert results["leaf0"]["betweenness_centrality"] == 0.0
+
+    def test_weighted_prefers_strong_connections(self):
+        # Direct a-c link is weak (length 10), a-b-c is strong (length 2)
+        edges = [("a", "b", 1.0), ("b", "c", 1.0), ("a", "c", 0.1)]
+
+        unweighted = make_analyzer(edges).calculate_centrality_measures()
+        weighted = make_analyzer(edges).calculate_centrality_measures(weighted=True)
+
+        assert unweighted["b"]["betweenness_centrality"] == 0.0
+        assert weighted["b"]["betweenness_centrality"] == pytest.approx(1.0)
+
+    def test_weighted_matches_unweighted_on_equal_strength(self):
+        analyzer = make_analyzer([(a, b, 1.0) for a, b, _ in random_edges(60, 4)])
+        csr = analyzer._get_csr()
+
+        np.testing.assert_allclose(
+            brandes_betweenness(csr, weighted=True), brandes_betweenness(csr), atol=1e-9
+        )
+
+    def test_disconnected_graph(self):
+        analyzer = make_analyzer(
+            [("a", "b", 1.0), ("b", "c", 1.0), ("x", "y", 1.0)], nodes=["a", "b", "c", "x", "y"]
+        )
+        results = analyzer.calculate_centrality_measures()
+
+        assert results["b"]["betweenness_centrality"] > 0
+        assert results["x"]["betweenness_centrality"] == 0.0
+
+    def test_csr_deduplicates_parallel_edges(self):
+        csr = CSRGraph.from_edges(
+            ["a", "b"], np.array([0, 1, 0]), np.array([1, 0, 0]), np.array([0.5, 0.9, 1.0])
+        )
+
+        assert csr.num_edges == 1
+        assert csr.weights.tolist() == [0.9, 0.9]
+
+
+class TestApproximateBetweenness:
+    """Sampled mode for very large graphs"""
+
+    def test_full_sample_equals_exact(self):
+        csr = make_analyzer(random_edges(100, 4))._get_csr()
+
+        np.testing.assert_allclose(
+            brandes_betweenness(csr, sample_size=100), brandes_betweenness(csr)
+        )
+
+    def test_sampled_ranking_close_to_exact(self):
+        csr = make_analyzer(random_edges(1000, 6))._get_csr()
+
+        exact = brandes_betweenness(csr)
+        approx = brandes_betweenness(csr, sample_size=200, seed=1)
+
+        top_exact = set(np.argsort(-exact)[:20])
+        top_approx = set(np.argsort(-approx)[:20])
+        assert len(top_exact & top_approx) >= 10
+        assert np.corrcoef(exact, approx)[0, 1] > 0.9
+
+    def test_auto_approximation_threshold(self, monkeypatch):
+        analyzer = make_analyzer(random_edges(200, 4))
+        monkeypatch.setattr(SocialNetworkAnalyzer, "APPROXIMATE_BETWEENNESS_NODES", 100)
+
+        results = analyzer.calculate_centrality_measures(sample_size=50, seed=3)
+
+        assert len(results) == 200
+
+
+class TestBetweennessBenchmark:
+    """Benchmark against the legacy implementation"""
+
+    def test_benchmark_vs_legacy(self):
+        analyzer = make_analyzer(random_edges(60, 4))
+
+        start = time.time()
+        legacy = {node_id: legacy_betweenness(analyzer, node_id) for node_id in analyzer.graph}
+        legacy_time = time.time() - start
+
+        start = time.time()
+        results = analyzer.calculate_centrality_measures()
+        brandes_time = time.time() - start
+
+        print(f"\n📊 Betweenness (60 nodes):")
+        print(f"   Legacy:  {legacy_time * 1000:.0f}ms")
+        print(f"   Brandes: {brandes_time * 1000:.1f}ms")
+        print(f"   Speedup: {legacy_time / brandes_time:.0f}x")
+
+        assert len(results) == len(legacy)
+        assert brandes_time < legacy_time
+
+    def test_brandes_scales_to_5k_nodes(self):
+        csr = make_analyzer(random_edges(5000, 6))._get_csr()
+
+        start = time.time()
+        exact = brandes_betweenness(csr)
+        exact_time = time.time() - start
+
+        start = time.time()
+        brandes_betweenness(csr, sample_size=500, seed=0)
+        sampled_time = time.time() - start
+
+        print(f"\n📊 Brandes (5K nodes, 15K edges):")
+        print(f"   Exact:   {exact_time:.2f}s")
+        print(f"   Sampled: {sampled_time:.2f}s (500 sources)")
+
+        assert exact.shape == (5000,)
+        assert exact_time < 60
+
+
+class TestBuildGraph:
+    """Edges from inverted indexes (organization / location / tag)"""
+
+    @pytest.mark.asyncio
+    async def test_matches_all_pairs_detection(self):
+        contacts = make_contacts(400)
+        analyzer = SocialNetworkAnalyzer(supabase_client=None)
+        await analyzer.build_graph(contacts, max_posting_size=10000)
+
+        expected = {}
+        for i, c1 in enumerate(contacts):
+            for c2 in contacts[i + 1 :]:
+                connection_type, strength, _ = analyzer._detect_connection(c1, c2)
+                if connection_type:
+                    expected[tuple(sorted((c1["id"], c2["id"])))] = (connection_type, strength)
+
+        actual = {
+            (conn.contact_id_1, conn.contact_id_2): (conn.connection_type, conn.strength)
+            for conn in analyzer._iter_connections()
+        }
+
+        assert actual.keys() == expected.keys()
+        for key, (connection_type, strength) in expected.items():
+            assert actual[key][0] == connection_type
+            assert actual[key][1] == pytest.approx(strength, abs=1e-6)
+
+    @pytest.mark.asyncio
+    async def test_incremental_build_matches_single_build(self):
+        contacts = make_contacts(400)
+        single = SocialNetworkAnalyzer(supabase_client=None)
+        await single.build_graph(contacts, max_posting_size=10000)
+
+        incremental = SocialNetworkAnalyzer(supabase_client=None)
+        await incremental.build_graph(contacts[:150], max_posting_size=10000)
+        await incremental.build_graph(contacts, max_posting_size=10000)
+        await incremental.build_graph(contacts[300:], max_posting_size=10000)
+
+        def edges(analyzer):
+            return {
+                (conn.contact_id_1, conn.contact_id_2): conn.strength
+                for conn in analyzer._iter_connections()
+            }
+
+        assert edges(incremental) == pytest.approx(edges(single))
+        assert len(incremental.edges) == len(single.edges)  # no duplicate old-old pairs
+
+    @pytest.mark.asyncio
+    async def test_new_contact_connects_to_existing(self):
+        analyzer = SocialNetworkAnalyzer(supabase_client=None)
+        contacts = [
+            {"id": "a", "organization": "Acme"},
+            {"id": "b", "location": "Moscow"},
+            {"id": "c", "organization": "Acme"},
+        ]
+
+        await analyzer.build_graph(contacts[:2])
+        await analyzer.build_graph(contacts)
+
+        assert analyzer.neighbors("c") == ["a"]
+        assert analyzer.neighbors("b") == []
+
+    @pytest.mark.asyncio
+    async def test_connections_view(self):
+        analyzer = SocialNetworkAnalyzer(supabase_client=None)
+        await analyzer.build_graph(
+            [
+                {"id": "a", "organization": "Acme", "location": "Moscow", "tags": ["vc"]},
+                {"id": "b", "organization": "Acme", "tags": ["vc"]},
+                {"id": "c", "location": "Moscow"},
+            ]
+        )
+
+        connections = {conn.contact_id_2: conn for conn in analyzer.connections("a")}
+
+        assert set(connections) == {"b", "c"}
+        assert connections["b"].connection_type == ConnectionType.COLLEAGUES
+        assert connections["b"].strength == pytest.approx(0.7)
+        assert connections["b"].shared_attributes == ["organization", "vc"]
+        assert connections["c"].connection_type == ConnectionType.PROXIMITY
+        assert sorted(analyzer.neighbors("a")) == ["b", "c"]
+        assert [conn.contact_id_2 for conn in analyzer.connections("c")] == ["a"]
+
+    def test_sampling_independent_of_hash_seed(self):
+        script = (
+            "import asyncio\n"
+            "from apps.contacts.social_network_analyzer import SocialNetworkAnalyzer\n"
+            "contacts = [{'id': f'c{i}', 'tags': [f't{i % 7}', f'u{i % 5}']} for i in range(300)]\n"
+            "analyzer = SocialNetworkAnalyzer(supabase_client=None)\n"
+            "asyncio.run(analyzer.build_graph(contacts, max_posting_size=20, fanout=3, seed=1))\n"
+            "print(sorted((c.contact_id_1, c.contact_id_2) for c in analyzer._iter_connections()))\n"
+        )
+        root = Path(__file__).resolve().parent.parent
+        outputs = [
+            subprocess.run(
+                [sys.executable, "-c", script],
+                cwd=root,
+                env={**os.environ, "PYTHONHASHSEED": hash_seed},
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            for hash_seed in ("1", "2", "3")
+        ]
+
+        assert outputs[0] and outputs[0] == outputs[1] == outputs[2]
+
+    @pytest.mark.asyncio
+    async def test_large_posting_list_is_capped(self):
+        contacts = [{"id": f"c{i}", "tags": ["newsletter"]} for i in range(500)]
+        analyzer = SocialNetworkAnalyzer(supabase_client=None)
+
+        await analyzer.build_graph(contacts, max_posting_size=100, fanout=5)
+
+        csr = analyzer._get_csr()
+        assert csr.num_edges == 500 * 5
+        assert csr.degree().min() == 10
+
+    @pytest.mark.asyncio
+    async def test_save_writes_each_edge_once(self):
+        supabase = MagicMock()
+        table = supabase.table.return_value
+        table.insert.return_value.execute = AsyncMock()
+        table.update.return_value.eq.return_value.execute = AsyncMock()
+        analyzer = SocialNetworkAnalyzer(supabase_client=supabase)
+        await analyzer.build_graph(
+            [{"id": "b", "organization": "Acme"}, {"id": "a", "organization": "Acme"}]
+        )
+
+        await analyzer.save_to_database()
+
+        rows = table.insert.call_args[0][0]
+        assert rows == [
+            {
+                "contact_id_1": "a",
+                "contact_id_2": "b",
+                "connection_type": "colleagues",
+                "strength": 0.5,
+                "weight": 1.0,
+                "shared_attributes": ["organization"],
+            }
+        ]
+
+    @pytest.mark.asyncio
+    async def test_save_invalidates_recommendation_graphs(self):
+        supabase = MagicMock()
+        table = supabase.table.return_value
+        table.insert.return_value.execute = AsyncMock()
+        table.update.return_value.eq.return_value.execute = AsyncMock()
+        analyzer = SocialNetworkAnalyzer(supabase_client=supabase)
+        await analyzer.build_graph(
+            [{"id": "b", "organization": "Acme"}, {"id": "a", "organization": "Acme"}]
+        )
+        engine = RecommendationEngine(supabase, embeddings_service=None)
+        engine._adjacency = ContactAdjacency([("a", "c")])
+
+        await analyzer.save_to_database()
+
+        assert engine._adjacency is None
+
+    @pytest.mark.asyncio
+    async def test_build_graph_50k_contacts(self):
+        contacts = make_contacts(50000)
+        analyzer = SocialNetworkAnalyzer(supabase_client=None)
+
+        start = time.time()
+        await analyzer.build_graph(contacts)
+        duration = time.time() - start
+
+        src, _, _, _ = analyzer.edges.arrays
+        print(f"\n📊 build_graph (50K contacts): {len(src)} edges in {duration:.2f}s")
+        print(f"   Edge storage: {sum(a.nbytes for a in analyzer.edges.arrays) / 1e6:.1f}MB")
+
+        assert len(analyzer.graph) == 50000
+        assert duration < 60
+
+
+class TestCommunityDetection:
+    """Louvain / Leiden community detection"""
+
+    def test_two_cliques_with_bridge(self):
+        clique_a = [(f"a{i}", f"a{j}", 1.0) for i in range(5) for j in range(i + 1, 5)]
+        clique_b = [(f"b{i}", f"b{j}", 1.0) for i in range(5) for j in range(i + 1, 5)]
+        analyzer = make_analyzer(clique_a + clique_b + [("a0", "b0", 1.0)])
+
+        communities = analyzer.detect_communities(seed=0)
+
+        assert sorted(sorted(members) for members in communities.values()) == [
+            [f"a{i}" for i in range(5)],
+            [f"b{i}" for i in range(5)],
+        ]
+        assert analyzer.graph["a3"].community_id != analyzer.graph["b3"].community_id
+
+    def test_not_connected_components(self):
+        # One connected graph must not collapse into one community
+        graph, _ = planted_partition(2000, community_size=50)
+        rows = np.repeat(np.arange(graph.num_nodes), graph.degree())
+        edges = [
+            (f"n{i}", f"n{j}", 1.0) for i, j in zip(rows.tolist(), graph.indices.tolist()) if i < j
+        ]
+        analyzer = make_analyzer(edges, nodes=graph.node_ids)
+
+        communities = analyzer.detect_communities(seed=0)
+
+        assert len(communities) > 20
+
+    def test_recovers_planted_partition(self):
+        graph, planted = planted_partition(5000, community_size=50)
+
+        labels = louvain_communities(graph, seed=0)
+
+        assert modularity(graph, labels) >= 0.98 * modularity(graph, planted)
+
+    def test_resolution_controls_granularity(self):
+        graph, _ = planted_partition(3000, community_size=100)
+
+        coarse = louvain_communities(graph, resolution=0.3, seed=0).max() + 1
+        default = louvain_communities(graph, resolution=1.0, seed=0).max() + 1
+        fine = louvain_communities(graph, resolution=20.0, seed=0).max() + 1
+
+        assert coarse < default < fine
+
+    def test_weights_are_used(self):
+        # Square with two strong and two weak sides -> two strong pairs
+        edges = [("a", "b", 1.0), ("c", "d", 1.0), ("b", "c", 0.05), ("d", "a", 0.05)]
+        analyzer = make_analyzer(edges)
+
+        communities = analyzer.detect_communities(seed=0)
+
+        assert sorted(sorted(members) for members in communities.values()) == [
+            ["a", "b"],
+            ["c", "d"],
+        ]
+
+    def test_communities_are_connected(self):
+        graph, _ = planted_partition(3000, community_size=60, k_in=4, k_out=4)
+
+        labels = louvain_communities(graph, seed=0)
+
+        # Splitting by connectivity inside communities changes nothing
+        for community in np.unique(labels):
+            members = np.flatnonzero(labels == community)
+            seen, stack = {int(members[0])}, [int(members[0])]
+            while stack:
+                v = stack.pop()
+                for w in graph.indices[graph.indptr[v] : graph.indptr[v + 1]].tolist():
+                    if labels[w] == community and w not in seen:
+                        seen.add(w)
+                        stack.append(w)
+            assert len(seen) == len(members)
+
+    @pytest.mark.asyncio
+    async def test_incremental_rerun_keeps_assignment(self):
+        contacts = make_contacts(2000)
+        analyzer = SocialNetworkAnalyzer(supabase_client=None)
+        await analyzer.build_graph(contacts[:1800])
+        analyzer.detect_communities(seed=0)
+        before = {node_id: node.community_id for node_id, node in analyzer.graph.items()}
+
+        await analyzer.build_graph(contacts)
+        analyzer.detect_communities(incremental=True, seed=0)
+
+        # New nodes are wired to the existing graph (new<->old edges reach the incremental path)
+        new_ids = [contact["id"] for contact in contacts[1800:]]
+        assert (
+            sum(1 for node_id in new_ids if set(analyzer.neighbors(node_id)) - set(new_ids)) > 100
+        )
+
+        # Pairs that shared a community before mostly still do
+        old_ids = list(before)
+        kept = [
+            (before[a] == before[b])
+            == (analyzer.graph[a].community_id == analyzer.graph[b].community_id)
+            for a, b in zip(old_ids[::2], old_ids[1::2])
+        ]
+        assert sum(kept) / len(kept) > 0.9
+        assert all(node.community_id >= 0 for node in analyzer.graph.values())
+        # Connected new nodes join existing communities rather than staying singletons
+        old_communities = set(before.values())
+        joined = [
+            analyzer.graph[node_id].community_id in old_communities
+            for node_id in new_ids
+            if analyzer.neighbors(node_id)
+        ]
+        assert sum(joined) / len(joined) > 0.5
+
+
+class TestCommunityBenchmark:
+    """Community detection on 10K-100K node graphs"""
+
+    @pytest.mark.parametrize("num_nodes", [10000, 100000])
+    def test_planted_partition_benchmark(self, num_nodes):
+        graph, planted = planted_partition(num_nodes)
+
+        start = time.time()
+        labels = louvain_communities(graph, seed=0)
+        full_time = time.time() - start
+
+        start = time.time()
+        rerun = louvain_communities(graph, initial=labels, seed=1)
+        incremental_time = time.time() - start
+
+        q_found = modularity(graph, labels)
+        q_planted = modularity(graph, planted)
+        print(f"\n📊 Louvain/Leiden ({num_nodes // 1000}K nodes, {graph.num_edges} edges):")
+        print(f"   Full run:    {full_time:.2f}s, {labels.max() + 1} communities")
+        print(f"   Incremental: {incremental_time:.2f}s")
+        print(f"   Modularity:  {q_found:.4f} (planted {q_planted:.4f})")
+
+        assert q_found >= 0.98 * q_planted
+        assert modularity(graph, rerun) >= 0.99 * q_found
+        assert incremental_time < full_time
+        assert full_time < 120
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
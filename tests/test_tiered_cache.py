@@ -0,0 +1,318 @@
+"""
+Two-Tier Cache Tests
+
+Test Coverage:
+1. L1 hits skip Redis; LRU bound; TTL with stale-while-revalidate
+2. Single-flight: concurrent misses share one Redis read / one computation
+3. Probabilistic early refresh before the Redis copy expires
+4. Invalidation: generation bump, pub/sub broadcast to other pods, in-flight loads
+5. Benchmark: hot-key latency and thundering-herd recomputations vs Redis-only
+
+Runs against an in-memory Redis stand-in shared by simulated pods (no server needed).
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from api.cache import CacheManager, ContactRecommendation, TieredCacheManager
+
+from fakes import FakeBroker, FakeClock, FakeRedis
+
+
+def make_recs(prefix: str, k: int = 20):
+    return [
+        ContactRecommendation(contact_id=f"{prefix}_{i}", score=0.9 - i * 0.01) for i in range(k)
+    ]
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(now=1000.0)
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(redis_client, clock):
+    return TieredCacheManager(
+        redis_client, key_prefix="test", l1_ttl=30, l1_stale_ttl=30, clock=clock
+    )
+
+
+class TestL1:
+    """In-process tier"""
+
+    @pytest.mark.asyncio
+    async def test_hits_skip_redis(self, cache, redis_client):
+        await cache.set_recommendations("ws_1", "c1", make_recs("c1"), k=20)
+        redis_client.round_trips = 0
+
+        for _ in range(100):
+            cached = await cache.get_recommendations("ws_1", "c1", 20)
+
+        assert cached[0].contact_id == "c1_0"
+        assert redis_client.round_trips == 0
+        assert cache.l1_stats()["hits"] == 100
+
+    @pytest.mark.asyncio
+    async def test_redis_hit_fills_l1(self, cache, redis_client):
+        writer = CacheManager(redis_client, key_prefix="test")
+        await writer.set_recommendations("ws_1", "c1", make_recs("c1"), k=20)
+
+        assert await cache.get_recommendations("ws_1", "c1", 20) is not None
+        trips = redis_client.round_trips
+        assert await cache.get_recommendations("ws_1", "c1", 20) is not None
+
+        assert redis_client.round_trips == trips
+        assert cache.stats.hit_count == 1  # one Redis hit, then L1
+
+        many = await cache.mget_recommendations("ws_1", ["c1", "c2"], k=20)
+        assert many["c1"] is not None and many["c2"] is None
+
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate(self, cache, redis_client, clock):
+        await cache.set_recommendations("ws_1", "c1", make_recs("old"), k=20)
+        # Another pod rewrites Redis
+        writer = CacheManager(redis_client, key_prefix="test")
+        await writer.set_recommendations("ws_1", "c1", make_recs("new"), k=20)
+
+        clock.now += 45  # past l1_ttl, within l1_stale_ttl
+        stale = await cache.get_recommendations("ws_1", "c1", 20)
+        assert stale[0].contact_id == "old_0"
+        assert cache.l1_stale_hits == 1
+
+        await asyncio.sleep(0)  # background reload
+        await asyncio.sleep(0)
+        fresh = await cache.get_recommendations("ws_1", "c1", 20)
+        assert fresh[0].contact_id == "new_0"
+
+        clock.now += 120  # past stale window: a plain miss
+        await cache.get_recommendations("ws_1", "c1", 20)
+        assert cache.l1_misses >= 1
+
+    @pytest.mark.asyncio
+    async def test_lru_bound(self, redis_client):
+        cache = TieredCacheManager(redis_client, l1_max_entries=3)
+        for i in range(5):
+            await cache.set_recommendations("ws_1", f"c{i}", make_recs("r", k=1), k=1)
+
+        assert len(cache.l1) == 3
+        assert cache.l1.get(("ws_1", "c0", 1)) is None
+        assert cache.l1.get(("ws_1", "c4", 1)) is not None
+
+
+class TestSingleFlight:
+    """Stampede protection"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_compute_once(self, cache):
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return make_recs("computed")
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("ws_1", "c1", 20, compute) for _ in range(50))
+        )
+
+        assert calls == 1
+        assert all(result[0].contact_id == "computed_0" for result in results)
+        assert cache.coalesced == 49
+        # Written through to Redis
+        plain = CacheManager(cache.redis, key_prefix="test")
+        assert await plain.get_recommendations("ws_1", "c1", 20) is not None
+
+    @pytest.mark.asyncio
+    async def test_compute_after_joining_read_only_miss(self, cache):
+        async def compute():
+            return make_recs("computed")
+
+        read, computed = await asyncio.gather(
+            cache.get_recommendations("ws_1", "c1", 20),
+            cache.get_or_compute("ws_1", "c1", 20, compute),
+        )
+
+        assert read is None
+        assert computed[0].contact_id == "computed_0"
+
+    @pytest.mark.asyncio
+    async def test_uncacheable_result(self, cache):
+        async def compute():
+            return None
+
+        assert await cache.get_or_compute("ws_1", "c1", 20, compute) is None
+        assert len(cache.l1) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_compute_propagates(self, cache):
+        async def compute():
+            raise RuntimeError("model unavailable")
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("ws_1", "c1", 20, compute)
+        assert not cache._inflight
+
+
+class TestEarlyRefresh:
+    """XFetch before the Redis TTL runs out"""
+
+    @pytest.mark.asyncio
+    async def test_refresh_near_expiry(self, redis_client, clock):
+        draws = iter([1.0, 1e-9])
+        cache = TieredCacheManager(
+            redis_client, default_ttl=60, l1_ttl=600, clock=clock, rng=lambda: next(draws, 1.0)
+        )
+        versions = iter(["v1", "v2"])
+
+        async def compute():
+            clock.now += 0.5  # recomputation takes 0.5s
+            return make_recs(next(versions))
+
+        first = await cache.get_or_compute("ws_1", "c1", 20, compute)
+        assert first[0].contact_id == "v1_0"
+
+        clock.now += 50  # 10s before the Redis copy expires
+        # rng=1.0: no early refresh
+        assert (await cache.get_or_compute("ws_1", "c1", 20, compute))[0].contact_id == "v1_0"
+        # Tiny draw: -0.5 * log(1e-9) ~ 10.4s > 10s left -> refresh in the background
+        served = await cache.get_or_compute("ws_1", "c1", 20, compute)
+        assert served[0].contact_id == "v1_0"
+        assert cache.early_refreshes == 1
+
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        refreshed = await cache.get_or_compute("ws_1", "c1", 20, compute)
+        assert refreshed[0].contact_id == "v2_0"
+
+
+class TestInvalidation:
+    """Coherence across pods"""
+
+    @pytest.mark.asyncio
+    async def test_broadcast_drops_other_pods_l1(self):
+        broker = FakeBroker()
+        pod_a = TieredCacheManager(FakeRedis(broker=broker), key_prefix="test")
+        pod_b = TieredCacheManager(FakeRedis(broker=broker), key_prefix="test")
+        await pod_a.start()
+        await pod_b.start()
+        try:
+            await pod_a.set_recommendations("ws_1", "c1", make_recs("r"), k=20)
+            await pod_a.set_recommendations("ws_2", "c1", make_recs("r"), k=20)
+            assert await pod_b.get_recommendations("ws_1", "c1", 20) is not None
+            assert await pod_b.get_recommendations("ws_2", "c1", 20) is not None
+
+            assert await pod_a.invalidate_workspace("ws_1") == 1
+            for _ in range(10):
+                if pod_b.invalidations_received:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert pod_b.invalidations_received == 1
+            assert pod_a.invalidations_received == 0  # own message ignored
+            assert pod_b.l1.get(("ws_1", "c1", 20)) is None
+            assert pod_b.l1.get(("ws_2", "c1", 20)) is not None
+            assert await pod_b.get_recommendations("ws_1", "c1", 20) is None
+        finally:
+            await pod_a.close()
+            await pod_b.close()
+
+    @pytest.mark.asyncio
+    async def test_load_racing_invalidation_does_not_refill_l1(self, cache):
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return make_recs("stale")
+
+        load = asyncio.ensure_future(cache.get_or_compute("ws_1", "c1", 20, compute))
+        for _ in range(3):
+            await asyncio.sleep(0)  # load has read Redis and is computing
+        await cache.invalidate_workspace("ws_1")
+        release.set()
+        await load
+
+        assert cache.l1.get(("ws_1", "c1", 20)) is None
+        assert await cache.get_recommendations("ws_1", "c1", 20) is None
+
+    def test_malformed_message_is_ignored(self, cache):
+        cache.handle_invalidation(b"not json")
+        cache.handle_invalidation(json.dumps({"workspace_id": "ws_1", "origin": "other"}))
+        assert cache.invalidations_received == 1
+
+
+class TestTieredBenchmark:
+    """L1 + single-flight vs Redis only"""
+
+    @pytest.mark.asyncio
+    async def test_hot_key_and_herd(self):
+        latency = 0.0005  # 0.5ms network round trip
+        recs = make_recs("hot")
+
+        redis_only = CacheManager(FakeRedis(latency=latency))
+        tiered = TieredCacheManager(FakeRedis(latency=latency))
+        await redis_only.set_recommendations("ws_1", "hot", recs)
+        await tiered.set_recommendations("ws_1", "hot", recs)
+
+        timings = {}
+        for name, manager in (("redis_only", redis_only), ("tiered", tiered)):
+            start = time.perf_counter()
+            for _ in range(1000):
+                await manager.get_recommendations("ws_1", "hot", 20)
+            timings[name] = (time.perf_counter() - start) / 1000
+
+        # Herd: 200 concurrent requests for a key that just expired, 50ms recomputation
+        computations = {"redis_only": 0, "tiered": 0}
+
+        async def compute(name):
+            computations[name] += 1
+            await asyncio.sleep(0.05)
+            return recs
+
+        async def naive_request():
+            cached = await redis_only.get_recommendations("ws_1", "cold", 20)
+            if cached is None:
+                cached = await compute("redis_only")
+                await redis_only.set_recommendations("ws_1", "cold", cached)
+            return cached
+
+        start = time.perf_counter()
+        await asyncio.gather(*(naive_request() for _ in range(200)))
+        naive_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                tiered.get_or_compute("ws_1", "cold", 20, lambda: compute("tiered"))
+                for _ in range(200)
+            )
+        )
+        tiered_time = time.perf_counter() - start
+
+        print(f"\n📊 Two-tier cache ({latency * 1000:.1f}ms RTT):")
+        print(f"   Hot key, Redis only:   {timings['redis_only'] * 1e6:.0f}us/get")
+        print(f"   Hot key, L1:           {timings['tiered'] * 1e6:.0f}us/get")
+        print(
+            f"   Herd of 200, Redis only: {computations['redis_only']} recomputations, "
+            f"{naive_time * 1000:.0f}ms"
+        )
+        print(
+            f"   Herd of 200, tiered:     {computations['tiered']} recomputation, "
+            f"{tiered_time * 1000:.0f}ms"
+        )
+
+        assert timings["tiered"] < timings["redis_only"] / 10
+        assert computations["tiered"] == 1
+        assert computations["redis_only"] > 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,267 @@
+"""
+Vector Index Tests
+
+Test Coverage:
+1. Exact (brute-force) top-k matches NumPy reference
+2. Incremental upsert / remove / exclusion
+3. IVF mode recall@k vs exact search (benchmark)
+4. ContactEmbeddingsService: index loading, incremental updates, similarity lookups,
+   TTL reloads and contact deletes
+"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from api.ml.embeddings_service import ContactEmbeddingsService, remove_contact_embeddings
+from api.ml.vector_index import VectorIndex
+
+from fakes import FakeSupabase
+
+
+def clustered_vectors(n, dim, num_clusters=200, noise=0.3, seed=0):
+    """Embeddings-like data: points scattered around random topic directions"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, num_clusters, n)
+    return centers[labels] + noise * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def exact_top_k(vectors, query, k):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normed @ (query / np.linalg.norm(query))
+    return np.argsort(-scores)[:k], scores
+
+
+def make_service(num_contacts=50, dim=16, pgvector_strings=False):
+    vectors = clustered_vectors(num_contacts, dim, num_clusters=5)
+    embeddings = [
+        {
+            "contact_id": f"c{i}",
+            "embedding": (
+                "[" + ",".join(map(str, vector.tolist())) + "]"
+                if pgvector_strings
+                else vector.tolist()
+            ),
+        }
+        for i, vector in enumerate(vectors)
+    ]
+    contacts = [{"id": f"c{i}", "workspace_id": f"w{i % 2}"} for i in range(num_contacts)]
+
+    supabase = FakeSupabase({"contact_embeddings": embeddings, "contacts": contacts})
+    service = ContactEmbeddingsService(supabase, MagicMock())
+    service.embedding_dimension = dim
+    service.INDEX_PAGE_SIZE = 20
+    return service, supabase, vectors
+
+
+class TestVectorIndexExact:
+    """Brute-force mode"""
+
+    def test_top_k_matches_reference(self):
+        vectors = clustered_vectors(2000, 64)
+        index = VectorIndex(dimension=64, mode="brute")
+        index.upsert_many([f"c{i}" for i in range(2000)], vectors)
+
+        query = vectors[7]
+        results = index.search(query, k=10)
+        expected, scores = exact_top_k(vectors, query, 10)
+
+        assert [cid for cid, _ in results] == [f"c{i}" for i in expected]
+        assert results[0][1] == pytest.approx(scores[expected[0]], abs=1e-5)
+
+    def test_search_by_id_excludes_self(self):
+        vectors = clustered_vectors(100, 16)
+        index = VectorIndex(dimension=16)
+        index.upsert_many([f"c{i}" for i in range(100)], vectors)
+
+        results = index.search_by_id("c3", k=5)
+
+        assert len(results) == 5
+        assert "c3" not in [cid for cid, _ in results]
+
+    def test_upsert_replaces_vector(self):
+        index = VectorIndex(dimension=3)
+        index.upsert("a", [1, 0, 0])
+        index.upsert("b", [0, 1, 0])
+        index.upsert("a", [0, 1, 0.1])
+
+        assert len(index) == 2
+        assert index.search([0, 1, 0], k=1)[0][0] == "b"
+        assert index.similarities("a", ["b"])["b"] > 0.99
+
+    def test_remove_keeps_matrix_contiguous(self):
+        index = VectorIndex(dimension=3)
+        index.upsert_many(["a", "b", "c"], np.eye(3, dtype=np.float32))
+
+        assert index.remove(["a", "missing"]) == 1
+
+        assert len(index) == 2
+        assert "a" not in index
+        assert index.search([0, 0, 1], k=1)[0][0] == "c"
+        np.testing.assert_allclose(index.get("b"), [0, 1, 0])
+
+    def test_zero_query_returns_nothing(self):
+        index = VectorIndex(dimension=3)
+        index.upsert("a", [1, 0, 0])
+
+        assert index.search([0, 0, 0], k=5) == []
+
+
+class TestVectorIndexIVF:
+    """IVF mode for large workspaces"""
+
+    def test_auto_mode_switches_to_ivf(self):
+        index = VectorIndex(dimension=16, exact_threshold=500)
+        index.upsert_many([f"c{i}" for i in range(499)], clustered_vectors(499, 16))
+        assert index.active_mode == "brute"
+
+        index.upsert("c499", np.ones(16))
+        assert index.active_mode == "ivf"
+
+    def test_incremental_adds_are_searchable(self):
+        vectors = clustered_vectors(3000, 32)
+        index = VectorIndex(dimension=32, mode="ivf")
+        index.upsert_many([f"c{i}" for i in range(2000)], vectors[:2000])
+        index.search(vectors[0], k=1)  # trains the quantizer
+
+        index.upsert_many([f"c{i}" for i in range(2000, 3000)], vectors[2000:])
+
+        for i in (2000, 2500, 2999):
+            assert index.search(vectors[i], k=1)[0][0] == f"c{i}"
+
+    def test_recall_at_k_benchmark(self):
+        n, dim, k = 100000, 256, 10
+        vectors = clustered_vectors(n, dim, num_clusters=1000, noise=0.5)
+        index = VectorIndex(dimension=dim, mode="ivf", nprobe=16)
+        index.upsert_many([f"c{i}" for i in range(n)], vectors)
+
+        start = time.time()
+        index.train()
+        train_time = time.time() - start
+
+        queries = np.random.default_rng(1).choice(n, size=100, replace=False)
+        recall, ivf_time, exact_time = 0.0, 0.0, 0.0
+        for q in queries:
+            start = time.time()
+            approx = index.search(vectors[q], k=k)
+            ivf_time += time.time() - start
+
+            start = time.time()
+            exact = index.search(vectors[q], k=k, exact=True)
+            exact_time += time.time() - start
+
+            recall += len({cid for cid, _ in approx} & {cid for cid, _ in exact}) / k
+
+        recall /= len(queries)
+        print(f"\n📊 Vector index ({n // 1000}K x {dim}):")
+        print(f"   IVF train:     {train_time:.2f}s")
+        print(f"   Exact query:   {exact_time / len(queries) * 1000:.2f}ms")
+        print(f"   IVF query:     {ivf_time / len(queries) * 1000:.2f}ms")
+        print(f"   Recall@{k}:     {recall:.3f}")
+
+        assert recall >= 0.9
+        assert ivf_time < exact_time
+        assert ivf_time / len(queries) < 0.05
+
+
+class TestEmbeddingsServiceIndex:
+    """ContactEmbeddingsService on top of the vector index"""
+
+    @pytest.mark.asyncio
+    async def test_find_similar_matches_exact_scan(self):
+        service, _, vectors = make_service()
+
+        results = await service.find_similar_contacts("c0", top_n=5)
+        expected, scores = exact_top_k(vectors, vectors[0], 6)
+
+        assert [r["contact_id"] for r in results] == [f"c{i}" for i in expected[1:]]
+        assert results[0]["similarity"] == pytest.approx(scores[expected[1]], abs=1e-5)
+
+    @pytest.mark.asyncio
+    async def test_table_loaded_once_with_paging(self):
+        service, supabase, _ = make_service(pgvector_strings=True)
+
+        await service.find_similar_contacts("c0")
+        loads = len(supabase.calls)
+        await service.find_similar_contacts("c1")
+        await service.find_similar_contacts("c2")
+
+        assert loads == 3  # 50 rows, pages of 20
+        assert len(supabase.calls) == loads
+
+    @pytest.mark.asyncio
+    async def test_workspace_index(self):
+        service, _, _ = make_service()
+
+        results = await service.find_similar_contacts("c0", top_n=100, workspace_id="w0")
+
+        assert len(results) == 24
+        assert all(int(r["contact_id"][1:]) % 2 == 0 for r in results)
+
+    @pytest.mark.asyncio
+    async def test_process_single_contact_updates_loaded_index(self):
+        service, supabase, vectors = make_service()
+        await service.find_similar_contacts("c0")
+
+        service.generate_embedding = AsyncMock(return_value=vectors[0] * 2)
+        assert await service._process_single_contact({"id": "new", "workspace_id": "w0"})
+
+        calls = len(supabase.calls)
+        results = await service.find_similar_contacts("c0", top_n=1)
+
+        assert results[0]["contact_id"] == "new"
+        assert results[0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+        assert len(supabase.calls) == calls
+
+    @pytest.mark.asyncio
+    async def test_get_similarities(self):
+        service, _, vectors = make_service()
+
+        similarities = await service.get_similarities("c0", ["c1", "missing"])
+        _, scores = exact_top_k(vectors, vectors[0], 1)
+
+        assert set(similarities) == {"c1"}
+        assert similarities["c1"] == pytest.approx(scores[1], abs=1e-5)
+
+    @pytest.mark.asyncio
+    async def test_index_reloaded_after_ttl(self):
+        service, supabase, vectors = make_service()
+        await service.find_similar_contacts("c0")
+
+        supabase.tables["contact_embeddings"].append(
+            {"contact_id": "new", "embedding": (vectors[0] * 2).tolist()}
+        )
+        assert (await service.find_similar_contacts("c0", top_n=1))[0]["contact_id"] != "new"
+
+        service.index_ttl_seconds = 0.0
+        results = await service.find_similar_contacts("c0", top_n=1)
+
+        assert results[0]["contact_id"] == "new"
+
+    @pytest.mark.asyncio
+    async def test_deleted_contacts_leave_loaded_indexes(self):
+        service, _, _ = make_service()
+        await service.find_similar_contacts("c0")
+        await service.find_similar_contacts("c0", workspace_id="w0")
+        nearest = (await service.find_similar_contacts("c0", top_n=1))[0]["contact_id"]
+
+        remove_contact_embeddings([nearest, "missing"])
+
+        for workspace_id in (None, "w0"):
+            results = await service.find_similar_contacts(
+                "c0", top_n=100, workspace_id=workspace_id
+            )
+            assert nearest not in [r["contact_id"] for r in results]
+
+    @pytest.mark.asyncio
+    async def test_unknown_contact(self):
+        service, _, _ = make_service()
+
+        assert await service.find_similar_contacts("missing") == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])